@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+backup_store.py
+Content-addressed, deduplicated workbook backups with retention.
+
+Every backup is a snapshot entry in manifest.json pointing at an object
+named by the SHA-256 of the workbook bytes:
+
+    backups/
+        manifest.json
+        objects/ab/ab12...ef.xlsx       (or .xlsx.gz once compressed)
+
+- An unchanged workbook adds only a manifest entry (hash reference), no copy
+- Objects only referenced by old snapshots are gzip-compressed
+- Retention keeps the last N snapshots plus the newest one per day and per
+  ISO week for the configured number of days/weeks; unreferenced objects
+  are then deleted
+- Objects and the manifest are written to a temp file and renamed into place
+
+Usage:
+    store = BackupStore('backups', keep_last=10, keep_daily=7, keep_weekly=8)
+    store.backup('Hybrid_ProjectPlan_Template.xlsx')
+    store.restore(store.snapshots()[-1]['id'], 'restored.xlsx')
+
+    python backup_store.py --dir backups list
+    python backup_store.py --dir backups restore <snapshot-id> restored.xlsx
+    python backup_store.py --dir backups prune
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file, read in 1 MiB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BackupStore:
+    """Deduplicating snapshot store for workbook backups"""
+
+    def __init__(self, root, keep_last=10, keep_daily=7, keep_weekly=8, compress_after_days=7):
+        self.root = root
+        self.keep_last = keep_last
+        self.keep_daily = keep_daily
+        self.keep_weekly = keep_weekly
+        self.compress_after_days = compress_after_days
+        self.manifest = self._load_manifest()
+
+    @classmethod
+    def from_config(cls, settings, default_root):
+        """Build from a BACKUP config section (UPPER_CASE or lower_case keys)"""
+        settings = {k.lower(): v for k, v in (settings or {}).items()}
+        return cls(
+            settings.get('dir') or default_root,
+            keep_last=settings.get('keep_last', 10),
+            keep_daily=settings.get('keep_daily', 7),
+            keep_weekly=settings.get('keep_weekly', 8),
+            compress_after_days=settings.get('compress_after_days', 7)
+        )
+
+    # ------------------
+    # Manifest
+    # ------------------
+    def _load_manifest(self):
+        path = os.path.join(self.root, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {'version': 1, 'snapshots': [], 'objects': {}}
+
+    def _save_manifest(self):
+        self._atomic_write(os.path.join(self.root, MANIFEST),
+                           lambda f: f.write(json.dumps(self.manifest, indent=2).encode()))
+
+    def _atomic_write(self, path, write):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def snapshots(self, source=None):
+        """Snapshots oldest first, optionally for one source file name"""
+        return [s for s in self.manifest['snapshots'] if source is None or s['source'] == source]
+
+    # ------------------
+    # Backup / restore
+    # ------------------
+    def backup(self, path, created=None):
+        """Snapshot ``path``; copies the bytes only if this content is new"""
+        created = created or datetime.now()
+        sha = file_sha256(path)
+        _, ext = os.path.splitext(path)
+        objects = self.manifest['objects']
+
+        deduplicated = sha in objects
+        if not deduplicated:
+            relative = os.path.join('objects', sha[:2], sha + ext)
+            with open(path, 'rb') as src:
+                self._atomic_write(os.path.join(self.root, relative),
+                                   lambda f: shutil.copyfileobj(src, f, CHUNK_SIZE))
+            size = os.path.getsize(path)
+            objects[sha] = {'file': relative, 'size': size, 'stored_size': size, 'compressed': False}
+
+        snapshot = {
+            'id': f"{created.strftime('%Y%m%d_%H%M%S')}_{sha[:8]}",
+            'source': os.path.basename(path),
+            'created': created.isoformat(timespec='seconds'),
+            'sha256': sha,
+        }
+        if all(s['id'] != snapshot['id'] for s in self.manifest['snapshots']):
+            self.manifest['snapshots'].append(snapshot)
+        self.manifest['snapshots'].sort(key=lambda s: s['created'])
+
+        self.prune(now=created)
+        logger.info(f"Backup snapshot {snapshot['id']} of {path} "
+                    f"({'unchanged, referenced existing object' if deduplicated else 'new object stored'})")
+        return dict(snapshot, deduplicated=deduplicated)
+
+    def restore(self, snapshot_id, destination):
+        """Write the workbook of a snapshot to ``destination``"""
+        snapshot = next((s for s in self.manifest['snapshots'] if s['id'] == snapshot_id), None)
+        if snapshot is None:
+            raise KeyError(f"No snapshot {snapshot_id}")
+        entry = self.manifest['objects'][snapshot['sha256']]
+        opener = gzip.open if entry['compressed'] else open
+        with opener(os.path.join(self.root, entry['file']), 'rb') as src:
+            self._atomic_write(os.path.abspath(destination), lambda f: shutil.copyfileobj(src, f, CHUNK_SIZE))
+        return destination
+
+    # ------------------
+    # Retention
+    # ------------------
+    def _retained(self, snapshots):
+        """Ids to keep for one source: last N plus newest per day / ISO week"""
+        newest_first = sorted(snapshots, key=lambda s: s['created'], reverse=True)
+        keep = {s['id'] for s in newest_first[:self.keep_last]}
+
+        for count, bucket in ((self.keep_daily, lambda d: d.date()),
+                              (self.keep_weekly, lambda d: tuple(d.isocalendar())[:2])):
+            seen = []
+            for snapshot in newest_first:
+                key = bucket(datetime.fromisoformat(snapshot['created']))
+                if key in seen:
+                    continue
+                if len(seen) >= count:
+                    break
+                seen.append(key)
+                keep.add(snapshot['id'])
+        return keep
+
+    def prune(self, now=None):
+        """Apply retention, compress old objects, delete unreferenced ones and save"""
+        now = now or datetime.now()
+        snapshots = self.manifest['snapshots']
+        keep = set()
+        for source in {s['source'] for s in snapshots}:
+            keep |= self._retained([s for s in snapshots if s['source'] == source])
+        removed = [s for s in snapshots if s['id'] not in keep]
+        self.manifest['snapshots'] = [s for s in snapshots if s['id'] in keep]
+
+        # Newest snapshot time per object; latest object per source stays uncompressed
+        last_used = {}
+        latest = {}
+        for snapshot in self.manifest['snapshots']:
+            last_used[snapshot['sha256']] = max(last_used.get(snapshot['sha256'], ''), snapshot['created'])
+            latest[snapshot['source']] = snapshot['sha256']
+
+        deleted = []
+        for sha, entry in list(self.manifest['objects'].items()):
+            path = os.path.join(self.root, entry['file'])
+            if sha not in last_used:
+                if os.path.exists(path):
+                    os.unlink(path)
+                del self.manifest['objects'][sha]
+                deleted.append(sha)
+            elif (not entry['compressed'] and sha not in latest.values()
+                  and datetime.fromisoformat(last_used[sha]) < now - timedelta(days=self.compress_after_days)):
+                self._compress(entry)
+
+        self._save_manifest()
+        if removed:
+            logger.info(f"Backup retention removed {len(removed)} snapshots and {len(deleted)} objects")
+        return removed
+
+    def _compress(self, entry):
+        source = os.path.join(self.root, entry['file'])
+        with open(source, 'rb') as src:
+            self._atomic_write(source + '.gz', lambda f: self._gzip_into(src, f))
+        os.unlink(source)
+        entry['file'] += '.gz'
+        entry['compressed'] = True
+        entry['stored_size'] = os.path.getsize(os.path.join(self.root, entry['file']))
+
+    @staticmethod
+    def _gzip_into(src, dst):
+        with gzip.GzipFile(fileobj=dst, mode='wb', mtime=0) as gz:
+            shutil.copyfileobj(src, gz, CHUNK_SIZE)
+
+    def usage(self):
+        """Logical bytes referenced by snapshots vs. bytes actually stored"""
+        objects = self.manifest['objects']
+        logical = sum(objects[s['sha256']]['size'] for s in self.manifest['snapshots'])
+        stored = sum(entry['stored_size'] for entry in objects.values())
+        return {'snapshots': len(self.manifest['snapshots']), 'objects': len(objects),
+                'logical_bytes': logical, 'stored_bytes': stored}
+
+
+def main():
+    """Command line access to a backup store"""
+    parser = argparse.ArgumentParser(description='Inspect, restore and prune workbook backups')
+    parser.add_argument('--dir', default='backups', help='Backup store directory (default: backups)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='List snapshots')
+    restore = sub.add_parser('restore', help='Restore a snapshot')
+    restore.add_argument('snapshot_id')
+    restore.add_argument('destination')
+    sub.add_parser('prune', help='Apply retention and compression now')
+
+    args = parser.parse_args()
+    store = BackupStore(args.dir)
+
+    if args.command == 'list':
+        for snapshot in store.snapshots():
+            entry = store.manifest['objects'][snapshot['sha256']]
+            print(f"{snapshot['id']}  {snapshot['source']}  {entry['size']} bytes"
+                  f"{'  (gz)' if entry['compressed'] else ''}")
+        usage = store.usage()
+        print(f"\n{usage['snapshots']} snapshots, {usage['objects']} objects, "
+              f"{usage['stored_bytes']} bytes stored for {usage['logical_bytes']} bytes of backups")
+    elif args.command == 'restore':
+        print(f"Restored to {store.restore(args.snapshot_id, args.destination)}")
+    elif args.command == 'prune':
+        removed = store.prune()
+        print(f"Removed {len(removed)} snapshots")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+evm.py
+Vectorised earned-value management over the WBS_TaskPlan sheet.
+
+For every task and status date the engine computes planned value (PV),
+earned value (EV) and actual cost (AC) as whole-column NumPy operations
+(tasks x dates broadcasting, no per-row Python), then SPI, CPI, SV, CV,
+EAC, ETC and VAC, and rolls everything up through the WBS hierarchy.
+
+Inputs per task (WBS_TaskPlan columns):
+- Planned Start / Planned End / Planned Days  -> baseline (PV)
+- Actual Start / Actual End                   -> actuals (AC)
+- % Complete                                  -> progress at the data date (EV)
+- Budget (optional, BUDGET_COLUMN)            -> budget at completion;
+  without it BAC = Planned Days x daily rate
+
+Time phasing:
+- PV accrues linearly from Planned Start to Planned End
+- AC accrues at the planned daily rate from Actual Start to Actual End, or
+  to the data date while the task is still open
+- EV accrues linearly from Actual Start to Actual End (reaching 100%), or
+  to the data date (reaching % Complete); the sheet has no progress
+  history, so this is the usual straight-line assumption
+
+Hierarchy: dotted WBS IDs ("1.2.3") roll up to every ancestor ("1.2",
+"1") and to the portfolio total; flat IDs ("T001") roll up to the
+portfolio only. ``group_by`` adds a rollup by any other column (Owner).
+
+Usage:
+    engine = EvmEngine.from_excel('Hybrid_ProjectPlan_Template.xlsx')
+    tasks = engine.task_table('2025-10-17')
+    curve = engine.s_curve(status_dates('2025-08-01', '2025-12-31'))
+
+    python evm.py --excel ../Hybrid_ProjectPlan_Template.xlsx --status-date 2025-10-17 --update-rag
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from xlsx_patch import XlsxPatchUnsupported, patch_sheet_cells
+
+logger = logging.getLogger(__name__)
+
+NAT = np.iinfo(np.int64).min
+PORTFOLIO = 'Portfolio'
+CURVES = ('PV', 'EV', 'AC')
+
+
+def status_dates(start, end, freq: str = 'W-FRI') -> np.ndarray:
+    """Regular status dates (weekly on Friday by default) as datetime64[D]"""
+    return pd.date_range(start, end, freq=freq).to_numpy(dtype='datetime64[D]')
+
+
+def _days(series: pd.Series) -> np.ndarray:
+    """Column of dates as int64 day numbers; missing dates become NAT"""
+    values = pd.to_datetime(series, errors='coerce').to_numpy(dtype='datetime64[D]')
+    return values.view(np.int64)
+
+
+def _numbers(df: pd.DataFrame, name: str, default=np.nan) -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), default, dtype=float)
+    return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def _accrual(t, start, end, missing):
+    """Fraction of [start, end] elapsed at day numbers ``t`` (tasks x dates)"""
+    span = (end - start).astype(float)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        linear = np.clip((t[None, :] - start[:, None]) / span, 0.0, 1.0)
+    instant = (t[None, :] >= end[:, None]).astype(float)
+    fraction = np.where(span > 0, linear, instant)
+    fraction[missing] = 0.0
+    return fraction
+
+
+def evm_indices(pv, ev, ac, bac) -> Dict[str, np.ndarray]:
+    """Variances, performance indices and forecasts from PV/EV/AC/BAC arrays"""
+    cpi = _ratio(ev, ac)
+    spi = _ratio(ev, pv)
+    # EAC = BAC / CPI; before any cost is booked fall back to the budget
+    eac = np.where(np.isnan(cpi), bac, _ratio(bac, np.where(np.isnan(cpi), 1.0, cpi)))
+    return {
+        'SV': ev - pv,
+        'CV': ev - ac,
+        'SPI': spi,
+        'CPI': cpi,
+        'EAC': eac,
+        'ETC': eac - ac,
+        'VAC': bac - eac,
+    }
+
+
+class EvmEngine:
+    """Earned value for a task table at any number of status dates"""
+
+    def __init__(self, df: pd.DataFrame, data_date=None, budget_column: Optional[str] = 'Budget',
+                 daily_rate: float = 1.0, id_column: str = 'WBS ID', block_size: int = 20000):
+        self.df = df.reset_index(drop=True)
+        self.ids = self.df[id_column].astype(str).str.strip().to_numpy() if id_column in df.columns \
+            else np.arange(1, len(df) + 1).astype(str)
+        self.data_date = np.datetime64(pd.Timestamp(data_date or pd.Timestamp.now()).date(), 'D').astype(np.int64)
+        self.block_size = block_size
+
+        self.planned_start = _days(self.df.get('Planned Start', pd.Series(pd.NaT, index=self.df.index)))
+        self.planned_end = _days(self.df.get('Planned End', pd.Series(pd.NaT, index=self.df.index)))
+        self.actual_start = _days(self.df.get('Actual Start', pd.Series(pd.NaT, index=self.df.index)))
+        self.actual_end = _days(self.df.get('Actual End', pd.Series(pd.NaT, index=self.df.index)))
+
+        planned_days = _numbers(self.df, 'Planned Days')
+        span = np.where((self.planned_start != NAT) & (self.planned_end != NAT),
+                        self.planned_end - self.planned_start, 0).astype(float)
+        planned_days = np.where(np.isnan(planned_days), span, planned_days)
+        budget = _numbers(self.df, budget_column) if budget_column else np.full(len(self.df), np.nan)
+        self.bac = np.where(np.isnan(budget), planned_days * daily_rate, budget)
+        self.bac = np.nan_to_num(self.bac)
+        # Cost per elapsed calendar day of actual work
+        self.daily_cost = np.nan_to_num(_ratio(self.bac, np.maximum(planned_days, 1.0)))
+
+        percent = np.nan_to_num(_numbers(self.df, '% Complete', 0.0)) / 100.0
+        # A recorded finish means the task is done whatever % Complete says
+        self.percent = np.clip(np.where(self.actual_end != NAT, 1.0, percent), 0.0, 1.0)
+
+    @classmethod
+    def from_excel(cls, excel_path: str, sheet: str = 'WBS_TaskPlan', **kwargs) -> 'EvmEngine':
+        return cls(pd.read_excel(excel_path, sheet_name=sheet), **kwargs)
+
+    def __len__(self):
+        return len(self.df)
+
+    # ------------------
+    # Curves
+    # ------------------
+    def _block_curves(self, rows: slice, dates: np.ndarray) -> Dict[str, np.ndarray]:
+        """PV/EV/AC (tasks x dates) for one block of tasks"""
+        t = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+        ps, pe = self.planned_start[rows], self.planned_end[rows]
+        as_, ae = self.actual_start[rows], self.actual_end[rows]
+        bac, percent = self.bac[rows], self.percent[rows]
+
+        pv = bac[:, None] * _accrual(t, ps, pe, (ps == NAT) | (pe == NAT))
+
+        started = as_ != NAT
+        finished = ae != NAT
+        # Open tasks earn and spend up to the data date only
+        end = np.where(finished, ae, np.maximum(as_, self.data_date))
+        not_started = ~started
+        ev = (bac * np.where(finished, 1.0, percent))[:, None] * _accrual(t, as_, end, not_started)
+
+        elapsed = np.clip(np.minimum(t[None, :], end[:, None]) - as_[:, None], 0, None).astype(float)
+        ac = self.daily_cost[rows][:, None] * elapsed
+        ac[not_started] = 0.0
+        return {'PV': pv, 'EV': ev, 'AC': ac}
+
+    def curves(self, dates) -> Dict[str, np.ndarray]:
+        """Task-level PV/EV/AC matrices (tasks x dates)"""
+        blocks = [self._block_curves(slice(i, i + self.block_size), dates)
+                  for i in range(0, len(self), self.block_size)]
+        if not blocks:
+            return {name: np.zeros((0, len(dates))) for name in CURVES}
+        return {name: np.vstack([block[name] for block in blocks]) for name in CURVES}
+
+    def task_table(self, status_date=None) -> pd.DataFrame:
+        """Per-task PV/EV/AC, variances, indices, forecasts and EVM-based RAG"""
+        date = np.array([np.datetime64(pd.Timestamp(status_date).date(), 'D') if status_date is not None
+                         else self.data_date.astype('datetime64[D]')])
+        curves = {name: values[:, 0] for name, values in self.curves(date).items()}
+        table = pd.DataFrame({'WBS ID': self.ids, 'BAC': self.bac, **curves})
+        for name, values in evm_indices(curves['PV'], curves['EV'], curves['AC'], self.bac).items():
+            table[name] = values
+        table['RAG'] = rag_status(table['SPI'].to_numpy(), table['CPI'].to_numpy())
+        return table
+
+    # ------------------
+    # Rollups
+    # ------------------
+    def hierarchy(self, group_by: Optional[str] = None) -> List[np.ndarray]:
+        """One node-label array per rollup level (each the length of the task table)"""
+        levels = [np.full(len(self), PORTFOLIO, dtype=object)]
+        parts = pd.Series(self.ids).str.split('.')
+        depth = parts.str.len().to_numpy()
+        for d in range(1, int(depth.max()) if len(self) else 1):
+            ancestors = parts.str[:d].str.join('.').to_numpy(dtype=object)
+            # Tasks at depth <= d have no ancestor at this level
+            levels.append(np.where(depth > d, ancestors, None))
+        if group_by:
+            levels.append(self.df[group_by].astype(str).to_numpy(dtype=object))
+        return levels
+
+    def rollup_curves(self, dates, group_by: Optional[str] = None) -> pd.DataFrame:
+        """PV/EV/AC/BAC summed per WBS node (and group) and status date, with indices
+
+        Task blocks are accumulated into per-node totals, so memory stays at
+        one block of tasks x dates however large the plan is.
+        """
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        levels = self.hierarchy(group_by)
+        names = ['Portfolio'] + [f'WBS Level {d}' for d in range(1, len(levels))]
+        if group_by:
+            names[-1] = group_by
+
+        codes = []
+        labels = []
+        for labels_at_level in levels:
+            valid = pd.notna(labels_at_level)
+            level_codes, uniques = pd.factorize(pd.Series(labels_at_level).where(valid))
+            codes.append(level_codes)
+            labels.append(uniques)
+
+        totals = [{name: np.zeros((len(uniques), len(dates))) for name in CURVES} for uniques in labels]
+        bac = [np.zeros(len(uniques)) for uniques in labels]
+        for start in range(0, len(self), self.block_size):
+            rows = slice(start, start + self.block_size)
+            block = self._block_curves(rows, dates)
+            for level, level_codes in enumerate(codes):
+                block_codes = level_codes[rows]
+                keep = block_codes >= 0
+                order = np.argsort(block_codes[keep], kind='stable')
+                sorted_codes = block_codes[keep][order]
+                if not len(sorted_codes):
+                    continue
+                boundaries = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+                nodes = sorted_codes[boundaries]
+                for name in CURVES:
+                    totals[level][name][nodes] += np.add.reduceat(block[name][keep][order], boundaries, axis=0)
+                bac[level][nodes] += np.add.reduceat(self.bac[rows][keep][order], boundaries)
+
+        frames = []
+        for level, uniques in enumerate(labels):
+            n = len(uniques)
+            frame = pd.DataFrame({
+                'Level': names[level],
+                'Node': np.repeat(np.asarray(uniques, dtype=object), len(dates)),
+                'Status Date': np.tile(dates, n),
+                'BAC': np.repeat(bac[level], len(dates)),
+                **{name: totals[level][name].ravel() for name in CURVES},
+            })
+            frames.append(frame)
+        result = pd.concat(frames, ignore_index=True)
+        indices = evm_indices(result['PV'].to_numpy(), result['EV'].to_numpy(),
+                              result['AC'].to_numpy(), result['BAC'].to_numpy())
+        for name, values in indices.items():
+            result[name] = values
+        result['RAG'] = rag_status(result['SPI'].to_numpy(), result['CPI'].to_numpy())
+        return result
+
+    def s_curve(self, dates) -> pd.DataFrame:
+        """Portfolio-level cumulative PV/EV/AC per status date"""
+        rollup = self.rollup_curves(dates)
+        return rollup[rollup['Level'] == 'Portfolio'].drop(columns=['Level', 'Node']).reset_index(drop=True)
+
+
+def rag_status(spi, cpi, green: float = 0.95, amber: float = 0.85) -> np.ndarray:
+    """Green/Amber/Red from the worse of SPI and CPI; nothing due yet is Green"""
+    worst = np.fmin(np.asarray(spi, dtype=float), np.asarray(cpi, dtype=float))
+    return np.select([np.isnan(worst) | (worst >= green), worst >= amber], ['Green', 'Amber'], 'Red')
+
+
+def write_rag_column(excel_path: str, table: pd.DataFrame, sheet: str = 'WBS_TaskPlan',
+                     column: str = 'Status (RAG)'):
+    """Patch the sheet's RAG column with the EVM-based status (rows in table order)"""
+    headers = list(pd.read_excel(excel_path, sheet_name=sheet, nrows=0).columns)
+    if column not in headers:
+        raise ValueError(f"Column '{column}' not found in {sheet}")
+    col = headers.index(column) + 1
+    updates = {(row, col): value for row, value in enumerate(table['RAG'], start=2)}
+    try:
+        patch_sheet_cells(excel_path, sheet, updates)
+    except XlsxPatchUnsupported as e:
+        logger.warning(f"In-place patch not possible ({e}); rewriting workbook with openpyxl")
+        wb = load_workbook(excel_path)
+        for (row, c), value in updates.items():
+            wb[sheet].cell(row=row, column=c, value=value)
+        wb.save(excel_path)
+
+
+def main():
+    """Command line EVM report for a workbook"""
+    parser = argparse.ArgumentParser(description='Earned value report for the WBS_TaskPlan sheet')
+    parser.add_argument('--excel', required=True, help='Workbook path')
+    parser.add_argument('--sheet', default='WBS_TaskPlan')
+    parser.add_argument('--status-date', help='Data date (default: today)')
+    parser.add_argument('--history-weeks', type=int, default=26,
+                        help='Weekly status dates back from the data date for the S-curve (default: 26)')
+    parser.add_argument('--daily-rate', type=float, default=1.0,
+                        help='Cost per planned day when the sheet has no Budget column')
+    parser.add_argument('--group-by', help='Extra rollup column, e.g. Owner')
+    parser.add_argument('--output', default='evm_tasks.csv', help='Per-task table (CSV)')
+    parser.add_argument('--rollup-output', default='evm_rollup.csv', help='Rollup / S-curve table (CSV)')
+    parser.add_argument('--update-rag', action='store_true', help='Write the EVM RAG status back into the sheet')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.excel):
+        logger.error(f"Input file not found: {args.excel}")
+        return 1
+
+    data_date = pd.Timestamp(args.status_date) if args.status_date else pd.Timestamp.now().normalize()
+    engine = EvmEngine.from_excel(args.excel, args.sheet, data_date=data_date, daily_rate=args.daily_rate)
+    tasks = engine.task_table(data_date)
+    tasks.to_csv(args.output, index=False)
+
+    dates = status_dates(data_date - pd.Timedelta(weeks=args.history_weeks), data_date)
+    if not len(dates) or dates[-1] != np.datetime64(data_date.date(), 'D'):
+        dates = np.append(dates, np.datetime64(data_date.date(), 'D'))
+    rollup = engine.rollup_curves(dates, group_by=args.group_by)
+    rollup.to_csv(args.rollup_output, index=False)
+
+    total = rollup[(rollup['Level'] == 'Portfolio') & (rollup['Status Date'] == dates[-1])].iloc[0]
+    print(f"EVM at {data_date.date()} for {len(engine)} tasks: PV {total['PV']:.1f}, EV {total['EV']:.1f}, "
+          f"AC {total['AC']:.1f}, SPI {total['SPI']:.2f}, CPI {total['CPI']:.2f}, EAC {total['EAC']:.1f}")
+    print(f"Tasks: {args.output}  Rollups: {args.rollup_output}")
+
+    if args.update_rag:
+        write_rag_column(args.excel, tasks, args.sheet)
+        print(f"Updated Status (RAG) in {args.sheet}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+folder_watch.py
+Wait for CSV files to arrive in a folder.
+
+InotifyWatcher uses Linux inotify (through ctypes, no extra packages) and
+sleeps in the kernel until a file is closed after writing or moved into
+the folder. PollingWatcher compares (mtime, size) snapshots on an
+interval and works everywhere. ``create_watcher`` picks inotify when it
+is available and falls back to polling.
+
+``debounced_batches`` groups a burst of drops into one batch: it waits
+until no new file has arrived for ``debounce`` seconds (or ``max_wait``
+seconds have passed since the first one) before yielding.
+
+Usage:
+    with create_watcher('weekly_csvs') as watcher:
+        for paths in debounced_batches(watcher, debounce=2.0):
+            process(paths)
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import glob
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def is_candidate(name: str, suffix: str = '.csv') -> bool:
+    """True for data files; editor swap and partial-download names are ignored"""
+    base = os.path.basename(name)
+    return base.lower().endswith(suffix) and not base.startswith(('.', '~'))
+
+
+def file_signature(path: str):
+    """(mtime_ns, size) of a file, or None if it has gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PollingWatcher:
+    """Portable watcher comparing folder snapshots every ``interval`` seconds"""
+
+    backend = 'polling'
+
+    def __init__(self, folder: str, interval: float = 5.0, suffix: str = '.csv'):
+        self.folder = folder
+        self.interval = interval
+        self.suffix = suffix
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        files = glob.glob(os.path.join(self.folder, '*'))
+        return {f: file_signature(f) for f in files if is_candidate(f, self.suffix)}
+
+    def poll(self, timeout: Optional[float] = None) -> List[str]:
+        """Paths new or changed since the last call; waits up to ``timeout`` seconds"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self._scan()
+            changed = [f for f, sig in current.items() if sig is not None and self.snapshot.get(f) != sig]
+            self.snapshot = current
+            if changed:
+                return sorted(changed)
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            time.sleep(self.interval if remaining is None else min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class InotifyWatcher:
+    """Linux inotify watcher: no CPU use while nothing arrives"""
+
+    backend = 'inotify'
+
+    def __init__(self, folder: str, suffix: str = '.csv'):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.folder = folder
+        self.suffix = suffix
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch({folder}) failed: {os.strerror(err)}")
+
+    def poll(self, timeout: Optional[float] = None) -> List[str]:
+        """Paths written or moved in; blocks up to ``timeout`` seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; report every candidate so nothing is missed
+                logger.warning("inotify queue overflowed; rescanning folder")
+                paths.update(f for f in glob.glob(os.path.join(self.folder, '*')) if is_candidate(f, self.suffix))
+            elif mask & IN_IGNORED:
+                logger.warning(f"Watch on {self.folder} was removed")
+            elif name and is_candidate(os.fsdecode(name), self.suffix):
+                paths.add(os.path.join(self.folder, os.fsdecode(name)))
+        return sorted(paths)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def create_watcher(folder: str, backend: str = 'auto', poll_interval: float = 5.0, suffix: str = '.csv'):
+    """Watcher for ``folder``: "inotify", "polling" or "auto" (inotify if available)"""
+    if backend not in ('auto', 'inotify', 'polling'):
+        raise ValueError(f"Unknown watch backend: {backend}")
+    if backend in ('auto', 'inotify'):
+        try:
+            return InotifyWatcher(folder, suffix)
+        except (OSError, AttributeError) as e:
+            if backend == 'inotify':
+                raise
+            logger.info(f"inotify unavailable ({e}); polling every {poll_interval}s")
+    return PollingWatcher(folder, poll_interval, suffix)
+
+
+def debounced_batches(watcher, debounce: float = 2.0, max_wait: float = 30.0,
+                      stop: Optional[threading.Event] = None, idle_timeout: float = 1.0) -> Iterator[Set[str]]:
+    """Yield sets of arrived paths once a burst has been quiet for ``debounce`` seconds
+
+    ``stop`` ends the iteration; it is checked every ``idle_timeout``
+    seconds while idle.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        pending = set(watcher.poll(timeout=idle_timeout))
+        if not pending:
+            continue
+        first = time.monotonic()
+        while not stop.is_set():
+            remaining = max_wait - (time.monotonic() - first)
+            if remaining <= 0:
+                break
+            more = watcher.poll(timeout=min(debounce, remaining))
+            if not more:
+                break
+            pending.update(more)
+        yield pending
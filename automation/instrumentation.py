@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+instrumentation.py
+Per-stage timing and memory instrumentation shared by update_weekly.py and
+the MS Project integration scripts.
+
+Each pipeline stage (load workbook, parse CSV, validate, forward pass,
+backward pass, write cells, save, XML parse, serialise, ...) records:
+- wall time (perf_counter)
+- CPU time (process_time)
+- peak RSS at the end of the stage and how much the stage raised it
+
+Records are logged as structured JSON lines and can optionally be exported
+to a Prometheus node_exporter textfile and/or an OpenTelemetry OTLP/JSON
+file that a collector's file receiver can pick up.
+
+Usage:
+    metrics = PipelineMetrics('update_weekly', metrics_file='weekly_metrics.jsonl')
+    with metrics.stage('parse_csv', files=12):
+        ...
+    metrics.flush()
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+metrics_logger = logging.getLogger('pipeline.metrics')
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class PipelineMetrics:
+    """Collects per-stage wall time, CPU time and peak RSS for one run"""
+
+    def __init__(self, pipeline, metrics_file=None, prometheus_textfile=None, otel_file=None, enabled=True):
+        self.pipeline = pipeline
+        self.metrics_file = metrics_file
+        self.prometheus_textfile = prometheus_textfile
+        self.otel_file = otel_file
+        self.enabled = enabled
+        self.run_id = uuid.uuid4().hex
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, pipeline, settings):
+        """Build from a config section; accepts UPPER_CASE or lower_case keys"""
+        settings = {k.lower(): v for k, v in (settings or {}).items()}
+        return cls(
+            pipeline,
+            metrics_file=settings.get('metrics_file') or None,
+            prometheus_textfile=settings.get('prometheus_textfile') or None,
+            otel_file=settings.get('otel_file') or None,
+            enabled=settings.get('enabled', True)
+        )
+
+    @property
+    def _stack(self):
+        # Stages nest per thread, so worker threads can time their own stages
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name, **attributes):
+        """Time a pipeline stage; nested stages record their parent"""
+        if not self.enabled:
+            yield
+            return
+
+        span_id = uuid.uuid4().hex[:16]
+        stack = self._stack
+        parent = stack[-1] if stack else None
+        stack.append((name, span_id))
+        rss_before = peak_rss_kb()
+        start_ns = time.time_ns()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            stack.pop()
+            rss_after = peak_rss_kb()
+            self._record({
+                'pipeline': self.pipeline,
+                'run_id': self.run_id,
+                'stage': name,
+                'parent': parent[0] if parent else None,
+                'status': status,
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                'peak_rss_kb': rss_after,
+                'rss_growth_kb': rss_after - rss_before if rss_after is not None else None,
+                'start_time_unix_nano': start_ns,
+                'end_time_unix_nano': start_ns + int(wall * 1e9),
+                'span_id': span_id,
+                'parent_span_id': parent[1] if parent else None,
+                'attributes': attributes
+            })
+
+    def _record(self, record):
+        line = json.dumps({k: v for k, v in record.items()
+                           if k not in ('start_time_unix_nano', 'end_time_unix_nano', 'span_id', 'parent_span_id')},
+                          default=str)
+        metrics_logger.debug(line)
+        with self._lock:
+            self.records.append(record)
+            if self.metrics_file:
+                try:
+                    with open(self.metrics_file, 'a') as f:
+                        f.write(line + '\n')
+                except OSError as e:
+                    metrics_logger.warning(f"Could not write metrics file {self.metrics_file}: {e}")
+
+    def summary(self):
+        """Aggregate wall/CPU seconds and call counts per stage name"""
+        totals = {}
+        for record in self.records:
+            entry = totals.setdefault(record['stage'], {'count': 0, 'wall_seconds': 0.0,
+                                                        'cpu_seconds': 0.0, 'peak_rss_kb': None})
+            entry['count'] += 1
+            entry['wall_seconds'] = round(entry['wall_seconds'] + record['wall_seconds'], 6)
+            entry['cpu_seconds'] = round(entry['cpu_seconds'] + record['cpu_seconds'], 6)
+            if record['peak_rss_kb'] is not None:
+                entry['peak_rss_kb'] = max(entry['peak_rss_kb'] or 0, record['peak_rss_kb'])
+        return totals
+
+    def flush(self):
+        """Log the per-stage summary, write the optional exports and reset"""
+        if not self.enabled or not self.records:
+            return {}
+
+        totals = self.summary()
+        metrics_logger.info(json.dumps({'pipeline': self.pipeline, 'run_id': self.run_id, 'stages': totals}))
+
+        if self.prometheus_textfile:
+            try:
+                write_prometheus_textfile(self.prometheus_textfile, self.pipeline, totals)
+            except OSError as e:
+                metrics_logger.warning(f"Could not write Prometheus textfile: {e}")
+        if self.otel_file:
+            try:
+                append_otlp_json(self.otel_file, self.pipeline, self.run_id, self.records)
+            except OSError as e:
+                metrics_logger.warning(f"Could not write OpenTelemetry file: {e}")
+
+        self.records = []
+        self.run_id = uuid.uuid4().hex
+        return totals
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_prometheus_textfile(path, pipeline, totals):
+    """Write stage totals in the node_exporter textfile collector format
+
+    The file is replaced atomically so the collector never reads a partial
+    scrape.
+    """
+    metrics = [
+        ('stage_wall_seconds', 'Wall-clock seconds spent in a pipeline stage', 'wall_seconds'),
+        ('stage_cpu_seconds', 'CPU seconds spent in a pipeline stage', 'cpu_seconds'),
+        ('stage_calls', 'Number of times a pipeline stage ran', 'count'),
+        ('stage_peak_rss_kib', 'Process peak RSS (KiB) at the end of a pipeline stage', 'peak_rss_kb'),
+    ]
+    lines = []
+    for name, help_text, key in metrics:
+        lines.append(f"# HELP hybrid_pmp_{name} {help_text}")
+        lines.append(f"# TYPE hybrid_pmp_{name} gauge")
+        for stage, values in sorted(totals.items()):
+            if values[key] is not None:
+                lines.append(f'hybrid_pmp_{name}{{pipeline="{pipeline}",stage="{stage}"}} {values[key]}')
+    lines.append("# HELP hybrid_pmp_last_run_timestamp_seconds Unix time the pipeline last flushed metrics")
+    lines.append("# TYPE hybrid_pmp_last_run_timestamp_seconds gauge")
+    lines.append(f'hybrid_pmp_last_run_timestamp_seconds{{pipeline="{pipeline}"}} {int(time.time())}')
+    _atomic_write(path, '\n'.join(lines) + '\n')
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def append_otlp_json(path, pipeline, run_id, records):
+    """Append the run as one OTLP/JSON ``resourceSpans`` line (file exporter format)"""
+    spans = []
+    for record in records:
+        attributes = dict(record['attributes'])
+        attributes.update({
+            'cpu_seconds': record['cpu_seconds'],
+            'peak_rss_kb': record['peak_rss_kb'],
+            'rss_growth_kb': record['rss_growth_kb'],
+        })
+        span = {
+            'traceId': run_id,
+            'spanId': record['span_id'],
+            'name': record['stage'],
+            'kind': 1,
+            'startTimeUnixNano': str(record['start_time_unix_nano']),
+            'endTimeUnixNano': str(record['end_time_unix_nano']),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in attributes.items() if v is not None],
+            'status': {'code': 2 if record['status'] == 'error' else 1}
+        }
+        if record['parent_span_id']:
+            span['parentSpanId'] = record['parent_span_id']
+        spans.append(span)
+
+    payload = {'resourceSpans': [{
+        'resource': {'attributes': [
+            {'key': 'service.name', 'value': {'stringValue': pipeline}},
+            {'key': 'host.name', 'value': {'stringValue': os.uname().nodename if hasattr(os, 'uname') else ''}},
+        ]},
+        'scopeSpans': [{
+            'scope': {'name': 'hybrid_pmp.instrumentation'},
+            'spans': spans
+        }]
+    }]}
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(payload) + '\n')
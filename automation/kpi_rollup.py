@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+kpi_rollup.py
+Materialised weekly / monthly / quarterly KPI rollups.
+
+KpiRollup keeps one row per (grain, period) with ticket totals, the
+backlog at the end of the period, the resolution rate and CSAT / NPS
+means and percentiles. The rows and a fingerprint of every weekly row
+they were built from are kept in a JSON state file, so a run only
+recomputes the periods from the earliest new, changed or removed week
+onwards (the backlog is cumulative, so later periods move with it).
+
+The table is exported to a columnar file for dashboards: Parquet when
+pyarrow is installed, otherwise CSV next to the configured path.
+
+Usage:
+    rollup = KpiRollup.load('kpi_rollup_state.json', grains=['week', 'month', 'quarter'])
+    rollup.update(df)
+    rollup.save('kpi_rollup_state.json')
+    rollup.export('kpi_rollup.parquet')
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+# Grain name -> pandas period frequency
+GRAINS = {
+    'week': None,
+    'month': 'M',
+    'quarter': 'Q',
+}
+
+TABLE_COLUMNS = ['Grain', 'Period', 'Period Start', 'Weeks', 'Tickets Opened', 'Tickets Resolved',
+                 'Backlog', 'Resolution Rate']
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[name], errors='coerce')
+
+
+def _round(value, digits=4):
+    return None if value is None or pd.isna(value) else round(float(value), digits)
+
+
+def _count(value):
+    return None if value is None or pd.isna(value) else int(round(float(value)))
+
+
+def week_fingerprint(row) -> str:
+    """Short digest of the KPI inputs of one weekly row"""
+    values = [row.get(name) for name in ('Tickets Opened', 'Tickets Resolved', 'NPS', 'CSAT')]
+    text = '|'.join('' if pd.isna(v) else repr(float(v)) for v in values)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class KpiRollup:
+    """Incrementally maintained KPI rollup table"""
+
+    def __init__(self, grains=None, percentiles=None):
+        self.grains = list(grains or GRAINS)
+        unknown = [g for g in self.grains if g not in GRAINS]
+        if unknown:
+            raise ValueError(f"Unknown rollup grain(s): {', '.join(unknown)}")
+        self.percentiles = sorted(percentiles or [10, 50, 90])
+        self.weeks = {}
+        self.rows = []
+
+    def settings(self) -> Dict:
+        return {'grains': self.grains, 'percentiles': self.percentiles}
+
+    def columns(self) -> List[str]:
+        columns = list(TABLE_COLUMNS)
+        for metric in ('CSAT', 'NPS'):
+            columns.append(f'{metric} Mean')
+            columns.extend(f'{metric} P{p}' for p in self.percentiles)
+        return columns
+
+    # ------------------
+    # Persistence
+    # ------------------
+    @classmethod
+    def load(cls, path: Optional[str], **settings) -> 'KpiRollup':
+        """Load saved state; start empty if missing, unreadable or configured differently"""
+        rollup = cls(**settings)
+        if not path or not os.path.exists(path):
+            return rollup
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable KPI rollup state {path}: {e}")
+            return rollup
+        if state.get('version') != STATE_VERSION or state.get('settings') != rollup.settings():
+            logger.info("KPI rollup settings changed; rebuilding rollups from full history")
+            return rollup
+        rollup.weeks = state['weeks']
+        rollup.rows = state['rows']
+        return rollup
+
+    def save(self, path: str):
+        """Write state atomically (temp file + rename)"""
+        state = {
+            'version': STATE_VERSION,
+            'settings': self.settings(),
+            'weeks': self.weeks,
+            'rows': self.rows,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    # ------------------
+    # Incremental update
+    # ------------------
+    def update(self, df: pd.DataFrame) -> int:
+        """Recompute the periods touched by new, changed or removed weeks; returns rows recomputed
+
+        ``df`` is the full weekly history with one row per Week Start.
+        """
+        weeks = pd.to_datetime(df['Week Start'], errors='coerce')
+        history = df.loc[weeks.notna()].assign(**{'Week Start': weeks[weeks.notna()]}).sort_values('Week Start')
+        labels = history['Week Start'].dt.strftime('%Y-%m-%d')
+        fingerprints = dict(zip(labels, (week_fingerprint(row) for _, row in history.iterrows())))
+
+        dirty = [week for week, digest in fingerprints.items() if self.weeks.get(week) != digest]
+        dirty += [week for week in self.weeks if week not in fingerprints]
+        if not dirty:
+            return 0
+        since = pd.Timestamp(min(dirty))
+
+        opened = _column(history, 'Tickets Opened')
+        resolved = _column(history, 'Tickets Resolved')
+        history = history.assign(**{
+            'Tickets Opened': opened,
+            'Tickets Resolved': resolved,
+            'Backlog': (opened.fillna(0) - resolved.fillna(0)).cumsum(),
+            'CSAT': _column(history, 'CSAT'),
+            'NPS': _column(history, 'NPS'),
+        })
+
+        kept = []
+        recomputed = []
+        for grain in self.grains:
+            periods = self._periods(history['Week Start'], grain)
+            first_dirty = self._periods(pd.Series([since]), grain).iloc[0]
+            kept += [row for row in self.rows if row['Grain'] == grain and row['Period'] < first_dirty]
+            affected = history[periods >= first_dirty]
+            for period, group in affected.groupby(periods[periods >= first_dirty], sort=True):
+                recomputed.append(self._aggregate(grain, period, group))
+
+        self.rows = kept + recomputed
+        self.weeks = fingerprints
+        return len(recomputed)
+
+    @staticmethod
+    def _periods(week_starts: pd.Series, grain: str) -> pd.Series:
+        """Sortable period label of each week for a grain"""
+        freq = GRAINS[grain]
+        if freq is None:
+            return week_starts.dt.strftime('%Y-%m-%d')
+        return week_starts.dt.to_period(freq).astype(str)
+
+    def _aggregate(self, grain: str, period: str, group: pd.DataFrame) -> Dict:
+        opened = group['Tickets Opened'].sum(min_count=1)
+        resolved = group['Tickets Resolved'].sum(min_count=1)
+        row = {
+            'Grain': grain,
+            'Period': period,
+            'Period Start': group['Week Start'].iloc[0].strftime('%Y-%m-%d') if GRAINS[grain] is None
+            else pd.Period(period, GRAINS[grain]).start_time.strftime('%Y-%m-%d'),
+            'Weeks': int(len(group)),
+            'Tickets Opened': _count(opened),
+            'Tickets Resolved': _count(resolved),
+            'Backlog': _count(group['Backlog'].iloc[-1]),
+            'Resolution Rate': _round(resolved / opened) if opened and not pd.isna(opened) else None,
+        }
+        for metric in ('CSAT', 'NPS'):
+            values = group[metric].dropna().to_numpy(dtype=float)
+            row[f'{metric} Mean'] = _round(values.mean()) if len(values) else None
+            points = np.percentile(values, self.percentiles) if len(values) else [None] * len(self.percentiles)
+            for p, value in zip(self.percentiles, points):
+                row[f'{metric} P{p}'] = _round(value)
+        return row
+
+    # ------------------
+    # Results
+    # ------------------
+    def table(self) -> pd.DataFrame:
+        """Rollup rows ordered by grain then period"""
+        table = pd.DataFrame(self.rows, columns=self.columns())
+        if table.empty:
+            return table
+        order = {grain: i for i, grain in enumerate(self.grains)}
+        return table.sort_values(['Grain', 'Period'], key=lambda s: s.map(order) if s.name == 'Grain' else s,
+                                 ignore_index=True)
+
+    def latest(self, grain: str = 'week') -> Optional[Dict]:
+        """Most recent rollup row of a grain"""
+        rows = [row for row in self.rows if row['Grain'] == grain]
+        return max(rows, key=lambda row: row['Period']) if rows else None
+
+    def export(self, path: str) -> str:
+        """Write the table as Parquet (pyarrow) or CSV; returns the path written"""
+        table = self.table()
+        root, ext = os.path.splitext(path)
+        if ext.lower() == '.parquet' and pyarrow is None:
+            logger.info("pyarrow not installed; writing KPI rollups as CSV")
+            path = root + '.csv'
+        tmp_path = f"{path}.tmp"
+        if path.lower().endswith('.parquet'):
+            table.to_parquet(tmp_path, index=False)
+        else:
+            table.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+
+def headline_rows(rollup: KpiRollup, trends: Optional[Dict] = None) -> List[List]:
+    """Metric / Value / Trend rows for the latest week"""
+    latest = rollup.latest('week') or rollup.latest(rollup.grains[0])
+    if latest is None:
+        return []
+    trends = trends or {}
+    rows = []
+    for metric, field in (('CSAT', 'CSAT Mean'), ('NPS', 'NPS Mean'), ('Backlog', 'Backlog'),
+                          ('Resolution Rate', 'Resolution Rate'), ('Tickets Opened', 'Tickets Opened'),
+                          ('Tickets Resolved', 'Tickets Resolved')):
+        rows.append([metric, latest[field], trends.get(metric, {}).get('trend')])
+    return rows
+
+
+def dashboard_cells(rollup: KpiRollup, trends: Optional[Dict] = None, table_column: int = 5):
+    """({(row, col): value}, clear region) for a Metric/Value/Trend sheet
+
+    The headline occupies A:C below the existing header; the rollup table
+    starts at ``table_column`` with its own header in row 1.
+    """
+    updates = {}
+    for r, values in enumerate(headline_rows(rollup, trends), start=2):
+        for c, value in enumerate(values, start=1):
+            updates[(r, c)] = value
+
+    table = rollup.table()
+    columns = rollup.columns()
+    for c, name in enumerate(columns, start=table_column):
+        updates[(1, c)] = name
+    for r, values in enumerate(table.itertuples(index=False), start=2):
+        for c, value in enumerate(values, start=table_column):
+            updates[(r, c)] = None if pd.isna(value) else value
+    return updates, (2, None, 1, table_column + len(columns) - 1)
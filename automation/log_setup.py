@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+log_setup.py
+Non-blocking logging shared by the automation and MS Project scripts.
+
+``setup_logging`` installs a single QueueHandler on the root logger; a
+QueueListener thread does the formatting and the file / console I/O, so
+a slow or network disk never stalls the processing thread.
+
+Per-item messages (one per file, task, ...) are tagged with a summary
+key and only the first ``summary_after`` of each key are written; the
+rest are counted and reported as one line by ``flush_summaries``:
+
+    logger.info(f"Processed {path}", extra={'summary': 'csv_file'})
+
+``fmt="json"`` writes one JSON object per line (timestamp, level,
+logger, message, summary key and any ``fields`` dict passed in extra).
+
+Usage:
+    logs = setup_logging('INFO', 'run.log', console=True, fmt='json')
+    ...
+    logs.stop()      # flush summaries, drain the queue, close handlers
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'summary', None):
+            entry['summary'] = record.summary
+        if isinstance(getattr(record, 'fields', None), dict):
+            entry.update(record.fields)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SummaryFilter(logging.Filter):
+    """Passes the first ``keep_first`` records of each summary key, counts the rest"""
+
+    def __init__(self, keep_first: int = 20):
+        super().__init__()
+        self.keep_first = keep_first
+        self.counts = Counter()
+        self.levels = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, 'summary', None)
+        if key is None:
+            return True
+        with self._lock:
+            self.counts[key] += 1
+            self.levels[key] = max(self.levels.get(key, 0), record.levelno)
+            return self.counts[key] <= self.keep_first
+
+    def drain(self):
+        """(key, total, highest level) for keys that had records suppressed; resets the counters"""
+        with self._lock:
+            items = [(key, count, self.levels[key]) for key, count in self.counts.items()
+                     if count > self.keep_first]
+            self.counts.clear()
+            self.levels.clear()
+        return items
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread
+
+    The stdlib version formats every record in the calling thread; within
+    one process it is enough to resolve the message arguments.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class LoggingSetup:
+    """Handle on the queue listener and summary counters"""
+
+    def __init__(self, listener, summary_filter):
+        self.listener = listener
+        self.summary_filter = summary_filter
+        self._stopped = False
+
+    def flush_summaries(self):
+        """Log one aggregate line per summary key that was thinned out"""
+        for key, count, level in self.summary_filter.drain():
+            logging.getLogger('summary').log(
+                level, f"{key}: {count} events ({self.summary_filter.keep_first} logged individually)",
+                extra={'fields': {'summary_key': key, 'count': count}})
+
+    def stop(self):
+        """Flush summaries, drain the queue and close the real handlers"""
+        if self._stopped:
+            return
+        self._stopped = True
+        self.flush_summaries()
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_active = None
+
+
+def setup_logging(level='INFO', log_file: Optional[str] = None, console: bool = True,
+                  fmt: str = 'text', summary_after: int = 20) -> LoggingSetup:
+    """Route all logging through a queue to file/console handlers on a background thread"""
+    global _active
+    if _active is not None:
+        _active.stop()
+
+    formatter = JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if log_file:
+        if os.path.dirname(log_file):
+            os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        handlers.append(logging.FileHandler(log_file))
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    summary_filter = SummaryFilter(summary_after)
+    queue_handler.addFilter(summary_filter)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level) if isinstance(level, str) else level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _active = LoggingSetup(listener, summary_filter)
+    return _active
+
+
+def flush_summaries():
+    """Aggregate lines for the active setup (no-op before setup_logging)"""
+    if _active is not None:
+        _active.flush_summaries()
+
+
+def shutdown():
+    """Stop the active listener; registered with atexit"""
+    global _active
+    if _active is not None:
+        _active.stop()
+        _active = None
+
+
+atexit.register(shutdown)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+profiling.py
+Built-in --profile mode shared by update_weekly.py and the MS Project scripts.
+
+A profiled run writes its own diagnostics next to the log file:
+- <name>_profile_<timestamp>.pstats   cProfile stats (snakeviz, pstats)
+- <name>_profile_<timestamp>.folded   collapsed stacks from a wall-clock
+                                      sampler (flamegraph.pl, speedscope)
+- <name>_profile_<timestamp>.txt      top-N hot functions summary
+
+The "pyinstrument" engine is used instead of cProfile when requested and
+installed; it additionally writes an HTML report.
+
+Usage:
+    with profile_run('update_weekly', output_dir, enabled=args.profile):
+        main()
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from datetime import datetime
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed wall-clock interval"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write_folded(self, path):
+        """Write samples in Brendan Gregg's collapsed-stack format"""
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    """Context manager that profiles a run and writes its reports on exit"""
+
+    def __init__(self, name, output_dir='.', top_n=25, sample_interval_ms=5, engine='cprofile'):
+        self.name = name
+        self.output_dir = output_dir or '.'
+        self.top_n = top_n
+        self.sample_interval = sample_interval_ms / 1000.0
+        self.engine = engine
+        if engine == 'pyinstrument' and pyinstrument is None:
+            logger.warning("pyinstrument is not installed; falling back to cProfile")
+            self.engine = 'cprofile'
+        self.paths = {}
+
+    def __enter__(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.prefix = os.path.join(self.output_dir, f"{self.name}_profile_{timestamp}")
+
+        self.sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        if self.engine == 'pyinstrument':
+            self.profiler = pyinstrument.Profiler(interval=self.sample_interval)
+        else:
+            self.profiler = cProfile.Profile()
+        self.sampler.start()
+        self.started = time.perf_counter()
+        if self.engine == 'pyinstrument':
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.engine == 'pyinstrument':
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        elapsed = time.perf_counter() - self.started
+        self.sampler.stop()
+
+        try:
+            self._write_reports(elapsed)
+            logger.info(f"Profile written: {self.paths['summary']}")
+        except OSError as e:
+            logger.error(f"Failed to write profile reports: {e}")
+        return False
+
+    def _write_reports(self, elapsed):
+        self.paths['folded'] = f"{self.prefix}.folded"
+        self.sampler.write_folded(self.paths['folded'])
+
+        header = (f"Profile of {self.name}: {elapsed:.3f}s wall, "
+                  f"{sum(self.sampler.samples.values())} stack samples, engine={self.engine}\n\n")
+
+        if self.engine == 'pyinstrument':
+            self.paths['html'] = f"{self.prefix}.html"
+            with open(self.paths['html'], 'w') as f:
+                f.write(self.profiler.output_html())
+            summary = self.profiler.output_text(unicode=False, color=False)
+        else:
+            self.paths['pstats'] = f"{self.prefix}.pstats"
+            self.profiler.dump_stats(self.paths['pstats'])
+            summary = self.top_functions()
+
+        self.paths['summary'] = f"{self.prefix}.txt"
+        with open(self.paths['summary'], 'w') as f:
+            f.write(header)
+            f.write(summary)
+
+    def top_functions(self):
+        """Top-N functions by own time and by cumulative time"""
+        out = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.strip_dirs()
+        out.write(f"Top {self.top_n} functions by own time\n")
+        stats.sort_stats('tottime').print_stats(self.top_n)
+        out.write(f"\nTop {self.top_n} functions by cumulative time\n")
+        stats.sort_stats('cumulative').print_stats(self.top_n)
+        return out.getvalue()
+
+
+def profile_run(name, output_dir, enabled=False, settings=None):
+    """Return a RunProfiler when enabled, otherwise a no-op context
+
+    ``settings`` is a config section with top_n / sample_interval_ms / engine
+    keys (UPPER_CASE or lower_case).
+    """
+    if not enabled:
+        return nullcontext()
+    settings = {k.lower(): v for k, v in (settings or {}).items()}
+    return RunProfiler(
+        name,
+        output_dir,
+        top_n=settings.get('top_n', 25),
+        sample_interval_ms=settings.get('sample_interval_ms', 5),
+        engine=settings.get('engine', 'cprofile')
+    )
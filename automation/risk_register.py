@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+risk_register.py
+Indexed risk register: exposure scoring, ageing, top-N queries and heatmaps.
+
+Risk_Issue_Log columns: ID, Type (Risk/Issue), Description,
+Probability (0-1), Impact (1-5), Score (P*I), Owner, Mitigation/Action,
+Status. Optional columns are used when present: Category (otherwise the
+Type is the category), Project, Date Created and Date Closed.
+
+Loading computes exposure (probability x impact), score band and age
+for every entry with array operations, sorts the register once by
+exposure and builds an index per owner, status, category and band.
+Each index maps a value to the ranks of its entries in exposure order,
+so a filtered top-N query only touches the smallest matching index
+and stops after N hits - well under a millisecond on registers of tens
+of thousands of entries.
+
+Usage:
+    register = RiskRegister(pd.read_excel(path, sheet_name='Risk_Issue_Log'))
+    register.query(owner='Project Manager', status='Open', n=5)
+    register.heatmap().to_csv('risk_heatmap.csv', index=False)
+
+    python risk_register.py --excel ../Hybrid_ProjectPlan_Template.xlsx --status Open --top 10
+    python risk_register.py --excel ../Hybrid_ProjectPlan_Template.xlsx --heatmap risk_heatmap.csv
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Upper exposure bound (inclusive) of each band; matches the High / Critical
+# thresholds of the Power BI risk measures (> 1.5, > 2.5)
+SCORE_BANDS = [(0.75, 'Low'), (1.5, 'Medium'), (2.5, 'High'), (np.inf, 'Critical')]
+
+# Probability rows of the heatmap: upper bound (inclusive) and label
+PROBABILITY_BANDS = [(0.2, '0-0.2'), (0.4, '0.2-0.4'), (0.6, '0.4-0.6'), (0.8, '0.6-0.8'), (1.0, '0.8-1.0')]
+IMPACT_LEVELS = [1, 2, 3, 4, 5]
+
+CLOSED_STATUSES = ('closed', 'resolved', 'done')
+INDEXED_FIELDS = ('owner', 'status', 'category', 'band')
+
+Filter = Union[None, str, Iterable[str]]
+
+
+def _text(df: pd.DataFrame, name: str, default: str) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(default, index=df.index)
+    return df[name].fillna(default).astype(str).str.strip().replace('', default)
+
+
+def _dates(df: pd.DataFrame, name: str) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    return pd.to_datetime(df[name], errors='coerce')
+
+
+class RiskRegister:
+    """Risk register scored, sorted by exposure and indexed for filtered top-N queries"""
+
+    def __init__(self, df: pd.DataFrame, as_of=None, bands=None):
+        self.bands = bands or SCORE_BANDS
+        self.as_of = pd.Timestamp(as_of).normalize() if as_of is not None else pd.Timestamp.now().normalize()
+
+        probability = pd.to_numeric(df.get('Probability (0-1)'), errors='coerce').fillna(0.0).clip(0, 1)
+        impact = pd.to_numeric(df.get('Impact (1-5)'), errors='coerce').fillna(0.0).clip(0, 5)
+        exposure = (probability * impact).to_numpy()
+        limits = np.array([limit for limit, _ in self.bands])
+        band_labels = np.array([label for _, label in self.bands], dtype=object)
+
+        status = _text(df, 'Status', 'Open')
+        is_open = ~status.str.lower().isin(CLOSED_STATUSES)
+        created = _dates(df, 'Date Created')
+        closed = _dates(df, 'Date Closed')
+        # Open entries age until today, closed ones until they were closed
+        end = closed.where(~is_open & closed.notna(), self.as_of)
+
+        table = pd.DataFrame({
+            'ID': _text(df, 'ID', ''),
+            'Type': _text(df, 'Type (Risk/Issue)', 'Risk'),
+            'Description': _text(df, 'Description', ''),
+            'Project': _text(df, 'Project', ''),
+            'Category': _text(df, 'Category', '') if 'Category' in df.columns else _text(df, 'Type (Risk/Issue)', 'Risk'),
+            'Owner': _text(df, 'Owner', 'Unassigned'),
+            'Status': status,
+            'Probability': probability.to_numpy(),
+            'Impact': impact.to_numpy(),
+            'Exposure': exposure.round(4),
+            'Band': band_labels[np.searchsorted(limits, exposure.round(4), side='left')],
+            'Open': is_open.to_numpy(),
+            'Age (days)': (end - created).dt.days.to_numpy(dtype=float),
+        })
+
+        # Highest exposure first; ties keep register order
+        order = np.argsort(-exposure, kind='stable')
+        self.table = table.iloc[order].reset_index(drop=True)
+        self.exposure = self.table['Exposure'].to_numpy()
+        self.indexes = self._build_indexes()
+
+    def _build_indexes(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """field -> value -> ranks (ascending, i.e. by descending exposure)
+
+        Also keeps each field's value codes per rank for checking candidates.
+        """
+        indexes = {}
+        self.codes = {}
+        self.value_codes = {}
+        for field in INDEXED_FIELDS:
+            codes, values = pd.factorize(self.table[field.capitalize()], sort=True)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            indexes[field] = {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(values)}
+            self.codes[field] = codes
+            self.value_codes[field] = {value: i for i, value in enumerate(values)}
+        return indexes
+
+    def __len__(self):
+        return len(self.table)
+
+    def values(self, field: str):
+        """Indexed values of a field (owner, status, category or band)"""
+        return list(self.indexes[field])
+
+    # ------------------
+    # Queries
+    # ------------------
+    @staticmethod
+    def _wanted(wanted: Filter) -> list:
+        return [wanted] if isinstance(wanted, str) else list(wanted)
+
+    def _postings(self, field: str, wanted: list) -> np.ndarray:
+        index = self.indexes[field]
+        lists = [index[value] for value in wanted if value in index]
+        if not lists:
+            return np.empty(0, dtype=np.intp)
+        return lists[0] if len(lists) == 1 else np.sort(np.concatenate(lists))
+
+    def _value_codes(self, field: str, wanted: list) -> np.ndarray:
+        lookup = self.value_codes[field]
+        return np.array([lookup[value] for value in wanted if value in lookup], dtype=np.intp)
+
+    def _matches(self, field: str, wanted: list) -> int:
+        index = self.indexes[field]
+        return sum(len(index[value]) for value in wanted if value in index)
+
+    def query_ranks(self, n: int = 10, min_exposure: Optional[float] = None, open_only: bool = False,
+                    **filters: Filter) -> np.ndarray:
+        """Ranks (rows of ``table``) of the top ``n`` entries matching all filters
+
+        Filters are owner, status, category and band; each takes a value
+        or a list of values (any of them matches).
+        """
+        unknown = set(filters) - set(INDEXED_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown risk filter(s): {', '.join(sorted(unknown))}")
+        active = {field: self._wanted(wanted) for field, wanted in filters.items() if wanted is not None}
+
+        limit = len(self.table)
+        if min_exposure is not None:
+            # Exposure is descending, so the qualifying entries are a prefix
+            limit = int(np.searchsorted(-self.exposure, -min_exposure, side='right'))
+
+        # Walk the smallest matching index; check the other filters on its candidates
+        if active:
+            driver = min(active, key=lambda field: self._matches(field, active[field]))
+            ranks = self._postings(driver, active[driver])
+            ranks = ranks[:np.searchsorted(ranks, limit)]
+            checks = [(self.codes[field], self._value_codes(field, wanted))
+                      for field, wanted in active.items() if field != driver]
+        else:
+            ranks = np.arange(limit)
+            checks = []
+        if not checks and not open_only:
+            return ranks[:n]
+
+        # A block at a time, stopping once n are found
+        found = []
+        count = 0
+        block = max(4 * n, 256)
+        open_flags = self.table['Open'].to_numpy()
+        for start in range(0, len(ranks), block):
+            candidates = ranks[start:start + block]
+            keep = open_flags[candidates] if open_only else np.ones(len(candidates), dtype=bool)
+            for codes, wanted_codes in checks:
+                if len(wanted_codes) == 1:
+                    keep &= codes[candidates] == wanted_codes[0]
+                else:
+                    keep &= np.isin(codes[candidates], wanted_codes)
+            hits = candidates[keep]
+            found.append(hits)
+            count += len(hits)
+            if count >= n:
+                break
+        return np.concatenate(found)[:n] if found else ranks[:0]
+
+    def query(self, n: int = 10, min_exposure: Optional[float] = None, open_only: bool = False,
+              **filters: Filter) -> pd.DataFrame:
+        """Top ``n`` entries by exposure matching the filters, as a table"""
+        return self.table.iloc[self.query_ranks(n, min_exposure, open_only, **filters)]
+
+    def counts(self, field: str) -> Dict[str, int]:
+        """Entries per indexed value"""
+        return {value: len(ranks) for value, ranks in self.indexes[field].items()}
+
+    # ------------------
+    # Aggregates
+    # ------------------
+    def heatmap(self, open_only: bool = True, by: Optional[str] = None) -> pd.DataFrame:
+        """Probability band x impact matrix: entry count and total exposure per cell
+
+        Long format (one row per cell, every cell present) so dashboards can
+        pivot it directly; ``by`` adds a grouping column such as Project or Owner.
+        """
+        table = self.table[self.table['Open']] if open_only else self.table
+        p_limits = np.array([limit for limit, _ in PROBABILITY_BANDS])
+        p_code = np.minimum(np.searchsorted(p_limits, table['Probability'].to_numpy(), side='left'),
+                            len(PROBABILITY_BANDS) - 1)
+        i_code = np.clip(np.ceil(table['Impact'].to_numpy()).astype(int), 1, 5) - 1
+        cells = len(PROBABILITY_BANDS) * len(IMPACT_LEVELS)
+        cell = p_code * len(IMPACT_LEVELS) + i_code
+
+        if by:
+            group_codes, groups = pd.factorize(table[by], sort=True)
+        else:
+            group_codes, groups = np.zeros(len(table), dtype=int), pd.Index(['All'])
+        flat = group_codes * cells + cell
+        size = len(groups) * cells
+        count = np.bincount(flat, minlength=size)
+        exposure = np.bincount(flat, weights=table['Exposure'].to_numpy(), minlength=size)
+
+        grid = np.arange(size)
+        heatmap = pd.DataFrame({
+            'Probability': [PROBABILITY_BANDS[p][1] for p in (grid % cells) // len(IMPACT_LEVELS)],
+            'Impact': np.array(IMPACT_LEVELS)[grid % len(IMPACT_LEVELS)],
+            'Entries': count,
+            'Exposure': exposure.round(4),
+        })
+        if by:
+            heatmap.insert(0, by, np.asarray(groups)[grid // cells])
+        return heatmap
+
+    def band_summary(self) -> pd.DataFrame:
+        """Entries, open entries, total exposure and mean age per band"""
+        grouped = self.table.groupby('Band', sort=False)
+        summary = grouped.agg(Entries=('ID', 'size'), Open=('Open', 'sum'), Exposure=('Exposure', 'sum'),
+                              **{'Mean Age (days)': ('Age (days)', 'mean')})
+        return summary.reindex([label for _, label in self.bands], fill_value=0).reset_index()
+
+
+def main():
+    """Command line risk queries and heatmap export"""
+    parser = argparse.ArgumentParser(description='Query and summarise the Risk_Issue_Log register')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--excel', help='Workbook with a Risk_Issue_Log sheet')
+    source.add_argument('--csv', help='CSV with the Risk_Issue_Log columns')
+    parser.add_argument('--sheet', default='Risk_Issue_Log')
+    parser.add_argument('--as-of', help='Date ages are measured to (default today)')
+    for field in INDEXED_FIELDS:
+        parser.add_argument(f'--{field}', action='append', help=f'Filter by {field} (repeatable)')
+    parser.add_argument('--min-exposure', type=float)
+    parser.add_argument('--open-only', action='store_true')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--heatmap', help='Write the probability x impact heatmap (CSV)')
+    parser.add_argument('--heatmap-by', help='Group the heatmap by a column, e.g. Project or Owner')
+    args = parser.parse_args()
+
+    path = args.excel or args.csv
+    if not os.path.exists(path):
+        logger.error(f"Input file not found: {path}")
+        return 1
+    df = pd.read_excel(path, sheet_name=args.sheet) if args.excel else pd.read_csv(path)
+
+    started = time.perf_counter()
+    register = RiskRegister(df, as_of=args.as_of)
+    logger.info(f"Indexed {len(register)} entries in {time.perf_counter() - started:.3f}s")
+
+    filters = {field: getattr(args, field) for field in INDEXED_FIELDS}
+    started = time.perf_counter()
+    ranks = register.query_ranks(args.top, args.min_exposure, args.open_only, **filters)
+    logger.info(f"Query matched {len(ranks)} entries in {(time.perf_counter() - started) * 1000:.3f} ms")
+    columns = ['ID', 'Owner', 'Status', 'Category', 'Band', 'Exposure', 'Age (days)', 'Description']
+    print(register.table.iloc[ranks][columns].to_string(index=False))
+
+    if args.heatmap:
+        register.heatmap(by=args.heatmap_by).to_csv(args.heatmap, index=False)
+        logger.info(f"Heatmap written to {args.heatmap}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+sheet_feeds.py
+Refresh several plan sheets from their sources in one workbook pass.
+
+Each sheet is fed by a SheetFeed: a loader returning a DataFrame plus the
+layout to write it in (first data row, column order, value conversion).
+SheetFeedPipeline runs all loaders concurrently, then applies every
+sheet's cells in a single workbook read and a single save, timing each
+load and each sheet write as its own metrics stage.
+
+Feed types are pluggable; "csv" (a file or a folder of CSVs) and "json"
+(a list of records) are built in:
+
+    @register_feed_type("tickets_api")
+    def tickets_api_feed(settings):
+        return SheetFeed(settings["SHEET"], lambda: fetch_tickets(settings["URL"]))
+
+Config (update_weekly.py SHEET_FEEDS):
+    [{"SHEET": "Risk_Issue_Log", "TYPE": "csv", "SOURCE": "./feeds/risks.csv"},
+     {"SHEET": "Sprint_Planner", "TYPE": "csv", "SOURCE": "./feeds/sprints", "START_ROW": 2}]
+"""
+
+import glob
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from xlsx_patch import XlsxPatchUnsupported, patch_workbook_cells
+
+logger = logging.getLogger(__name__)
+
+FEED_TYPES = {}
+
+
+def register_feed_type(name):
+    """Decorator registering a factory ``settings -> SheetFeed`` under ``name``"""
+    def decorator(factory):
+        FEED_TYPES[name] = factory
+        return factory
+    return decorator
+
+
+def cell_value(value):
+    """Excel-friendly Python value for a DataFrame cell"""
+    if value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, pd.Timestamp):
+        return None if pd.isna(value) else value.to_pydatetime()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, (str, int, float, bool, datetime, date)):
+        return value
+    return None if pd.isna(value) else str(value)
+
+
+class SheetFeed:
+    """Data source and layout for one sheet
+
+    A ``required`` feed fails the whole refresh when its loader raises;
+    other feeds are logged and left out.
+    """
+
+    def __init__(self, sheet: str, loader: Callable[[], pd.DataFrame], start_row: int = 2,
+                 columns: Optional[List[str]] = None, row_values: Optional[Callable] = None,
+                 sort_by: Optional[str] = None, required: bool = False):
+        self.sheet = sheet
+        self.loader = loader
+        self.start_row = start_row
+        self.columns = columns
+        self.row_values = row_values
+        self.sort_by = sort_by
+        self.required = required
+
+    def load(self) -> pd.DataFrame:
+        return self.loader()
+
+    def cell_updates(self, df: pd.DataFrame):
+        """({(row, col): value}, clear region, rows written) for the loaded frame"""
+        columns = self.columns or list(df.columns)
+        if self.sort_by:
+            df = df.sort_values(self.sort_by)
+
+        updates = {}
+        written = 0
+        r = self.start_row
+        for _, row in df.iterrows():
+            try:
+                values = self.row_values(row) if self.row_values else \
+                    [cell_value(row.get(col)) for col in columns]
+            except Exception as e:
+                logger.error(f"{self.sheet}: error writing row {r}: {e}")
+                continue
+            for col, value in enumerate(values, start=1):
+                updates[(r, col)] = value
+            written += 1
+            r += 1
+        return updates, (self.start_row, None, 1, len(columns)), written
+
+
+@register_feed_type("csv")
+def csv_feed(settings: Dict) -> SheetFeed:
+    """SOURCE is a CSV file or a folder whose *.csv files are concatenated in name order"""
+    source = settings["SOURCE"]
+
+    def load():
+        files = sorted(glob.glob(os.path.join(source, "*.csv"))) if os.path.isdir(source) else [source]
+        frames = [pd.read_csv(f) for f in files]
+        if not frames:
+            return pd.DataFrame(columns=settings.get("COLUMNS") or [])
+        df = pd.concat(frames, ignore_index=True)
+        return df.rename(columns={c: c.strip() for c in df.columns})
+
+    return SheetFeed(settings["SHEET"], load, settings.get("START_ROW", 2), settings.get("COLUMNS"),
+                     sort_by=settings.get("SORT_BY"))
+
+
+@register_feed_type("json")
+def json_feed(settings: Dict) -> SheetFeed:
+    """SOURCE is a JSON file holding a list of records"""
+    def load():
+        with open(settings["SOURCE"]) as f:
+            return pd.DataFrame(json.load(f))
+
+    return SheetFeed(settings["SHEET"], load, settings.get("START_ROW", 2), settings.get("COLUMNS"),
+                     sort_by=settings.get("SORT_BY"))
+
+
+def build_feed(settings: Dict) -> SheetFeed:
+    """SheetFeed for one SHEET_FEEDS entry"""
+    kind = settings.get("TYPE", "csv")
+    if kind not in FEED_TYPES:
+        raise ValueError(f"Unknown sheet feed type '{kind}' for sheet {settings.get('SHEET')}")
+    return FEED_TYPES[kind](settings)
+
+
+class SheetFeedPipeline:
+    """Loads all feeds concurrently and writes them with one load and one save"""
+
+    def __init__(self, feeds: List[SheetFeed], metrics, max_workers: int = 4, writer: str = "patch"):
+        sheets = [feed.sheet for feed in feeds]
+        duplicates = sorted({sheet for sheet in sheets if sheets.count(sheet) > 1})
+        if duplicates:
+            raise ValueError(f"More than one feed writes sheet(s) {', '.join(duplicates)}")
+        self.feeds = feeds
+        self.metrics = metrics
+        self.max_workers = max_workers
+        self.writer = writer
+
+    def _load_one(self, feed):
+        with self.metrics.stage("feed_load", sheet=feed.sheet):
+            return feed.load()
+
+    def load_all(self) -> Dict[str, pd.DataFrame]:
+        """Run every loader; a failing feed is logged and left out, a failing required feed re-raised"""
+        frames = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.feeds)))) as pool:
+            futures = [(feed, pool.submit(self._load_one, feed)) for feed in self.feeds]
+            for feed, future in futures:
+                try:
+                    frames[feed.sheet] = future.result()
+                except Exception as e:
+                    logger.error(f"Feed for {feed.sheet} failed: {e}")
+                    if feed.required:
+                        raise
+        return frames
+
+    def apply(self, excel_path: str, frames: Dict[str, pd.DataFrame], before_save: Optional[Callable] = None,
+              extra_sheets: Optional[Dict[str, tuple]] = None) -> Dict[str, int]:
+        """Write every loaded frame into its sheet; returns rows written per sheet
+
+        ``extra_sheets`` maps further sheets to ready-made ``(updates, clear)``
+        cells (e.g. the KPI dashboard) that go into the same save.
+        """
+        plan = dict(extra_sheets or {})
+        written = {}
+        for feed in self.feeds:
+            if feed.sheet not in frames:
+                continue
+            with self.metrics.stage("write_cells", sheet=feed.sheet, rows=len(frames[feed.sheet])):
+                updates, clear, rows = feed.cell_updates(frames[feed.sheet])
+            plan[feed.sheet] = (updates, clear)
+            written[feed.sheet] = rows
+        if not plan:
+            return written
+
+        if before_save:
+            before_save(excel_path)
+
+        if self.writer == "patch":
+            try:
+                with self.metrics.stage("save", sheets=len(plan), writer="patch"):
+                    result = patch_workbook_cells(excel_path, plan)
+                logger.info(f"Patched {len(plan)} sheets in one pass (rewrote {', '.join(result['parts_rewritten'])})")
+                return written
+            except (XlsxPatchUnsupported, zipfile.BadZipFile) as e:
+                logger.warning(f"In-place patch not possible ({e}); rewriting workbook with openpyxl")
+
+        with self.metrics.stage("load_workbook"):
+            wb = load_workbook(excel_path)
+        for sheet, (updates, clear) in plan.items():
+            if sheet not in wb.sheetnames:
+                raise ValueError(f"Sheet '{sheet}' not found in Excel file")
+            ws = wb[sheet]
+            min_row, _, min_col, max_col = clear
+            for r in range(min_row, ws.max_row + 1):
+                for c in range(min_col, max_col + 1):
+                    ws.cell(row=r, column=c, value=None)
+            for (r, c), value in updates.items():
+                ws.cell(row=r, column=c, value=value)
+        with self.metrics.stage("save", sheets=len(plan), writer="openpyxl"):
+            wb.save(excel_path)
+        return written
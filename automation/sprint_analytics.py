@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+sprint_analytics.py
+Velocity, throughput, burn charts and completion forecasts for Sprint_Planner.
+
+Sprint_Planner columns: Sprint, User Story, Estimate (pts), Status,
+Actual Effort (hrs), Owner, plus an optional Team column (one sheet or
+CSV can hold many teams; without it everything is one team).
+
+All tables come from pandas groupbys over the whole frame, so thousands
+of sprints across many teams are processed in one pass:
+- velocity:   per team and sprint - committed / completed points, stories,
+              effort, hours per point and a rolling average velocity
+              (over delivered sprints only; sprints after a team's last
+              done story are still planned and have no velocity yet)
+- throughput: per team and owner - stories and points done, effort,
+              points per active sprint
+- burn:       per team and sprint - cumulative scope (burnup), completed
+              (burnup) and remaining points (release burndown; the sheet
+              has no dates, so sprints are the time axis)
+- forecast:   per team - Monte Carlo over the team's historical
+              delivered velocities: sprints needed to finish the open backlog at
+              P50 / P85 / P95, simulated for all teams in array chunks
+
+Usage:
+    analytics = SprintAnalytics(pd.read_excel(path, sheet_name='Sprint_Planner'))
+    analytics.velocity()
+    analytics.forecast(simulations=10000)
+
+    python sprint_analytics.py --excel ../Hybrid_ProjectPlan_Template.xlsx --output sprint_summary.csv
+"""
+
+import argparse
+import logging
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DONE_STATUSES = ('done', 'completed', 'closed', 'accepted')
+DEFAULT_TEAM = 'All'
+
+
+def prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed working frame: Team, Sprint, sprint order, points, effort, done flag"""
+    frame = pd.DataFrame({
+        'Team': df['Team'].astype(str) if 'Team' in df.columns else DEFAULT_TEAM,
+        'Sprint': df['Sprint'].astype(str).str.strip(),
+        'Owner': df['Owner'].fillna('Unassigned').astype(str) if 'Owner' in df.columns else 'Unassigned',
+        'Points': pd.to_numeric(df.get('Estimate (pts)'), errors='coerce').fillna(0.0),
+        'Effort': pd.to_numeric(df.get('Actual Effort (hrs)'), errors='coerce'),
+        'Done': df['Status'].astype(str).str.strip().str.lower().isin(DONE_STATUSES),
+    }, index=df.index)
+
+    # "Sprint 12" sorts by its number; other labels keep their first-seen order
+    number = pd.to_numeric(frame['Sprint'].str.extract(r'(\d+)\s*$', expand=False), errors='coerce')
+    first_seen = pd.Series(pd.factorize(frame['Sprint'])[0], index=frame.index)
+    frame['Order'] = number.fillna(first_seen + number.max(skipna=True) if number.notna().any() else first_seen)
+    return frame
+
+
+def delivered_sprints(table: pd.DataFrame, done_column: str) -> pd.Series:
+    """Mask of sprints up to each team's last sprint with any done story (later ones are only planned)"""
+    last_done = table['Order'].where(table[done_column] > 0).groupby(table['Team']).transform('max')
+    return table['Order'] <= last_done
+
+
+class SprintAnalytics:
+    """Sprint tables for one or many teams"""
+
+    def __init__(self, df: pd.DataFrame, rolling_window: int = 3):
+        self.frame = prepare(df)
+        self.rolling_window = rolling_window
+
+    def velocity(self) -> pd.DataFrame:
+        """Per team and sprint: committed and completed points, effort and rolling velocity"""
+        frame = self.frame.assign(
+            Completed=self.frame['Points'].where(self.frame['Done'], 0.0),
+            DoneEffort=self.frame['Effort'].where(self.frame['Done']),
+        )
+        table = frame.groupby(['Team', 'Sprint'], sort=False).agg(
+            Order=('Order', 'first'),
+            Stories=('Points', 'size'),
+            StoriesDone=('Done', 'sum'),
+            Committed=('Points', 'sum'),
+            Velocity=('Completed', 'sum'),
+            Effort=('DoneEffort', 'sum'),
+        ).reset_index().sort_values(['Team', 'Order'], ignore_index=True)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            table['Completion Ratio'] = np.where(table['Committed'] > 0, table['Velocity'] / table['Committed'], np.nan)
+            table['Hours per Point'] = np.where(table['Velocity'] > 0, table['Effort'] / table['Velocity'], np.nan)
+        delivered = delivered_sprints(table, 'StoriesDone')
+        table['Rolling Velocity'] = (table[delivered].groupby('Team', sort=False)['Velocity']
+                                     .rolling(self.rolling_window, min_periods=1).mean()
+                                     .reset_index(level=0, drop=True))
+        return table.rename(columns={'StoriesDone': 'Stories Done', 'Committed': 'Committed (pts)',
+                                     'Velocity': 'Velocity (pts)', 'Effort': 'Effort (hrs)'})
+
+    def history(self) -> pd.DataFrame:
+        """Velocity rows of delivered sprints: each team's sprints up to its last one with a done story"""
+        velocity = self.velocity()
+        return velocity[delivered_sprints(velocity, 'Stories Done')].reset_index(drop=True)
+
+    def throughput(self) -> pd.DataFrame:
+        """Per team and owner: stories and points done, effort and points per sprint"""
+        done = self.frame[self.frame['Done']]
+        table = done.groupby(['Team', 'Owner'], sort=True).agg(
+            Stories=('Points', 'size'),
+            Points=('Points', 'sum'),
+            Effort=('Effort', 'sum'),
+            Sprints=('Sprint', 'nunique'),
+        ).reset_index()
+        table['Points per Sprint'] = table['Points'] / table['Sprints']
+        return table.rename(columns={'Stories': 'Stories Done', 'Points': 'Points Done', 'Effort': 'Effort (hrs)',
+                                     'Sprints': 'Active Sprints'})
+
+    def burn(self) -> pd.DataFrame:
+        """Per team and sprint: cumulative scope, cumulative completed and remaining points"""
+        velocity = self.velocity()
+        grouped = velocity.groupby('Team')
+        return pd.DataFrame({
+            'Team': velocity['Team'],
+            'Sprint': velocity['Sprint'],
+            'Scope (pts)': grouped['Committed (pts)'].cumsum(),
+            'Completed (pts)': grouped['Velocity (pts)'].cumsum(),
+        }).assign(**{'Remaining (pts)': lambda t: t['Scope (pts)'] - t['Completed (pts)']})
+
+    def remaining(self) -> pd.Series:
+        """Open (not done) points per team"""
+        open_points = self.frame['Points'].where(~self.frame['Done'], 0.0)
+        return open_points.groupby(self.frame['Team']).sum()
+
+    def forecast(self, simulations: int = 10000, horizon: int = 52, history: Optional[int] = None,
+                 seed: Optional[int] = None, chunk_cells: int = 5_000_000) -> pd.DataFrame:
+        """Monte Carlo sprints-to-complete for each team's open backlog
+
+        Each simulation draws future sprint velocities from the team's
+        delivered ones (the last ``history`` sprints, default all) until
+        the backlog is done; results beyond ``horizon`` sprints are NaN.
+        Planned sprints with nothing done yet are not history.
+        """
+        velocity = self.history()
+        if history:
+            velocity = velocity.groupby('Team').tail(history)
+        remaining = self.remaining()
+        teams = list(remaining.index)
+
+        samples = velocity.groupby('Team')['Velocity (pts)'].apply(lambda s: s.to_numpy())
+        counts = np.array([len(samples.get(team, [])) for team in teams])
+        padded = np.zeros((len(teams), max(counts.max(initial=0), 1)))
+        for i, team in enumerate(teams):
+            padded[i, :counts[i]] = samples.get(team, [])
+
+        rng = np.random.default_rng(seed)
+        needed = np.full((len(teams), simulations), np.nan)
+        chunk = max(1, chunk_cells // (simulations * horizon))
+        for start in range(0, len(teams), chunk):
+            rows = slice(start, start + chunk)
+            n = np.maximum(counts[rows], 1)
+            picks = (rng.random((len(n), simulations, horizon)) * n[:, None, None]).astype(np.int64)
+            draws = np.take_along_axis(padded[rows][:, None, :], picks.reshape(len(n), 1, -1), axis=2)
+            burned = np.cumsum(draws.reshape(len(n), simulations, horizon), axis=2)
+            done = burned >= remaining.to_numpy()[rows][:, None, None]
+            reached = done.any(axis=2)
+            needed[rows] = np.where(reached, done.argmax(axis=2) + 1, np.nan)
+
+        backlog_done = remaining.to_numpy() <= 0
+        needed[backlog_done] = 0
+        with np.errstate(invalid='ignore'):
+            p50, p85, p95 = (np.nanpercentile(np.where(np.isnan(needed), np.inf, needed), q, axis=1)
+                             for q in (50, 85, 95))
+        return pd.DataFrame({
+            'Team': teams,
+            'Remaining (pts)': remaining.to_numpy(),
+            'Historical Sprints': counts,
+            'Mean Velocity': [padded[i, :counts[i]].mean() if counts[i] else np.nan for i in range(len(teams))],
+            'P50 Sprints': np.where(np.isinf(p50), np.nan, p50),
+            'P85 Sprints': np.where(np.isinf(p85), np.nan, p85),
+            'P95 Sprints': np.where(np.isinf(p95), np.nan, p95),
+            'Within Horizon': np.mean(~np.isnan(needed), axis=1),
+        })
+
+    def summary(self, **forecast_kwargs) -> pd.DataFrame:
+        """One compact row per team: latest delivered sprint, velocity statistics and forecast"""
+        velocity = self.history()
+        latest = velocity.groupby('Team').tail(1).set_index('Team')
+        stats = velocity.groupby('Team')['Velocity (pts)'].agg(['mean', 'std', 'size'])
+        forecast = self.forecast(**forecast_kwargs).set_index('Team')
+        return pd.DataFrame({
+            'Latest Sprint': latest['Sprint'],
+            'Sprints': stats['size'].reindex(forecast.index, fill_value=0),
+            'Average Velocity': stats['mean'].round(2),
+            'Velocity Std': stats['std'].round(2),
+            'Rolling Velocity': latest['Rolling Velocity'].round(2),
+            'Remaining (pts)': forecast['Remaining (pts)'],
+            'P50 Sprints': forecast['P50 Sprints'],
+            'P85 Sprints': forecast['P85 Sprints'],
+            'P95 Sprints': forecast['P95 Sprints'],
+        }).reset_index()
+
+
+def main():
+    """Command line sprint report"""
+    parser = argparse.ArgumentParser(description='Velocity, burn and forecast tables for Sprint_Planner')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--excel', help='Workbook with a Sprint_Planner sheet')
+    source.add_argument('--csv', help='CSV with the Sprint_Planner columns (and optionally Team)')
+    parser.add_argument('--sheet', default='Sprint_Planner')
+    parser.add_argument('--simulations', type=int, default=10000)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--output', default='sprint_summary.csv', help='Per-team summary (CSV)')
+    parser.add_argument('--velocity-output', help='Per-sprint velocity and burn table (CSV)')
+    parser.add_argument('--throughput-output', help='Per-owner throughput table (CSV)')
+    args = parser.parse_args()
+
+    path = args.excel or args.csv
+    if not os.path.exists(path):
+        logger.error(f"Input file not found: {path}")
+        return 1
+    df = pd.read_excel(path, sheet_name=args.sheet) if args.excel else pd.read_csv(path)
+    analytics = SprintAnalytics(df)
+
+    summary = analytics.summary(simulations=args.simulations, seed=args.seed)
+    summary.to_csv(args.output, index=False)
+    if args.velocity_output:
+        analytics.velocity().merge(analytics.burn(), on=['Team', 'Sprint']).to_csv(args.velocity_output, index=False)
+    if args.throughput_output:
+        analytics.throughput().to_csv(args.throughput_output, index=False)
+
+    print(summary.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    sys.exit(main())
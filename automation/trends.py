@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+trends.py
+Incremental rolling trend analytics for the weekly updates.
+
+TrendEngine keeps running aggregates in a small JSON state file so each
+weekly run only folds in the weeks it has not seen yet (a digest of the
+folded rows catches corrections to earlier weeks, which trigger a rebuild):
+- count / sum / sum of squares (mean and standard deviation)
+- EWMA
+- the last max(windows) values, for windowed means and regression slopes
+- two-sided CUSUM changepoint detection
+
+Tracked metrics: CSAT, NPS, ticket backlog (cumulative opened - resolved)
+and resolution rate (resolved / opened).
+
+``verify`` recomputes everything from the full history with pandas and
+reports any field that differs from the incremental state.
+
+Usage:
+    engine = TrendEngine.load('trend_state.json', windows=[4, 12])
+    engine.update(df)
+    engine.save('trend_state.json')
+    print(engine.summary())
+"""
+
+import json
+import logging
+import math
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 2
+
+# Input columns covered by the history digest
+INPUT_COLUMNS = ['Tickets Opened', 'Tickets Resolved', 'NPS', 'CSAT']
+
+# Higher is better for every metric except the backlog
+METRICS = {
+    'CSAT': True,
+    'NPS': True,
+    'Backlog': False,
+    'Resolution Rate': True,
+}
+
+
+def window_slope(values: List[float]) -> Optional[float]:
+    """Least-squares slope per week over consecutive values"""
+    n = len(values)
+    if n < 2:
+        return None
+    x_mean = (n - 1) / 2.0
+    y_mean = sum(values) / n
+    numerator = sum((i - x_mean) * (v - y_mean) for i, v in enumerate(values))
+    denominator = sum((i - x_mean) ** 2 for i in range(n))
+    return numerator / denominator
+
+
+def _column(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+
+
+def weekly_metric_values(df: pd.DataFrame, backlog_start: float = 0.0) -> Dict[str, np.ndarray]:
+    """Per-week values of each tracked metric for rows sorted by Week Start"""
+    opened = _column(df, 'Tickets Opened')
+    resolved = _column(df, 'Tickets Resolved')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(opened > 0, resolved / opened, np.nan)
+    backlog = backlog_start + np.cumsum(np.nan_to_num(opened) - np.nan_to_num(resolved))
+    return {
+        'CSAT': _column(df, 'CSAT'),
+        'NPS': _column(df, 'NPS'),
+        'Backlog': backlog,
+        'Resolution Rate': rate,
+    }
+
+
+def history_digest(df: pd.DataFrame, weeks: pd.Series) -> int:
+    """Order-independent digest of weekly rows: sum of per-row hashes modulo 2**64"""
+    if not len(df):
+        return 0
+    frame = pd.DataFrame({'Week Start': weeks.to_numpy(dtype='datetime64[ns]').view(np.int64),
+                          **{name: _column(df, name) for name in INPUT_COLUMNS}})
+    return int(pd.util.hash_pandas_object(frame, index=False).to_numpy().sum(dtype=np.uint64))
+
+
+class TrendEngine:
+    """Rolling trend state updated in O(new rows) per run"""
+
+    def __init__(self, windows=None, ewma_alpha=0.3, changepoint_threshold=5.0,
+                 changepoint_drift=0.5, min_periods=4):
+        self.windows = sorted(windows or [4, 12])
+        self.ewma_alpha = ewma_alpha
+        self.changepoint_threshold = changepoint_threshold
+        self.changepoint_drift = changepoint_drift
+        self.min_periods = min_periods
+        self.reset()
+
+    def reset(self):
+        self.last_week = None
+        self.rows = 0
+        self.backlog = 0.0
+        self.digest = 0
+        self.metrics = {name: self._empty_metric() for name in METRICS}
+
+    @staticmethod
+    def _empty_metric():
+        return {'count': 0, 'sum': 0.0, 'sumsq': 0.0, 'ewma': None, 'last': None,
+                'window': [], 'cusum_pos': 0.0, 'cusum_neg': 0.0, 'changepoints': []}
+
+    def settings(self) -> Dict:
+        return {
+            'windows': self.windows,
+            'ewma_alpha': self.ewma_alpha,
+            'changepoint_threshold': self.changepoint_threshold,
+            'changepoint_drift': self.changepoint_drift,
+            'min_periods': self.min_periods,
+        }
+
+    # ------------------
+    # Persistence
+    # ------------------
+    @classmethod
+    def load(cls, path: Optional[str], **settings) -> 'TrendEngine':
+        """Load saved state; start empty if missing, unreadable or configured differently"""
+        engine = cls(**settings)
+        if not path or not os.path.exists(path):
+            return engine
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable trend state {path}: {e}")
+            return engine
+        if state.get('version') != STATE_VERSION or state.get('settings') != engine.settings():
+            logger.info("Trend settings changed; rebuilding trend state from full history")
+            return engine
+        engine.last_week = pd.Timestamp(state['last_week']) if state['last_week'] else None
+        engine.rows = state['rows']
+        engine.backlog = state['backlog']
+        engine.digest = state['digest']
+        engine.metrics = state['metrics']
+        return engine
+
+    def save(self, path: str):
+        """Write state atomically (temp file + rename)"""
+        state = {
+            'version': STATE_VERSION,
+            'settings': self.settings(),
+            'last_week': self.last_week.strftime('%Y-%m-%d') if self.last_week is not None else None,
+            'rows': self.rows,
+            'backlog': self.backlog,
+            'digest': self.digest,
+            'metrics': self.metrics,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    # ------------------
+    # Incremental update
+    # ------------------
+    def update(self, df: pd.DataFrame) -> int:
+        """Fold in rows newer than the last processed week; returns rows added
+
+        ``df`` must hold one row per week. When the rows at or before the
+        last processed week no longer match the digest of what was folded
+        in (a corrected, added or removed earlier week), the state is
+        rebuilt from the whole of ``df`` and every row counts as added.
+        """
+        weeks = pd.to_datetime(df['Week Start'], errors='coerce')
+        new = weeks.notna()
+        if self.last_week is not None:
+            seen = new & (weeks <= self.last_week)
+            if history_digest(df.loc[seen], weeks[seen]) != self.digest:
+                logger.info("Earlier weeks changed since the trend state was saved; rebuilding from full history")
+                self.reset()
+                return self.update(df)
+            new &= weeks > self.last_week
+        if not new.any():
+            return 0
+
+        new_rows = df.loc[new].assign(**{'Week Start': weeks[new]}).sort_values('Week Start')
+        values = weekly_metric_values(new_rows, self.backlog)
+        week_labels = new_rows['Week Start'].dt.strftime('%Y-%m-%d').tolist()
+
+        for name in METRICS:
+            for week, value in zip(week_labels, values[name]):
+                self._fold(self.metrics[name], float(value), week)
+
+        self.backlog = float(values['Backlog'][-1])
+        self.last_week = new_rows['Week Start'].iloc[-1]
+        self.rows += len(new_rows)
+        self.digest = (self.digest + history_digest(new_rows, new_rows['Week Start'])) % 2 ** 64
+        return len(new_rows)
+
+    def _fold(self, state: Dict, value: float, week: str):
+        if math.isnan(value):
+            return
+
+        # Changepoint check against the statistics *before* this value
+        if state['count'] >= self.min_periods:
+            mean = state['sum'] / state['count']
+            variance = max(state['sumsq'] / state['count'] - mean ** 2, 0.0)
+            std = math.sqrt(variance)
+            if std > 0:
+                z = (value - mean) / std
+                state['cusum_pos'] = max(0.0, state['cusum_pos'] + z - self.changepoint_drift)
+                state['cusum_neg'] = max(0.0, state['cusum_neg'] - z - self.changepoint_drift)
+                if state['cusum_pos'] > self.changepoint_threshold or state['cusum_neg'] > self.changepoint_threshold:
+                    direction = 'up' if state['cusum_pos'] > self.changepoint_threshold else 'down'
+                    state['changepoints'].append({'week': week, 'direction': direction})
+                    state['cusum_pos'] = state['cusum_neg'] = 0.0
+
+        state['count'] += 1
+        state['sum'] += value
+        state['sumsq'] += value * value
+        state['ewma'] = value if state['ewma'] is None else \
+            self.ewma_alpha * value + (1 - self.ewma_alpha) * state['ewma']
+        state['last'] = value
+        state['window'].append(value)
+        if len(state['window']) > self.windows[-1]:
+            del state['window'][0]
+
+    # ------------------
+    # Results
+    # ------------------
+    def summary(self) -> Dict:
+        """Per-metric aggregates, windowed means/slopes, verdict and changepoints"""
+        summary = {}
+        for name, higher_is_better in METRICS.items():
+            state = self.metrics[name]
+            if not state['count']:
+                continue
+            mean = state['sum'] / state['count']
+            std = math.sqrt(max(state['sumsq'] / state['count'] - mean ** 2, 0.0))
+            windows = {}
+            for size in self.windows:
+                recent = state['window'][-size:]
+                slope = window_slope(recent)
+                windows[size] = {
+                    'mean': round(sum(recent) / len(recent), 4),
+                    'slope': round(slope, 4) if slope is not None else None,
+                }
+
+            slope = windows[self.windows[0]]['slope']
+            tolerance = 0.01 * std if std else 0.0
+            if slope is None or abs(slope) <= tolerance:
+                trend = 'stable'
+            elif (slope > 0) == higher_is_better:
+                trend = 'improving'
+            else:
+                trend = 'declining'
+
+            summary[name] = {
+                'count': state['count'],
+                'mean': round(mean, 4),
+                'std': round(std, 4),
+                'ewma': round(state['ewma'], 4),
+                'last': round(state['last'], 4),
+                'windows': windows,
+                'trend': trend,
+                'changepoints': state['changepoints'][-5:],
+            }
+        return summary
+
+    # ------------------
+    # Verification
+    # ------------------
+    def recompute(self, df: pd.DataFrame) -> Dict:
+        """Full recompute of the summary from the whole history (pandas)"""
+        weeks = pd.to_datetime(df['Week Start'], errors='coerce')
+        history = df.loc[weeks.notna()].assign(**{'Week Start': weeks[weeks.notna()]}).sort_values('Week Start')
+        values = weekly_metric_values(history)
+        labels = history['Week Start'].dt.strftime('%Y-%m-%d').tolist()
+
+        full = {}
+        for name in METRICS:
+            series = pd.Series(values[name])
+            valid = series.dropna()
+            if valid.empty:
+                continue
+            changepoint_state = self._empty_metric()
+            for week, value in zip(labels, values[name]):
+                self._fold(changepoint_state, float(value), week)
+            full[name] = {
+                'count': int(valid.count()),
+                'mean': round(float(valid.mean()), 4),
+                'std': round(float(valid.std(ddof=0)), 4),
+                'ewma': round(float(valid.ewm(alpha=self.ewma_alpha, adjust=False).mean().iloc[-1]), 4),
+                'last': round(float(valid.iloc[-1]), 4),
+                'windows': {
+                    size: {
+                        'mean': round(float(valid.tail(size).mean()), 4),
+                        'slope': round(float(np.polyfit(np.arange(len(valid.tail(size))), valid.tail(size), 1)[0]), 4)
+                        if len(valid.tail(size)) >= 2 else None,
+                    }
+                    for size in self.windows
+                },
+                'changepoints': changepoint_state['changepoints'][-5:],
+            }
+        return full
+
+    def verify(self, df: pd.DataFrame, tolerance: float = 1e-3) -> List[str]:
+        """Compare the incremental state with a full recompute; returns mismatches"""
+        incremental = self.summary()
+        full = self.recompute(df)
+        mismatches = []
+
+        for name in set(incremental) | set(full):
+            if name not in incremental or name not in full:
+                mismatches.append(f"{name}: present in only one of incremental/full results")
+                continue
+            inc, ref = incremental[name], full[name]
+            for field in ('count', 'mean', 'std', 'ewma', 'last'):
+                if not math.isclose(inc[field], ref[field], rel_tol=tolerance, abs_tol=tolerance):
+                    mismatches.append(f"{name}.{field}: incremental {inc[field]} != full {ref[field]}")
+            for size in self.windows:
+                for field in ('mean', 'slope'):
+                    a, b = inc['windows'][size][field], ref['windows'][size][field]
+                    if (a is None) != (b is None) or (a is not None and not math.isclose(a, b, rel_tol=tolerance, abs_tol=tolerance)):
+                        mismatches.append(f"{name}.window{size}.{field}: incremental {a} != full {b}")
+            if inc['changepoints'] != ref['changepoints']:
+                mismatches.append(f"{name}.changepoints differ")
+
+        return mismatches
+
+    def rebuild(self, df: pd.DataFrame):
+        """Discard state and fold the full history again"""
+        self.reset()
+        self.update(df)
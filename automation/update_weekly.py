@@ -8,15 +8,25 @@ Week Start, Tickets Opened, Tickets Resolved, NPS, CSAT, Notes
 
 Features:
 - Enhanced error handling and validation
-- Email notifications on errors
-- Data quality checks
-- Automatic trend analysis
-- Logging capabilities
+- Deduplicated backups with retention (BACKUP; see backup_store.py)
+- In-place sheet patching: other sheets, charts and pivots are left untouched
+- Extra sheet feeds (SHEET_FEEDS; see sheet_feeds.py) loaded concurrently and
+  written together with Weekly_Updates in one workbook save
+- Chunked streaming CSV ingest (memory bounded by INGEST.CHUNK_SIZE)
+- Email notifications on errors (queued, one digest per run, pooled SMTP)
+- Data quality checks (config-declared rules, per-row issue report)
+- Automatic trend analysis (rolling state file: EWMA, windowed slopes, changepoints)
+- Materialised weekly/monthly/quarterly KPI rollups (KPI_Dashboard + Parquet/CSV)
+- Queued logging (background writer thread, per-file messages summarised, optional JSON lines)
+- Per-stage timing/memory metrics (JSON lines, Prometheus textfile, OTLP file)
+- --profile mode writing cProfile / flamegraph reports next to the log file
 - Configuration file support
+- --watch daemon mode: inotify (or polling) on CSV_FOLDER, debounced batches
 
 Usage:
   1) Set the config values below (paths).
-  2) Run: python update_weekly.py
+  2) Run: python update_weekly.py            (add --profile to profile the run)
+     or:  python update_weekly.py --watch    (process CSVs as they arrive)
   3) Optional: Schedule weekly via Windows Task Scheduler or cron.
 
 Requirements:
@@ -27,14 +37,27 @@ import os
 import glob
 import logging
 import json
+import queue
 import smtplib
+import threading
+import zipfile
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.utils.exceptions import InvalidFileException
+import log_setup
+from instrumentation import PipelineMetrics
+from profiling import profile_run
+from trends import TrendEngine
+from backup_store import BackupStore
+from xlsx_patch import XlsxPatchUnsupported, patch_workbook_cells, sheet_names
+from sheet_feeds import SheetFeed, SheetFeedPipeline, build_feed
+from kpi_rollup import KpiRollup, dashboard_cells
+from folder_watch import create_watcher, debounced_batches, file_signature
 
 # ------------------
 # Enhanced Config
@@ -45,22 +68,79 @@ CONFIG = {
     "CSV_FOLDER": r"./weekly_csvs",
     "START_ROW": 4,
     "BACKUP_ON_SAVE": True,
+    "EXCEL_WRITER": "patch",
+    "SHEET_FEEDS": [],
+    "FEED_WORKERS": 4,
+    "BACKUP": {
+        "DIR": "",
+        "KEEP_LAST": 10,
+        "KEEP_DAILY": 7,
+        "KEEP_WEEKLY": 8,
+        "COMPRESS_AFTER_DAYS": 7
+    },
     "LOG_LEVEL": "INFO",
     "LOG_FILE": "weekly_update.log",
+    "LOG_FORMAT": "text",
+    "LOG_SUMMARY_AFTER": 20,
     "EMAIL_NOTIFICATIONS": {
         "ENABLED": False,
         "SMTP_SERVER": "smtp.gmail.com",
         "SMTP_PORT": 587,
         "EMAIL": "",
         "PASSWORD": "",
-        "TO_EMAILS": []
+        "TO_EMAILS": [],
+        "USE_TLS": True,
+        "TIMEOUT_SECONDS": 30,
+        "DIGEST_INTERVAL_SECONDS": 0,
+        "MAX_EVENTS_PER_GROUP": 20
     },
     "DATA_VALIDATION": {
         "MIN_CSAT": 0,
         "MAX_CSAT": 10,
         "MIN_NPS": -100,
         "MAX_NPS": 100,
-        "MAX_TICKETS": 10000
+        "MAX_TICKETS": 10000,
+        "RULES": [],
+        "ISSUE_REPORT_FILE": ""
+    },
+    "INSTRUMENTATION": {
+        "ENABLED": True,
+        "METRICS_FILE": "weekly_metrics.jsonl",
+        "PROMETHEUS_TEXTFILE": "",
+        "OTEL_FILE": ""
+    },
+    "INGEST": {
+        "CHUNK_SIZE": 100000,
+        "DUPLICATE_POLICY": "file_order"
+    },
+    "PROFILE": {
+        "ENABLED": False,
+        "ENGINE": "cprofile",
+        "TOP_N": 25,
+        "SAMPLE_INTERVAL_MS": 5
+    },
+    "TRENDS": {
+        "ENABLED": True,
+        "STATE_FILE": "trend_state.json",
+        "WINDOWS": [4, 12],
+        "EWMA_ALPHA": 0.3,
+        "CHANGEPOINT_THRESHOLD": 5.0,
+        "CHANGEPOINT_DRIFT": 0.5,
+        "VERIFY": False
+    },
+    "WATCH": {
+        "BACKEND": "auto",
+        "DEBOUNCE_SECONDS": 2.0,
+        "MAX_BATCH_SECONDS": 30.0,
+        "POLL_INTERVAL": 5.0
+    },
+    "KPI_ROLLUP": {
+        "ENABLED": True,
+        "SHEET": "KPI_Dashboard",
+        "STATE_FILE": "kpi_rollup_state.json",
+        "OUTPUT_FILE": "kpi_rollup.parquet",
+        "GRAINS": ["week", "month", "quarter"],
+        "PERCENTILES": [10, 50, 90]
     }
 }
 
@@ -75,77 +155,384 @@ if os.path.exists(CONFIG_FILE):
 # Logging Setup
 # ------------------
 def setup_logging():
-    logging.basicConfig(
-        level=getattr(logging, CONFIG["LOG_LEVEL"]),
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(CONFIG["LOG_FILE"]),
-            logging.StreamHandler()
-        ]
+    """Queued logging: file and console I/O happen on a background thread"""
+    log_setup.setup_logging(
+        CONFIG["LOG_LEVEL"],
+        CONFIG["LOG_FILE"],
+        console=True,
+        fmt=CONFIG.get("LOG_FORMAT", "text"),
+        summary_after=CONFIG.get("LOG_SUMMARY_AFTER", 20)
     )
     return logging.getLogger(__name__)
 
 logger = setup_logging()
+metrics = PipelineMetrics.from_config("update_weekly", CONFIG.get("INSTRUMENTATION"))
 
 # ------------------
 # Email Notifications
 # ------------------
-def send_email_notification(subject: str, body: str, is_error: bool = False):
-    """Send email notification if enabled"""
-    if not CONFIG["EMAIL_NOTIFICATIONS"]["ENABLED"]:
-        return
+class NotificationDispatcher:
+    """Queued, batched e-mail delivery for run notifications
     
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = CONFIG["EMAIL_NOTIFICATIONS"]["EMAIL"]
-        msg['To'] = ", ".join(CONFIG["EMAIL_NOTIFICATIONS"]["TO_EMAILS"])
-        msg['Subject'] = f"{'[ERROR]' if is_error else '[INFO]'} {subject}"
+    Events are queued without blocking the caller and handled by a
+    background sender thread. All events of a run are coalesced into one
+    digest e-mail, and the SMTP connection (STARTTLS + login) is opened
+    once and reused for later digests while it stays alive.
+    """
+    
+    def __init__(self, get_settings):
+        self._get_settings = get_settings
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._smtp = None
+        self.sent_digests = 0
+    
+    def settings(self) -> Dict:
+        return self._get_settings() or {}
+    
+    def enabled(self) -> bool:
+        return bool(self.settings().get("ENABLED"))
+    
+    def notify(self, subject: str, body: str, is_error: bool = False):
+        """Queue an event for the next digest (never blocks)"""
+        if not self.enabled():
+            return
+        self._ensure_worker()
+        self._queue.put_nowait(("event", {
+            "time": datetime.now(),
+            "subject": subject,
+            "body": body,
+            "is_error": is_error
+        }))
+    
+    def flush(self, timeout: Optional[float] = 30) -> bool:
+        """Send everything queued so far as one digest and wait for delivery"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        return done.wait(timeout)
+    
+    def close(self, timeout: Optional[float] = 30):
+        """Send pending events, close the SMTP connection and stop the sender"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(("stop", done))
+        done.wait(timeout)
+        self._thread.join(timeout)
+        self._thread = None
+    
+    def _ensure_worker(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notification-sender", daemon=True)
+                self._thread.start()
+    
+    def _run(self):
+        pending = []
+        while True:
+            interval = self.settings().get("DIGEST_INTERVAL_SECONDS", 0)
+            try:
+                kind, payload = self._queue.get(timeout=interval or None)
+            except queue.Empty:
+                # Periodic digest for long-running processes (e.g. watch mode)
+                self._send_digest(pending)
+                pending = []
+                continue
+            
+            if kind == "event":
+                pending.append(payload)
+                continue
+            
+            self._send_digest(pending)
+            pending = []
+            if kind == "stop":
+                self._disconnect()
+                payload.set()
+                return
+            payload.set()
+    
+    def build_digest(self, events: List[Dict]) -> MIMEMultipart:
+        """Coalesce events into one message, grouping repeats of a subject"""
+        settings = self.settings()
+        max_per_group = settings.get("MAX_EVENTS_PER_GROUP", 20)
+        errors = sum(1 for e in events if e["is_error"])
         
-        msg.attach(MIMEText(body, 'plain'))
+        groups = {}
+        for event in events:
+            groups.setdefault(event["subject"], []).append(event)
         
-        server = smtplib.SMTP(CONFIG["EMAIL_NOTIFICATIONS"]["SMTP_SERVER"], 
-                             CONFIG["EMAIL_NOTIFICATIONS"]["SMTP_PORT"])
-        server.starttls()
-        server.login(CONFIG["EMAIL_NOTIFICATIONS"]["EMAIL"], 
-                    CONFIG["EMAIL_NOTIFICATIONS"]["PASSWORD"])
-        server.send_message(msg)
-        server.quit()
-        logger.info(f"Email notification sent: {subject}")
-    except Exception as e:
-        logger.error(f"Failed to send email: {e}")
+        if len(events) == 1:
+            subject = events[0]["subject"]
+        else:
+            subject = f"Weekly Update digest: {len(events)} events, {errors} errors"
+        
+        lines = []
+        for group_subject, group in groups.items():
+            lines.append(f"{group_subject} ({len(group)})")
+            lines.append("-" * len(lines[-1]))
+            for event in group[:max_per_group]:
+                lines.append(f"[{event['time']:%Y-%m-%d %H:%M:%S}] {event['body']}")
+            if len(group) > max_per_group:
+                lines.append(f"... and {len(group) - max_per_group} more")
+            lines.append("")
+        
+        msg = MIMEMultipart()
+        msg['From'] = settings.get("EMAIL", "")
+        msg['To'] = ", ".join(settings.get("TO_EMAILS", []))
+        msg['Subject'] = f"{'[ERROR]' if errors else '[INFO]'} {subject}"
+        msg.attach(MIMEText("\n".join(lines), 'plain'))
+        return msg
+    
+    def _connection(self) -> smtplib.SMTP:
+        """Reuse the pooled SMTP connection if it is still alive, else reconnect"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+        
+        settings = self.settings()
+        server = smtplib.SMTP(settings["SMTP_SERVER"], settings["SMTP_PORT"],
+                              timeout=settings.get("TIMEOUT_SECONDS", 30))
+        if settings.get("USE_TLS", True):
+            server.starttls()
+        if settings.get("PASSWORD"):
+            server.login(settings["EMAIL"], settings["PASSWORD"])
+        self._smtp = server
+        return server
+    
+    def _disconnect(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+    
+    def _send_digest(self, events: List[Dict]):
+        if not events:
+            return
+        msg = self.build_digest(events)
+        for attempt in range(2):
+            try:
+                self._connection().send_message(msg)
+                self.sent_digests += 1
+                logger.info(f"Email notification sent: {msg['Subject']} ({len(events)} events)")
+                return
+            except Exception as e:
+                # A dropped pooled connection gets one fresh retry
+                self._disconnect()
+                if attempt:
+                    logger.error(f"Failed to send email: {e}")
+
+notifier = NotificationDispatcher(lambda: CONFIG.get("EMAIL_NOTIFICATIONS"))
+
+def send_email_notification(subject: str, body: str, is_error: bool = False):
+    """Queue an email notification for this run's digest if enabled"""
+    notifier.notify(subject, body, is_error)
 
 # ------------------
 # Data Validation
 # ------------------
+VALIDATION_KINDS = ("not_null", "range", "not_future", "allowed")
+
+class ValidationConfigError(ValueError):
+    """DATA_VALIDATION declares a rule that cannot be evaluated"""
+
+def build_validation_rules(validation_config: Dict, columns) -> List[Dict]:
+    """Declare the checks to run as a list of rules
+    
+    Range rules come from the MIN_/MAX_ keys of DATA_VALIDATION; extra rules
+    can be declared under DATA_VALIDATION["RULES"], e.g.
+    {"name": "Negative backlog", "column": "Tickets Resolved", "kind": "range", "min": 0}.
+    Supported kinds: not_null, range, not_future, allowed (with "values").
+    Declared rules are checked here, once per run, and a bad one raises
+    ValidationConfigError before any file is read.
+    """
+    rules = [{"name": f"Missing values in {col}", "column": col, "kind": "not_null"} for col in columns]
+    
+    ranges = [
+        ("CSAT", "MIN_CSAT", "MAX_CSAT"),
+        ("NPS", "MIN_NPS", "MAX_NPS"),
+        ("Tickets Opened", None, "MAX_TICKETS"),
+        ("Tickets Resolved", None, "MAX_TICKETS"),
+    ]
+    for col, min_key, max_key in ranges:
+        if col not in columns:
+            continue
+        low = validation_config.get(min_key, 0) if min_key else 0
+        high = validation_config.get(max_key)
+        rules.append({"name": f"Invalid {col} values", "column": col, "kind": "range", "min": low, "max": high})
+    
+    if "Week Start" in columns:
+        rules.append({"name": "Future dates detected", "column": "Week Start", "kind": "not_future"})
+    
+    for rule in validation_config.get("RULES", []):
+        rule = dict({"kind": "range"}, **rule)
+        name = rule.get("name", rule.get("column"))
+        missing = [key for key in ("name", "column") if key not in rule]
+        if missing:
+            raise ValidationConfigError(f"Validation rule {name!r} is missing {missing}")
+        if rule["kind"] not in VALIDATION_KINDS:
+            raise ValidationConfigError(f"Unknown validation rule kind: {rule['kind']} (rule {name!r})")
+        if rule["kind"] == "allowed" and "values" not in rule:
+            raise ValidationConfigError(f"Validation rule {name!r} of kind 'allowed' has no 'values'")
+        if rule["column"] in columns:
+            rules.append(rule)
+    
+    if len(rules) > 64:
+        raise ValidationConfigError(f"At most 64 validation rules are supported, got {len(rules)}")
+    return rules
+
+class ValidationReport:
+    """Per-row issue bitmap produced by evaluate_validation_rules
+    
+    Bit i of ``bitmap[row]`` is set when the row fails ``rules[i]``.
+    """
+    
+    def __init__(self, rules: List[Dict], bitmap: np.ndarray, counts: List[int], index=None):
+        self.rules = rules
+        self.bitmap = bitmap
+        self.counts = counts
+        self.index = index if index is not None else np.arange(len(bitmap))
+    
+    def __len__(self):
+        return len(self.bitmap)
+    
+    def merge(self, other: "ValidationReport") -> "ValidationReport":
+        """Combine reports of consecutive chunks evaluated with the same rules"""
+        return ValidationReport(
+            self.rules,
+            np.concatenate([self.bitmap, other.bitmap]),
+            [a + b for a, b in zip(self.counts, other.counts)],
+            np.concatenate([self.index, other.index])
+        )
+    
+    def flagged(self) -> "ValidationReport":
+        """Same report restricted to failing rows (counts unchanged)"""
+        rows = np.flatnonzero(self.bitmap)
+        return ValidationReport(self.rules, self.bitmap[rows], self.counts, self.index[rows])
+    
+    def issues(self) -> List[str]:
+        """Summary lines for every rule with at least one failing row"""
+        issues = []
+        for rule, count in zip(self.rules, self.counts):
+            if not count:
+                continue
+            if rule["kind"] == "not_null":
+                issues.append(f"{rule['name']}: {count} rows")
+            elif rule["kind"] == "range":
+                low, high = rule.get("min"), rule.get("max")
+                if low is not None and high is not None:
+                    bounds = f"outside range {low} to {high}"
+                elif high is not None:
+                    bounds = f"above {high}"
+                else:
+                    bounds = f"below {low}"
+                issues.append(f"{rule['name']}: {count} rows {bounds}")
+            else:
+                issues.append(f"{rule['name']}: {count} rows")
+        return issues
+    
+    def row_issues(self) -> pd.DataFrame:
+        """Row-level report: one line per failing row with the rules it broke"""
+        flagged = np.flatnonzero(self.bitmap)
+        names = [rule["name"] for rule in self.rules]
+        descriptions = [
+            "; ".join(names[bit] for bit in range(len(names)) if (int(mask) >> bit) & 1)
+            for mask in self.bitmap[flagged]
+        ]
+        return pd.DataFrame({
+            "Row": self.index[flagged],
+            "Issue Bitmap": self.bitmap[flagged],
+            "Issues": descriptions
+        })
+
+def _datetime_array(values: pd.Series) -> np.ndarray:
+    """datetime64[ns] array of a column; ISO text is parsed vectorised, only other text element by element"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]")
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    retry = parsed.isna().to_numpy() & values.notna().to_numpy()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    return parsed.to_numpy(dtype="datetime64[ns]")
+
+def evaluate_validation_rules(df: pd.DataFrame, rules: Optional[List[Dict]] = None, now: Optional[datetime] = None) -> ValidationReport:
+    """Evaluate all rules as NumPy masks over column arrays
+    
+    Each column is converted to an array at most once per kind (numeric or
+    datetime) and every rule contributes one boolean mask; no filtered copy
+    of the frame is ever made.
+    """
+    if rules is None:
+        rules = build_validation_rules(CONFIG.get("DATA_VALIDATION", {}), list(df.columns))
+    if len(rules) > 64:
+        raise ValidationConfigError(f"At most 64 validation rules are supported, got {len(rules)}")
+    
+    n = len(df)
+    dtype = np.uint32 if len(rules) <= 32 else np.uint64
+    bitmap = np.zeros(n, dtype=dtype)
+    counts = []
+    arrays = {}
+    
+    def column_array(col, kind):
+        key = (col, kind)
+        if key not in arrays:
+            if kind == "numeric":
+                arrays[key] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            elif kind == "datetime":
+                arrays[key] = _datetime_array(df[col])
+            else:
+                arrays[key] = df[col].isna().to_numpy()
+        return arrays[key]
+    
+    now = np.datetime64(now or datetime.now(), "ns")
+    for bit, rule in enumerate(rules):
+        col = rule["column"]
+        if rule["kind"] == "not_null":
+            mask = column_array(col, "isna")
+        elif rule["kind"] == "range":
+            values = column_array(col, "numeric")
+            mask = np.zeros(n, dtype=bool)
+            if rule.get("min") is not None:
+                mask |= values < rule["min"]
+            if rule.get("max") is not None:
+                mask |= values > rule["max"]
+        elif rule["kind"] == "not_future":
+            mask = column_array(col, "datetime") > now
+        elif rule["kind"] == "allowed":
+            mask = ~df[col].isin(rule["values"]).to_numpy() & ~column_array(col, "isna")
+        else:
+            raise ValidationConfigError(f"Unknown validation rule kind: {rule['kind']}")
+        
+        bitmap |= mask.astype(dtype) << dtype(bit)
+        counts.append(int(np.count_nonzero(mask)))
+    
+    return ValidationReport(rules, bitmap, counts, df.index.to_numpy())
+
 def validate_data_quality(df: pd.DataFrame) -> List[str]:
     """Validate data quality and return list of issues"""
-    issues = []
-    
-    # Check for missing values
-    missing_data = df.isnull().sum()
-    for col, count in missing_data.items():
-        if count > 0:
-            issues.append(f"Missing values in {col}: {count} rows")
-    
-    # Check data ranges
-    if 'CSAT' in df.columns:
-        invalid_csat = df[(df['CSAT'] < CONFIG["DATA_VALIDATION"]["MIN_CSAT"]) | 
-                         (df['CSAT'] > CONFIG["DATA_VALIDATION"]["MAX_CSAT"])]
-        if len(invalid_csat) > 0:
-            issues.append(f"Invalid CSAT values: {len(invalid_csat)} rows outside range 0-10")
-    
-    if 'NPS' in df.columns:
-        invalid_nps = df[(df['NPS'] < CONFIG["DATA_VALIDATION"]["MIN_NPS"]) | 
-                        (df['NPS'] > CONFIG["DATA_VALIDATION"]["MAX_NPS"])]
-        if len(invalid_nps) > 0:
-            issues.append(f"Invalid NPS values: {len(invalid_nps)} rows outside range -100 to 100")
-    
-    # Check for future dates
-    future_dates = df[df['Week Start'] > datetime.now()]
-    if len(future_dates) > 0:
-        issues.append(f"Future dates detected: {len(future_dates)} rows")
-    
-    return issues
+    return evaluate_validation_rules(df).issues()
+
+def write_issue_report(report: ValidationReport, df: pd.DataFrame):
+    """Write failing rows to DATA_VALIDATION["ISSUE_REPORT_FILE"] if configured"""
+    report_path = CONFIG.get("DATA_VALIDATION", {}).get("ISSUE_REPORT_FILE")
+    if not report_path:
+        return
+    rows = report.row_issues()
+    flagged = np.flatnonzero(report.bitmap)
+    if "Week Start" in df.columns:
+        rows.insert(1, "Week Start", df["Week Start"].to_numpy()[flagged])
+    if "File" in df.columns:
+        rows.insert(0, "File", df["File"].to_numpy()[flagged])
+    rows.to_csv(report_path, index=False)
+    logger.info(f"Wrote {len(rows)} flagged rows to {report_path}")
 
 # ------------------
 # Trend Analysis
@@ -178,69 +565,325 @@ def analyze_trends(df: pd.DataFrame) -> Dict:
     
     return trends
 
-def read_all_weekly_csvs(csv_folder: str) -> pd.DataFrame:
-    """Enhanced CSV reading with better error handling"""
-    files = sorted(glob.glob(os.path.join(csv_folder, "*.csv")))
-    frames = []
-    processed_files = []
+def update_trend_state(df: pd.DataFrame) -> Dict:
+    """Fold new weeks into the persisted rolling trend state and summarise it
     
-    if not files:
-        logger.warning(f"No CSV files found in {csv_folder}")
-        return pd.DataFrame(columns=["Week Start","Tickets Opened","Tickets Resolved","NPS","CSAT","Notes"])
+    Only weeks after the last processed one are added; corrections to
+    earlier weeks are detected by the engine and rebuild the state. With
+    TRENDS.VERIFY set, the state is also checked against a full recompute
+    and rebuilt from the full history if they disagree.
+    """
+    settings = CONFIG.get("TRENDS", {})
+    if not settings.get("ENABLED", True):
+        return {}
     
-    for f in files:
-        try:
-            df = pd.read_csv(f)
-            if df.empty:
-                logger.warning(f"Empty file skipped: {f}")
-                continue
-            frames.append(df)
-            processed_files.append(f)
-            logger.info(f"Successfully processed: {f}")
-        except Exception as e:
-            error_msg = f"Failed to process {f}: {e}"
-            logger.error(error_msg)
-            send_email_notification("CSV Processing Error", error_msg, is_error=True)
+    state_file = settings.get("STATE_FILE", "trend_state.json")
+    engine = TrendEngine.load(
+        state_file,
+        windows=settings.get("WINDOWS", [4, 12]),
+        ewma_alpha=settings.get("EWMA_ALPHA", 0.3),
+        changepoint_threshold=settings.get("CHANGEPOINT_THRESHOLD", 5.0),
+        changepoint_drift=settings.get("CHANGEPOINT_DRIFT", 0.5)
+    )
+    previous_week = engine.last_week
+    added = engine.update(df)
+    logger.info(f"Trend state: {added} new weeks, {engine.rows} weeks total")
     
-    if not frames:
-        raise ValueError("No valid CSV files could be processed")
+    if settings.get("VERIFY", False):
+        mismatches = engine.verify(df)
+        if mismatches:
+            logger.warning(f"Trend state differs from full recompute ({len(mismatches)} fields); rebuilding")
+            for mismatch in mismatches:
+                logger.warning(f"  {mismatch}")
+            engine.rebuild(df)
+        else:
+            logger.info("Trend state verified against full recompute")
     
-    df = pd.concat(frames, ignore_index=True)
-    logger.info(f"Combined data from {len(processed_files)} files: {len(df)} rows")
+    try:
+        engine.save(state_file)
+    except OSError as e:
+        logger.warning(f"Could not save trend state {state_file}: {e}")
     
-    # Normalize columns
-    expected = ["Week Start","Tickets Opened","Tickets Resolved","NPS","CSAT","Notes"]
-    df = df.rename(columns={c:c.strip() for c in df.columns})
-    missing = [c for c in expected if c not in df.columns]
-    if missing:
-        error_msg = f"Missing required columns: {missing}"
-        logger.error(error_msg)
-        raise ValueError(error_msg)
+    summary = engine.summary()
+    cutoff = previous_week.strftime('%Y-%m-%d') if previous_week is not None else ''
+    for name, entry in summary.items():
+        for changepoint in entry['changepoints']:
+            if changepoint['week'] > cutoff:
+                send_email_notification(f"Weekly Update - {name} changepoint",
+                                        f"{name} shifted {changepoint['direction']} in week {changepoint['week']}")
+    return summary
+
+def update_kpi_rollup(df: pd.DataFrame) -> Optional[KpiRollup]:
+    """Refresh the materialised KPI rollups and export them
+    
+    Only periods touched by new or changed weeks are recomputed. The table
+    goes to KPI_ROLLUP.OUTPUT_FILE; the dashboard cells (see
+    kpi_dashboard_sheets) are written with the weekly data.
+    """
+    settings = CONFIG.get("KPI_ROLLUP", {})
+    if not settings.get("ENABLED", True):
+        return None
+    
+    state_file = settings.get("STATE_FILE", "kpi_rollup_state.json")
+    rollup = KpiRollup.load(state_file, grains=settings.get("GRAINS"), percentiles=settings.get("PERCENTILES"))
+    with metrics.stage("kpi_rollup", weeks=len(df)):
+        recomputed = rollup.update(df)
+    logger.info(f"KPI rollup: {recomputed} periods recomputed, {len(rollup.rows)} rows total")
+    
+    try:
+        rollup.save(state_file)
+        if settings.get("OUTPUT_FILE"):
+            logger.info(f"KPI rollup table written to {rollup.export(settings['OUTPUT_FILE'])}")
+    except OSError as e:
+        logger.warning(f"Could not save KPI rollups: {e}")
+    return rollup
+
+def kpi_dashboard_sheets(rollup: Optional[KpiRollup], trends: Optional[Dict] = None) -> Dict[str, tuple]:
+    """{KPI_ROLLUP.SHEET: (updates, clear)} with the latest-week headline and rollup table
     
-    # Type conversions with better error handling
-    df["Week Start"] = pd.to_datetime(df["Week Start"], errors="coerce")
+    Empty when there is no rollup or the workbook has no such sheet. The
+    cells go into the same single workbook save as the weekly rows.
+    """
+    sheet = CONFIG.get("KPI_ROLLUP", {}).get("SHEET", "KPI_Dashboard")
+    excel_path = CONFIG["EXCEL_PATH"]
+    if rollup is None or not sheet or not os.path.exists(excel_path):
+        return {}
+    try:
+        names = sheet_names(excel_path)
+    except XlsxPatchUnsupported:
+        names = load_workbook(excel_path, read_only=True).sheetnames
+    except (zipfile.BadZipFile, KeyError):
+        return {}  # the weekly write reports the broken workbook
+    if sheet not in names:
+        logger.info(f"No {sheet} sheet in {excel_path}; skipping KPI dashboard")
+        return {}
+    with metrics.stage("write_cells", sheet=sheet, rows=len(rollup.rows)):
+        return {sheet: dashboard_cells(rollup, trends)}
+
+def _apply_openpyxl_sheets(wb, sheets: Dict[str, tuple]):
+    """Clear and fill extra sheets' cells in a loaded workbook (openpyxl writer)"""
+    for sheet, (updates, clear) in sheets.items():
+        ws = wb[sheet]
+        min_row, _, min_col, max_col = clear
+        for r in range(min_row, ws.max_row + 1):
+            for c in range(min_col, max_col + 1):
+                ws.cell(row=r, column=c, value=None)
+        for (r, c), value in updates.items():
+            ws.cell(row=r, column=c, value=value)
+
+WEEKLY_COLUMNS = ["Week Start","Tickets Opened","Tickets Resolved","NPS","CSAT","Notes"]
+
+class SchemaError(ValueError):
+    """A weekly CSV is missing required columns"""
+
+def _normalise_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Strip column names, check the schema and coerce column types"""
+    chunk = chunk.rename(columns={c: c.strip() for c in chunk.columns})
+    missing = [c for c in WEEKLY_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise SchemaError(f"Missing required columns: {missing}")
+    chunk["Week Start"] = pd.to_datetime(chunk["Week Start"], errors="coerce")
     for col in ["Tickets Opened","Tickets Resolved","NPS","CSAT"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+        chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+    return chunk
+
+class WeekIndex:
+    """Week-keyed upsert index with explicit last-writer-wins
+    
+    Rows are keyed by the Week Start ordinal (datetime64[ns] as int64), so
+    merging a batch is a dict upsert: O(rows) with no sort, and which row
+    wins depends only on the order batches are upserted in.
+    """
+    
+    NAT_KEY = np.iinfo(np.int64).min
+    
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self._rows = {}
+    
+    def __len__(self):
+        return len(self._rows)
+    
+    def upsert(self, frame: pd.DataFrame):
+        """Insert or replace rows; later rows of ``frame`` win within it too"""
+        # Hash-based keep-last reduces the batch to at most one row per week
+        latest = frame.drop_duplicates(subset=["Week Start"], keep="last")
+        keys = latest["Week Start"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        self._rows.update(zip(keys.tolist(), latest[self.columns].itertuples(index=False, name=None)))
+    
+    def merge(self, other: "WeekIndex"):
+        """Apply another index on top of this one (other wins on conflicts)"""
+        self._rows.update(other._rows)
+    
+    def to_frame(self) -> pd.DataFrame:
+        """One row per week, ordered by week with undated rows last"""
+        keys = sorted(self._rows, key=lambda k: (k == self.NAT_KEY, k))
+        df = pd.DataFrame([self._rows[k] for k in keys], columns=self.columns)
+        df["Week Start"] = pd.to_datetime(df["Week Start"])
+        return df
+
+def _ordered_csv_files(csv_folder: str) -> List[str]:
+    """CSV files in writer order for INGEST.DUPLICATE_POLICY (file_order or mtime)"""
+    files = sorted(glob.glob(os.path.join(csv_folder, "*.csv")))
+    policy = CONFIG.get("INGEST", {}).get("DUPLICATE_POLICY", "file_order")
+    if policy == "mtime":
+        files.sort(key=lambda f: (os.path.getmtime(f), f))
+    elif policy != "file_order":
+        raise ValueError(f"Unknown INGEST.DUPLICATE_POLICY: {policy}")
+    return files
+
+def read_all_weekly_csvs(csv_folder: str) -> pd.DataFrame:
+    """Stream weekly CSVs in chunks into one row per Week Start
+    
+    Files are read with ``chunksize`` rows at a time (INGEST.CHUNK_SIZE).
+    Each chunk is coerced and validated on its own and upserted into a
+    WeekIndex, so peak memory follows the chunk size and the number of
+    weeks, not the file size. Duplicate weeks resolve last-writer-wins:
+    later rows of a file beat earlier ones, and later files beat earlier
+    ones in file name order or, with INGEST.DUPLICATE_POLICY "mtime", in
+    modification time order. A file that fails half-way contributes nothing.
+    """
+    files = _ordered_csv_files(csv_folder)
+    if not files:
+        logger.warning(f"No CSV files found in {csv_folder}")
+        return pd.DataFrame(columns=WEEKLY_COLUMNS)
     
-    # Data quality validation
-    quality_issues = validate_data_quality(df)
+    return ingest_weekly_csvs(files).to_frame()
+
+def ingest_weekly_csvs(files: List[str], weeks: Optional[WeekIndex] = None) -> WeekIndex:
+    """Upsert ``files`` (in order) into ``weeks``; see read_all_weekly_csvs"""
+    chunk_size = CONFIG.get("INGEST", {}).get("CHUNK_SIZE", 100000)
+    processed_files = []
+    weeks = weeks if weeks is not None else WeekIndex(WEEKLY_COLUMNS)
+    weeks_before = len(weeks)
+    report = None
+    flagged = []
+    total_rows = 0
+    chunk_count = 0
+    
+    rules = build_validation_rules(CONFIG.get("DATA_VALIDATION", {}), WEEKLY_COLUMNS)
+    
+    with metrics.stage("parse_csv", files=len(files), chunk_size=chunk_size):
+        for f in files:
+            try:
+                file_weeks = WeekIndex(WEEKLY_COLUMNS)
+                file_reports = []
+                file_flagged = []
+                file_rows = 0
+                for chunk in pd.read_csv(f, chunksize=chunk_size):
+                    chunk = _normalise_chunk(chunk)
+                    chunk_report = evaluate_validation_rules(chunk, rules).flagged()
+                    file_reports.append(chunk_report)
+                    if len(chunk_report):
+                        file_flagged.append(pd.DataFrame({
+                            "File": os.path.basename(f),
+                            "Week Start": chunk.loc[chunk_report.index, "Week Start"].to_numpy()
+                        }))
+                    file_weeks.upsert(chunk)
+                    file_rows += len(chunk)
+                    chunk_count += 1
+                
+                if not file_rows:
+                    logger.warning(f"Empty file skipped: {f}", extra={"summary": "csv_empty"})
+                    continue
+            except SchemaError as e:
+                logger.error(f"{f}: {e}")
+                raise
+            except Exception as e:
+                error_msg = f"Failed to process {f}: {e}"
+                logger.error(error_msg)
+                send_email_notification("CSV Processing Error", error_msg, is_error=True)
+                continue
+            
+            # Apply the completed file on top of the earlier ones
+            weeks.merge(file_weeks)
+            for chunk_report in file_reports:
+                report = chunk_report if report is None else report.merge(chunk_report)
+            flagged.extend(file_flagged)
+            total_rows += file_rows
+            processed_files.append(f)
+            logger.info(f"Successfully processed: {f} ({file_rows} rows)", extra={"summary": "csv_processed"})
+        
+        if not processed_files:
+            raise ValueError("No valid CSV files could be processed")
+        
+        logger.info(f"Combined data from {len(processed_files)} files: {total_rows} rows in {chunk_count} chunks")
+    
+    # Data quality validation (evaluated per chunk above)
+    quality_issues = report.issues()
+    write_issue_report(report, pd.concat(flagged, ignore_index=True) if flagged else pd.DataFrame())
     if quality_issues:
         logger.warning(f"Data quality issues found: {'; '.join(quality_issues)}")
-        if CONFIG["EMAIL_NOTIFICATIONS"]["ENABLED"]:
-            send_email_notification("Data Quality Issues", 
-                                  "Issues found:\n" + "\n".join(quality_issues))
+        send_email_notification("Data Quality Issues", 
+                              "Issues found:\n" + "\n".join(quality_issues))
     
-    # Deduplicate by Week Start
-    initial_count = len(df)
-    df = df.sort_values("Week Start").drop_duplicates(subset=["Week Start"], keep="last")
-    final_count = len(df)
-    if initial_count != final_count:
-        logger.info(f"Removed {initial_count - final_count} duplicate entries")
+    # Deduplicated by Week Start while upserting
+    duplicates = total_rows - (len(weeks) - weeks_before)
+    if duplicates:
+        logger.info(f"Removed {duplicates} duplicate entries")
     
-    return df
+    return weeks
+
+def _weekly_row_values(row) -> List:
+    """Cell values for columns A:F of one weekly row"""
+    return [
+        row["Week Start"].date() if pd.notnull(row["Week Start"]) else None,
+        int(row["Tickets Opened"]) if pd.notnull(row["Tickets Opened"]) else None,
+        int(row["Tickets Resolved"]) if pd.notnull(row["Tickets Resolved"]) else None,
+        float(row["NPS"]) if pd.notnull(row["NPS"]) else None,
+        float(row["CSAT"]) if pd.notnull(row["CSAT"]) else None,
+        str(row["Notes"]) if pd.notnull(row["Notes"]) else None,
+    ]
 
-def write_to_excel(excel_path: str, sheet: str, df: pd.DataFrame, start_row: int = 4):
-    """Enhanced Excel writing with better error handling"""
+def _backup_workbook(excel_path: str):
+    """Snapshot the workbook into the deduplicating backup store before saving"""
+    with metrics.stage("backup"):
+        default_root = os.path.join(os.path.dirname(os.path.abspath(excel_path)), "backups")
+        store = BackupStore.from_config(CONFIG.get("BACKUP"), default_root)
+        snapshot = store.backup(excel_path)
+        logger.info(f"Backup created: {snapshot['id']} in {store.root}"
+                    f"{' (unchanged since last backup)' if snapshot['deduplicated'] else ''}")
+
+def _patch_weekly_sheet(excel_path: str, sheet: str, df: pd.DataFrame, start_row: int,
+                        extra_sheets: Optional[Dict[str, tuple]] = None) -> int:
+    """Write the weekly rows (and any extra sheets' cells) by patching only those sheets' XML parts"""
+    with metrics.stage("write_cells", rows=len(df), writer="patch"):
+        updates = {}
+        written_rows = 0
+        r = start_row
+        for _, row in df.sort_values("Week Start").iterrows():
+            try:
+                values = _weekly_row_values(row)
+            except Exception as e:
+                logger.error(f"Error writing row {r}: {e}")
+                continue
+            for col, value in enumerate(values, start=1):
+                updates[(r, col)] = value
+            written_rows += 1
+            r += 1
+    
+    if CONFIG.get("BACKUP_ON_SAVE", True):
+        _backup_workbook(excel_path)
+    
+    sheets = dict(extra_sheets or {})
+    sheets[sheet] = (updates, (start_row, None, 1, 6))
+    with metrics.stage("save", writer="patch", sheets=len(sheets)):
+        result = patch_workbook_cells(excel_path, sheets)
+    logger.info(f"Patched {', '.join(result['sheet_parts'].values())} in place "
+                f"(rewrote {', '.join(result['parts_rewritten'])})")
+    return written_rows
+
+def write_to_excel(excel_path: str, sheet: str, df: pd.DataFrame, start_row: int = 4,
+                   extra_sheets: Optional[Dict[str, tuple]] = None):
+    """Enhanced Excel writing with better error handling
+    
+    With EXCEL_WRITER "patch" (default) only the target sheet's XML part is
+    regenerated and every other part of the workbook (charts, pivots,
+    other sheets) is copied through; "openpyxl" loads and re-saves the
+    whole workbook, which is also the fallback when a patch isn't possible.
+    ``extra_sheets`` ({sheet: (updates, clear)}, e.g. the KPI dashboard)
+    are written in the same save.
+    """
     try:
         # Validate Excel file exists
         if not os.path.exists(excel_path):
@@ -248,9 +891,18 @@ def write_to_excel(excel_path: str, sheet: str, df: pd.DataFrame, start_row: int
             logger.error(error_msg)
             raise FileNotFoundError(error_msg)
         
+        if CONFIG.get("EXCEL_WRITER", "patch") == "patch":
+            try:
+                written_rows = _patch_weekly_sheet(excel_path, sheet, df, start_row, extra_sheets)
+                logger.info(f"Successfully wrote {written_rows} rows into {sheet} @ {excel_path}")
+                return written_rows
+            except (XlsxPatchUnsupported, zipfile.BadZipFile) as e:
+                logger.warning(f"In-place patch not possible ({e}); rewriting workbook with openpyxl")
+        
         # Load workbook with error handling
         try:
-            wb = load_workbook(excel_path)
+            with metrics.stage("load_workbook"):
+                wb = load_workbook(excel_path)
         except InvalidFileException as e:
             error_msg = f"Invalid Excel file: {e}"
             logger.error(error_msg)
@@ -264,42 +916,38 @@ def write_to_excel(excel_path: str, sheet: str, df: pd.DataFrame, start_row: int
         
         ws = wb[sheet]
         
-        # Clear old data region (columns A:F for safety)
-        max_row = ws.max_row
-        for r in range(start_row, max_row+1):
-            for c in range(1, 7):
-                ws.cell(row=r, column=c, value=None)
+        with metrics.stage("write_cells", rows=len(df), writer="openpyxl"):
         
-        # Write new rows with data validation
-        df = df.sort_values("Week Start")
-        r = start_row
-        written_rows = 0
+            # Clear old data region (columns A:F for safety)
+            max_row = ws.max_row
+            for r in range(start_row, max_row+1):
+                for c in range(1, 7):
+                    ws.cell(row=r, column=c, value=None)
         
-        for _, row in df.iterrows():
-            try:
-                ws.cell(row=r, column=1, value=row["Week Start"].date() if pd.notnull(row["Week Start"]) else None)
-                ws.cell(row=r, column=2, value=int(row["Tickets Opened"]) if pd.notnull(row["Tickets Opened"]) else None)
-                ws.cell(row=r, column=3, value=int(row["Tickets Resolved"]) if pd.notnull(row["Tickets Resolved"]) else None)
-                ws.cell(row=r, column=4, value=float(row["NPS"]) if pd.notnull(row["NPS"]) else None)
-                ws.cell(row=r, column=5, value=float(row["CSAT"]) if pd.notnull(row["CSAT"]) else None)
-                ws.cell(row=r, column=6, value=str(row["Notes"]) if pd.notnull(row["Notes"]) else None)
-                written_rows += 1
-                r += 1
-            except Exception as e:
-                logger.error(f"Error writing row {r}: {e}")
-                continue
+            # Write new rows with data validation
+            df = df.sort_values("Week Start")
+            r = start_row
+            written_rows = 0
+        
+            for _, row in df.iterrows():
+                try:
+                    for col, value in enumerate(_weekly_row_values(row), start=1):
+                        ws.cell(row=r, column=col, value=value)
+                    written_rows += 1
+                    r += 1
+                except Exception as e:
+                    logger.error(f"Error writing row {r}: {e}")
+                    continue
+            
+            _apply_openpyxl_sheets(wb, extra_sheets or {})
         
         # Create backup if enabled
-        if CONFIG["BACKUP_ON_SAVE"]:
-            root, ext = os.path.splitext(excel_path)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = f"{root}_backup_{timestamp}{ext}"
-            import shutil
-            shutil.copy2(excel_path, backup_path)
-            logger.info(f"Backup created: {backup_path}")
+        if CONFIG.get("BACKUP_ON_SAVE", True):
+            _backup_workbook(excel_path)
         
         # Save workbook
-        wb.save(excel_path)
+        with metrics.stage("save", writer="openpyxl"):
+            wb.save(excel_path)
         logger.info(f"Successfully wrote {written_rows} rows into {sheet} @ {excel_path}")
         
         return written_rows
@@ -310,6 +958,64 @@ def write_to_excel(excel_path: str, sheet: str, df: pd.DataFrame, start_row: int
         send_email_notification("Excel Write Error", error_msg, is_error=True)
         raise
 
+def build_sheet_pipeline() -> Optional[SheetFeedPipeline]:
+    """Weekly feed plus the SHEET_FEEDS entries, or None when none are configured"""
+    extra = [build_feed(settings) for settings in CONFIG.get("SHEET_FEEDS", [])]
+    if not extra:
+        return None
+    weekly = SheetFeed(CONFIG["WEEKLY_SHEET"], lambda: read_all_weekly_csvs(CONFIG["CSV_FOLDER"]),
+                       start_row=CONFIG["START_ROW"], columns=WEEKLY_COLUMNS,
+                       row_values=_weekly_row_values, sort_by="Week Start", required=True)
+    return SheetFeedPipeline([weekly] + extra, metrics, max_workers=CONFIG.get("FEED_WORKERS", 4),
+                             writer=CONFIG.get("EXCEL_WRITER", "patch"))
+
+def refresh_sheets(pipeline: SheetFeedPipeline, frames: Dict[str, pd.DataFrame],
+                   extra_sheets: Optional[Dict[str, tuple]] = None) -> Dict[str, int]:
+    """Write all loaded feeds (plus ``extra_sheets`` cells) with one workbook load and one save"""
+    excel_path = CONFIG["EXCEL_PATH"]
+    try:
+        if not os.path.exists(excel_path):
+            raise FileNotFoundError(f"Excel file not found: {excel_path}")
+        before_save = _backup_workbook if CONFIG.get("BACKUP_ON_SAVE", True) else None
+        written = pipeline.apply(excel_path, frames, before_save=before_save, extra_sheets=extra_sheets)
+        for sheet, rows in written.items():
+            logger.info(f"Successfully wrote {rows} rows into {sheet} @ {excel_path}")
+        return written
+    except Exception as e:
+        error_msg = f"Failed to write to Excel: {e}"
+        logger.error(error_msg)
+        send_email_notification("Excel Write Error", error_msg, is_error=True)
+        raise
+
+def publish_weekly_data(df: pd.DataFrame, pipeline: Optional[SheetFeedPipeline] = None,
+                        frames: Optional[Dict[str, pd.DataFrame]] = None) -> Dict:
+    """Analyse trends, refresh the KPI rollups and write the workbook (dashboard included) for ``df``"""
+    trends = {}
+    rolling_trends = {}
+    if not df.empty:
+        with metrics.stage("analyze_trends"):
+            trends = analyze_trends(df)
+            rolling_trends = update_trend_state(df)
+        if trends:
+            logger.info(f"Trend analysis: {trends}")
+        for name, entry in rolling_trends.items():
+            logger.info(f"Rolling trend {name}: {entry['trend']} "
+                        f"(last {entry['last']}, EWMA {entry['ewma']}, windows {entry['windows']})")
+    
+    # Materialised KPI rollups; the dashboard is written in the same save as the weekly rows
+    dashboard = kpi_dashboard_sheets(update_kpi_rollup(df), rolling_trends) if not df.empty else {}
+    
+    # Write to Excel
+    written = {}
+    if pipeline:
+        written = refresh_sheets(pipeline, frames, dashboard)
+        written_rows = written.get(CONFIG["WEEKLY_SHEET"], 0)
+    else:
+        written_rows = write_to_excel(CONFIG["EXCEL_PATH"], CONFIG["WEEKLY_SHEET"], df, CONFIG["START_ROW"],
+                                      dashboard)
+    
+    return {"trends": trends, "written_rows": written_rows, "written": written}
+
 # ------------------
 # Configuration Management
 # ------------------
@@ -338,27 +1044,35 @@ def main():
         # Ensure CSV folder exists
         os.makedirs(CONFIG["CSV_FOLDER"], exist_ok=True)
         
-        # Read and process CSV files
-        df = read_all_weekly_csvs(CONFIG["CSV_FOLDER"])
-        if df.empty:
+        # Read and process CSV files (and any extra sheet feeds, concurrently)
+        pipeline = build_sheet_pipeline()
+        if pipeline:
+            frames = pipeline.load_all()
+            df = frames.get(CONFIG["WEEKLY_SHEET"], pd.DataFrame(columns=WEEKLY_COLUMNS))
+            if df.empty:
+                # Keep the existing weekly rows rather than clearing the sheet
+                frames.pop(CONFIG["WEEKLY_SHEET"], None)
+        else:
+            df = read_all_weekly_csvs(CONFIG["CSV_FOLDER"])
+        if df.empty and not (pipeline and frames):
             logger.info("No CSVs found; nothing to update.")
             send_email_notification("Weekly Update - No Data", 
                                   "No CSV files found for processing this week.")
             return
         
-        # Perform trend analysis
-        trends = analyze_trends(df)
-        if trends:
-            logger.info(f"Trend analysis: {trends}")
-        
-        # Write to Excel
-        written_rows = write_to_excel(CONFIG["EXCEL_PATH"], CONFIG["WEEKLY_SHEET"], df, CONFIG["START_ROW"])
+        result = publish_weekly_data(df, pipeline, frames if pipeline else None)
+        trends = result["trends"]
+        written_rows = result["written_rows"]
         
         # Success notification
         duration = datetime.now() - start_time
         success_msg = f"Weekly update completed successfully!\n\n"
         success_msg += f"• Processed {len(df)} data rows\n"
         success_msg += f"• Written {written_rows} rows to Excel\n"
+        if pipeline:
+            for sheet, rows in result["written"].items():
+                if sheet != CONFIG["WEEKLY_SHEET"]:
+                    success_msg += f"• Refreshed {sheet}: {rows} rows\n"
         success_msg += f"• Duration: {duration.total_seconds():.2f} seconds\n"
         
         if trends and 'error' not in trends:
@@ -366,14 +1080,95 @@ def main():
         
         logger.info(success_msg.replace('\n', ' '))
         
-        if CONFIG["EMAIL_NOTIFICATIONS"]["ENABLED"]:
-            send_email_notification("Weekly Update Success", success_msg)
+        send_email_notification("Weekly Update Success", success_msg)
         
     except Exception as e:
         error_msg = f"Weekly update failed: {e}"
         logger.error(error_msg)
         send_email_notification("Weekly Update Failed", error_msg, is_error=True)
         raise
+    finally:
+        notifier.flush()
+        metrics.flush()
+        log_setup.flush_summaries()
+
+def watch(stop: Optional[threading.Event] = None, max_batches: Optional[int] = None, profile: bool = False) -> int:
+    """Daemon mode: refresh the workbook as CSVs arrive in CSV_FOLDER
+    
+    The folder is ingested once at start-up. After that each debounced
+    burst of new or rewritten files is upserted into the in-memory week
+    index (later arrivals win) and published with one workbook write.
+    With ``profile`` each batch is profiled on its own (idle waiting is
+    not). Returns the number of batches processed.
+    """
+    settings = CONFIG.get("WATCH", {})
+    folder = CONFIG["CSV_FOLDER"]
+    create_default_config()
+    os.makedirs(folder, exist_ok=True)
+    
+    # Start watching before the initial scan so nothing dropped meanwhile is missed
+    with create_watcher(folder, settings.get("BACKEND", "auto"), settings.get("POLL_INTERVAL", 5.0)) as watcher:
+        files = _ordered_csv_files(folder)
+        seen = {f: file_signature(f) for f in files}
+        weeks = WeekIndex(WEEKLY_COLUMNS)
+        if files:
+            _publish_arrivals(files, weeks, profile)
+        logger.info(f"Watching {folder} for new CSV files ({watcher.backend})")
+        
+        batches = 0
+        for paths in debounced_batches(watcher, settings.get("DEBOUNCE_SECONDS", 2.0),
+                                       settings.get("MAX_BATCH_SECONDS", 30.0), stop):
+            arrived = [f for f in paths if file_signature(f) is not None and file_signature(f) != seen.get(f)]
+            if not arrived:
+                continue
+            arrived.sort(key=lambda f: (os.path.getmtime(f), f))
+            seen.update((f, file_signature(f)) for f in arrived)
+            _publish_arrivals(arrived, weeks, profile)
+            batches += 1
+            if max_batches and batches >= max_batches:
+                break
+    return batches
+
+def _publish_arrivals(files: List[str], weeks: WeekIndex, profile: bool = False):
+    """Ingest one batch of files into ``weeks`` and publish the result"""
+    start_time = datetime.now()
+    try:
+        with profile_run("update_weekly_watch", os.path.dirname(os.path.abspath(CONFIG["LOG_FILE"])),
+                         enabled=profile, settings=CONFIG.get("PROFILE", {})):
+            ingest_weekly_csvs(files, weeks)
+            result = publish_weekly_data(weeks.to_frame())
+        logger.info(f"Processed {len(files)} new CSV files: wrote {result['written_rows']} rows "
+                    f"in {(datetime.now() - start_time).total_seconds():.2f} seconds")
+    except Exception as e:
+        error_msg = f"Weekly update failed for {', '.join(os.path.basename(f) for f in files)}: {e}"
+        logger.error(error_msg)
+        send_email_notification("Weekly Update Failed", error_msg, is_error=True)
+    finally:
+        notifier.flush()
+        metrics.flush()
+        log_setup.flush_summaries()
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Refresh the Weekly_Updates sheet from weekly CSVs')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile this run (same as PROFILE.ENABLED in config.json)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and process CSVs as they arrive in CSV_FOLDER')
+    args = parser.parse_args()
+    
+    profile_settings = CONFIG.get("PROFILE", {})
+    profile = args.profile or profile_settings.get("ENABLED", False)
+    if args.watch:
+        try:
+            watch(profile=profile)
+        except KeyboardInterrupt:
+            logger.info("Watch mode stopped")
+        raise SystemExit(0)
+    
+    with profile_run("update_weekly",
+                     os.path.dirname(os.path.abspath(CONFIG["LOG_FILE"])),
+                     enabled=profile,
+                     settings=profile_settings):
+        main()
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+xlsx_patch.py
+Patch cells of one worksheet in an .xlsx package without re-serialising
+the whole workbook.
+
+openpyxl's load_workbook()/save() rewrites every part of the package and
+drops what it does not model (charts, pivot caches, slicers, ...). The
+patcher edits the zip directly instead:
+- only the target xl/worksheets/sheetN.xml part is regenerated
+- xl/styles.xml gains a date cell format only when a date is written into
+  a cell whose style has no date number format
+- xl/workbook.xml is touched only to request a full recalculation on open
+  when the workbook has formulas and does not already ask for it
+- xl/calcChain.xml is dropped only when a formula cell was overwritten
+- every other part is copied through unchanged, streamed part by part
+
+Strings are written as inline strings, so xl/sharedStrings.xml is never
+rewritten. Shared-formula masters and array formulas inside the patched
+cells are not supported and raise XlsxPatchUnsupported, as does a missing
+lxml; callers then fall back to openpyxl.
+
+Usage:
+    patch_sheet_cells('plan.xlsx', 'Weekly_Updates',
+                      {(4, 1): date(2024, 1, 1), (4, 2): 12},
+                      clear=(4, None, 1, 6))
+"""
+
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime, time
+from numbers import Number
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+NS_CT = 'http://schemas.openxmlformats.org/package/2006/content-types'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+CALC_CHAIN = 'xl/calcChain.xml'
+
+# Built-in number formats that display dates/times
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+
+_CELL_REF = re.compile(r'^([A-Z]+)(\d+)$')
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class XlsxPatchUnsupported(Exception):
+    """The requested patch cannot be applied safely in place"""
+
+
+def _q(tag, ns=NS_MAIN):
+    return f'{{{ns}}}{tag}'
+
+
+def column_letter(col):
+    """1 -> A, 27 -> AA"""
+    letters = ''
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def split_ref(ref):
+    """'AB12' -> (12, 28)"""
+    match = _CELL_REF.match(ref)
+    if not match:
+        raise XlsxPatchUnsupported(f"Unsupported cell reference: {ref}")
+    col = 0
+    for char in match.group(1):
+        col = col * 26 + ord(char) - 64
+    return int(match.group(2)), col
+
+
+def _parse(data):
+    parser = etree.XMLParser(huge_tree=True, remove_blank_text=False)
+    return etree.fromstring(data, parser)
+
+
+def _serialise(root):
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def _is_missing(value):
+    if value is None:
+        return True
+    try:
+        return bool(value != value)  # NaN / NaT
+    except (TypeError, ValueError):
+        return False
+
+
+class _Package:
+    """Read side of the package: sheet lookup and the small shared parts"""
+
+    def __init__(self, zin):
+        self.zin = zin
+        self.names = set(zin.namelist())
+        self.workbook = _parse(zin.read('xl/workbook.xml'))
+
+    def sheet_part(self, sheet_name=None):
+        """Zip member name of a sheet (the active sheet when sheet_name is None)"""
+        sheets = self.workbook.findall(f"{_q('sheets')}/{_q('sheet')}")
+        if sheet_name is None:
+            view = self.workbook.find(f"{_q('bookViews')}/{_q('workbookView')}")
+            index = int(view.get('activeTab', 0)) if view is not None else 0
+            sheet = sheets[min(index, len(sheets) - 1)]
+        else:
+            sheet = next((s for s in sheets if s.get('name') == sheet_name), None)
+            if sheet is None:
+                raise ValueError(f"Sheet '{sheet_name}' not found in Excel file")
+
+        rel_id = sheet.get(_q('id', NS_REL))
+        rels = _parse(self.zin.read('xl/_rels/workbook.xml.rels'))
+        for rel in rels.findall(_q('Relationship', NS_PKG_REL)):
+            if rel.get('Id') == rel_id:
+                target = rel.get('Target')
+                if target.startswith('/'):
+                    return target.lstrip('/')
+                return posixpath.normpath(posixpath.join('xl', target))
+        raise XlsxPatchUnsupported(f"No relationship {rel_id} for sheet '{sheet.get('name')}'")
+
+    def date1904(self):
+        pr = self.workbook.find(_q('workbookPr'))
+        return pr is not None and pr.get('date1904') in ('1', 'true')
+
+
+class _Styles:
+    """Date cell formats in xl/styles.xml, added on demand"""
+
+    def __init__(self, data):
+        self.root = _parse(data)
+        self.cell_xfs = self.root.find(_q('cellXfs'))
+        self.xfs = self.cell_xfs.findall(_q('xf')) if self.cell_xfs is not None else []
+        custom = self.root.find(_q('numFmts'))
+        self.date_formats = set(BUILTIN_DATE_FORMATS)
+        if custom is not None:
+            for fmt in custom.findall(_q('numFmt')):
+                # Ignore quoted literals and [colour]/[$-locale] sections
+                code = re.sub(r'"[^"]*"|\[[^\]]*\]', '', fmt.get('formatCode', '')).lower()
+                if re.search('[dy]', code) or ('m' in code and not re.search('[hs]', code)):
+                    self.date_formats.add(int(fmt.get('numFmtId')))
+        self._date_variant = {}
+        self.changed = False
+
+    def is_date_style(self, index):
+        if index >= len(self.xfs):
+            return False
+        return int(self.xfs[index].get('numFmtId', 0)) in self.date_formats
+
+    def date_style_for(self, index):
+        """Style index showing a date that otherwise looks like ``index``"""
+        if self.cell_xfs is None:
+            raise XlsxPatchUnsupported("styles.xml has no cellXfs")
+        if self.is_date_style(index):
+            return index
+        if index not in self._date_variant:
+            base = self.xfs[index] if index < len(self.xfs) else None
+            xf = etree.fromstring(etree.tostring(base)) if base is not None else \
+                etree.Element(_q('xf'), fontId='0', fillId='0', borderId='0', xfId='0')
+            xf.set('numFmtId', '14')
+            xf.set('applyNumberFormat', '1')
+            self.cell_xfs.append(xf)
+            self.xfs.append(xf)
+            self.cell_xfs.set('count', str(len(self.xfs)))
+            self._date_variant[index] = len(self.xfs) - 1
+            self.changed = True
+        return self._date_variant[index]
+
+
+class _SheetPatcher:
+    """Applies cell updates to one parsed worksheet"""
+
+    def __init__(self, root, styles_loader, date1904):
+        self.root = root
+        self.sheet_data = root.find(_q('sheetData'))
+        if self.sheet_data is None:
+            raise XlsxPatchUnsupported("Worksheet has no sheetData")
+        self._styles_loader = styles_loader
+        self.styles = None
+        self.epoch = datetime(1904, 1, 1) if date1904 else datetime(1899, 12, 30)
+        self.formulas_removed = False
+        self.cells_written = 0
+
+        self.rows = {}
+        for row in self.sheet_data.findall(_q('row')):
+            if row.get('r') is None:
+                raise XlsxPatchUnsupported("Rows without an r attribute are not supported")
+            self.rows[int(row.get('r'))] = row
+        self._touched_rows = set()
+
+    def _row(self, number, create):
+        row = self.rows.get(number)
+        if row is None and create:
+            row = etree.SubElement(self.sheet_data, _q('row'), r=str(number))
+            self.rows[number] = row
+        return row
+
+    @staticmethod
+    def _cells(row):
+        cells = {}
+        for cell in row.findall(_q('c')):
+            if cell.get('r') is None:
+                raise XlsxPatchUnsupported("Cells without an r attribute are not supported")
+            cells[split_ref(cell.get('r'))[1]] = cell
+        return cells
+
+    def apply(self, updates, clear=None):
+        by_row = {}
+        for (row, col), value in updates.items():
+            by_row.setdefault(row, {})[col] = value
+
+        if clear:
+            min_row, max_row, min_col, max_col = clear
+            for number, row in list(self.rows.items()):
+                if number < min_row or (max_row is not None and number > max_row):
+                    continue
+                for col in self._cells(row):
+                    if min_col <= col <= max_col:
+                        by_row.setdefault(number, {}).setdefault(col, None)
+
+        for number, values in by_row.items():
+            row = self._row(number, create=any(not _is_missing(v) for v in values.values()))
+            if row is None:
+                continue
+            cells = self._cells(row)
+            for col, value in values.items():
+                cell = cells.get(col)
+                if cell is None:
+                    if _is_missing(value):
+                        continue
+                    cell = etree.SubElement(row, _q('c'), r=f"{column_letter(col)}{number}")
+                self._set_value(cell, value)
+                if len(cell) == 0 and cell.get('s') is None:
+                    row.remove(cell)
+            self._touched_rows.add(number)
+
+        self._normalise()
+
+    def _set_value(self, cell, value):
+        formula = cell.find(_q('f'))
+        if formula is not None:
+            if formula.get('t') == 'array' or (formula.get('t') == 'shared' and formula.get('ref')):
+                raise XlsxPatchUnsupported(f"Cell {cell.get('r')} holds an array or shared formula")
+            self.formulas_removed = True
+        for child in list(cell):
+            cell.remove(child)
+        cell.attrib.pop('t', None)
+        self.cells_written += 1
+
+        if _is_missing(value):
+            return
+        if isinstance(value, bool):
+            cell.set('t', 'b')
+            etree.SubElement(cell, _q('v')).text = '1' if value else '0'
+        elif isinstance(value, (datetime, date)):
+            if not isinstance(value, datetime):
+                value = datetime.combine(value, time())
+            delta = value.replace(tzinfo=None) - self.epoch
+            serial = delta.days + delta.seconds / 86400 + delta.microseconds / 86400e6
+            if self.styles is None:
+                self.styles = self._styles_loader()
+            style = self.styles.date_style_for(int(cell.get('s', 0)))
+            if style:
+                cell.set('s', str(style))
+            etree.SubElement(cell, _q('v')).text = repr(int(serial)) if serial == int(serial) else repr(serial)
+        elif isinstance(value, Number):
+            number = float(value)
+            text = repr(int(number)) if number.is_integer() and abs(number) < 1e15 else repr(number)
+            etree.SubElement(cell, _q('v')).text = text
+        else:
+            cell.set('t', 'inlineStr')
+            inline = etree.SubElement(cell, _q('is'))
+            text = etree.SubElement(inline, _q('t'))
+            text.text = _ILLEGAL_XML_CHARS.sub('', str(value))
+            if text.text != text.text.strip():
+                text.set(XML_SPACE, 'preserve')
+
+    def _normalise(self):
+        """Restore row/cell ordering, drop emptied rows and fix the dimension"""
+        for number in self._touched_rows:
+            row = self.rows[number]
+            row.attrib.pop('spans', None)
+            cells = sorted(row.findall(_q('c')), key=lambda c: split_ref(c.get('r'))[1])
+            for cell in cells:
+                row.append(cell)
+            if len(row) == 0 and set(row.attrib) == {'r'}:
+                self.sheet_data.remove(row)
+                del self.rows[number]
+
+        for number in sorted(self.rows):
+            self.sheet_data.append(self.rows[number])
+
+        refs = [split_ref(c.get('r')) for row in self.rows.values() for c in row.findall(_q('c'))]
+        dimension = self.root.find(_q('dimension'))
+        if dimension is not None:
+            if refs:
+                top = min(r for r, _ in refs)
+                bottom = max(r for r, _ in refs)
+                left = min(c for _, c in refs)
+                right = max(c for _, c in refs)
+                dimension.set('ref', f"{column_letter(left)}{top}:{column_letter(right)}{bottom}")
+            else:
+                dimension.set('ref', 'A1')
+
+    def has_formulas(self):
+        return self.sheet_data.find(f".//{_q('f')}") is not None
+
+
+def _without_calc_chain(data, kind):
+    root = _parse(data)
+    if kind == 'rels':
+        for rel in root.findall(_q('Relationship', NS_PKG_REL)):
+            if rel.get('Target', '').endswith('calcChain.xml'):
+                root.remove(rel)
+    else:
+        for override in root.findall(_q('Override', NS_CT)):
+            if override.get('PartName') == '/' + CALC_CHAIN:
+                root.remove(override)
+    return _serialise(root)
+
+
+def _with_full_calc(workbook):
+    """workbook.xml bytes with fullCalcOnLoad set, or None if already set"""
+    calc = workbook.find(_q('calcPr'))
+    if calc is not None and calc.get('fullCalcOnLoad') in ('1', 'true'):
+        return None
+    if calc is None:
+        calc = etree.SubElement(workbook, _q('calcPr'))
+        # calcPr must come before these optional elements
+        for tag in ('oleSize', 'customWorkbookViews', 'pivotCaches', 'smartTagPr', 'smartTagTypes',
+                    'webPublishing', 'fileRecoveryPr', 'webPublishObjects', 'extLst'):
+            following = workbook.find(_q(tag))
+            if following is not None:
+                following.addprevious(calc)
+                break
+    calc.set('fullCalcOnLoad', '1')
+    return _serialise(workbook)
+
+
+def sheet_names(path):
+    """Sheet names in workbook order, read from xl/workbook.xml only"""
+    if etree is None:
+        raise XlsxPatchUnsupported("lxml is not installed")
+    with zipfile.ZipFile(path) as zin:
+        workbook = _parse(zin.read('xl/workbook.xml'))
+    return [sheet.get('name') for sheet in workbook.findall(f"{_q('sheets')}/{_q('sheet')}")]
+
+
+def patch_sheet_cells(path, sheet_name, updates, clear=None, output_path=None):
+    """Write ``updates`` ({(row, col): value}, 1-based) into one sheet
+
+    ``clear`` = (min_row, max_row or None, min_col, max_col) blanks existing
+    cells in that region first (styles are kept). The result is written to
+    ``output_path`` (default: ``path``) through a temporary file and an
+    atomic rename. Returns a dict with the sheet part, the rewritten parts
+    and the number of cells written.
+    """
+    result = patch_workbook_cells(path, {sheet_name: (updates, clear)}, output_path)
+    result['sheet_part'] = result['sheet_parts'][sheet_name]
+    return result
+
+
+def patch_workbook_cells(path, sheets, output_path=None):
+    """Patch several sheets in one read and one write of the package
+
+    ``sheets`` maps sheet name (None = active sheet) to ``(updates, clear)``
+    as in patch_sheet_cells.
+    """
+    if etree is None:
+        raise XlsxPatchUnsupported("lxml is not installed")
+
+    output_path = output_path or path
+    with zipfile.ZipFile(path) as zin:
+        package = _Package(zin)
+        styles = []
+
+        def load_styles():
+            if not styles:
+                styles.append(_Styles(zin.read('xl/styles.xml')))
+            return styles[0]
+
+        replaced = {}
+        sheet_parts = {}
+        patchers = []
+        for sheet_name, (updates, clear) in sheets.items():
+            sheet_part = package.sheet_part(sheet_name)
+            patcher = _SheetPatcher(_parse(zin.read(sheet_part)), load_styles, package.date1904())
+            patcher.apply(updates, clear)
+            replaced[sheet_part] = _serialise(patcher.root)
+            sheet_parts[sheet_name] = sheet_part
+            patchers.append(patcher)
+
+        if styles and styles[0].changed:
+            replaced['xl/styles.xml'] = _serialise(styles[0].root)
+
+        dropped = set()
+        if any(p.formulas_removed for p in patchers) and CALC_CHAIN in package.names:
+            dropped.add(CALC_CHAIN)
+            replaced['xl/_rels/workbook.xml.rels'] = _without_calc_chain(
+                zin.read('xl/_rels/workbook.xml.rels'), 'rels')
+            replaced['[Content_Types].xml'] = _without_calc_chain(zin.read('[Content_Types].xml'), 'types')
+        if CALC_CHAIN in package.names or any(p.has_formulas() for p in patchers):
+            workbook = _with_full_calc(package.workbook)
+            if workbook is not None:
+                replaced['xl/workbook.xml'] = workbook
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix='.xlsx.tmp', dir=directory)
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+                for info in zin.infolist():
+                    if info.filename in dropped:
+                        continue
+                    target = zipfile.ZipInfo(info.filename, info.date_time)
+                    target.compress_type = info.compress_type
+                    target.external_attr = info.external_attr
+                    if info.filename in replaced:
+                        zout.writestr(target, replaced[info.filename])
+                    else:
+                        with zin.open(info) as src, zout.open(target, 'w') as dst:
+                            shutil.copyfileobj(src, dst, 1024 * 1024)
+            if os.path.exists(output_path):
+                shutil.copymode(output_path, tmp_path)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    return {
+        'sheet_parts': sheet_parts,
+        'parts_rewritten': sorted(replaced),
+        'parts_dropped': sorted(dropped),
+        'cells_written': sum(p.cells_written for p in patchers),
+    }
@@ -3,12 +3,14 @@ Gantt Chart Calculator
 Handles timeline calculations, dependency resolution, and critical path analysis
 """
 
+import numpy as np
 import pandas as pd
 import openpyxl
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 import json
 import os
+import sys
 import argparse
 from collections import defaultdict
 
@@ -21,26 +23,29 @@ def load_config():
 
 CONFIG = load_config()
 
+# Shared helpers live in the automation folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'automation'))
+import log_setup
+from instrumentation import PipelineMetrics
+from profiling import profile_run
+from xlsx_patch import XlsxPatchUnsupported, patch_sheet_cells
+from plan_graph import PlanIndex, Scenario, WorkCalendar, calendars_from_rows, compare_scenarios, task_key
+from wbs_hierarchy import SummaryRollup, WbsHierarchy
+
 # Logging setup
 def setup_logging():
-    """Set up logging configuration"""
-    log_level = getattr(logging, CONFIG['logging']['level'])
-    log_file = CONFIG['logging']['file']
-    
-    # Create logs directory if it doesn't exist
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
-    handlers = [logging.FileHandler(log_file)]
-    if CONFIG['logging']['console']:
-        handlers.append(logging.StreamHandler())
-    
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=handlers
+    """Set up queued logging (file/console writes on a background thread)"""
+    settings = CONFIG['logging']
+    log_setup.setup_logging(
+        settings['level'],
+        settings['file'],
+        console=settings['console'],
+        fmt=settings.get('format', 'text'),
+        summary_after=settings.get('summary_after', 20)
     )
 
 setup_logging()
+metrics = PipelineMetrics.from_config('gantt_calculator', CONFIG.get('instrumentation'))
 
 class GanttCalculator:
     """Calculates timelines, dependencies, and critical path for Gantt charts"""
@@ -50,7 +55,16 @@ class GanttCalculator:
         self.sheet_name = sheet_name
         self.tasks = {}
         self.task_order = []
+        self.headers = {}
         self.working_days = self._get_working_days()
+        self.holidays = set()
+        self.calendar = None
+        self.calendars = {}
+        self.resources = {}
+        self.hierarchy = None
+        self.summary_ids = set()
+        self._plan_index = None
+        self._schedule = None
         
     def _get_working_days(self):
         """Get list of working days from config"""
@@ -69,7 +83,8 @@ class GanttCalculator:
         try:
             logging.info(f"Loading tasks from: {self.excel_file_path}")
             
-            wb = openpyxl.load_workbook(self.excel_file_path)
+            with metrics.stage('load_workbook'):
+                wb = openpyxl.load_workbook(self.excel_file_path)
             if self.sheet_name not in wb.sheetnames:
                 logging.error(f"Sheet '{self.sheet_name}' not found")
                 return False
@@ -78,228 +93,234 @@ class GanttCalculator:
             
             # Read headers
             headers = [cell.value for cell in ws[1]]
+            self.headers = {name: col for col, name in enumerate(headers, start=1) if name is not None}
             
             # Read tasks
             for row in ws.iter_rows(min_row=2, values_only=True):
-                if row[0]:  # Check Task ID
+                if row[0] not in (None, ''):  # Check Task ID (the project summary task is ID 0)
                     task_data = dict(zip(headers, row))
                     task_id = task_data.get('Task ID')
                     self.tasks[task_id] = task_data
                     self.task_order.append(task_id)
             
             logging.info(f"Loaded {len(self.tasks)} tasks")
+            
+            if 'Calendars' in wb.sheetnames:
+                self._load_calendars(wb)
+            if 'Resources' in wb.sheetnames:
+                self.resources = {row['Resource Name']: row for row in self._sheet_rows(wb['Resources'])
+                                  if row.get('Resource Name')}
+            if 'WBS' in wb.sheetnames:
+                self._load_outline(wb)
             return True
             
         except Exception as e:
             logging.error(f"Error loading tasks: {e}")
             return False
     
+    @staticmethod
+    def _sheet_rows(worksheet):
+        """Rows of a header + table sheet as dicts"""
+        rows = worksheet.iter_rows(values_only=True)
+        headers = next(rows, ())
+        return [dict(zip(headers, row)) for row in rows if any(value is not None for value in row)]
+    
+    def _load_calendars(self, wb):
+        """Use the working calendars imported from MS Project instead of config working_days"""
+        rows = self._sheet_rows(wb['Calendars'])
+        self.calendars = calendars_from_rows(rows)
+        project_uid = next((task_key(row.get('Calendar UID')) for row in rows
+                            if str(row.get('Project Calendar')).strip().lower() == 'yes'), None)
+        if project_uid in self.calendars:
+            self.calendar = self.calendars[project_uid]
+            self.working_days = [day for day in range(7) if self.calendar.weekmask[day]]
+            self.holidays = set(self.calendar.holidays.tolist())
+            logging.info(f"Using project calendar {project_uid} ({len(self.holidays)} non-working dates)")
+    
+    def _load_outline(self, wb):
+        """Outline tree from the WBS sheet; summary tasks are rolled up from their leaves, not scheduled"""
+        levels = {task_key(row.get('Task ID')): row.get('Outline Level') for row in self._sheet_rows(wb['WBS'])}
+        self.hierarchy = WbsHierarchy([levels.get(task_key(task_id)) for task_id in self.task_order])
+        self.summary_ids = {self.task_order[position] for position in self.hierarchy.summaries}
+        logging.info(f"Outline has {len(self.summary_ids)} summary tasks")
+    
+    def _schedule_order(self):
+        """Task IDs to schedule, in sheet order (summary tasks excluded)"""
+        if not self.summary_ids:
+            return self.task_order
+        return [task_id for task_id in self.task_order if task_id not in self.summary_ids]
+    
+    def _summary_members(self):
+        """{summary task ID: IDs of its leaf tasks}; links to a summary apply to its leaves"""
+        members = defaultdict(list)
+        if self.hierarchy is not None:
+            for position in self.hierarchy.leaves:
+                for ancestor in self.hierarchy.ancestors(position):
+                    members[task_key(self.task_order[ancestor])].append(self.task_order[position])
+        return dict(members)
+    
+    def _summary_rollup(self, calculated):
+        """Summary values over the calculated leaf dates and the sheet's durations and progress"""
+        tasks = [dict(self.tasks[task_id], **calculated.get(task_id, {})) for task_id in self.task_order]
+        
+        def dates(column):
+            return [task.get(column) if isinstance(task.get(column), datetime) else None for task in tasks]
+        
+        return SummaryRollup(
+            self.hierarchy,
+            dates('Start Date'),
+            dates('Finish Date'),
+            [task.get('Duration (Days)') for task in tasks],
+            [task.get('Progress (%)') for task in tasks]
+        )
+    
+    def resource_calendar(self, resource_name):
+        """Imported working calendar of a resource (the project calendar if it has none)"""
+        row = self.resources.get(resource_name, {})
+        return self.calendars.get(task_key(row.get('Calendar UID')), self.calendar)
+    
     def calculate_dates(self):
         """Calculate start and finish dates based on dependencies"""
         logging.info("Calculating task dates...")
         
+        with metrics.stage('calculate_dates', tasks=len(self.task_order)):
+            return self._calculate_dates()
+    
+    def _calculate_dates(self):
+        """Dependency-driven start/finish dates for every task, from the plan index schedule
+
+        Link types and lags are applied in working days, exactly as for
+        what-if scenarios, so the Base scenario is the plan written here.
+        """
+        index = self.plan_index()
+        start, finish, _ = self.schedule()
+        starts = index.calendar.to_date(start).tolist()
+        finishes = index.calendar.to_date(finish).tolist()
         calculated = {}
-        
-        for task_id in self.task_order:
-            task = self.tasks[task_id]
-            
-            # If start date is already set and no dependencies, use it
-            start_date = task.get('Start Date')
-            duration = task.get('Duration (Days)', 0)
-            dependencies = task.get('Dependencies', '')
-            
-            # Calculate start date based on dependencies
-            if dependencies:
-                dep_finish_date = self._get_latest_dependency_finish(dependencies, calculated)
-                if dep_finish_date:
-                    start_date = self._add_working_days(dep_finish_date, 1)
-            
-            # If no start date, use today
-            if not start_date or not isinstance(start_date, datetime):
-                start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            # Calculate finish date
-            if duration:
-                finish_date = self._add_working_days(start_date, int(float(duration)))
-            else:
-                finish_date = start_date
-            
+        for task_id, start_day, finish_day in zip(index.ids, starts, finishes):
             calculated[task_id] = {
-                'Start Date': start_date,
-                'Finish Date': finish_date,
-                'Duration (Days)': duration
+                'Start Date': datetime.combine(start_day, datetime.min.time()),
+                'Finish Date': datetime.combine(finish_day, datetime.min.time()),
+                'Duration (Days)': self.tasks[task_id].get('Duration (Days)', 0)
             }
         
-        return calculated
-    
-    def _get_latest_dependency_finish(self, dependencies, calculated):
-        """Get the latest finish date from dependencies"""
-        dep_finish_dates = []
-        
-        # Parse dependencies (e.g., "2FS", "3SS+2", "4,5")
-        dep_ids = []
-        for dep in str(dependencies).split(','):
-            dep = dep.strip()
-            if dep:
-                # Extract numeric ID
-                dep_id = ''.join(filter(str.isdigit, dep))
-                if dep_id:
-                    dep_ids.append(int(dep_id) if dep_id.isdigit() else dep_id)
+        if self.summary_ids:
+            rollup = self._summary_rollup(calculated)
+            for position in self.hierarchy.summaries:
+                values = rollup.values(position)
+                calculated[self.task_order[position]] = {
+                    'Start Date': values['Start Date'],
+                    'Finish Date': values['Finish Date'],
+                    'Progress (%)': values['Progress (%)']
+                }
         
-        # Get finish dates
-        for dep_id in dep_ids:
-            if dep_id in calculated:
-                dep_finish_dates.append(calculated[dep_id]['Finish Date'])
-        
-        return max(dep_finish_dates) if dep_finish_dates else None
+        return calculated
     
-    def _add_working_days(self, start_date, days):
-        """Add working days to a date (skipping weekends)"""
-        current_date = start_date
-        days_added = 0
-        
-        while days_added < days:
-            current_date += timedelta(days=1)
-            if current_date.weekday() in self.working_days:
-                days_added += 1
-        
-        return current_date
+    def schedule(self):
+        """(early start, early finish, total float) working-day ordinals of the scheduled tasks, computed once"""
+        if self._schedule is None:
+            index = self.plan_index()
+            with metrics.stage('schedule', tasks=len(index.ids)):
+                self._schedule = index.schedule()
+        return self._schedule
     
     def calculate_critical_path(self):
-        """Calculate the critical path through the project"""
+        """Calculate the critical path through the project (tasks without total float)"""
         logging.info("Calculating critical path...")
         
-        # Calculate earliest start/finish times (forward pass)
-        earliest_times = self._forward_pass()
-        
-        # Calculate latest start/finish times (backward pass)
-        latest_times = self._backward_pass(earliest_times)
-        
-        # Identify critical tasks (where slack = 0)
-        critical_tasks = []
-        for task_id in self.task_order:
-            earliest_finish = earliest_times[task_id]['finish']
-            latest_finish = latest_times[task_id]['finish']
-            slack = (latest_finish - earliest_finish).days
-            
-            if slack == 0:
-                critical_tasks.append(task_id)
+        _, _, total_float = self.schedule()
+        ids = self.plan_index().ids
+        critical_tasks = [ids[position] for position in np.flatnonzero(total_float <= 0)]
         
         logging.info(f"Critical path contains {len(critical_tasks)} tasks")
         return critical_tasks
     
-    def _forward_pass(self):
-        """Forward pass: calculate earliest start and finish times"""
-        earliest = {}
-        
-        for task_id in self.task_order:
-            task = self.tasks[task_id]
-            start_date = task.get('Start Date', datetime.now())
-            duration = task.get('Duration (Days)', 0)
-            dependencies = task.get('Dependencies', '')
-            
-            # Calculate earliest start based on dependencies
-            if dependencies:
-                dep_finish_dates = []
-                for dep in str(dependencies).split(','):
-                    dep_id = ''.join(filter(str.isdigit, dep.strip()))
-                    if dep_id and int(dep_id) in earliest:
-                        dep_finish_dates.append(earliest[int(dep_id)]['finish'])
-                
-                if dep_finish_dates:
-                    earliest_start = max(dep_finish_dates) + timedelta(days=1)
-                else:
-                    earliest_start = start_date
-            else:
-                earliest_start = start_date
-            
-            earliest_finish = self._add_working_days(earliest_start, int(float(duration)) if duration else 0)
-            
-            earliest[task_id] = {
-                'start': earliest_start,
-                'finish': earliest_finish
-            }
-        
-        return earliest
+    def plan_index(self, as_of=None):
+        """Dependency graph and calendar arrays of the loaded plan, built once and shared by scenarios"""
+        if self._plan_index is None:
+            with metrics.stage('plan_index', tasks=len(self.task_order)):
+                calendar = self.calendar or WorkCalendar.from_config(CONFIG['working_days'])
+                self._plan_index = PlanIndex({tid: self.tasks[tid] for tid in self._schedule_order()}, calendar, as_of,
+                                             groups=self._summary_members())
+            if self._plan_index.unknown_links:
+                logging.warning(f"Ignored {self._plan_index.unknown_links} links to unknown or same tasks")
+        return self._plan_index
     
-    def _backward_pass(self, earliest_times):
-        """Backward pass: calculate latest start and finish times"""
-        latest = {}
-        
-        # Start from the last task
-        last_task_id = self.task_order[-1]
-        latest[last_task_id] = {
-            'finish': earliest_times[last_task_id]['finish'],
-            'start': earliest_times[last_task_id]['start']
-        }
-        
-        # Work backwards
-        for task_id in reversed(self.task_order[:-1]):
-            task = self.tasks[task_id]
-            duration = task.get('Duration (Days)', 0)
-            
-            # Find successor tasks
-            successors = self._find_successors(task_id)
-            
-            if successors:
-                latest_finish = min([latest[succ]['start'] for succ in successors if succ in latest]) - timedelta(days=1)
-            else:
-                latest_finish = earliest_times[task_id]['finish']
-            
-            latest_start = latest_finish - timedelta(days=int(float(duration)) if duration else 0)
-            
-            latest[task_id] = {
-                'start': latest_start,
-                'finish': latest_finish
-            }
-        
-        return latest
+    def scenario(self, name, spec=None):
+        """New copy-on-write what-if scenario over the loaded plan (optionally from a text spec)"""
+        if spec:
+            return Scenario.from_spec(name, spec, self.plan_index())
+        return Scenario(name, self.plan_index())
     
-    def _find_successors(self, task_id):
-        """Find tasks that depend on the given task"""
-        successors = []
-        
-        for tid, task in self.tasks.items():
-            dependencies = str(task.get('Dependencies', ''))
-            if str(task_id) in dependencies:
-                successors.append(tid)
-        
-        return successors
+    def compare_scenarios(self, scenarios, max_workers=None, executor='process'):
+        """Finish date and critical path of each scenario against the base plan"""
+        logging.info(f"Evaluating {len(scenarios)} scenarios...")
+        with metrics.stage('scenarios', scenarios=len(scenarios), executor=executor):
+            return compare_scenarios(self.plan_index(), scenarios, max_workers, executor)
     
     def update_excel(self, calculated_dates, critical_tasks):
         """Update Excel with calculated dates and critical path markers"""
         try:
             logging.info("Updating Excel with calculated values...")
             
-            wb = openpyxl.load_workbook(self.excel_file_path)
+            if CONFIG.get('excel', {}).get('writer', 'patch') == 'patch':
+                try:
+                    return self._patch_excel(calculated_dates, critical_tasks)
+                except XlsxPatchUnsupported as e:
+                    logging.warning(f"In-place patch not possible ({e}); rewriting workbook with openpyxl")
+            
+            with metrics.stage('load_workbook'):
+                wb = openpyxl.load_workbook(self.excel_file_path)
             ws = wb[self.sheet_name]
             
             # Find column indices
             headers = {cell.value: cell.column for cell in ws[1]}
             
             # Update each task
-            for row_idx, task_id in enumerate(self.task_order, start=2):
-                if task_id in calculated_dates:
-                    calc = calculated_dates[task_id]
-                    
-                    # Update dates
-                    if 'Start Date' in headers:
-                        ws.cell(row=row_idx, column=headers['Start Date'], value=calc['Start Date'])
-                    
-                    if 'Finish Date' in headers:
-                        ws.cell(row=row_idx, column=headers['Finish Date'], value=calc['Finish Date'])
-                    
-                    # Mark critical tasks
-                    if 'Critical Path' in headers and task_id in critical_tasks:
-                        ws.cell(row=row_idx, column=headers['Critical Path'], value='Yes')
+            with metrics.stage('write_cells', tasks=len(self.task_order)):
+                for (row_idx, col), value in self._cell_updates(headers, calculated_dates, critical_tasks).items():
+                    ws.cell(row=row_idx, column=col, value=value)
             
-            wb.save(self.excel_file_path)
+            with metrics.stage('save'):
+                wb.save(self.excel_file_path)
             logging.info("Excel updated successfully")
             return True
             
         except Exception as e:
             logging.error(f"Error updating Excel: {e}")
             return False
+    
+    def _cell_updates(self, headers, calculated_dates, critical_tasks):
+        """{(row, column): value} for calculated dates and critical path markers"""
+        updates = {}
+        for row_idx, task_id in enumerate(self.task_order, start=2):
+            if task_id in calculated_dates:
+                calc = calculated_dates[task_id]
+                
+                # Update dates
+                if 'Start Date' in headers:
+                    updates[(row_idx, headers['Start Date'])] = calc['Start Date']
+                
+                if 'Finish Date' in headers:
+                    updates[(row_idx, headers['Finish Date'])] = calc['Finish Date']
+                
+                # Rolled-up progress of summary tasks
+                if 'Progress (%)' in headers and 'Progress (%)' in calc:
+                    updates[(row_idx, headers['Progress (%)'])] = calc['Progress (%)']
+                
+                # Mark critical tasks
+                if 'Critical Path' in headers and task_id in critical_tasks:
+                    updates[(row_idx, headers['Critical Path'])] = 'Yes'
+        return updates
+    
+    def _patch_excel(self, calculated_dates, critical_tasks):
+        """Write the updates by patching only the Gantt sheet's XML part"""
+        with metrics.stage('write_cells', tasks=len(self.task_order), writer='patch'):
+            updates = self._cell_updates(self.headers, calculated_dates, critical_tasks)
+        with metrics.stage('save', writer='patch'):
+            patch_sheet_cells(self.excel_file_path, self.sheet_name, updates)
+        logging.info("Excel updated successfully (sheet patched in place)")
+        return True
 
 def main():
     """Main execution function"""
@@ -307,9 +328,23 @@ def main():
     parser.add_argument('--input', '-i', required=True, help='Path to Excel Gantt chart file')
     parser.add_argument('--sheet', '-s', default='Gantt Chart', help='Excel sheet name (default: Gantt Chart)')
     parser.add_argument('--recalculate', '-r', action='store_true', help='Recalculate all dates based on dependencies')
+    parser.add_argument('--what-if', action='append', metavar='NAME=ACTIONS',
+                        help='Evaluate a scenario without changing the workbook, e.g. '
+                             '"late vendor=slip 42 5; crash 10-19 20%%" (repeatable)')
+    parser.add_argument('--scenario-output', help='Write the scenario comparison table to this CSV file')
+    parser.add_argument('--workers', type=int, help='Worker processes for scenarios (default: one per CPU)')
+    parser.add_argument('--profile', action='store_true', help='Profile this run and write reports next to the log file')
     
     args = parser.parse_args()
     
+    log_dir = os.path.dirname(os.path.abspath(CONFIG['logging']['file']))
+    with profile_run('gantt_calculator', log_dir, enabled=args.profile, settings=CONFIG.get('profiling')):
+        run(args)
+    
+    metrics.flush()
+
+def run(args):
+    """Run the command for parsed arguments"""
     # Validate input file
     if not os.path.exists(args.input):
         logging.error(f"Input file not found: {args.input}")
@@ -319,12 +354,21 @@ def main():
     calculator = GanttCalculator(args.input, args.sheet)
     
     if calculator.load_tasks():
-        if args.recalculate:
-            calculated_dates = calculator.calculate_dates()
-        else:
-            calculated_dates = {}
+        if args.what_if:
+            run_scenarios(calculator, args)
+            return
         
-        critical_tasks = calculator.calculate_critical_path()
+        try:
+            if args.recalculate:
+                calculated_dates = calculator.calculate_dates()
+            else:
+                calculated_dates = {}
+            
+            critical_tasks = calculator.calculate_critical_path()
+        except ValueError as e:
+            logging.error(f"Cannot schedule plan: {e}")
+            print("Failed to calculate schedule")
+            return
         
         if calculator.update_excel(calculated_dates, critical_tasks):
             print(f"Successfully updated Gantt chart")
@@ -335,6 +379,19 @@ def main():
     else:
         print("Failed to load tasks")
 
+def run_scenarios(calculator, args):
+    """Evaluate --what-if scenarios and print the comparison table"""
+    scenarios = []
+    for number, text in enumerate(args.what_if, start=1):
+        name, _, spec = text.rpartition('=') if '=' in text else (f'Scenario {number}', '', text)
+        scenarios.append(calculator.scenario(name.strip() or f'Scenario {number}', spec))
+    
+    table = calculator.compare_scenarios(scenarios, max_workers=args.workers)
+    print(table.to_string(index=False))
+    if args.scenario_output:
+        table.to_csv(args.scenario_output, index=False)
+        print(f"Scenario comparison written to {args.scenario_output}")
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,297 @@
+"""
+Gantt Grid Renderer
+Draws the Gantt bar grid to the right of the task columns of a Gantt Chart sheet
+"""
+
+import pandas as pd
+import numpy as np
+import openpyxl
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import column_index_from_string, get_column_letter
+from datetime import datetime
+import logging
+import json
+import os
+import sys
+import argparse
+
+# Configuration loading
+def load_config():
+    """Load configuration from JSON file"""
+    config_path = os.path.join(os.path.dirname(__file__), 'config_msproject.json')
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+CONFIG = load_config()
+
+# Shared helpers live in the automation folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'automation'))
+import log_setup
+from instrumentation import PipelineMetrics
+from profiling import profile_run
+
+# Logging setup
+def setup_logging():
+    """Set up queued logging (file/console writes on a background thread)"""
+    settings = CONFIG['logging']
+    log_setup.setup_logging(
+        settings['level'],
+        settings['file'],
+        console=settings['console'],
+        fmt=settings.get('format', 'text'),
+        summary_after=settings.get('summary_after', 20)
+    )
+
+setup_logging()
+metrics = PipelineMetrics.from_config('gantt_renderer', CONFIG.get('instrumentation'))
+
+DAY_MAP = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+# Grid cell codes; bar codes follow, one per status and one per critical status,
+# then a neutral bar (and its critical variant) for statuses without a colour
+EMPTY, WEEKEND, TODAY = 0, 1, 2
+FIRST_BAR = 3
+
+STYLE_PREFIX = 'Gantt '
+OTHER_FILL = 'FFE5E7EB'
+
+_UNKNOWN_STATUSES = set()
+
+
+def period_starts(first_day, count, mode='weeks'):
+    """Start day of each timeline column (datetime64[D]); weeks start on Monday"""
+    first = np.datetime64(pd.Timestamp(first_day).date(), 'D')
+    if mode == 'weeks':
+        # 1970-01-01 was a Thursday (weekday 3)
+        first = first - ((first.astype(np.int64) + 3) % 7)
+        return first + np.arange(count) * 7
+    return first + np.arange(count)
+
+
+def occupancy_matrix(starts, finishes, periods, period_days):
+    """Task x period booleans: True where [start, finish] overlaps the period
+
+    ``starts``/``finishes`` are datetime64[D] arrays (NaT = no bar); all
+    tasks and periods are compared at once by broadcasting.
+    """
+    period_start = periods.astype(np.int64)[None, :]
+    period_end = period_start + period_days
+    start = starts.astype(np.int64)[:, None]
+    finish = finishes.astype(np.int64)[:, None]
+    valid = (~np.isnat(starts) & ~np.isnat(finishes))[:, None]
+    return valid & (start < period_end) & (finish >= period_start)
+
+
+class GanttRenderer:
+    """Renders the timeline grid using one named style per kind of cell"""
+
+    def __init__(self, excel_file_path, sheet_name='Gantt Chart', settings=None, status_colors=None, today=None):
+        self.excel_file_path = excel_file_path
+        self.sheet_name = sheet_name
+        self.settings = settings or CONFIG.get('gantt_settings', {})
+        self.status_colors = status_colors or CONFIG.get('status_colors', {})
+        self.statuses = list(self.status_colors)
+        self.today = np.datetime64((pd.Timestamp(today) if today else pd.Timestamp.now()).date(), 'D')
+        self.working_days = [DAY_MAP[day] for day, working in CONFIG.get('working_days', {}).items() if working]
+        self.wb = None
+        self.ws = None
+        self.headers = {}
+        self.rows = []
+
+    def load_tasks(self):
+        """Load the task rows (Start/Finish Date, Status, Critical Path)"""
+        try:
+            logging.info(f"Loading tasks from: {self.excel_file_path}")
+
+            with metrics.stage('load_workbook'):
+                self.wb = openpyxl.load_workbook(self.excel_file_path)
+            if self.sheet_name not in self.wb.sheetnames:
+                logging.error(f"Sheet '{self.sheet_name}' not found")
+                return False
+
+            self.ws = self.wb[self.sheet_name]
+            headers = [cell.value for cell in self.ws[1]]
+            self.headers = {name: col for col, name in enumerate(headers, start=1) if isinstance(name, str)}
+            self.rows = [row for row in self.ws.iter_rows(min_row=2, max_col=max(self.headers.values()),
+                                                          values_only=True) if row[0] not in (None, '')]
+            logging.info(f"Loaded {len(self.rows)} tasks")
+            return True
+
+        except Exception as e:
+            logging.error(f"Error loading tasks: {e}")
+            return False
+
+    def _column(self, name):
+        """Values of one task column (None where the sheet lacks it)"""
+        col = self.headers.get(name)
+        return [row[col - 1] if col else None for row in self.rows]
+
+    def start_column(self):
+        """First timeline column; never left of the last task column"""
+        configured = column_index_from_string(self.settings.get('start_column', 'M'))
+        first_free = max(self.headers.values()) + 1
+        if configured < first_free:
+            logging.warning(f"start_column {self.settings.get('start_column')} overlaps the task columns; "
+                            f"drawing the timeline from column {get_column_letter(first_free)}")
+            return first_free
+        return configured
+
+    def timeline(self, starts):
+        """(period starts, days per period) covering the configured number of weeks"""
+        mode = self.settings.get('timeline_mode', 'weeks')
+        weeks = int(self.settings.get('timeline_weeks', 26))
+        first = self.settings.get('timeline_start')
+        if not first:
+            first = starts[~np.isnat(starts)].min() if (~np.isnat(starts)).any() else self.today
+        if mode == 'days':
+            return period_starts(first, weeks * 7, 'days'), 1
+        if self.settings.get('weekend_shading'):
+            logging.info("weekend_shading only applies with timeline_mode 'days'; week columns are not shaded")
+        return period_starts(first, weeks, 'weeks'), 7
+
+    def grid_codes(self):
+        """(period starts, days per period, task x period array of cell codes)"""
+        starts = pd.to_datetime(pd.Series(self._column('Start Date'), dtype=object), errors='coerce').to_numpy('datetime64[D]')
+        finishes = pd.to_datetime(pd.Series(self._column('Finish Date'), dtype=object), errors='coerce').to_numpy('datetime64[D]')
+        periods, period_days = self.timeline(starts)
+
+        with metrics.stage('occupancy', tasks=len(self.rows), periods=len(periods)):
+            occupied = occupancy_matrix(starts, finishes, periods, period_days)
+
+            status_index = {status: i for i, status in enumerate(self.statuses)}
+            statuses = self._column('Status')
+            for value in set(statuses) - set(status_index) - _UNKNOWN_STATUSES:
+                _UNKNOWN_STATUSES.add(value)
+                logging.warning(f"Status '{value}' has no colour in status_colors; drawing it as '{STYLE_PREFIX}Other'")
+            known = np.array([value in status_index for value in statuses], dtype=bool)
+            status = np.array([status_index.get(value, 0) for value in statuses], dtype=np.int16)
+            n = len(self.statuses)
+            bar = np.where(known, FIRST_BAR + status, FIRST_BAR + 2 * n)
+            if self.settings.get('critical_path_highlight', True):
+                critical = np.array([str(value).strip().lower() == 'yes' for value in self._column('Critical Path')])
+                bar = bar + np.where(critical, np.where(known, n, 1), 0)
+
+            background = np.full(len(periods), EMPTY, dtype=np.int16)
+            if self.settings.get('weekend_shading', True) and period_days == 1:
+                weekday = (periods.astype(np.int64) + 3) % 7
+                background[~np.isin(weekday, self.working_days)] = WEEKEND
+            if self.settings.get('today_marker', True):
+                background[(periods <= self.today) & (self.today < periods + period_days)] = TODAY
+
+            codes = np.where(occupied, bar[:, None], background[None, :])
+        return periods, period_days, codes
+
+    def _named_styles(self):
+        """Style name per cell code, registering any missing named styles once"""
+        thin = Side(style='thin', color='FFD1D5DB')
+        critical_side = Side(style='medium', color='FF991B1B')
+        specs = [
+            (None, None, thin),
+            ('Weekend', PatternFill('solid', fgColor='FFF3F4F6'), thin),
+            ('Today', PatternFill('solid', fgColor='FFFEF3C7'), thin),
+        ]
+        fills = {status: PatternFill('solid', fgColor='FF' + self.status_colors[status].lstrip('#').upper())
+                 for status in self.statuses}
+        specs += [(status, fills[status], thin) for status in self.statuses]
+        specs += [(f'{status} Critical', fills[status], critical_side) for status in self.statuses]
+        other = PatternFill('solid', fgColor=OTHER_FILL)
+        specs += [('Other', other, thin), ('Other Critical', other, critical_side)]
+
+        existing = set(self.wb.named_styles)
+        names = []
+        for label, fill, side in specs:
+            if label is None:
+                names.append(None)
+                continue
+            name = STYLE_PREFIX + label
+            if name not in existing:
+                self.wb.add_named_style(NamedStyle(name=name, fill=fill, border=Border(top=side, bottom=side)))
+            names.append(name)
+
+        for label, bold_fill in (('Header', None), ('Today Header', 'FFFDE68A')):
+            name = STYLE_PREFIX + label
+            if name not in existing:
+                self.wb.add_named_style(NamedStyle(
+                    name=name, font=Font(bold=True, size=9), number_format='dd mmm',
+                    alignment=Alignment(horizontal='center', text_rotation=90),
+                    fill=PatternFill('solid', fgColor=bold_fill) if bold_fill else PatternFill()))
+        return names
+
+    def render(self, output_path=None):
+        """Draw the timeline grid and save the workbook"""
+        try:
+            periods, period_days, codes = self.grid_codes()
+            first_col = self.start_column()
+            ws = self.ws
+
+            with metrics.stage('write_cells', tasks=len(self.rows), periods=len(periods)):
+                names = self._named_styles()
+                # The timeline owns every column from start_column on; drop the previous render
+                if ws.max_column >= first_col:
+                    ws.delete_cols(first_col, ws.max_column - first_col + 1)
+
+                today_col = None
+                for offset, day in enumerate(periods):
+                    cell = ws.cell(row=1, column=first_col + offset, value=day.astype(datetime))
+                    is_today = day <= self.today < day + period_days
+                    cell.style = STYLE_PREFIX + ('Today Header' if is_today else 'Header')
+                    if is_today:
+                        today_col = first_col + offset
+                    ws.column_dimensions[get_column_letter(first_col + offset)].width = 3.5 if period_days == 1 else 4.5
+
+                rows, cols = np.nonzero(codes)
+                for row, col, code in zip((rows + 2).tolist(), (cols + first_col).tolist(), codes[rows, cols].tolist()):
+                    ws.cell(row=row, column=col).style = names[code]
+
+            with metrics.stage('save'):
+                wb_path = output_path or self.excel_file_path
+                self.wb.save(wb_path)
+            bars = int((codes >= FIRST_BAR).sum())
+            logging.info(f"Rendered {len(self.rows)} tasks x {len(periods)} periods "
+                         f"({bars} bar cells, today column {get_column_letter(today_col) if today_col else 'outside timeline'})")
+            return True
+
+        except Exception as e:
+            logging.error(f"Error rendering Gantt grid: {e}")
+            return False
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description='Render the Gantt bar grid into an Excel Gantt chart')
+    parser.add_argument('--input', '-i', required=True, help='Path to Excel Gantt chart file')
+    parser.add_argument('--output', '-o', help='Path to output Excel file (default: update the input)')
+    parser.add_argument('--sheet', '-s', default='Gantt Chart', help='Excel sheet name (default: Gantt Chart)')
+    parser.add_argument('--today', help='Date for the today marker (default: today)')
+    parser.add_argument('--profile', action='store_true', help='Profile this run and write reports next to the log file')
+
+    args = parser.parse_args()
+
+    log_dir = os.path.dirname(os.path.abspath(CONFIG['logging']['file']))
+    with profile_run('gantt_renderer', log_dir, enabled=args.profile, settings=CONFIG.get('profiling')):
+        run(args)
+
+    metrics.flush()
+
+def run(args):
+    """Run the command for parsed arguments"""
+    # Validate input file
+    if not os.path.exists(args.input):
+        logging.error(f"Input file not found: {args.input}")
+        return
+
+    renderer = GanttRenderer(args.input, args.sheet, today=args.today)
+
+    if renderer.load_tasks():
+        if renderer.render(args.output):
+            print(f"Successfully rendered Gantt grid")
+            print(f"   Tasks: {len(renderer.rows)}")
+        else:
+            print("Failed to render Gantt grid")
+    else:
+        print("Failed to load tasks")
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,7 @@ from lxml import etree
 import logging
 import json
 import os
+import sys
 import argparse
 
 # Configuration loading
@@ -21,26 +22,27 @@ def load_config():
 
 CONFIG = load_config()
 
+# Shared helpers live in the automation folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'automation'))
+import log_setup
+from instrumentation import PipelineMetrics
+from profiling import profile_run
+from wbs_hierarchy import SummaryRollup, WbsHierarchy
+
 # Logging setup
 def setup_logging():
-    """Set up logging configuration"""
-    log_level = getattr(logging, CONFIG['logging']['level'])
-    log_file = CONFIG['logging']['file']
-    
-    # Create logs directory if it doesn't exist
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
-    handlers = [logging.FileHandler(log_file)]
-    if CONFIG['logging']['console']:
-        handlers.append(logging.StreamHandler())
-    
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=handlers
+    """Set up queued logging (file/console writes on a background thread)"""
+    settings = CONFIG['logging']
+    log_setup.setup_logging(
+        settings['level'],
+        settings['file'],
+        console=settings['console'],
+        fmt=settings.get('format', 'text'),
+        summary_after=settings.get('summary_after', 20)
     )
 
 setup_logging()
+metrics = PipelineMetrics.from_config('ms_project_exporter', CONFIG.get('instrumentation'))
 
 class MSProjectExporter:
     """Exports Excel Gantt chart format to MS Project XML files"""
@@ -56,7 +58,8 @@ class MSProjectExporter:
             logging.info(f"Loading Excel file: {self.excel_file_path}")
             
             # Load workbook and worksheet
-            wb = openpyxl.load_workbook(self.excel_file_path)
+            with metrics.stage('load_workbook'):
+                wb = openpyxl.load_workbook(self.excel_file_path)
             if self.sheet_name not in wb.sheetnames:
                 logging.error(f"Sheet '{self.sheet_name}' not found in workbook")
                 return False
@@ -68,10 +71,13 @@ class MSProjectExporter:
             
             # Read data rows
             for row in ws.iter_rows(min_row=2, values_only=True):
-                if row[0]:  # Skip empty rows (check Task ID)
+                if row[0] not in (None, ''):  # Skip empty rows (check Task ID; 0 is the project summary)
                     task_data = dict(zip(headers, row))
                     self.tasks.append(task_data)
             
+            if 'WBS' in wb.sheetnames:
+                self._load_outline(wb['WBS'])
+            
             logging.info(f"Successfully loaded {len(self.tasks)} tasks from Excel")
             return True
             
@@ -79,6 +85,40 @@ class MSProjectExporter:
             logging.error(f"Error loading Excel file: {e}")
             return False
     
+    def _load_outline(self, worksheet):
+        """Merge the WBS sheet into the tasks and roll summary dates and progress up from their leaves"""
+        rows = worksheet.iter_rows(values_only=True)
+        headers = next(rows, ())
+        outline = {}
+        for row in rows:
+            values = dict(zip(headers, row))
+            if values.get('Task ID') is not None:
+                outline[str(values['Task ID'])] = values
+        if not outline:
+            return
+        
+        for task in self.tasks:
+            values = outline.get(str(task['Task ID']), {})
+            task['WBS'] = values.get('WBS')
+            task['Outline Level'] = values.get('Outline Level')
+        
+        hierarchy = WbsHierarchy([task['Outline Level'] for task in self.tasks])
+        rollup = SummaryRollup(
+            hierarchy,
+            [task.get('Start Date') for task in self.tasks],
+            [task.get('Finish Date') for task in self.tasks],
+            [task.get('Duration (Days)') for task in self.tasks],
+            [task.get('Progress (%)') for task in self.tasks]
+        )
+        for position in hierarchy.summaries:
+            task = self.tasks[position]
+            task['Summary'] = True
+            values = rollup.values(position)
+            for column in ('Start Date', 'Finish Date', 'Progress (%)'):
+                if values[column] is not None:
+                    task[column] = values[column]
+        logging.info(f"Rolled up {len(hierarchy.summaries)} summary tasks from the WBS sheet")
+    
     def to_ms_project_xml(self, output_path=None):
         """Convert tasks to MS Project XML format"""
         if not self.tasks:
@@ -98,11 +138,13 @@ class MSProjectExporter:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
             # Build XML structure
-            root = self._create_xml_structure()
+            with metrics.stage('serialise', tasks=len(self.tasks)):
+                root = self._create_xml_structure()
             
             # Write XML to file
-            tree = etree.ElementTree(root)
-            tree.write(output_path, pretty_print=True, xml_declaration=True, encoding='UTF-8')
+            with metrics.stage('save'):
+                tree = etree.ElementTree(root)
+                tree.write(output_path, pretty_print=True, xml_declaration=True, encoding='UTF-8')
             
             logging.info(f"Successfully exported to: {output_path}")
             return True
@@ -117,7 +159,6 @@ class MSProjectExporter:
         ns = "http://schemas.microsoft.com/project"
         root = etree.Element(
             'Project',
-            xmlns=ns,
             nsmap={None: ns}
         )
         
@@ -168,6 +209,14 @@ class MSProjectExporter:
         name = etree.SubElement(task, 'Name')
         name.text = str(task_data.get('Task Name', 'Unnamed Task'))
         
+        # Outline position (WBS sheet)
+        if task_data.get('WBS'):
+            outline_number = etree.SubElement(task, 'OutlineNumber')
+            outline_number.text = str(task_data['WBS'])
+        if task_data.get('Outline Level') is not None:
+            outline_level = etree.SubElement(task, 'OutlineLevel')
+            outline_level.text = str(int(task_data['Outline Level']))
+        
         # Start and Finish dates
         start_date = task_data.get('Start Date')
         if isinstance(start_date, datetime):
@@ -210,6 +259,11 @@ class MSProjectExporter:
             milestone = etree.SubElement(task, 'Milestone')
             milestone.text = '1'
         
+        # Summary
+        if task_data.get('Summary'):
+            summary = etree.SubElement(task, 'Summary')
+            summary.text = '1'
+        
         # Critical
         critical = etree.SubElement(task, 'Critical')
         critical.text = '0'  # Will be calculated by MS Project
@@ -239,9 +293,18 @@ def main():
     parser.add_argument('--input', '-i', required=True, help='Path to Excel Gantt chart file')
     parser.add_argument('--output', '-o', help='Path to output MS Project XML file (optional)')
     parser.add_argument('--sheet', '-s', default='Gantt Chart', help='Excel sheet name (default: Gantt Chart)')
+    parser.add_argument('--profile', action='store_true', help='Profile this run and write reports next to the log file')
     
     args = parser.parse_args()
     
+    log_dir = os.path.dirname(os.path.abspath(CONFIG['logging']['file']))
+    with profile_run('ms_project_exporter', log_dir, enabled=args.profile, settings=CONFIG.get('profiling')):
+        run(args)
+    
+    metrics.flush()
+
+def run(args):
+    """Run the command for parsed arguments"""
     # Validate input file
     if not os.path.exists(args.input):
         logging.error(f"Input file not found: {args.input}")
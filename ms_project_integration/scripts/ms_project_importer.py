@@ -6,10 +6,11 @@ Converts MS Project XML files into Excel Gantt chart format
 import pandas as pd
 import openpyxl
 from datetime import datetime, timedelta
-from lxml import etree
 import logging
 import json
+import glob
 import os
+import sys
 import argparse
 
 # Configuration loading
@@ -21,26 +22,43 @@ def load_config():
 
 CONFIG = load_config()
 
+# Shared helpers live in the automation folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'automation'))
+import log_setup
+from instrumentation import PipelineMetrics
+from profiling import profile_run
+from xlsx_patch import XlsxPatchUnsupported, patch_workbook_cells, sheet_names
+from mspdi_reader import (consolidate, format_dependencies, local_links, read_project, read_projects,
+                          resolve_calendars, resource_work)
+from wbs_hierarchy import WbsHierarchy
+
 # Logging setup
 def setup_logging():
-    """Set up logging configuration"""
-    log_level = getattr(logging, CONFIG['logging']['level'])
-    log_file = CONFIG['logging']['file']
-    
-    # Create logs directory if it doesn't exist
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
-    handlers = [logging.FileHandler(log_file)]
-    if CONFIG['logging']['console']:
-        handlers.append(logging.StreamHandler())
-    
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=handlers
+    """Set up queued logging (file/console writes on a background thread)"""
+    settings = CONFIG['logging']
+    log_setup.setup_logging(
+        settings['level'],
+        settings['file'],
+        console=settings['console'],
+        fmt=settings.get('format', 'text'),
+        summary_after=settings.get('summary_after', 20)
     )
 
 setup_logging()
+metrics = PipelineMetrics.from_config('ms_project_importer', CONFIG.get('instrumentation'))
+
+WEEKDAY_ABBREVIATIONS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Extra sheets written next to the Gantt chart: (sheet, columns, importer attribute)
+DETAIL_SHEETS = [
+    ('Resources', ['Resource UID', 'Resource Name', 'Type', 'Group', 'Max Units', 'Calendar UID',
+                   'Assignments', 'Work (hrs)', 'Actual Work (hrs)', 'Remaining Work (hrs)'], 'resources'),
+    ('Assignments', ['Assignment UID', 'Task ID', 'Resource UID', 'Resource Name', 'Units',
+                     'Work (hrs)', 'Actual Work (hrs)', 'Remaining Work (hrs)', 'Start', 'Finish'], 'assignments'),
+    ('Calendars', ['Calendar UID', 'Calendar Name', 'Base Calendar UID', 'Project Calendar', 'Working Days',
+                   'Hours per Day', 'Non-working Dates', 'Working Dates'], 'calendars'),
+    ('WBS', ['Task ID', 'WBS', 'Outline Level', 'Summary'], 'outline'),
+]
 
 class MSProjectImporter:
     """Imports MS Project XML files and converts to Excel Gantt format"""
@@ -48,54 +66,53 @@ class MSProjectImporter:
     def __init__(self, xml_file_path):
         self.xml_file_path = xml_file_path
         self.tasks = []
-        self.namespace = {}
+        self.units = {}
+        self.resources = []
+        self.assignments = []
+        self.calendars = []
+        self.outline = []
         
     def parse_xml(self):
-        """Parse MS Project XML file"""
+        """Parse MS Project XML file (streamed, one Task element at a time)"""
         try:
             logging.info(f"Parsing MS Project XML: {self.xml_file_path}")
-            tree = etree.parse(self.xml_file_path)
-            root = tree.getroot()
-            
-            # Extract namespace if present
-            if root.tag.startswith('{'):
-                self.namespace = {'ms': root.tag.split('}')[0].strip('{')}
-            
-            # Extract tasks
-            self._extract_tasks(root)
+            with metrics.stage('xml_parse'):
+                project = read_project(self.xml_file_path)
+                self.units = project['units']
+                
+                # Extract tasks
+                self._extract_tasks(project['tasks'], local_links(project))
+                self._extract_outline(project['tasks'])
+                self._extract_details(project, {task['UID']: task['ID'] for task in project['tasks']})
             
-            logging.info(f"Successfully parsed {len(self.tasks)} tasks from XML")
+            logging.info(f"Successfully parsed {len(self.tasks)} tasks, {len(self.resources)} resources, "
+                         f"{len(self.assignments)} assignments and {len(self.calendars)} calendars from XML")
             return True
             
         except Exception as e:
             logging.error(f"Error parsing XML file: {e}")
             return False
     
-    def _extract_tasks(self, root):
-        """Extract task information from XML"""
-        # Handle with or without namespace
-        if self.namespace:
-            tasks_xpath = './/ms:Task'
-        else:
-            tasks_xpath = './/Task'
-        
-        tasks = root.xpath(tasks_xpath, namespaces=self.namespace) if self.namespace else root.findall('.//Task')
-        
-        for task in tasks:
+    def _extract_tasks(self, records, links):
+        """Convert task records to Gantt rows; ``links`` maps UID -> [(predecessor ID, type, lag)]"""
+        for record in records:
             task_data = {
-                'Task_ID': self._get_text(task, 'ID', ''),
-                'Task_Name': self._get_text(task, 'Name', 'Unnamed Task'),
-                'Start_Date': self._parse_date(self._get_text(task, 'Start', '')),
-                'Finish_Date': self._parse_date(self._get_text(task, 'Finish', '')),
-                'Duration_Days': self._parse_duration(self._get_text(task, 'Duration', '0')),
-                'Progress': self._parse_percent(self._get_text(task, 'PercentComplete', '0')),
-                'Priority': self._parse_priority(self._get_text(task, 'Priority', '500')),
-                'Assigned_To': self._get_text(task, 'ResourceNames', ''),
-                'Predecessors': self._get_text(task, 'PredecessorLink', ''),
-                'Notes': self._get_text(task, 'Notes', ''),
-                'Milestone': self._get_text(task, 'Milestone', '0') == '1',
-                'Critical': self._get_text(task, 'Critical', '0') == '1'
+                'Task_ID': record.get('Task ID', record['ID']),
+                'Task_Name': record['Name'],
+                'Start_Date': record['Start'],
+                'Finish_Date': record['Finish'],
+                'Duration_Days': record['Duration'],
+                'Progress': self._parse_percent(record['PercentComplete']),
+                'Priority': self._parse_priority(record['Priority']),
+                'Assigned_To': record['ResourceNames'],
+                'Predecessors': record['Dependencies'] if 'Dependencies' in record
+                                else format_dependencies(links.get(record['UID'], [])),
+                'Notes': record['Notes'],
+                'Milestone': record['Milestone'],
+                'Critical': record['Critical']
             }
+            if 'Project' in record:
+                task_data['Project'] = record['Project']
             
             # Determine status based on progress
             if task_data['Progress'] == 0:
@@ -107,36 +124,87 @@ class MSProjectImporter:
             
             self.tasks.append(task_data)
     
-    def _get_text(self, element, tag, default=''):
-        """Get text from XML element"""
-        if self.namespace:
-            child = element.find(f'ms:{tag}', namespaces=self.namespace)
-        else:
-            child = element.find(tag)
-        return child.text if child is not None and child.text else default
+    def _extract_outline(self, records):
+        """WBS rows (outline number, level, summary flag) unless the plan is flat
+        
+        Numbers are regenerated from the outline levels so that they stay
+        consistent after consolidation renumbers or nests tasks.
+        """
+        levels = [record['OutlineLevel'] for record in records]
+        if all(level is None or level == 1 for level in levels):
+            return
+        hierarchy = WbsHierarchy(levels)
+        for position, (record, number) in enumerate(zip(records, hierarchy.outline_numbers())):
+            row = {
+                'Task ID': record.get('Task ID', record['ID']),
+                'WBS': number,
+                'Outline Level': hierarchy.levels[position],
+                'Summary': 'Yes' if hierarchy.is_summary(position) else 'No'
+            }
+            if 'Project' in record:
+                row['Project'] = record['Project']
+            self.outline.append(row)
     
-    def _parse_date(self, date_str):
-        """Parse MS Project date format"""
-        if not date_str:
-            return None
-        try:
-            # MS Project date format: 2024-10-17T00:00:00
-            return datetime.fromisoformat(date_str.split('T')[0])
-        except:
-            return None
+    def _extract_details(self, project, task_ids, project_name=None):
+        """Resources (with their assigned work), assignments and resolved calendars as sheet rows
+        
+        ``task_ids`` maps task UID -> Task ID in the Gantt sheet.
+        """
+        extra = {'Project': project_name} if project_name else {}
+        work = resource_work(project)
+        for resource in project['resources']:
+            total = work[resource['UID']]
+            self.resources.append(dict({
+                'Resource UID': resource['UID'],
+                'Resource Name': resource['Name'],
+                'Type': resource['Type'],
+                'Group': resource['Group'],
+                'Max Units': resource['MaxUnits'],
+                'Calendar UID': resource['CalendarUID'] if resource['CalendarUID'] >= 0 else None,
+                'Assignments': total['Assignments'],
+                'Work (hrs)': round(total['Work'], 2),
+                'Actual Work (hrs)': round(total['ActualWork'], 2),
+                'Remaining Work (hrs)': round(total['RemainingWork'], 2)
+            }, **extra))
+        
+        for assignment in project['assignments']:
+            if assignment['TaskUID'] not in task_ids:
+                continue
+            self.assignments.append(dict({
+                'Assignment UID': assignment['UID'],
+                'Task ID': task_ids[assignment['TaskUID']],
+                'Resource UID': assignment['ResourceUID'] if assignment['ResourceName'] else None,
+                'Resource Name': assignment['ResourceName'],
+                'Units': assignment['Units'],
+                'Work (hrs)': assignment['Work'],
+                'Actual Work (hrs)': assignment['ActualWork'],
+                'Remaining Work (hrs)': assignment['RemainingWork'],
+                'Start': assignment['Start'],
+                'Finish': assignment['Finish']
+            }, **extra))
+        
+        for uid, calendar in resolve_calendars(project).items():
+            self.calendars.append(dict({
+                'Calendar UID': uid,
+                'Calendar Name': calendar['Name'],
+                'Base Calendar UID': calendar['BaseCalendarUID'] if calendar['BaseCalendarUID'] >= 0 else None,
+                'Project Calendar': 'Yes' if uid == project['calendar_uid'] else 'No',
+                'Working Days': ', '.join(WEEKDAY_ABBREVIATIONS[day] for day in calendar['WorkingWeekdays']),
+                'Hours per Day': calendar['HoursPerDay'],
+                'Non-working Dates': ', '.join(day.isoformat() for day in calendar['NonWorkingDates']),
+                'Working Dates': ', '.join(day.isoformat() for day in calendar['WorkingDates'])
+            }, **extra))
     
-    def _parse_duration(self, duration_str):
-        """Parse MS Project duration format (e.g., PT40H0M0S for 5 days)"""
-        if not duration_str or duration_str == '0':
-            return 0
-        try:
-            # Simple conversion: PT40H = 5 days (8-hour workday)
-            if 'H' in duration_str:
-                hours = int(duration_str.split('PT')[1].split('H')[0])
-                return hours / 8  # Convert to days
-            return 0
-        except:
-            return 0
+    def _detail_sheets(self):
+        """(sheet, columns, rows) for each detail sheet that has rows"""
+        sheets = []
+        for sheet, columns, attribute in DETAIL_SHEETS:
+            rows = getattr(self, attribute)
+            if rows:
+                if 'Project' in rows[0]:
+                    columns = columns + ['Project']
+                sheets.append((sheet, columns, rows))
+        return sheets
     
     def _parse_percent(self, percent_str):
         """Parse percentage (0-100)"""
@@ -188,9 +256,16 @@ class MSProjectImporter:
             
             # Load template or create new workbook
             template_path = CONFIG['paths']['excel_template']
+            if os.path.exists(template_path) and CONFIG.get('excel', {}).get('writer', 'patch') == 'patch':
+                try:
+                    return self._patch_template(template_path, output_path)
+                except XlsxPatchUnsupported as e:
+                    logging.warning(f"In-place patch not possible ({e}); rewriting workbook with openpyxl")
+            
             if os.path.exists(template_path):
                 logging.info(f"Using template: {template_path}")
-                wb = openpyxl.load_workbook(template_path)
+                with metrics.stage('load_workbook'):
+                    wb = openpyxl.load_workbook(template_path)
                 ws = wb['Gantt Chart'] if 'Gantt Chart' in wb.sheetnames else wb.active
             else:
                 logging.warning("Template not found, creating new workbook")
@@ -200,10 +275,13 @@ class MSProjectImporter:
                 self._create_headers(ws)
             
             # Write task data
-            self._write_tasks_to_excel(ws)
+            with metrics.stage('write_cells', tasks=len(self.tasks)):
+                self._write_tasks_to_excel(ws)
+                self._write_detail_sheets(wb)
             
             # Save workbook
-            wb.save(output_path)
+            with metrics.stage('save'):
+                wb.save(output_path)
             logging.info(f"Successfully exported to: {output_path}")
             return True
             
@@ -211,6 +289,34 @@ class MSProjectImporter:
             logging.error(f"Error exporting to Excel: {e}")
             return False
     
+    def _patch_template(self, template_path, output_path):
+        """Copy the template to output_path, regenerating only the Gantt (and detail) sheet parts"""
+        logging.info(f"Using template: {template_path}")
+        names = sheet_names(template_path)
+        sheet = 'Gantt Chart' if 'Gantt Chart' in names else None
+        details = self._detail_sheets()
+        missing = [name for name, _, _ in details if name not in names]
+        if missing:
+            raise XlsxPatchUnsupported(f"template has no {', '.join(missing)} sheet")
+        
+        with metrics.stage('write_cells', tasks=len(self.tasks), writer='patch'):
+            updates = {}
+            for row_idx, task in enumerate(self.tasks, start=2):
+                for col, value in enumerate(self._task_row_values(task), start=1):
+                    updates[(row_idx, col)] = value
+            sheets = {sheet: (updates, None)}
+            for name, columns, rows in details:
+                cells = {(1, col): column for col, column in enumerate(columns, start=1)}
+                for row_idx, row in enumerate(rows, start=2):
+                    for col, column in enumerate(columns, start=1):
+                        cells[(row_idx, col)] = row.get(column)
+                sheets[name] = (cells, (2, None, 1, len(columns)))
+        
+        with metrics.stage('save', writer='patch'):
+            patch_workbook_cells(template_path, sheets, output_path=output_path)
+        logging.info(f"Successfully exported to: {output_path}")
+        return True
+    
     def _create_headers(self, worksheet):
         """Create header row in Excel"""
         headers = [
@@ -225,26 +331,126 @@ class MSProjectImporter:
         start_row = 2  # Assuming headers are in row 1
         
         for idx, task in enumerate(self.tasks, start=start_row):
-            worksheet.cell(row=idx, column=1, value=task['Task_ID'])
-            worksheet.cell(row=idx, column=2, value=task['Task_Name'])
-            worksheet.cell(row=idx, column=3, value=task['Duration_Days'])
-            worksheet.cell(row=idx, column=4, value=task['Start_Date'])
-            worksheet.cell(row=idx, column=5, value=task['Finish_Date'])
-            worksheet.cell(row=idx, column=6, value=task['Progress'])
-            worksheet.cell(row=idx, column=7, value=task['Status'])
-            worksheet.cell(row=idx, column=8, value=task['Predecessors'])
-            worksheet.cell(row=idx, column=9, value=task['Assigned_To'])
-            worksheet.cell(row=idx, column=10, value=task['Priority'])
-            worksheet.cell(row=idx, column=11, value=task['Notes'])
+            for col, value in enumerate(self._task_row_values(task), start=1):
+                worksheet.cell(row=idx, column=col, value=value)
+    
+    def _write_detail_sheets(self, workbook):
+        """Replace the Resources / Assignments / Calendars / WBS sheets with the imported rows"""
+        for name, columns, rows in self._detail_sheets():
+            if name in workbook.sheetnames:
+                workbook.remove(workbook[name])
+            worksheet = workbook.create_sheet(name)
+            worksheet.append(columns)
+            for row in rows:
+                worksheet.append([row.get(column) for column in columns])
+    
+    @staticmethod
+    def _task_row_values(task):
+        """Cell values of one task row, in header order"""
+        return [
+            task['Task_ID'], task['Task_Name'], task['Duration_Days'], task['Start_Date'],
+            task['Finish_Date'], task['Progress'], task['Status'], task['Predecessors'],
+            task['Assigned_To'], task['Priority'], task['Notes']
+        ]
+
+class MSProjectBatchImporter(MSProjectImporter):
+    """Imports many MS Project XML files into one consolidated Gantt plan"""
+    
+    def __init__(self, xml_file_paths, max_workers=None):
+        super().__init__(None)
+        self.xml_file_paths = list(xml_file_paths)
+        self.max_workers = max_workers
+        self.mapping = []
+        self.stats = {}
+        self.failed = []
+    
+    def parse_xml(self):
+        """Parse all files on a process pool and merge them (task IDs remapped, cross-project links resolved)"""
+        try:
+            logging.info(f"Parsing {len(self.xml_file_paths)} MS Project XML files")
+            with metrics.stage('xml_parse', files=len(self.xml_file_paths)):
+                projects = read_projects(self.xml_file_paths, self.max_workers)
+            
+            self.failed = [project for project in projects if 'error' in project]
+            for project in self.failed:
+                logging.error(f"Error parsing XML file {project['path']}: {project['error']}")
+            projects = [project for project in projects if 'error' not in project]
+            if not projects:
+                return False
+            
+            # Two files with the same name would share one key in the consolidation index
+            seen = {}
+            for project in projects:
+                count = seen.get(project['key'], 0) + 1
+                seen[project['key']] = count
+                if count > 1:
+                    logging.warning(f"Duplicate project name '{project['key']}' ({project['path']}); "
+                                    f"cross-project links resolve to the first file")
+                    project['key'] = f"{project['key']}~{count}"
+            
+            with metrics.stage('consolidate', projects=len(projects)):
+                records, self.mapping, self.stats = consolidate(projects)
+                self._extract_tasks(records, {})
+                self._extract_outline(records)
+                task_ids = {}
+                for row in self.mapping:
+                    task_ids.setdefault(row['Project'], {})[row['UID']] = row['Task ID']
+                for project in projects:
+                    self._extract_details(project, task_ids.get(project['key'], {}), project['key'])
+            
+            logging.info(f"Consolidated {len(self.tasks)} tasks from {len(projects)} projects "
+                         f"({self.stats['remapped']} IDs remapped, {self.stats['cross_project_links']} cross-project links, "
+                         f"{self.stats['subprojects']} subprojects inserted, {self.stats['unresolved_links']} links unresolved)")
+            return True
+            
+        except Exception as e:
+            logging.error(f"Error consolidating XML files: {e}")
+            return False
+    
+    def write_mapping(self, output_path):
+        """Write the (Project, UID, ID) -> Task ID mapping as CSV"""
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        pd.DataFrame(self.mapping, columns=['Project', 'UID', 'ID', 'Task ID']).to_csv(output_path, index=False)
+        logging.info(f"Task ID mapping written to: {output_path}")
+
+
+def collect_xml_files(inputs):
+    """XML files named by paths, folders (every *.xml inside) or glob patterns, without duplicates"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, '*.xml')))
+        else:
+            matches = sorted(glob.glob(item)) or [item]
+        files.extend(path for path in matches if path not in files)
+    return files
 
 def main():
     """Main execution function"""
     parser = argparse.ArgumentParser(description='Import MS Project XML to Excel Gantt chart')
-    parser.add_argument('--input', '-i', required=True, help='Path to MS Project XML file')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', '-i', help='Path to MS Project XML file')
+    source.add_argument('--batch', '-b', nargs='+', metavar='PATH',
+                        help='XML files, folders or glob patterns to consolidate into one plan')
     parser.add_argument('--output', '-o', help='Path to output Excel file (optional)')
+    parser.add_argument('--workers', type=int, help='Worker processes for --batch (default: one per CPU)')
+    parser.add_argument('--mapping-output', help='CSV of original project/UID/ID to consolidated Task ID (--batch only)')
+    parser.add_argument('--profile', action='store_true', help='Profile this run and write reports next to the log file')
     
     args = parser.parse_args()
     
+    log_dir = os.path.dirname(os.path.abspath(CONFIG['logging']['file']))
+    with profile_run('ms_project_importer', log_dir, enabled=args.profile, settings=CONFIG.get('profiling')):
+        run(args)
+    
+    metrics.flush()
+
+def run(args):
+    """Run the command for parsed arguments"""
+    if args.batch:
+        run_batch(args)
+        return
+    
     # Validate input file
     if not os.path.exists(args.input):
         logging.error(f"Input file not found: {args.input}")
@@ -261,6 +467,33 @@ def main():
     else:
         print("Failed to parse MS Project XML file")
 
+def run_batch(args):
+    """Consolidate several MS Project files into one Excel Gantt chart"""
+    files = collect_xml_files(args.batch)
+    missing = [path for path in files if not os.path.exists(path)]
+    for path in missing:
+        logging.error(f"Input file not found: {path}")
+    files = [path for path in files if path not in missing]
+    if not files:
+        print("No MS Project XML files to import")
+        return
+    
+    importer = MSProjectBatchImporter(files, args.workers)
+    
+    if importer.parse_xml():
+        if importer.to_excel(args.output):
+            print(f"Successfully imported {len(importer.tasks)} tasks from {importer.stats['projects']} projects to Excel")
+            print(f"   Task IDs remapped: {importer.stats['remapped']}")
+            print(f"   Cross-project links: {importer.stats['cross_project_links']}")
+            if importer.failed:
+                print(f"   Files skipped (parse errors): {len(importer.failed)}")
+            if args.mapping_output:
+                importer.write_mapping(args.mapping_output)
+        else:
+            print("Failed to export to Excel")
+    else:
+        print("Failed to parse MS Project XML files")
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,483 @@
+"""
+MSPDI Reader and Plan Consolidation
+Streams MS Project XML into task, resource, assignment and calendar records; merges projects into one plan
+"""
+
+import os
+import re
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from lxml import etree
+
+from mspdi_values import (DAYS_PER_MONTH, MINUTES_PER_DAY, MINUTES_PER_WEEK, duration_days, duration_minutes,
+                          is_elapsed, parse_datetime)
+
+# MSPDI PredecessorLink/Type codes
+LINK_TYPES = {0: 'FF', 1: 'FS', 2: 'SF', 3: 'SS'}
+
+PROJECT_UNITS = {
+    'MinutesPerDay': 'minutes_per_day',
+    'MinutesPerWeek': 'minutes_per_week',
+    'DaysPerMonth': 'days_per_month',
+}
+
+# MSPDI Resource/Type codes
+RESOURCE_TYPES = {'0': 'Material', '1': 'Work', '2': 'Cost'}
+
+# ResourceUID of MS Project's placeholder for unassigned work
+UNASSIGNED = -65535
+
+# "C:\Plans\Vendor.mpp\12": the predecessor is task 12 of Vendor.mpp
+CROSS_PROJECT_PATTERN = re.compile(r'^(.*)[\\/](\d+)\s*$')
+
+
+def project_key(path):
+    """Case-insensitive project name from a file path (Windows or POSIX), without extension"""
+    name = re.split(r'[\\/]', str(path).strip())[-1]
+    return os.path.splitext(name)[0].lower()
+
+
+def _children(element, ns=''):
+    """{local tag: text} of an element's direct children (``ns`` is the '{uri}' tag prefix)"""
+    skip = len(ns)
+    return {child.tag[skip:]: child.text for child in element}
+
+
+def _links(element, units, ns=''):
+    """[(predecessor UID, link type, lag in days, cross-project name)] of one Task element"""
+    links = []
+    for child in element.iterchildren(ns + 'PredecessorLink'):
+        values = _children(child, ns)
+        try:
+            uid = int(values.get('PredecessorUID') or '')
+        except ValueError:
+            continue
+        link_type = LINK_TYPES.get(int(values.get('Type') or 1), 'FS')
+        # LinkLag is in tenths of a minute of work (or elapsed) time
+        minutes_per_day = 1440 if is_elapsed(values.get('LagFormat')) else units['minutes_per_day']
+        lag = float(values.get('LinkLag') or 0) / 10 / minutes_per_day
+        cross = values.get('CrossProjectName') if values.get('CrossProject') == '1' else None
+        links.append((uid, link_type, round(lag, 2), cross))
+    return links
+
+
+def task_record(element, units, ns=''):
+    """Plain dict of one Task element; text fields are left for the caller to interpret"""
+    values = _children(element, ns)
+    duration_format = values.get('DurationFormat')
+    return {
+        'UID': int(values.get('UID') or 0),
+        'ID': int(values.get('ID') or values.get('UID') or 0),
+        'Name': values.get('Name') or 'Unnamed Task',
+        'OutlineNumber': values.get('OutlineNumber'),
+        'OutlineLevel': int(values['OutlineLevel']) if (values.get('OutlineLevel') or '').isdigit() else None,
+        'Start': parse_datetime(values.get('Start') or ''),
+        'Finish': parse_datetime(values.get('Finish') or ''),
+        'Duration': duration_days(values.get('Duration') or '', duration_format, **units),
+        'PercentComplete': values.get('PercentComplete') or '0',
+        'Priority': values.get('Priority') or '500',
+        'ResourceNames': values.get('ResourceNames') or '',
+        'Notes': values.get('Notes') or '',
+        'Milestone': values.get('Milestone') == '1',
+        'Critical': values.get('Critical') == '1',
+        'Summary': values.get('Summary') == '1',
+        'External': values.get('ExternalTask') == '1',
+        'ExternalProject': values.get('ExternalTaskProject'),
+        'Subproject': values.get('SubprojectName') if values.get('IsSubproject') == '1' else None,
+        'Links': _links(element, units, ns) if 'PredecessorLink' in values else [],
+    }
+
+
+def _hours(text):
+    """Hours of work in an MSPDI work/duration value (0 if absent)"""
+    minutes = duration_minutes(text) if text else None
+    return round(minutes / 60, 4) if minutes else 0.0
+
+
+def _number(text, default=0.0):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return default
+
+
+def resource_record(element, ns=''):
+    """Plain dict of one Resource element"""
+    values = _children(element, ns)
+    return {
+        'UID': int(values.get('UID') or 0),
+        'Name': values.get('Name') or '',
+        'Type': RESOURCE_TYPES.get(values.get('Type') or '1', 'Work'),
+        'Group': values.get('Group') or '',
+        'MaxUnits': _number(values.get('MaxUnits'), 1.0),
+        'CalendarUID': int(values.get('CalendarUID') or -1),
+        'Work': _hours(values.get('Work')),
+    }
+
+
+def assignment_record(element, ns=''):
+    """Plain dict of one Assignment element (work in hours)"""
+    values = _children(element, ns)
+    return {
+        'UID': int(values.get('UID') or 0),
+        'TaskUID': int(values.get('TaskUID') or 0),
+        'ResourceUID': int(values.get('ResourceUID') or UNASSIGNED),
+        'Units': _number(values.get('Units'), 1.0),
+        'Work': _hours(values.get('Work')),
+        'ActualWork': _hours(values.get('ActualWork')),
+        'RemainingWork': _hours(values.get('RemainingWork')),
+        'Start': parse_datetime(values.get('Start') or ''),
+        'Finish': parse_datetime(values.get('Finish') or ''),
+    }
+
+
+def _period_dates(period, ns):
+    """Dates covered by a TimePeriod element (inclusive)"""
+    values = _children(period, ns)
+    start = parse_datetime(values.get('FromDate') or '')
+    finish = parse_datetime(values.get('ToDate') or '') or start
+    if start is None:
+        return []
+    return [start.date() + timedelta(days=offset) for offset in range((finish.date() - start.date()).days + 1)]
+
+
+def calendar_record(element, ns=''):
+    """Plain dict of one Calendar element
+
+    'Weekdays' maps Python weekday (0 = Monday) to (working, hours) for the
+    days this calendar defines itself; days it leaves out come from its
+    base calendar (see resolve_calendars). Date exceptions from WeekDay
+    DayType 0 and from Exceptions are expanded day by day; recurring
+    (non-daily) exceptions are not expanded.
+    """
+    values = _children(element, ns)
+    weekdays = {}
+    off, on = set(), set()
+    for weekday in element.iterchildren(ns + 'WeekDays'):
+        for day in weekday.iterchildren(ns + 'WeekDay'):
+            day_values = _children(day, ns)
+            working = day_values.get('DayWorking') == '1'
+            day_type = int(day_values.get('DayType') or 0)
+            if day_type == 0:
+                for period in day.iterchildren(ns + 'TimePeriod'):
+                    (on if working else off).update(_period_dates(period, ns))
+            else:
+                # MSPDI DayType: 1 = Sunday ... 7 = Saturday
+                weekdays[(day_type + 5) % 7] = (working, _working_hours(day, ns))
+    for exceptions in element.iterchildren(ns + 'Exceptions'):
+        for exception in exceptions.iterchildren(ns + 'Exception'):
+            exception_values = _children(exception, ns)
+            if (exception_values.get('Type') or '1') != '1':
+                continue
+            working = exception_values.get('DayWorking') == '1'
+            for period in exception.iterchildren(ns + 'TimePeriod'):
+                (on if working else off).update(_period_dates(period, ns))
+    return {
+        'UID': int(values.get('UID') or 0),
+        'Name': values.get('Name') or '',
+        'BaseCalendarUID': int(values.get('BaseCalendarUID') or -1),
+        'Weekdays': weekdays,
+        'NonWorkingDates': off - on,
+        'WorkingDates': on,
+    }
+
+
+def _working_hours(day, ns):
+    """Hours in a WeekDay's WorkingTimes (None when it lists none)"""
+    hours = 0.0
+    found = False
+    for times in day.iterchildren(ns + 'WorkingTimes'):
+        for working_time in times.iterchildren(ns + 'WorkingTime'):
+            values = _children(working_time, ns)
+            start, finish = values.get('FromTime'), values.get('ToTime')
+            if not start or not finish:
+                continue
+            start, finish = parse_datetime(f'2000-01-01T{start}'), parse_datetime(f'2000-01-01T{finish}')
+            if start is None or finish is None:
+                continue
+            seconds = (finish - start).total_seconds()
+            hours += (seconds if seconds > 0 else seconds + 86400) / 3600
+            found = True
+    return hours if found else None
+
+
+def read_project(path):
+    """Stream one MSPDI file into plain records
+
+    Returns {'path', 'key', 'name', 'units', 'calendar_uid', 'tasks',
+    'resources', 'assignments', 'calendars'}. Elements are cleared as soon
+    as they have been read, so memory stays flat however many tasks the
+    file holds. Tasks without ResourceNames get them from their
+    assignments (see join_assignments).
+    """
+    units = {'minutes_per_day': MINUTES_PER_DAY, 'minutes_per_week': MINUTES_PER_WEEK,
+             'days_per_month': DAYS_PER_MONTH}
+    project = {'path': path, 'key': project_key(path), 'name': None, 'units': units, 'calendar_uid': None,
+               'tasks': [], 'resources': [], 'assignments': [], 'calendars': []}
+    tags = ['{*}Task', '{*}Resource', '{*}Assignment', '{*}Calendar']
+    root = None
+
+    for _, element in etree.iterparse(path, events=('end',), tag=tags, remove_comments=True, remove_pis=True):
+        parent = element.getparent()
+        if root is None:
+            # Project-level settings precede <Calendars> and <Tasks>, so they are parsed by now
+            ns = element.tag[:element.tag.index('}') + 1] if element.tag.startswith('{') else ''
+            root = parent.getparent()
+            settings = _children(root, ns)
+            project['name'] = settings.get('Name')
+            project['calendar_uid'] = int(settings['CalendarUID']) if (settings.get('CalendarUID') or '').isdigit() else None
+            for tag, key in PROJECT_UNITS.items():
+                value = (settings.get(tag) or '').strip()
+                if value.isdigit() and int(value) > 0:
+                    units[key] = int(value)
+        tag = element.tag[len(ns):]
+        if tag == 'Task':
+            project['tasks'].append(task_record(element, units, ns))
+        elif tag == 'Assignment':
+            project['assignments'].append(assignment_record(element, ns))
+        elif tag == 'Resource':
+            project['resources'].append(resource_record(element, ns))
+        else:
+            project['calendars'].append(calendar_record(element, ns))
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del parent[0]
+
+    join_assignments(project)
+    return project
+
+
+def join_assignments(project):
+    """Join assignments to their task and resource through UID hash indexes, in O(n)
+
+    Sets each assignment's 'ResourceName', fills empty task ResourceNames
+    from the assignments and returns {task UID: [assignment, ...]}.
+    Assignments to MS Project's "unassigned" resource are kept but name
+    no resource.
+    """
+    resources = {resource['UID']: resource for resource in project['resources']}
+    by_task = {}
+    for assignment in project['assignments']:
+        resource = resources.get(assignment['ResourceUID'])
+        assignment['ResourceName'] = resource['Name'] if resource else ''
+        by_task.setdefault(assignment['TaskUID'], []).append(assignment)
+
+    for task in project['tasks']:
+        if not task['ResourceNames'] and task['UID'] in by_task:
+            names = [assignment['ResourceName'] for assignment in by_task[task['UID']] if assignment['ResourceName']]
+            task['ResourceNames'] = ', '.join(dict.fromkeys(names))
+    return by_task
+
+
+def resource_work(project):
+    """Per-resource totals from the assignments: {resource UID: {'Assignments', 'Work', 'ActualWork', 'RemainingWork'}}"""
+    totals = {resource['UID']: {'Assignments': 0, 'Work': 0.0, 'ActualWork': 0.0, 'RemainingWork': 0.0}
+              for resource in project['resources']}
+    for assignment in project['assignments']:
+        total = totals.get(assignment['ResourceUID'])
+        if total is None:
+            continue
+        total['Assignments'] += 1
+        for field in ('Work', 'ActualWork', 'RemainingWork'):
+            total[field] += assignment[field]
+    return totals
+
+
+def resolve_calendars(project):
+    """{calendar UID: {'Name', 'WorkingWeekdays', 'HoursPerDay', 'NonWorkingDates', 'WorkingDates'}}
+
+    Weekdays a calendar does not define, and its date exceptions, are
+    inherited from its base calendar chain; the calendar's own exceptions
+    win. Undefined weekdays at the root fall back to Monday-Friday.
+    """
+    calendars = {calendar['UID']: calendar for calendar in project['calendars']}
+    default_hours = project['units']['minutes_per_day'] / 60
+    resolved = {}
+
+    def resolve(uid, seen=()):
+        if uid in resolved:
+            return resolved[uid]
+        calendar = calendars[uid]
+        base_uid = calendar['BaseCalendarUID']
+        if base_uid in calendars and base_uid not in seen and base_uid != uid:
+            base = resolve(base_uid, seen + (uid,))
+            weekdays = dict(base['_weekdays'])
+            off = set(base['NonWorkingDates']) | calendar['NonWorkingDates']
+            on = (set(base['WorkingDates']) - calendar['NonWorkingDates']) | calendar['WorkingDates']
+        else:
+            weekdays = {day: (day < 5, None) for day in range(7)}
+            off, on = set(calendar['NonWorkingDates']), set(calendar['WorkingDates'])
+        weekdays.update(calendar['Weekdays'])
+        working = [day for day in range(7) if weekdays[day][0]]
+        hours = [weekdays[day][1] for day in working if weekdays[day][1]]
+        resolved[uid] = {
+            'Name': calendar['Name'],
+            'BaseCalendarUID': base_uid,
+            'WorkingWeekdays': working,
+            'HoursPerDay': round(max(hours, key=hours.count), 2) if hours else default_hours,
+            'NonWorkingDates': sorted(off - on),
+            'WorkingDates': sorted(on),
+            '_weekdays': weekdays,
+        }
+        return resolved[uid]
+
+    for uid in calendars:
+        resolve(uid)
+    for calendar in resolved.values():
+        del calendar['_weekdays']
+    return resolved
+
+
+def _read_project_safely(path):
+    try:
+        return read_project(path)
+    except Exception as e:
+        return {'path': path, 'key': project_key(path), 'error': str(e)}
+
+
+def read_projects(paths, max_workers=None, executor='process'):
+    """Read many MSPDI files concurrently, in input order; failed files carry an 'error' key"""
+    workers = max_workers or min(len(paths), os.cpu_count() or 1) or 1
+    if workers == 1:
+        # Shipping records back from a single worker only adds pickling
+        return [_read_project_safely(path) for path in paths]
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        return list(pool.map(_read_project_safely, paths))
+
+
+def format_dependencies(links):
+    """Links in the Gantt sheet notation, e.g. "12FS, 15SS+2" """
+    return ', '.join(f"{task_id}{link_type}{lag:+g}" if lag else f"{task_id}{link_type}"
+                     for task_id, link_type, lag in links)
+
+
+def local_links(project):
+    """{task UID: [(predecessor ID, type, lag)]} for links inside one project"""
+    ids = {task['UID']: task['ID'] for task in project['tasks']}
+    return {
+        task['UID']: [(ids[uid], link_type, lag) for uid, link_type, lag, _ in task['Links'] if uid in ids]
+        for task in project['tasks']
+    }
+
+
+def consolidate(projects):
+    """Merge projects into one plan with unique task IDs and resolved cross-project links
+
+    Returns (tasks, mapping, stats). Each task record gains 'Project',
+    'Task ID' (the consolidated ID) and 'Dependencies'. A task keeps its
+    own ID unless an earlier project already used it, in which case it
+    gets the next free ID; ``mapping`` lists every (project, UID, ID) ->
+    Task ID. Cross-project predecessors ("Vendor.mpp\\12") resolve through
+    the same index; ghost tasks that mirror another project's task are
+    dropped when that project is part of the batch. A master project's
+    inserted-subproject row is replaced in place by the subproject's
+    tasks: links to it attach to the subproject's last tasks, and its own
+    predecessors to the subproject's first tasks. Inserted tasks are
+    shifted to nest at the replaced row's outline level.
+    """
+    by_key = {project['key']: project for project in projects}
+    next_free = max((task['ID'] for project in projects for task in project['tasks']), default=0) + 1
+    uid_index = {}
+    id_index = {}
+    used = set()
+    placeholders = {}
+    stats = {'projects': len(projects), 'remapped': 0, 'cross_project_links': 0, 'unresolved_links': 0,
+             'subprojects': 0}
+
+    # Pass 1: consolidated IDs for every task that stays in the plan
+    for project in projects:
+        key = project['key']
+        for task in project['tasks']:
+            subproject = project_key(task['Subproject']) if task['Subproject'] else None
+            if subproject in by_key and subproject != key:
+                placeholders[(key, task['UID'])] = subproject
+                continue
+            if task['External'] and project_key(task['ExternalProject'] or '') in by_key:
+                continue
+            task_id = task['ID']
+            if task_id in used:
+                task_id = next_free
+                next_free += 1
+                stats['remapped'] += 1
+            used.add(task_id)
+            uid_index[(key, task['UID'])] = task_id
+            id_index[(key, task['ID'])] = task_id
+    stats['subprojects'] = len(placeholders)
+
+    # First/last tasks of each project stand in for its subproject row
+    has_successor = set()
+    for project in projects:
+        for task in project['tasks']:
+            has_successor.update((project['key'], uid) for uid, _, _, cross in task['Links'] if not cross)
+    ends = {}
+    starts = {}
+    for project in projects:
+        key = project['key']
+        kept = [task for task in project['tasks'] if (key, task['UID']) in uid_index and not task['Summary']]
+        ends[key] = [uid_index[(key, t['UID'])] for t in kept if (key, t['UID']) not in has_successor]
+        starts[key] = [uid_index[(key, t['UID'])] for t in kept
+                       if not any((key, uid) in uid_index for uid, _, _, cross in t['Links'] if not cross)]
+
+    def resolve(key, uid, cross):
+        """Consolidated predecessor IDs of one link (several for a subproject row)"""
+        if cross:
+            match = CROSS_PROJECT_PATTERN.match(cross)
+            target = match and id_index.get((project_key(match.group(1)), int(match.group(2))))
+            if target:
+                stats['cross_project_links'] += 1
+                return [target]
+        if (key, uid) in placeholders:
+            return ends[placeholders[(key, uid)]]
+        return [uid_index[(key, uid)]] if (key, uid) in uid_index else []
+
+    # Pass 2: rewrite links in consolidated IDs
+    extra_links = {}
+    for project in projects:
+        key = project['key']
+        for task in project['tasks']:
+            if (key, task['UID']) in placeholders:
+                inherited = [(target, link_type, lag) for uid, link_type, lag, cross in task['Links']
+                             for target in resolve(key, uid, cross)]
+                for first in starts[placeholders[(key, task['UID'])]]:
+                    extra_links.setdefault(first, []).extend(inherited)
+
+    tasks = []
+    mapping = []
+    emitted = set()
+
+    def emit(project, level_offset=0):
+        """Append a project's rows, inserting subprojects where the master references them"""
+        key = project['key']
+        emitted.add(key)
+        for task in project['tasks']:
+            level = task['OutlineLevel']
+            subproject = placeholders.get((key, task['UID']))
+            if subproject is not None:
+                if subproject not in emitted:
+                    # The subproject's summary task (level 0), or its top-level tasks, take the row's level
+                    inserted = by_key[subproject]['tasks']
+                    has_root = any(t['OutlineLevel'] == 0 for t in inserted)
+                    base = (level or 1) + level_offset
+                    emit(by_key[subproject], base if has_root else base - 1)
+                continue
+            task_id = uid_index.get((key, task['UID']))
+            if task_id is None:
+                continue
+            links = []
+            for uid, link_type, lag, cross in task['Links']:
+                targets = resolve(key, uid, cross)
+                if not targets:
+                    stats['unresolved_links'] += 1
+                links.extend((target, link_type, lag) for target in targets)
+            links.extend(extra_links.get(task_id, []))
+            tasks.append(dict(task, **{'Project': key, 'Task ID': task_id,
+                                       'Dependencies': format_dependencies(links),
+                                       'OutlineLevel': level + level_offset if level is not None else None}))
+            mapping.append({'Project': key, 'UID': task['UID'], 'ID': task['ID'], 'Task ID': task_id})
+
+    for project in projects:
+        if project['key'] not in emitted:
+            emit(project)
+    return tasks, mapping, stats
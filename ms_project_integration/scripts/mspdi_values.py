@@ -0,0 +1,113 @@
+"""
+MSPDI Value Parsing
+ISO-8601 durations and date-times as written by MS Project XML, memoised for repeated literals
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# PnYnMnWnDTnHnMnS; every component optional and fractional
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+DURATION_RE = re.compile(
+    r'^\s*(-)?P'
+    rf'(?:{_NUMBER}Y)?(?:{_NUMBER}M)?(?:{_NUMBER}W)?(?:{_NUMBER}D)?'
+    rf'(?:T(?:{_NUMBER}H)?(?:{_NUMBER}M)?(?:{_NUMBER}S)?)?\s*$',
+    re.IGNORECASE
+)
+
+DATETIME_RE = re.compile(
+    r'^\s*(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d{1,6})\d*)?)?)?'
+    r'(Z|[+-]\d{2}:?\d{2})?\s*$'
+)
+
+# MSPDI DurationFormat codes -> (unit, elapsed); 35-53 are the estimated ("?") variants
+DURATION_FORMATS = {
+    3: ('minutes', False), 4: ('minutes', True),
+    5: ('hours', False), 6: ('hours', True),
+    7: ('days', False), 8: ('days', True),
+    9: ('weeks', False), 10: ('weeks', True),
+    11: ('months', False), 12: ('months', True),
+    19: ('percent', False), 20: ('percent', True),
+    21: ('null', False),
+}
+DURATION_FORMATS.update({code + 32: unit for code, unit in DURATION_FORMATS.items() if code <= 12})
+DURATION_FORMATS.update({51: ('percent', False), 52: ('percent', True), 53: ('null', False)})
+
+MINUTES_PER_DAY = 480
+MINUTES_PER_WEEK = 2400
+DAYS_PER_MONTH = 20
+
+ELAPSED_MINUTES_PER_DAY = 1440
+
+CACHE_SIZE = 4096
+
+
+def is_elapsed(duration_format):
+    """True when a DurationFormat code denotes elapsed (24x7) time"""
+    try:
+        return DURATION_FORMATS.get(int(duration_format), ('days', False))[1]
+    except (TypeError, ValueError):
+        return False
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def duration_minutes(text, elapsed=False, minutes_per_day=MINUTES_PER_DAY,
+                     minutes_per_week=MINUTES_PER_WEEK, days_per_month=DAYS_PER_MONTH):
+    """Minutes in an ISO-8601 duration (None if the text is not one)
+
+    Time components (H/M/S) are absolute. Date components follow MS
+    Project units: for work durations a day is ``minutes_per_day``, a week
+    ``minutes_per_week`` and a month ``days_per_month`` days; elapsed
+    durations use 24-hour days, 7-day weeks and 30-day months. A year is
+    twelve months either way.
+    """
+    match = DURATION_RE.match(text) if text else None
+    if not match or match.group(0).strip().upper() in ('P', 'PT', '-P', '-PT'):
+        return None
+    sign, years, months, weeks, days, hours, minutes, seconds = match.groups()
+    if elapsed:
+        day, week, month = ELAPSED_MINUTES_PER_DAY, 7 * ELAPSED_MINUTES_PER_DAY, 30 * ELAPSED_MINUTES_PER_DAY
+    else:
+        day, week, month = minutes_per_day, minutes_per_week, days_per_month * minutes_per_day
+
+    total = 0.0
+    for value, scale in ((years, 12 * month), (months, month), (weeks, week), (days, day),
+                         (hours, 60), (minutes, 1), (seconds, 1 / 60)):
+        if value:
+            total += float(value.replace(',', '.')) * scale
+    return -total if sign else total
+
+
+def duration_days(text, duration_format=None, minutes_per_day=MINUTES_PER_DAY,
+                  minutes_per_week=MINUTES_PER_WEEK, days_per_month=DAYS_PER_MONTH):
+    """Duration in days (working days, or calendar days for elapsed formats); 0 if unparseable
+
+    MSPDI stores every duration as PT<h>H<m>M<s>S of work (or elapsed)
+    time; ``duration_format`` is the task's DurationFormat code and only
+    decides whether the hours are spread over working or 24-hour days.
+    """
+    elapsed = is_elapsed(duration_format)
+    minutes = duration_minutes(text, elapsed, minutes_per_day, minutes_per_week, days_per_month)
+    if minutes is None:
+        return 0
+    return minutes / (ELAPSED_MINUTES_PER_DAY if elapsed else minutes_per_day)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_datetime(text):
+    """datetime for an ISO-8601 date or date-time, time of day included (None if unparseable)
+
+    MSPDI times are project-local wall-clock times, so a trailing UTC
+    offset is accepted but not applied; Excel cells cannot hold one.
+    """
+    match = DATETIME_RE.match(text) if text else None
+    if not match:
+        return None
+    year, month, day, hour, minute, second, fraction, _ = match.groups()
+    try:
+        return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                        int(second or 0), int(fraction.ljust(6, '0')) if fraction else 0)
+    except ValueError:
+        return None
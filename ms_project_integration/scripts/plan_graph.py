@@ -0,0 +1,396 @@
+"""
+Plan Graph and What-If Scenarios
+Dependency graph, working-day calendar and copy-on-write scenarios for Gantt plans
+"""
+
+import logging
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Link type codes used in the edge arrays
+LINK_TYPES = {'FS': 0, 'SS': 1, 'FF': 2, 'SF': 3}
+
+# "12", "12FS", "3SS+2", "7FF-1d", "9 SF + 3 days"; IDs may carry a label ("T1", "#4", "Task 5") or
+# a zero fraction ("2.0"), which the digit-filter parser GanttCalculator used before also accepted
+DEPENDENCY_PATTERN = re.compile(
+    r'^\s*(?:[a-z_#]+[\s#:-]*)?(\d+)(?:\.0+)?\s*(FS|SS|FF|SF)?'
+    r'\s*(?:([+-])\s*(\d+(?:\.\d+)?)\s*(?:d|day|days)?)?\s*$', re.IGNORECASE)
+
+_UNPARSED = set()
+
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+EPOCH = np.datetime64('2000-01-03', 'D')  # a Monday
+
+
+def parse_dependencies(text):
+    """[(predecessor id, link type, lag in days)] from a Dependencies cell
+
+    Unparseable parts are skipped (with a warning, once per text, when
+    they contain a number), so "3SS+2" is task 3 with a 2 day lag rather
+    than task 32.
+    """
+    links = []
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return links
+    if isinstance(text, (int, float)):
+        return [(int(text), 'FS', 0)]
+    for part in str(text).split(','):
+        match = DEPENDENCY_PATTERN.match(part)
+        if not match:
+            part = part.strip()
+            if any(c.isdigit() for c in part) and part not in _UNPARSED:
+                _UNPARSED.add(part)
+                logging.warning(f"Ignoring unrecognised dependency '{part}' in '{text}'")
+            continue
+        task_id, link_type, sign, lag = match.groups()
+        lag_days = float(lag) if lag else 0
+        links.append((int(task_id), (link_type or 'FS').upper(), -lag_days if sign == '-' else lag_days))
+    return links
+
+
+def task_key(task_id):
+    """Task IDs from Excel may be 3, 3.0 or "3"; dependencies always name integers"""
+    try:
+        value = float(task_id)
+    except (TypeError, ValueError):
+        return task_id
+    return int(value) if value.is_integer() else task_id
+
+
+class WorkCalendar:
+    """Working-day arithmetic on integer ordinals (working days since a fixed Monday)"""
+
+    def __init__(self, working_weekdays=(0, 1, 2, 3, 4), holidays=()):
+        self.weekmask = [1 if day in working_weekdays else 0 for day in range(7)]
+        self.holidays = np.array(sorted(pd.to_datetime(list(holidays)).to_numpy('datetime64[D]')), dtype='datetime64[D]')
+        self.calendar = np.busdaycalendar(weekmask=self.weekmask, holidays=self.holidays)
+
+    @classmethod
+    def from_config(cls, working_days, holidays=()):
+        """Calendar from the config "working_days" {weekday name: bool} mapping"""
+        return cls([WEEKDAY_NAMES.index(day) for day, working in working_days.items() if working], holidays)
+
+    def to_ordinal(self, dates):
+        """Working-day ordinal of each date; a non-working day maps to the next working day"""
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        return np.busday_count(EPOCH, dates, busdaycal=self.calendar)
+
+    def to_date(self, ordinals):
+        """Dates of working-day ordinals"""
+        return np.busday_offset(EPOCH, np.asarray(ordinals, dtype=np.int64), roll='forward', busdaycal=self.calendar)
+
+    def add_working_days(self, dates, days):
+        """Dates moved ``days`` working days on; days=0 keeps the date (as GanttCalculator did)"""
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        days = np.asarray(days, dtype=np.int64)
+        moved = np.busday_offset(dates, days, roll='backward', busdaycal=self.calendar)
+        return np.where(days == 0, dates, moved)
+
+
+def calendars_from_rows(rows):
+    """{Calendar UID: WorkCalendar} from 'Calendars' sheet rows, as written by the MS Project importer
+
+    'Working Days' lists weekday abbreviations ("Mon, Tue, ...") and
+    'Non-working Dates' ISO dates. Extra working dates ('Working Dates')
+    cannot be expressed by a weekmask calendar and are not applied.
+    """
+    calendars = {}
+    for row in rows:
+        uid = task_key(row.get('Calendar UID'))
+        if uid is None:
+            continue
+        days = [part.strip().lower()[:3] for part in str(row.get('Working Days') or '').split(',')]
+        weekdays = [i for i, name in enumerate(WEEKDAY_NAMES) if name[:3] in days]
+        holidays = [part.strip() for part in str(row.get('Non-working Dates') or '').split(',') if part.strip()]
+        calendars[uid] = WorkCalendar(weekdays, holidays)
+    return calendars
+
+
+class PlanIndex:
+    """Arrays for one loaded plan: task order, durations, starts, edges and topological levels
+
+    Built once per plan; scenarios only copy the small arrays they change.
+    ``groups`` maps IDs that are not scheduled themselves (summary tasks)
+    to the task IDs they stand for; a link from a group applies to each
+    member, which is exact for FS/FF links and conservative for SS/SF.
+    """
+
+    def __init__(self, tasks, calendar, as_of=None, groups=None):
+        self.calendar = calendar
+        self.ids = list(tasks)
+        self.position = {task_key(task_id): i for i, task_id in enumerate(self.ids)}
+        n = len(self.ids)
+        today = np.datetime64((pd.Timestamp(as_of) if as_of else pd.Timestamp(datetime.now())).date(), 'D')
+
+        self.durations = np.array([self._duration(tasks[t].get('Duration (Days)')) for t in self.ids], dtype=np.int64)
+        starts = pd.to_datetime(pd.Series([tasks[t].get('Start Date') for t in self.ids], dtype=object), errors='coerce')
+        start_days = starts.to_numpy('datetime64[D]')
+        self.starts = calendar.to_ordinal(np.where(np.isnat(start_days), today, start_days))
+        self.resources = np.array([self._resource_count(tasks[t].get('Assigned To')) for t in self.ids], dtype=np.int64)
+
+        preds, succs, types, lags = [], [], [], []
+        self.unknown_links = 0
+        for succ, task_id in enumerate(self.ids):
+            for pred_id, link_type, lag in parse_dependencies(tasks[task_id].get('Dependencies')):
+                for member in (groups or {}).get(pred_id, (pred_id,)):
+                    pred = self.position.get(task_key(member))
+                    if pred is None or pred == succ:
+                        self.unknown_links += 1
+                        continue
+                    preds.append(pred)
+                    succs.append(succ)
+                    types.append(LINK_TYPES[link_type])
+                    lags.append(int(round(lag)))
+        self.edge_pred = np.array(preds, dtype=np.int64)
+        self.edge_succ = np.array(succs, dtype=np.int64)
+        self.edge_type = np.array(types, dtype=np.int8)
+        self.edge_lag = np.array(lags, dtype=np.int64)
+        self.levels = self._levels(n)
+
+        # Edges grouped by the level of their successor, for level-at-a-time passes
+        edge_level = self.levels[self.edge_succ]
+        order = np.argsort(edge_level, kind='stable')
+        bounds = np.searchsorted(edge_level[order], np.arange(self.levels.max(initial=0) + 2))
+        self.edges_by_level = [order[bounds[level]:bounds[level + 1]] for level in range(len(bounds) - 1)]
+
+    @staticmethod
+    def _duration(value):
+        try:
+            return max(int(float(value)), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def _resource_count(value):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return 1
+        return max(len([name for name in str(value).split(',') if name.strip()]), 1)
+
+    def _levels(self, n):
+        """Longest-path depth of every task (Kahn's algorithm); raises ValueError on cycles"""
+        indegree = np.bincount(self.edge_succ, minlength=n)
+        order = np.argsort(self.edge_pred, kind='stable')
+        bounds = np.searchsorted(self.edge_pred[order], np.arange(n + 1))
+        levels = np.zeros(n, dtype=np.int64)
+        frontier = np.flatnonzero(indegree == 0)
+        seen = 0
+        while len(frontier):
+            seen += len(frontier)
+            edges = np.concatenate([order[bounds[p]:bounds[p + 1]] for p in frontier])
+            if not len(edges):
+                break
+            targets = self.edge_succ[edges]
+            np.maximum.at(levels, targets, levels[self.edge_pred[edges]] + 1)
+            np.subtract.at(indegree, targets, 1)
+            frontier = np.unique(targets[indegree[targets] == 0])
+        if seen < n:
+            cyclic = [self.ids[i] for i in np.flatnonzero(indegree > 0)[:10]]
+            raise ValueError(f"Dependency cycle involving tasks {cyclic}")
+        return levels
+
+    def task_positions(self, task_ids):
+        """Positions of task IDs; raises KeyError for unknown IDs"""
+        try:
+            return np.array([self.position[task_key(task_id)] for task_id in task_ids], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError(f"Unknown task ID {e.args[0]}") from None
+
+    def schedule(self, durations=None, delays=None):
+        """Forward and backward pass; returns (early start, early finish, total float) ordinals
+
+        Lags are in working days. A task with predecessors starts at its
+        latest link constraint (FS: day after the predecessor finishes);
+        without predecessors at its own start date. ``delays`` pushes
+        individual starts later.
+        """
+        dur = self.durations if durations is None else durations
+        start = self.starts + (0 if delays is None else delays)
+        finish = start + dur
+        pred, succ, kind, lag = self.edge_pred, self.edge_succ, self.edge_type, self.edge_lag
+
+        for edges in self.edges_by_level[1:]:
+            if not len(edges):
+                continue
+            p, s, k, g = pred[edges], succ[edges], kind[edges], lag[edges]
+            bound = np.select(
+                [k == 0, k == 1, k == 2],
+                [finish[p] + 1 + g, start[p] + g, finish[p] + g - dur[s]],
+                start[p] + g - dur[s])
+            targets = np.unique(s)
+            constrained = np.full(len(start), np.iinfo(np.int64).min)
+            np.maximum.at(constrained, s, bound)
+            start[targets] = constrained[targets] + (0 if delays is None else delays[targets])
+            finish[targets] = start[targets] + dur[targets]
+
+        project_finish = finish.max(initial=0)
+        late_finish = np.full(len(start), project_finish, dtype=np.int64)
+        for edges in reversed(self.edges_by_level[1:]):
+            if not len(edges):
+                continue
+            p, s, k, g = pred[edges], succ[edges], kind[edges], lag[edges]
+            late_start_s = late_finish[s] - dur[s]
+            bound = np.select(
+                [k == 0, k == 1, k == 2],
+                [late_start_s - 1 - g, late_start_s - g + dur[p], late_finish[s] - g],
+                late_finish[s] - g + dur[p])
+            np.minimum.at(late_finish, p, bound)
+        total_float = late_finish - finish
+        return start, finish, total_float
+
+
+class Scenario:
+    """Copy-on-write view of a plan: only overridden task fields are stored
+
+    Overrides are keyed by task ID: ``delay`` (working days added to the
+    start), ``duration`` (working days) and ``resources`` (assigned
+    people; duration scales with base resources / new resources).
+    """
+
+    def __init__(self, name, index):
+        self.name = name
+        self.index = index
+        self.overrides = {}
+
+    def _set(self, task_ids, field, value_fn):
+        for task_id, pos in zip(task_ids, self.index.task_positions(task_ids)):
+            fields = self.overrides.setdefault(task_key(task_id), {})
+            fields[field] = value_fn(int(pos), fields.get(field))
+        return self
+
+    def get(self, task_id, field):
+        """Overridden value of a field, or None when the base plan applies"""
+        return self.overrides.get(task_key(task_id), {}).get(field)
+
+    def slip(self, task_ids, days):
+        """Delay the start of tasks by ``days`` working days"""
+        return self._set(task_ids, 'delay', lambda pos, current: (current or 0) + int(days))
+
+    def set_duration(self, task_ids, days):
+        """Set the duration of tasks in working days"""
+        return self._set(task_ids, 'duration', lambda pos, current: max(int(days), 0))
+
+    def crash(self, task_ids, days=None, percent=None):
+        """Shorten tasks by ``days`` or ``percent`` (never below one day for non-milestones)"""
+        def shortened(pos, current):
+            base = self.index.durations[pos] if current is None else current
+            target = base - days if days is not None else math.ceil(base * (1 - percent / 100))
+            return max(target, min(base, 1))
+        return self._set(task_ids, 'duration', shortened)
+
+    def add_resources(self, task_ids, count=1):
+        """Add people to tasks; durations shrink in proportion"""
+        return self._set(task_ids, 'resources',
+                         lambda pos, current: (current or self.index.resources[pos]) + int(count))
+
+    def arrays(self):
+        """(durations, delays) with overrides applied to copies of the base arrays"""
+        durations = self.index.durations.copy()
+        delays = np.zeros(len(durations), dtype=np.int64)
+        for task_id, fields in self.overrides.items():
+            pos = self.index.position[task_id]
+            if 'duration' in fields:
+                durations[pos] = fields['duration']
+            if 'resources' in fields:
+                durations[pos] = math.ceil(durations[pos] * self.index.resources[pos] / fields['resources'])
+            delays[pos] = fields.get('delay', 0)
+        return durations, delays
+
+    @classmethod
+    def from_spec(cls, name, spec, index):
+        """Scenario from text such as "slip 42 5; crash 10-19 20%; resource 7 1; duration 3 10" """
+        scenario = cls(name, index)
+        for action in filter(None, (part.strip() for part in spec.split(';'))):
+            words = action.split()
+            if len(words) != 3:
+                raise ValueError(f"Expected '<action> <task ids> <value>', got '{action}'")
+            verb, ids, value = words[0].lower(), expand_ids(words[1], index.position), words[2]
+            if verb == 'slip':
+                scenario.slip(ids, int(value))
+            elif verb == 'duration':
+                scenario.set_duration(ids, int(value))
+            elif verb == 'crash':
+                if value.endswith('%'):
+                    scenario.crash(ids, percent=float(value[:-1]))
+                else:
+                    scenario.crash(ids, days=int(value))
+            elif verb in ('resource', 'resources'):
+                scenario.add_resources(ids, int(value))
+            else:
+                raise ValueError(f"Unknown scenario action '{verb}'")
+        return scenario
+
+
+def expand_ids(text, known=None):
+    """Task IDs from "3", "3,5,9" or "10-19" (and combinations)
+
+    Ranges only include IDs in ``known`` when it is given (plans need not
+    number tasks contiguously); single IDs are always kept.
+    """
+    ids = []
+    for part in text.split(','):
+        if '-' in part:
+            low, high = part.split('-', 1)
+            ids.extend(i for i in range(int(low), int(high) + 1) if known is None or i in known)
+        elif part:
+            ids.append(int(part))
+    return ids
+
+
+# The worker's copy of the plan index (set once per process by the pool initializer)
+_worker_index = None
+
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _evaluate(name, overrides):
+    scenario = Scenario(name, _worker_index)
+    scenario.overrides = overrides
+    durations, delays = scenario.arrays()
+    start, finish, total_float = _worker_index.schedule(durations, delays)
+    return name, finish.max(initial=0), np.flatnonzero(total_float <= 0), start, finish
+
+
+def compare_scenarios(index, scenarios, max_workers=None, executor='process'):
+    """Evaluate scenarios concurrently against the base plan; one comparison row per scenario
+
+    The plan index is sent to each worker once; each scenario only ships
+    its overrides.
+    """
+    workers = max_workers or min(len(scenarios), os.cpu_count() or 1) or 1
+    pool_class = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    jobs = [('Base', {})] + [(scenario.name, scenario.overrides) for scenario in scenarios]
+    if executor == 'process':
+        pool = pool_class(max_workers=workers, initializer=_init_worker, initargs=(index,))
+    else:
+        _init_worker(index)
+        pool = pool_class(max_workers=workers)
+    with pool:
+        results = list(pool.map(_evaluate, *zip(*jobs)))
+
+    _, base_finish, base_critical, _, base_finishes = results[0]
+    base_set = set(base_critical.tolist())
+    calendar = index.calendar
+    rows = []
+    for name, finish, critical, start, finishes in results:
+        critical_set = set(critical.tolist())
+        rows.append({
+            'Scenario': name,
+            'Project Finish': pd.Timestamp(calendar.to_date(finish)),
+            'Finish Delta (working days)': int(finish - base_finish),
+            'Finish Delta (days)': int((calendar.to_date(finish) - calendar.to_date(base_finish)).astype(int)),
+            'Critical Tasks': len(critical_set),
+            'Critical Added': ', '.join(str(index.ids[i]) for i in sorted(critical_set - base_set)),
+            'Critical Removed': ', '.join(str(index.ids[i]) for i in sorted(base_set - critical_set)),
+            'Tasks Moved': int((finishes != base_finishes).sum()),
+        })
+    return pd.DataFrame(rows)
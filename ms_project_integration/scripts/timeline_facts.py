@@ -0,0 +1,306 @@
+"""
+Timeline Fact Table Builder
+Writes the Gantt chart as date-partitioned fact and task/date bridge tables for Power BI
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import hashlib
+import logging
+import json
+import os
+import shutil
+import sys
+import argparse
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Configuration loading
+def load_config():
+    """Load configuration from JSON file"""
+    config_path = os.path.join(os.path.dirname(__file__), 'config_msproject.json')
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+CONFIG = load_config()
+
+# Shared helpers live in the automation folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'automation'))
+import log_setup
+from instrumentation import PipelineMetrics
+from profiling import profile_run
+
+# Logging setup
+def setup_logging():
+    """Set up queued logging (file/console writes on a background thread)"""
+    settings = CONFIG['logging']
+    log_setup.setup_logging(
+        settings['level'],
+        settings['file'],
+        console=settings['console'],
+        fmt=settings.get('format', 'text'),
+        summary_after=settings.get('summary_after', 20)
+    )
+
+setup_logging()
+metrics = PipelineMetrics.from_config('timeline_facts', CONFIG.get('instrumentation'))
+
+MANIFEST_VERSION = 1
+UNDATED = 'undated'
+
+DAY_MAP = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+
+
+def _yes_no(flags):
+    return np.where(flags, 'Yes', 'No')
+
+
+def compute_facts(df):
+    """Gantt rows plus the date-independent columns Timeline_Queries.txt adds in Power Query
+
+    Task Duration Days and Is Milestone, with the M code's definitions.
+    The columns that depend on today's date are in ``status_rows`` so
+    that the fact partitions only change when the plan does.
+    """
+    facts = df[df['Task ID'].notna()].copy()
+    facts['Start Date'] = pd.to_datetime(facts['Start Date'], errors='coerce').dt.normalize()
+    facts['Finish Date'] = pd.to_datetime(facts['Finish Date'], errors='coerce').dt.normalize()
+
+    facts['Task Duration Days'] = (facts['Finish Date'] - facts['Start Date']).dt.days.astype('Int64')
+    facts['Is Milestone'] = _yes_no(pd.to_numeric(facts['Duration (Days)'], errors='coerce').eq(0).to_numpy())
+    return facts.reset_index(drop=True)
+
+
+def status_rows(facts, as_of):
+    """Per task: Is Overdue, Days Remaining and Is Active as of a date (one small table per run)
+
+    Same definitions as the M code, evaluated for ``as_of`` instead of
+    DateTime.LocalNow().
+    """
+    today = pd.Timestamp(as_of).normalize()
+    open_task = (facts['Status'].astype(str) != 'Completed').to_numpy()
+    start = facts['Start Date']
+    finish = facts['Finish Date']
+    return pd.DataFrame({
+        'Task ID': facts['Task ID'].to_numpy(),
+        'As Of Date': today,
+        'Is Overdue': _yes_no((finish < today).to_numpy() & open_task),
+        'Days Remaining': (finish - today).dt.days.astype('Int64').to_numpy(),
+        'Is Active': _yes_no((start <= today).to_numpy() & (finish >= today).to_numpy() & open_task),
+    })
+
+
+def bridge_rows(facts, working_days=None):
+    """One row per task and calendar day from Start Date to Finish Date (inclusive)"""
+    dated = facts[facts['Start Date'].notna() & facts['Finish Date'].notna()]
+    start = dated['Start Date'].to_numpy('datetime64[D]')
+    days = np.maximum((dated['Finish Date'].to_numpy('datetime64[D]') - start).astype(np.int64) + 1, 1)
+
+    # Offsets 0..days-1 for every task, built without a Python loop
+    task_pos = np.repeat(np.arange(len(dated)), days)
+    offsets = np.arange(days.sum()) - np.repeat(np.cumsum(days) - days, days)
+    dates = start[task_pos] + offsets
+    weekday = (dates.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    working = np.isin(weekday, working_days if working_days is not None else [0, 1, 2, 3, 4])
+
+    return pd.DataFrame({
+        'Task ID': dated['Task ID'].to_numpy()[task_pos],
+        'Date': dates,
+        'Task Day': offsets + 1,
+        'Is Working Day': _yes_no(working),
+        'Is Weekend': _yes_no(weekday >= 5),
+    })
+
+
+def partition_keys(dates, grain='month'):
+    """Partition label per row: 'YYYY-MM' (month), 'YYYY' (year) or 'YYYY-MM-DD' (day); undated rows share one"""
+    fmt = {'year': '%Y', 'day': '%Y-%m-%d'}.get(grain, '%Y-%m')
+    return dates.dt.strftime(fmt).fillna(UNDATED)
+
+
+def frame_digest(frame):
+    """Content hash of a partition, independent of row index"""
+    hashed = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes() + ','.join(frame.columns).encode()).hexdigest()[:16]
+
+
+class PartitionedTableWriter:
+    """Writes tables as Hive-style partition folders, skipping partitions whose content is unchanged
+
+    Layout: <root>/<table>/<key>=<partition>/part-0.parquet (CSV when
+    pyarrow is not installed), with a manifest of per-partition digests
+    in <root>/manifest.json.
+    """
+
+    def __init__(self, root, fmt='parquet'):
+        self.root = root
+        if fmt == 'parquet' and pyarrow is None:
+            logging.info("pyarrow not installed; writing timeline tables as CSV")
+            fmt = 'csv'
+        self.fmt = fmt
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {'version': MANIFEST_VERSION, 'format': self.fmt, 'tables': {}}
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('format') != self.fmt:
+            logging.info("Timeline manifest format changed; rewriting all partitions")
+            return {'version': MANIFEST_VERSION, 'format': self.fmt, 'tables': {}}
+        return manifest
+
+    def write(self, table, frame, keys, key_name):
+        """Write changed partitions of one table; returns (written, unchanged, removed) counts"""
+        previous = self.manifest['tables'].get(table, {})
+        current = {}
+        written = unchanged = 0
+        table_dir = os.path.join(self.root, table)
+
+        for partition, part in frame.groupby(keys, sort=True):
+            part = part.reset_index(drop=True)
+            folder = f'{key_name}={partition}'
+            digest = frame_digest(part)
+            path = os.path.join(table_dir, folder, f'part-0.{self.fmt}')
+            current[folder] = {'digest': digest, 'rows': int(len(part)), 'file': os.path.relpath(path, self.root)}
+            if previous.get(folder, {}).get('digest') == digest and os.path.exists(path):
+                unchanged += 1
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            if self.fmt == 'parquet':
+                part.to_parquet(tmp_path, index=False)
+            else:
+                part.to_csv(tmp_path, index=False, date_format='%Y-%m-%d')
+            os.replace(tmp_path, path)
+            written += 1
+
+        removed = 0
+        for folder in set(previous) - set(current):
+            shutil.rmtree(os.path.join(table_dir, folder), ignore_errors=True)
+            removed += 1
+
+        self.manifest['tables'][table] = current
+        return written, unchanged, removed
+
+    def save_manifest(self, **extra):
+        """Write the manifest atomically (temp file + rename)"""
+        self.manifest.update(extra)
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+class TimelineFactBuilder:
+    """Builds the timeline fact, bridge and status tables from a Gantt Chart sheet"""
+
+    def __init__(self, excel_file_path, sheet_name='Gantt Chart', settings=None, as_of=None):
+        self.excel_file_path = excel_file_path
+        self.sheet_name = sheet_name
+        self.settings = settings or CONFIG.get('timeline_facts', {})
+        self.as_of = pd.Timestamp(as_of).normalize() if as_of else pd.Timestamp(datetime.now().date())
+        self.working_days = [DAY_MAP[day] for day, working in CONFIG.get('working_days', {}).items() if working]
+        self.facts = None
+        self.bridge = None
+        self.status = None
+        self.result = None
+
+    def load_tasks(self):
+        """Read the Gantt sheet and compute the derived columns"""
+        try:
+            logging.info(f"Loading tasks from: {self.excel_file_path}")
+            with metrics.stage('load_workbook'):
+                df = pd.read_excel(self.excel_file_path, sheet_name=self.sheet_name)
+            with metrics.stage('derive_columns', tasks=len(df)):
+                self.facts = compute_facts(df)
+                self.status = status_rows(self.facts, self.as_of)
+            with metrics.stage('bridge', tasks=len(self.facts)):
+                self.bridge = bridge_rows(self.facts, self.working_days)
+            logging.info(f"Loaded {len(self.facts)} tasks ({len(self.bridge)} task-days)")
+            return True
+
+        except Exception as e:
+            logging.error(f"Error loading tasks: {e}")
+            return False
+
+    def write(self, output_dir=None):
+        """Write the tables; only changed partitions are rewritten"""
+        try:
+            grain = self.settings.get('partition', 'month')
+            writer = PartitionedTableWriter(output_dir or self.settings.get('output_dir', './exports/timeline/'),
+                                            self.settings.get('format', 'parquet'))
+            key = 'start_year' if grain == 'year' else 'start_month'
+            date_key = 'year' if grain == 'year' else 'month'
+
+            with metrics.stage('write_partitions', table='timeline_facts'):
+                facts = writer.write('timeline_facts', self.facts,
+                                     partition_keys(self.facts['Start Date'], grain), key)
+            with metrics.stage('write_partitions', table='timeline_task_days'):
+                bridge = writer.write('timeline_task_days', self.bridge,
+                                      partition_keys(pd.Series(self.bridge['Date']), grain), date_key)
+            # One partition per as-of date; the previous day's is removed
+            with metrics.stage('write_partitions', table='timeline_status'):
+                status = writer.write('timeline_status', self.status,
+                                      partition_keys(self.status['As Of Date'], 'day'), 'as_of')
+            writer.save_manifest(as_of=self.as_of.strftime('%Y-%m-%d'), source=os.path.abspath(self.excel_file_path))
+
+            counts = {'timeline_facts': facts, 'timeline_task_days': bridge, 'timeline_status': status}
+            for table, (written, unchanged, removed) in counts.items():
+                logging.info(f"{table}: {written} partitions written, {unchanged} unchanged, {removed} removed")
+            self.result = dict(counts, root=writer.root)
+            return True
+
+        except Exception as e:
+            logging.error(f"Error writing timeline tables: {e}")
+            return False
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description='Write Power BI timeline fact and task/date bridge tables')
+    parser.add_argument('--input', '-i', required=True, help='Path to Excel Gantt chart file')
+    parser.add_argument('--output', '-o', help='Output folder (default: timeline_facts.output_dir)')
+    parser.add_argument('--sheet', '-s', default='Gantt Chart', help='Excel sheet name (default: Gantt Chart)')
+    parser.add_argument('--as-of', help='Date the timeline_status table (Is Overdue, Days Remaining, Is Active) '
+                                        'refers to (default: today)')
+    parser.add_argument('--profile', action='store_true', help='Profile this run and write reports next to the log file')
+
+    args = parser.parse_args()
+
+    log_dir = os.path.dirname(os.path.abspath(CONFIG['logging']['file']))
+    with profile_run('timeline_facts', log_dir, enabled=args.profile, settings=CONFIG.get('profiling')):
+        run(args)
+
+    metrics.flush()
+
+def run(args):
+    """Run the command for parsed arguments"""
+    # Validate input file
+    if not os.path.exists(args.input):
+        logging.error(f"Input file not found: {args.input}")
+        return
+
+    builder = TimelineFactBuilder(args.input, args.sheet, as_of=args.as_of)
+
+    if builder.load_tasks():
+        if builder.write(args.output):
+            print(f"Successfully wrote timeline tables to {builder.result['root']}")
+            print(f"   Tasks: {len(builder.facts)}")
+            print(f"   Task-days: {len(builder.bridge)}")
+        else:
+            print("Failed to write timeline tables")
+    else:
+        print("Failed to load tasks")
+
+if __name__ == "__main__":
+    main()
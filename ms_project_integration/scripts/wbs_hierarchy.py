@@ -0,0 +1,212 @@
+"""
+WBS Hierarchy
+Outline tree of a task list and bottom-up summary-task rollups, both in linear time
+"""
+
+
+def outline_level(outline_number):
+    """Outline level of a WBS number: "3" -> 1, "3.2.1" -> 3, "0" -> 0 (project summary)"""
+    text = str(outline_number).strip() if outline_number is not None else ''
+    if not text:
+        return None
+    if text == '0':
+        return 0
+    return text.count('.') + 1
+
+
+def _missing(value):
+    """None, NaN or NaT (the only values not equal to themselves)"""
+    return value is None or value != value
+
+
+class WbsHierarchy:
+    """Parent/children arrays for tasks listed in outline order
+
+    Built in one pass with a stack of open ancestors: a task's parent is
+    the nearest earlier task with a lower outline level. Level 0 is MS
+    Project's project summary task. Positions are indexes into the input
+    sequence; a parent of -1 marks a top-level task.
+    """
+
+    def __init__(self, levels):
+        self.levels = [1 if _missing(level) else int(level) for level in levels]
+        n = len(self.levels)
+        self.parent = [-1] * n
+        self.children = [[] for _ in range(n)]
+        stack = []
+        for i, level in enumerate(self.levels):
+            while stack and self.levels[stack[-1]] >= level:
+                stack.pop()
+            if stack:
+                self.parent[i] = stack[-1]
+                self.children[stack[-1]].append(i)
+            stack.append(i)
+        self.depth = [0] * n
+        for i, parent in enumerate(self.parent):
+            self.depth[i] = self.depth[parent] + 1 if parent >= 0 else 1
+
+    @classmethod
+    def from_outline_numbers(cls, numbers):
+        """Hierarchy from WBS numbers ("1", "1.2", ...) in outline order"""
+        return cls([outline_level(number) for number in numbers])
+
+    def __len__(self):
+        return len(self.levels)
+
+    def is_summary(self, position):
+        return bool(self.children[position])
+
+    @property
+    def summaries(self):
+        """Positions of summary tasks (tasks with children)"""
+        return [i for i, children in enumerate(self.children) if children]
+
+    @property
+    def leaves(self):
+        """Positions of tasks without children"""
+        return [i for i, children in enumerate(self.children) if not children]
+
+    def ancestors(self, position):
+        """Parent, grandparent, ... of a task"""
+        parent = self.parent[position]
+        while parent >= 0:
+            yield parent
+            parent = self.parent[parent]
+
+    def outline_numbers(self):
+        """WBS numbers regenerated from the tree ("1", "1.1", "1.2", "2", ...)
+
+        The project summary task (level 0) is "0" and its children number
+        from "1", as in MS Project.
+        """
+        numbers = [''] * len(self.levels)
+        counters = {}
+        for i, parent in enumerate(self.parent):
+            if self.levels[i] == 0 and parent < 0:
+                numbers[i] = '0'
+                continue
+            count = counters.get(parent, 0) + 1
+            counters[parent] = count
+            prefix = numbers[parent] + '.' if parent >= 0 and numbers[parent] != '0' else ''
+            numbers[i] = f'{prefix}{count}'
+        return numbers
+
+
+class SummaryRollup:
+    """Summary-task values rolled up from their leaf tasks
+
+    Start is the earliest and Finish the latest leaf date; Duration and
+    Work are summed; Progress is duration-weighted like MS Project's
+    summary % complete (a plain mean when every leaf is a milestone).
+    Each summary keeps running totals, so ``update`` only walks the
+    changed leaf's ancestors.
+    """
+
+    def __init__(self, hierarchy, starts, finishes, durations, percents, work=None):
+        self.hierarchy = hierarchy
+        n = len(hierarchy)
+        work = work if work is not None else [0] * n
+        self.start = [None] * n
+        self.finish = [None] * n
+        self.duration = [0.0] * n
+        self.done = [0.0] * n
+        self.work = [0.0] * n
+        self.percent_sum = [0.0] * n
+        self.leaf_count = [0] * n
+        for i in hierarchy.leaves:
+            self._set_leaf(i, starts[i], finishes[i], durations[i], percents[i], work[i])
+
+        # Children follow their parent in outline order, so walking backwards
+        # finishes every subtree before it is folded into its parent
+        for i in range(n - 1, -1, -1):
+            parent = hierarchy.parent[i]
+            if parent >= 0:
+                self._fold(parent, i)
+
+    @staticmethod
+    def _number(value):
+        return 0.0 if _missing(value) else float(value)
+
+    def _set_leaf(self, i, start, finish, duration, percent, work):
+        duration, percent = self._number(duration), self._number(percent)
+        self.start[i] = None if _missing(start) else start
+        self.finish[i] = None if _missing(finish) else finish
+        self.duration[i] = duration
+        self.done[i] = duration * percent / 100
+        self.work[i] = self._number(work)
+        self.percent_sum[i] = percent
+        self.leaf_count[i] = 1
+
+    def _fold(self, parent, child):
+        if self.start[child] is not None and (self.start[parent] is None or self.start[child] < self.start[parent]):
+            self.start[parent] = self.start[child]
+        if self.finish[child] is not None and (self.finish[parent] is None or self.finish[child] > self.finish[parent]):
+            self.finish[parent] = self.finish[child]
+        self.duration[parent] += self.duration[child]
+        self.done[parent] += self.done[child]
+        self.work[parent] += self.work[child]
+        self.percent_sum[parent] += self.percent_sum[child]
+        self.leaf_count[parent] += self.leaf_count[child]
+
+    def percent(self, i):
+        """Rolled-up % complete of any task (its own value for a leaf)"""
+        if self.duration[i] > 0:
+            return 100 * self.done[i] / self.duration[i]
+        return self.percent_sum[i] / self.leaf_count[i] if self.leaf_count[i] else 0.0
+
+    def values(self, i):
+        """{'Start Date', 'Finish Date', 'Progress (%)', 'Work'} of one task"""
+        return {'Start Date': self.start[i], 'Finish Date': self.finish[i],
+                'Progress (%)': round(self.percent(i), 1), 'Work': self.work[i]}
+
+    def _refresh_dates(self, i, child, old_start, old_finish):
+        """Fold one child's moved dates into summary i; children are rescanned only when it held the extreme"""
+        children = self.hierarchy.children[i]
+        start = self.start[child]
+        if start is not None and (self.start[i] is None or start < self.start[i]):
+            self.start[i] = start
+        elif old_start is not None and old_start == self.start[i] and start != old_start:
+            starts = [self.start[c] for c in children if self.start[c] is not None]
+            self.start[i] = min(starts) if starts else None
+        finish = self.finish[child]
+        if finish is not None and (self.finish[i] is None or finish > self.finish[i]):
+            self.finish[i] = finish
+        elif old_finish is not None and old_finish == self.finish[i] and finish != old_finish:
+            finishes = [self.finish[c] for c in children if self.finish[c] is not None]
+            self.finish[i] = max(finishes) if finishes else None
+
+    def update(self, leaf, start=None, finish=None, duration=None, percent=None, work=None):
+        """Change one leaf and refresh its ancestors; returns the positions whose values changed
+
+        Totals change by the leaf's delta; a summary's dates are only
+        recomputed from its children when the leaf held the old extreme.
+        """
+        if self.hierarchy.is_summary(leaf):
+            raise ValueError("update() takes a leaf task; summary values are rolled up")
+        old = (self.start[leaf], self.finish[leaf], self.duration[leaf], self.done[leaf], self.work[leaf],
+               self.percent_sum[leaf])
+        self._set_leaf(
+            leaf,
+            old[0] if start is None else start,
+            old[1] if finish is None else finish,
+            old[2] if duration is None else duration,
+            old[5] if percent is None else percent,
+            old[4] if work is None else work,
+        )
+        deltas = (self.duration[leaf] - old[2], self.done[leaf] - old[3], self.work[leaf] - old[4],
+                  self.percent_sum[leaf] - old[5])
+        changed = [leaf]
+        child, old_dates = leaf, old[:2]
+        for ancestor in self.hierarchy.ancestors(leaf):
+            self.duration[ancestor] += deltas[0]
+            self.done[ancestor] += deltas[1]
+            self.work[ancestor] += deltas[2]
+            self.percent_sum[ancestor] += deltas[3]
+            if (self.start[child], self.finish[child]) != old_dates:
+                before = (self.start[ancestor], self.finish[ancestor])
+                self._refresh_dates(ancestor, child, *old_dates)
+                child, old_dates = ancestor, before
+            else:
+                child, old_dates = ancestor, (self.start[ancestor], self.finish[ancestor])
+            changed.append(ancestor)
+        return changed
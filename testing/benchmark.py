@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+benchmark.py
+Scalable benchmark suite for the Hybrid Project Management scripts.
+
+Each entry point (scheduler, Gantt renderer, exporter, importer, weekly ingest,
+EVM) is run
+against synthetic inputs built with LargePlanGenerator at increasing
+sizes. Every case runs in a fresh interpreter so peak RSS is measured per
+case rather than accumulated across the whole run.
+
+Features:
+- Throughput (items/second) and wall time per entry point and size
+- Peak RSS per case
+- Scaling exponent fitted on a log-log curve of time vs. size
+- JSON results stored per run
+- Regression check against a saved baseline
+
+Usage:
+    python benchmark.py
+    python benchmark.py --sizes 100 1000 10000 100000 1000000 --budget 600
+    python benchmark.py --entries scheduler importer --save-baseline
+    python benchmark.py --compare benchmarks/baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AUTOMATION_DIR = os.path.join(HERE, '..', 'automation')
+MS_PROJECT_DIR = os.path.join(HERE, '..', 'ms_project_integration', 'scripts')
+
+ENTRIES = ['scheduler', 'gantt_render', 'exporter', 'importer', 'weekly_ingest', 'evm']
+DEFAULT_SIZES = [100, 1000, 10000]
+RESULTS_DIR = os.path.join(HERE, 'benchmarks', 'results')
+BASELINE_PATH = os.path.join(HERE, 'benchmarks', 'baseline.json')
+
+# Weekly ingest spreads rows over at most this many CSV files
+MAX_WEEKLY_FILES = 520
+
+# Timeline columns per Gantt render case
+GANTT_RENDER_WEEKS = 104
+
+# Status dates per EVM case (weekly)
+EVM_STATUS_DATES = 100
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+# ------------------
+# Fixtures
+# ------------------
+def build_fixture(entry, size, workdir):
+    """Create the input files for one case and return their paths"""
+    sys.path.insert(0, HERE)
+    from test_data_generator import ProjectDataGenerator, LargePlanGenerator
+
+    generator = ProjectDataGenerator(workdir)
+    plan = LargePlanGenerator(task_count=size, seed=size)
+    fixture = {}
+
+    if entry in ('scheduler', 'gantt_render', 'exporter'):
+        fixture['workbook'] = plan.write_gantt_workbook(os.path.join(workdir, 'plan.xlsx'))
+
+    if entry == 'importer':
+        fixture['xml'] = plan.write_mspdi_xml(os.path.join(workdir, 'plan.xml'))
+
+    if entry == 'weekly_ingest':
+        weeks = min(size, MAX_WEEKLY_FILES)
+        fixture['csv_folder'] = plan.write_weekly_csv_folder(
+            os.path.join(workdir, 'csvs'),
+            years=math.ceil(weeks / 52),
+            rows_per_week=math.ceil(size / (52 * math.ceil(weeks / 52)))
+        )
+        fixture['workbook'] = generator.create_sample_excel_template()
+
+    if entry == 'evm':
+        fixture['wbs_csv'] = os.path.join(workdir, 'wbs.csv')
+        fixture['status_date'] = plan.status_date
+        plan.wbs_frame().to_csv(fixture['wbs_csv'], index=False)
+
+    return fixture
+
+
+def _import_ms_project():
+    if MS_PROJECT_DIR not in sys.path:
+        sys.path.insert(0, MS_PROJECT_DIR)
+
+
+# ------------------
+# Entry points
+# ------------------
+def run_scheduler(fixture):
+    _import_ms_project()
+    from gantt_calculator import GanttCalculator
+    calculator = GanttCalculator(fixture['workbook'])
+    if not calculator.load_tasks():
+        raise RuntimeError("scheduler failed to load tasks")
+    calculated = calculator.calculate_dates()
+    critical = calculator.calculate_critical_path()
+    if not calculator.update_excel(calculated, critical):
+        raise RuntimeError("scheduler failed to update Excel")
+
+
+def run_gantt_render(fixture):
+    _import_ms_project()
+    from gantt_renderer import CONFIG, GanttRenderer
+    settings = dict(CONFIG['gantt_settings'], timeline_weeks=GANTT_RENDER_WEEKS)
+    renderer = GanttRenderer(fixture['workbook'], settings=settings)
+    if not renderer.load_tasks():
+        raise RuntimeError("renderer failed to load tasks")
+    if not renderer.render():
+        raise RuntimeError("renderer failed to write the grid")
+
+
+def run_exporter(fixture):
+    _import_ms_project()
+    from ms_project_exporter import MSProjectExporter
+    exporter = MSProjectExporter(fixture['workbook'])
+    if not exporter.load_excel():
+        raise RuntimeError("exporter failed to load Excel")
+    if not exporter.to_ms_project_xml(os.path.join(os.path.dirname(fixture['workbook']), 'export.xml')):
+        raise RuntimeError("exporter failed to write XML")
+
+
+def run_importer(fixture):
+    _import_ms_project()
+    from ms_project_importer import MSProjectImporter
+    importer = MSProjectImporter(fixture['xml'])
+    if not importer.parse_xml():
+        raise RuntimeError("importer failed to parse XML")
+    if not importer.to_excel(os.path.join(os.path.dirname(fixture['xml']), 'imported.xlsx')):
+        raise RuntimeError("importer failed to write Excel")
+
+
+def run_weekly_ingest(fixture):
+    sys.path.insert(0, AUTOMATION_DIR)
+    import update_weekly
+    update_weekly.CONFIG['BACKUP_ON_SAVE'] = False
+    df = update_weekly.read_all_weekly_csvs(fixture['csv_folder'])
+    update_weekly.analyze_trends(df)
+    update_weekly.write_to_excel(fixture['workbook'], 'Weekly_Updates', df, 2)
+
+
+def run_evm(fixture):
+    sys.path.insert(0, AUTOMATION_DIR)
+    import pandas as pd
+    from evm import EvmEngine, status_dates
+    engine = EvmEngine(pd.read_csv(fixture['wbs_csv']), data_date=fixture['status_date'])
+    dates = status_dates(fixture['status_date'] - pd.Timedelta(weeks=EVM_STATUS_DATES - 1), fixture['status_date'])
+    engine.task_table(fixture['status_date'])
+    engine.rollup_curves(dates, group_by='Owner')
+
+
+RUNNERS = {
+    'scheduler': run_scheduler,
+    'gantt_render': run_gantt_render,
+    'exporter': run_exporter,
+    'importer': run_importer,
+    'weekly_ingest': run_weekly_ingest,
+    'evm': run_evm,
+}
+
+
+def run_case(entry, size, workdir):
+    """Build the fixture and time one entry point (called in a child process)"""
+    os.chdir(workdir)
+    fixture = build_fixture(entry, size, workdir)
+    rss_before = peak_rss_kb()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    RUNNERS[entry](fixture)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        'entry': entry,
+        'size': size,
+        'wall_seconds': round(wall, 6),
+        'cpu_seconds': round(cpu, 6),
+        'throughput_per_second': round(size / wall, 2) if wall > 0 else None,
+        'peak_rss_kb': peak_rss_kb(),
+        'fixture_rss_kb': rss_before,
+    }
+
+
+def spawn_case(entry, size, timeout=None):
+    """Run one case in a fresh interpreter and return its result"""
+    workdir = tempfile.mkdtemp(prefix=f'bench_{entry}_{size}_')
+    try:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-case', entry, str(size), workdir],
+            capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {'entry': entry, 'size': size, 'error': f'timed out after {timeout}s'}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if proc.returncode != 0:
+        return {'entry': entry, 'size': size, 'error': (proc.stderr.strip().splitlines() or ['unknown'])[-1]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+# ------------------
+# Analysis
+# ------------------
+def scaling_exponent(points):
+    """Least-squares slope of log(wall) vs log(size); 1.0 means linear scaling"""
+    points = [(p['size'], p['wall_seconds']) for p in points if p.get('wall_seconds')]
+    if len(points) < 2:
+        return None
+    xs = [math.log(s) for s, _ in points]
+    ys = [math.log(w) for _, w in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denom = sum((x - mean_x) ** 2 for x in xs)
+    if denom == 0:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denom, 3)
+
+
+def compare_results(current, baseline, tolerance=0.25, min_seconds=0.05):
+    """Return a list of regressions of current vs. baseline results
+
+    A case regresses when its wall time or peak RSS grows by more than
+    ``tolerance`` (fraction) and, for time, by more than ``min_seconds``
+    so that sub-noise timings on tiny inputs don't trip the check.
+    """
+    base_cases = {(c['entry'], c['size']): c for c in baseline.get('cases', []) if 'error' not in c}
+    regressions = []
+
+    for case in current.get('cases', []):
+        base = base_cases.get((case['entry'], case['size']))
+        if base is None or 'error' in case:
+            continue
+
+        wall, base_wall = case['wall_seconds'], base['wall_seconds']
+        if wall > base_wall * (1 + tolerance) and wall - base_wall > min_seconds:
+            regressions.append(
+                f"{case['entry']}@{case['size']}: wall {base_wall:.3f}s -> {wall:.3f}s "
+                f"(+{(wall / base_wall - 1) * 100:.0f}%)"
+            )
+
+        rss, base_rss = case.get('peak_rss_kb'), base.get('peak_rss_kb')
+        if rss and base_rss and rss > base_rss * (1 + tolerance):
+            regressions.append(
+                f"{case['entry']}@{case['size']}: peak RSS {base_rss} KiB -> {rss} KiB "
+                f"(+{(rss / base_rss - 1) * 100:.0f}%)"
+            )
+
+    return regressions
+
+
+def run_suite(entries, sizes, budget=None):
+    """Run every entry at increasing sizes; stop growing an entry once it exceeds the budget"""
+    cases = []
+    for entry in entries:
+        for size in sorted(sizes):
+            print(f"Running {entry} @ {size}...", flush=True)
+            result = spawn_case(entry, size, timeout=budget * 4 if budget else None)
+            cases.append(result)
+            if 'error' in result:
+                print(f"   failed: {result['error']}")
+                break
+            print(f"   {result['wall_seconds']:.3f}s, "
+                  f"{result['throughput_per_second']}/s, peak RSS {result['peak_rss_kb']} KiB")
+            if budget and result['wall_seconds'] > budget:
+                print(f"   over budget ({budget}s); skipping larger sizes for {entry}")
+                break
+
+    scaling = {
+        entry: scaling_exponent([c for c in cases if c['entry'] == entry and 'error' not in c])
+        for entry in entries
+    }
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'cases': cases,
+        'scaling_exponents': scaling,
+    }
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved: {path}")
+
+
+def main():
+    """Main function to run the benchmark suite"""
+    if len(sys.argv) == 5 and sys.argv[1] == '--run-case':
+        print(json.dumps(run_case(sys.argv[2], int(sys.argv[3]), sys.argv[4])))
+        return 0
+
+    parser = argparse.ArgumentParser(description='Benchmark the Hybrid Project Management scripts')
+    parser.add_argument('--entries', nargs='+', choices=ENTRIES, default=ENTRIES, help='Entry points to benchmark')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help='Input sizes (tasks or weekly rows)')
+    parser.add_argument('--budget', type=float, default=120, help='Stop growing an entry once a case exceeds this many seconds')
+    parser.add_argument('--output', default=None, help='Results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='Baseline file to check for regressions')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown/memory growth before flagging (fraction)')
+
+    args = parser.parse_args()
+
+    results = run_suite(args.entries, args.sizes, args.budget)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    save_results(results, output)
+
+    print("\nScaling exponents (1.0 = linear):")
+    for entry, exponent in results['scaling_exponents'].items():
+        print(f"   {entry}: {exponent}")
+
+    if args.save_baseline:
+        save_results(results, BASELINE_PATH)
+
+    baseline_path = args.compare or (BASELINE_PATH if os.path.exists(BASELINE_PATH) and not args.save_baseline else None)
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against {baseline_path}:")
+            for line in regressions:
+                print(f"- {line}")
+            return 1
+        print(f"\n✅ No regressions against {baseline_path}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
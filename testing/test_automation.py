@@ -23,6 +23,7 @@ import tempfile
 import os
 import shutil
 import json
+import threading
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 import sys
@@ -98,6 +99,82 @@ class TestDataValidation(unittest.TestCase):
         self.assertGreater(len(issues), 0)
         self.assertIn('Future dates detected', '; '.join(issues))
 
+    def test_text_dates_parsed_without_inference(self):
+        """Test that ISO and other date text is parsed with explicit formats (no per-element inference warning)"""
+        import warnings
+        from update_weekly import evaluate_validation_rules
+
+        text_dates = self.valid_data.assign(**{'Week Start': ['2024-01-07', '2099-01-14', '01/21/2099', 'invalid']})
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UserWarning)
+            report = evaluate_validation_rules(text_dates, now=datetime(2025, 1, 1))
+        rule = [r['column'] == 'Week Start' and r['kind'] == 'not_future' for r in report.rules].index(True)
+        self.assertEqual(report.counts[rule], 2)
+
+    def test_max_tickets_rule(self):
+        """Test that the MAX_TICKETS limit is enforced"""
+        data = self.valid_data.copy()
+        data.loc[2, 'Tickets Opened'] = CONFIG['DATA_VALIDATION']['MAX_TICKETS'] + 1
+
+        issues = validate_data_quality(data)
+        self.assertEqual(issues, ['Invalid Tickets Opened values: 1 rows outside range 0 to 10000'])
+
+    def test_row_level_issue_bitmap(self):
+        """Test the per-row bitmap and report of the validation engine"""
+        from update_weekly import evaluate_validation_rules
+
+        report = evaluate_validation_rules(self.invalid_data)
+        rule_names = [rule['name'] for rule in report.rules]
+        csat_bit = 1 << rule_names.index('Invalid CSAT values')
+        nps_bit = 1 << rule_names.index('Invalid NPS values')
+
+        # Row 0: CSAT 15 and NPS 150 are both out of range
+        self.assertTrue(report.bitmap[0] & csat_bit)
+        self.assertTrue(report.bitmap[0] & nps_bit)
+        # Row 1: only NPS -200 is out of range for those two rules
+        self.assertFalse(report.bitmap[1] & csat_bit)
+
+        rows = report.row_issues()
+        self.assertEqual(list(rows['Row']), [0, 1, 2])
+        self.assertIn('Invalid CSAT values', rows.iloc[0]['Issues'])
+
+    def test_config_declared_rule(self):
+        """Test that rules declared in config are evaluated like built-in ones"""
+        from update_weekly import build_validation_rules, evaluate_validation_rules
+
+        config = dict(CONFIG['DATA_VALIDATION'], RULES=[
+            {'name': 'Resolved above limit', 'column': 'Tickets Resolved', 'kind': 'range', 'max': 10}
+        ])
+        rules = build_validation_rules(config, list(self.valid_data.columns))
+        issues = evaluate_validation_rules(self.valid_data, rules).issues()
+
+        self.assertEqual(issues, ['Resolved above limit: 2 rows above 10'])
+
+    def test_bad_rule_config_fails_once(self):
+        """Test that a bad declared rule is a config error raised before any file is processed"""
+        from update_weekly import ValidationConfigError, build_validation_rules
+
+        columns = list(self.valid_data.columns)
+        for rule in ({'name': 'Typo', 'column': 'CSAT', 'kind': 'rnage'},
+                     {'name': 'No column', 'kind': 'range', 'max': 1},
+                     {'name': 'No values', 'column': 'Notes', 'kind': 'allowed'}):
+            with self.assertRaises(ValidationConfigError):
+                build_validation_rules(dict(CONFIG['DATA_VALIDATION'], RULES=[rule]), columns)
+        too_many = [{'name': f'Rule {i}', 'column': 'CSAT', 'max': 10} for i in range(64)]
+        with self.assertRaises(ValidationConfigError):
+            build_validation_rules(dict(CONFIG['DATA_VALIDATION'], RULES=too_many), columns)
+
+        csv_dir = tempfile.mkdtemp()
+        for name in ('a.csv', 'b.csv'):
+            self.valid_data.to_csv(os.path.join(csv_dir, name), index=False)
+        validation = dict(CONFIG['DATA_VALIDATION'], RULES=[{'name': 'Typo', 'column': 'CSAT', 'kind': 'rnage'}])
+        with patch.dict(CONFIG, {'DATA_VALIDATION': validation}), \
+                patch('update_weekly.send_email_notification') as notify:
+            with self.assertRaises(ValidationConfigError):
+                read_all_weekly_csvs(csv_dir)
+        notify.assert_not_called()
+        shutil.rmtree(csv_dir)
+
 class TestTrendAnalysis(unittest.TestCase):
     """Test trend analysis functions"""
     
@@ -142,6 +219,829 @@ class TestTrendAnalysis(unittest.TestCase):
         trends = analyze_trends(insufficient_data)
         self.assertIn('error', trends)
 
+    def _weekly_history(self, weeks=30):
+        rng = np.random.default_rng(7)
+        return pd.DataFrame({
+            'Week Start': pd.date_range('2024-01-01', periods=weeks, freq='W-MON'),
+            'Tickets Opened': rng.integers(20, 40, weeks),
+            'Tickets Resolved': rng.integers(15, 40, weeks),
+            'NPS': rng.integers(20, 60, weeks),
+            'CSAT': np.round(rng.uniform(7, 9, weeks), 1)
+        })
+
+    def test_incremental_state_matches_full_recompute(self):
+        """Test that run-by-run state updates equal a full recompute"""
+        from trends import TrendEngine
+
+        history = self._weekly_history()
+        state_file = os.path.join(tempfile.mkdtemp(), 'trend_state.json')
+        try:
+            for weeks in (10, 11, 25, 30):
+                engine = TrendEngine.load(state_file, windows=[4, 8])
+                engine.update(history.head(weeks))
+                engine.save(state_file)
+
+            engine = TrendEngine.load(state_file, windows=[4, 8])
+            self.assertEqual(engine.rows, 30)
+            self.assertEqual(engine.update(history), 0)
+            self.assertEqual(engine.verify(history), [])
+
+            full = TrendEngine(windows=[4, 8])
+            full.update(history)
+            self.assertEqual(engine.summary(), full.summary())
+            self.assertEqual(engine.summary()['Backlog']['last'],
+                             float((history['Tickets Opened'] - history['Tickets Resolved']).sum()))
+        finally:
+            shutil.rmtree(os.path.dirname(state_file))
+
+    def test_rolling_trend_and_changepoint(self):
+        """Test windowed slope verdicts and CUSUM changepoint detection"""
+        from trends import TrendEngine
+
+        history = self._weekly_history(20)
+        history.loc[12:, 'CSAT'] = 4.0
+        engine = TrendEngine(windows=[4, 12])
+        engine.update(history)
+        summary = engine.summary()
+
+        self.assertEqual(summary['CSAT']['changepoints'][0]['week'], '2024-03-25')
+        self.assertEqual(summary['CSAT']['changepoints'][0]['direction'], 'down')
+        self.assertLess(summary['CSAT']['windows'][12]['slope'], 0)
+
+        improving = TrendEngine(windows=[4])
+        improving.update(self.trending_data)
+        self.assertEqual(improving.summary()['CSAT']['trend'], 'improving')
+
+    def test_verify_detects_stale_state(self):
+        """Test that verification flags history edited after it was folded in"""
+        from trends import TrendEngine
+
+        history = self._weekly_history()
+        engine = TrendEngine()
+        engine.update(history)
+
+        edited = history.copy()
+        edited.loc[3, 'CSAT'] = 1.0
+        mismatches = engine.verify(edited)
+        self.assertTrue(any(m.startswith('CSAT.mean') for m in mismatches))
+
+        engine.rebuild(edited)
+        self.assertEqual(engine.verify(edited), [])
+
+    def test_corrected_past_week_rebuilds_state(self):
+        """Test that a last-writer-wins correction to a folded week reaches the saved state"""
+        from trends import TrendEngine
+
+        history = self._weekly_history()
+        state_file = os.path.join(tempfile.mkdtemp(), 'trend_state.json')
+        try:
+            engine = TrendEngine()
+            engine.update(history)
+            engine.save(state_file)
+
+            engine = TrendEngine.load(state_file)
+            self.assertEqual(engine.update(history.astype({'CSAT': object})), 0)
+            corrected = history.copy()
+            corrected.loc[3, 'CSAT'] = 1.0
+            self.assertEqual(engine.update(corrected), 30)
+            self.assertEqual(engine.verify(corrected), [])
+        finally:
+            shutil.rmtree(os.path.dirname(state_file))
+
+class TestKpiRollup(unittest.TestCase):
+    """Test the materialised KPI rollups"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.weeks = pd.DataFrame({
+            'Week Start': pd.date_range('2024-01-01', periods=20, freq='W-MON'),
+            'Tickets Opened': np.arange(10, 30),
+            'Tickets Resolved': np.arange(8, 28),
+            'NPS': np.linspace(40, 60, 20),
+            'CSAT': np.linspace(7.0, 9.0, 20),
+            'Notes': [''] * 20
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_incremental_update_matches_rebuild(self):
+        """Test that only touched periods are recomputed and the result matches a rebuild"""
+        from kpi_rollup import KpiRollup
+
+        state_file = os.path.join(self.test_dir, 'kpi_rollup_state.json')
+        rollup = KpiRollup()
+        rollup.update(self.weeks.iloc[:16])
+        rollup.save(state_file)
+
+        rollup = KpiRollup.load(state_file)
+        self.assertEqual(rollup.update(self.weeks.iloc[:16]), 0)
+        # Four new weeks (two in April, two in May): the weeks, April, May and Q2
+        self.assertEqual(rollup.update(self.weeks), 7)
+
+        changed = self.weeks.copy()
+        changed.loc[17, 'Tickets Opened'] = 100
+        self.assertEqual(rollup.update(changed), 6)
+        pd.testing.assert_frame_equal(rollup.table(), self._rebuilt(changed))
+
+        january = rollup.table().query("Grain == 'month' and Period == '2024-01'").iloc[0]
+        self.assertEqual(january['Weeks'], 5)
+        self.assertEqual(january['Tickets Opened'], 10 + 11 + 12 + 13 + 14)
+        self.assertEqual(january['Backlog'], 10)
+        self.assertAlmostEqual(january['CSAT P50'], self.weeks['CSAT'].iloc[2], places=4)
+
+    def _rebuilt(self, df):
+        from kpi_rollup import KpiRollup
+
+        rollup = KpiRollup()
+        rollup.update(df)
+        return rollup.table()
+
+    def test_export_and_dashboard_cells(self):
+        """Test the columnar export fallback and the dashboard sheet layout"""
+        from kpi_rollup import KpiRollup, dashboard_cells, pyarrow
+
+        rollup = KpiRollup(grains=['month', 'quarter'])
+        rollup.update(self.weeks)
+        path = rollup.export(os.path.join(self.test_dir, 'kpi_rollup.parquet'))
+        self.assertTrue(path.endswith('.parquet' if pyarrow else '.csv'))
+        exported = pd.read_parquet(path) if pyarrow else pd.read_csv(path)
+        self.assertEqual(list(exported['Period']), ['2024-01', '2024-02', '2024-03', '2024-04', '2024-05',
+                                                    '2024Q1', '2024Q2'])
+
+        updates, clear = dashboard_cells(rollup, {'CSAT': {'trend': 'improving'}})
+        self.assertEqual([updates[(2, c)] for c in (1, 2, 3)], ['CSAT', rollup.latest('month')['CSAT Mean'], 'improving'])
+        self.assertEqual(updates[(1, 5)], 'Grain')
+        self.assertEqual(updates[(2, 6)], '2024-01')
+        self.assertEqual(clear, (2, None, 1, 4 + len(rollup.columns())))
+
+class TestEarnedValue(unittest.TestCase):
+    """Test the vectorised EVM engine"""
+
+    def setUp(self):
+        self.tasks = pd.DataFrame({
+            'WBS ID': ['1.1', '1.2', '2.1'],
+            'Owner': ['PM', 'Dev', 'Dev'],
+            'Planned Start': ['2025-01-01', '2025-01-01', '2025-01-11'],
+            'Planned End': ['2025-01-11', '2025-01-21', '2025-01-21'],
+            'Planned Days': [10, 20, 10],
+            'Actual Start': ['2025-01-01', '2025-01-03', ''],
+            'Actual End': ['2025-01-09', '', ''],
+            '% Complete': [100, 25, 0]
+        })
+
+    def test_task_metrics_at_data_date(self):
+        """Test PV/EV/AC, indices and RAG against hand-computed values"""
+        from evm import EvmEngine
+
+        table = EvmEngine(self.tasks, data_date='2025-01-11', daily_rate=100).task_table()
+        self.assertEqual(table['PV'].tolist(), [1000.0, 1000.0, 0.0])
+        self.assertEqual(table['EV'].tolist(), [1000.0, 500.0, 0.0])
+        self.assertEqual(table['AC'].tolist(), [800.0, 800.0, 0.0])
+        self.assertAlmostEqual(table.loc[0, 'CPI'], 1.25)
+        self.assertAlmostEqual(table.loc[1, 'EAC'], 2000 / (500 / 800))
+        self.assertEqual(table['RAG'].tolist(), ['Green', 'Red', 'Green'])
+
+    def test_rollup_matches_task_curves(self):
+        """Test that WBS and group rollups equal sums of the task-level S-curves"""
+        from evm import EvmEngine, status_dates
+
+        engine = EvmEngine(self.tasks, data_date='2025-01-11', block_size=2)
+        dates = status_dates('2025-01-01', '2025-01-31')
+        curves = engine.curves(dates)
+        rollup = engine.rollup_curves(dates, group_by='Owner')
+
+        self.assertEqual(sorted(rollup['Level'].unique()), ['Owner', 'Portfolio', 'WBS Level 1'])
+        portfolio = engine.s_curve(dates)
+        np.testing.assert_allclose(portfolio['EV'], curves['EV'].sum(axis=0))
+        np.testing.assert_allclose(portfolio['PV'].iloc[-1], 40.0)
+        phase_one = rollup[(rollup['Level'] == 'WBS Level 1') & (rollup['Node'] == '1')]
+        np.testing.assert_allclose(phase_one['AC'], curves['AC'][:2].sum(axis=0))
+        dev = rollup[(rollup['Level'] == 'Owner') & (rollup['Node'] == 'Dev')]
+        np.testing.assert_allclose(dev['PV'], curves['PV'][1:].sum(axis=0))
+        self.assertTrue((np.diff(curves['PV'], axis=1) >= 0).all())
+
+class TestSprintAnalytics(unittest.TestCase):
+    """Test sprint velocity, burn and forecast tables"""
+
+    def setUp(self):
+        self.stories = pd.DataFrame({
+            'Team': ['Core'] * 5 + ['Web'] * 3,
+            'Sprint': ['Sprint 10', 'Sprint 2', 'Sprint 2', 'Sprint 10', 'Sprint 11',
+                       'Sprint 1', 'Sprint 2', 'Sprint 2'],
+            'User Story': list('ABCDEFGH'),
+            'Estimate (pts)': [5, 3, 8, 13, 20, 4, 4, 6],
+            'Status': ['Done', 'Done', 'Done', 'In Progress', 'To Do', 'Done', 'Done', 'Done'],
+            'Actual Effort (hrs)': [10, 6, 16, '', '', 8, 12, 6],
+            'Owner': ['Ann', 'Ann', 'Bob', 'Bob', 'Ann', 'Cid', 'Cid', 'Dee']
+        })
+
+    def test_velocity_throughput_and_burn(self):
+        """Test per-sprint velocity in sprint-number order, owner throughput and burnup"""
+        from sprint_analytics import SprintAnalytics
+
+        analytics = SprintAnalytics(self.stories)
+        velocity = analytics.velocity()
+        core = velocity[velocity['Team'] == 'Core']
+        self.assertEqual(core['Sprint'].tolist(), ['Sprint 2', 'Sprint 10', 'Sprint 11'])
+        self.assertEqual(core['Velocity (pts)'].tolist(), [11.0, 5.0, 0.0])
+        self.assertEqual(core['Committed (pts)'].tolist(), [11.0, 18.0, 20.0])
+        # Sprint 11 has nothing done yet, so it is planned and gets no rolling velocity
+        self.assertEqual(core['Rolling Velocity'].tolist()[:2], [11.0, 8.0])
+        self.assertTrue(np.isnan(core['Rolling Velocity'].iloc[2]))
+        self.assertAlmostEqual(core['Hours per Point'].iloc[0], 22 / 11)
+
+        throughput = analytics.throughput().set_index(['Team', 'Owner'])
+        self.assertEqual(throughput.loc[('Core', 'Ann'), 'Points Done'], 8)
+        self.assertEqual(throughput.loc[('Core', 'Ann'), 'Active Sprints'], 2)
+        self.assertEqual(throughput.loc[('Core', 'Bob'), 'Stories Done'], 1)
+
+        burn = analytics.burn()
+        self.assertEqual(burn[burn['Team'] == 'Core']['Remaining (pts)'].tolist(), [0.0, 13.0, 33.0])
+        self.assertEqual(analytics.remaining().to_dict(), {'Core': 33.0, 'Web': 0.0})
+
+    def test_monte_carlo_forecast(self):
+        """Test forecast percentiles for constant and finished teams and the single-team default"""
+        from sprint_analytics import SprintAnalytics
+
+        steady = pd.DataFrame({
+            'Sprint': ['Sprint 1', 'Sprint 2', 'Sprint 3', 'Sprint 3'],
+            'Estimate (pts)': [10, 10, 10, 25],
+            'Status': ['Done', 'Done', 'Done', 'To Do'],
+        })
+        forecast = SprintAnalytics(steady).forecast(simulations=500, seed=1)
+        self.assertEqual(forecast['Team'].tolist(), ['All'])
+        self.assertEqual(forecast[['P50 Sprints', 'P95 Sprints']].iloc[0].tolist(), [3.0, 3.0])
+
+        summary = SprintAnalytics(self.stories).summary(simulations=2000, seed=7, horizon=20, chunk_cells=1)
+        web = summary.set_index('Team').loc['Web']
+        self.assertEqual(web['P50 Sprints'], 0)
+        core = summary.set_index('Team').loc['Core']
+        self.assertEqual(core['Latest Sprint'], 'Sprint 10')
+        self.assertTrue(3 <= core['P50 Sprints'] <= core['P85 Sprints'] <= core['P95 Sprints'])
+
+        stalled = steady.assign(Status='To Do')
+        self.assertTrue(np.isnan(SprintAnalytics(stalled).forecast(simulations=50, horizon=5)['P50 Sprints'][0]))
+
+    def test_planned_sprints_are_not_history(self):
+        """Test that future sprints with nothing done do not count as zero velocity"""
+        from sprint_analytics import SprintAnalytics
+
+        planned = pd.DataFrame({
+            'Sprint': [f'Sprint {n}' for n in range(1, 11)] + ['Sprint 6'],
+            'Estimate (pts)': [20] * 5 + [0] * 5 + [100],
+            'Status': ['Done'] * 5 + ['To Do'] * 6,
+        })
+        analytics = SprintAnalytics(planned)
+        self.assertEqual(analytics.history()['Sprint'].tolist(), [f'Sprint {n}' for n in range(1, 6)])
+
+        forecast = analytics.forecast(simulations=500, seed=3).iloc[0]
+        self.assertEqual(forecast['Historical Sprints'], 5)
+        self.assertEqual([forecast['P50 Sprints'], forecast['P95 Sprints']], [5.0, 5.0])
+
+        summary = analytics.summary(simulations=500, seed=3).iloc[0]
+        self.assertEqual(summary['Latest Sprint'], 'Sprint 5')
+        self.assertEqual(summary['Rolling Velocity'], 20.0)
+
+class TestRiskRegister(unittest.TestCase):
+    """Test the indexed risk register"""
+
+    def setUp(self):
+        self.entries = pd.DataFrame({
+            'ID': ['R1', 'R2', 'R3', 'I4', 'R5', 'R6'],
+            'Type (Risk/Issue)': ['Risk', 'Risk', 'Risk', 'Issue', 'Risk', 'Risk'],
+            'Probability (0-1)': [0.3, 0.8, 0.5, 1.0, 0.1, 0.9],
+            'Impact (1-5)': [4, 5, 2, 2, 1, 3],
+            'Owner': ['PM', 'Tech Lead', 'PM', 'DBA', 'PM', 'Tech Lead'],
+            'Status': ['Open', 'Open', 'In Progress', 'Closed', 'Open', 'Closed'],
+            'Date Created': ['2025-01-01', '2025-02-01', '', '2025-01-01', '2025-03-01', '2025-01-01'],
+            'Date Closed': ['', '', '', '2025-01-11', '', '']
+        })
+
+    def test_scores_bands_and_queries(self):
+        """Test exposure, bands, ageing and filtered top-N queries in exposure order"""
+        from risk_register import RiskRegister
+
+        register = RiskRegister(self.entries, as_of='2025-03-02')
+        table = register.table.set_index('ID')
+        self.assertEqual(list(table.index), ['R2', 'R6', 'I4', 'R1', 'R3', 'R5'])
+        self.assertEqual(table['Band'].tolist(), ['Critical', 'Critical', 'High', 'Medium', 'Medium', 'Low'])
+        self.assertEqual(table.loc['R1', 'Age (days)'], 60)
+        self.assertEqual(table.loc['I4', 'Age (days)'], 10)
+        self.assertTrue(np.isnan(table.loc['R3', 'Age (days)']))
+        self.assertEqual(table.loc['R6', 'Category'], 'Risk')
+
+        self.assertEqual(register.query(owner='PM', n=2)['ID'].tolist(), ['R1', 'R3'])
+        self.assertEqual(register.query(owner='Tech Lead', open_only=True)['ID'].tolist(), ['R2'])
+        self.assertEqual(register.query(status=['Open', 'Closed'], band='Critical')['ID'].tolist(), ['R2', 'R6'])
+        self.assertEqual(register.query(min_exposure=1.2)['ID'].tolist(), ['R2', 'R6', 'I4', 'R1'])
+        self.assertTrue(register.query(owner='Nobody').empty)
+        self.assertEqual(register.counts('owner'), {'DBA': 1, 'PM': 3, 'Tech Lead': 2})
+        with self.assertRaises(ValueError):
+            register.query(project='X')
+
+    def test_heatmap_matrix(self):
+        """Test that the heatmap covers every cell and aggregates open entries"""
+        from risk_register import RiskRegister
+
+        heatmap = RiskRegister(self.entries).heatmap()
+        self.assertEqual(len(heatmap), 25)
+        self.assertEqual(heatmap['Entries'].sum(), 4)
+        cell = heatmap[(heatmap['Probability'] == '0.6-0.8') & (heatmap['Impact'] == 5)]
+        self.assertEqual(cell['Exposure'].iloc[0], 4.0)
+
+        by_owner = RiskRegister(self.entries).heatmap(open_only=False, by='Owner')
+        self.assertEqual(len(by_owner), 75)
+        self.assertEqual(by_owner.groupby('Owner')['Entries'].sum().to_dict(), {'DBA': 1, 'PM': 3, 'Tech Lead': 2})
+
+class TestPlanScenarios(unittest.TestCase):
+    """Test the plan graph index and what-if scenarios"""
+
+    def setUp(self):
+        sys.path.insert(0, '../ms_project_integration/scripts')
+        monday = datetime(2025, 1, 6)
+        self.tasks = {
+            1: {'Duration (Days)': 3, 'Start Date': monday, 'Dependencies': '', 'Assigned To': 'Ann'},
+            2: {'Duration (Days)': 2, 'Start Date': monday, 'Dependencies': '1', 'Assigned To': 'Bob, Cid'},
+            3: {'Duration (Days)': 4, 'Start Date': monday, 'Dependencies': '1SS+1', 'Assigned To': 'Dee'},
+            12: {'Duration (Days)': 1, 'Start Date': monday, 'Dependencies': '2FS, 3', 'Assigned To': 'Eve'},
+        }
+
+    def test_dependency_parsing_and_schedule(self):
+        """Test link parsing, working-day arithmetic and the forward/backward pass"""
+        from plan_graph import PlanIndex, WorkCalendar, parse_dependencies
+
+        self.assertEqual(parse_dependencies('3SS+2, 12, 7FF-1d, junk'),
+                         [(3, 'SS', 2), (12, 'FS', 0), (7, 'FF', -1)])
+        # Labelled IDs the old digit-filter parser accepted still resolve
+        self.assertEqual(parse_dependencies('T1, #4, Task 5SS, 2.0'),
+                         [(1, 'FS', 0), (4, 'FS', 0), (5, 'SS', 0), (2, 'FS', 0)])
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(parse_dependencies('3;4'), [])
+        calendar = WorkCalendar()
+        friday, saturday = np.datetime64('2025-01-10'), np.datetime64('2025-01-11')
+        self.assertEqual(calendar.add_working_days([friday, saturday, saturday], [1, 1, 0]).tolist(),
+                         [datetime(2025, 1, 13).date(), datetime(2025, 1, 13).date(), saturday.tolist()])
+
+        index = PlanIndex(self.tasks, calendar)
+        start, finish, total_float = index.schedule()
+        dates = [d.isoformat() for d in calendar.to_date(start).tolist()]
+        # 1 starts Monday; 2 the day after 1 finishes (FS); 3 a day after 1 starts (SS+1); 12 after 2 and 3
+        self.assertEqual(dates, ['2025-01-06', '2025-01-10', '2025-01-07', '2025-01-15'])
+        self.assertEqual(total_float.tolist(), [0, 0, 1, 0])
+        self.assertEqual(index.levels.tolist(), [0, 1, 1, 2])
+
+        cyclic = dict(self.tasks)
+        cyclic[1] = dict(cyclic[1], Dependencies='12')
+        with self.assertRaises(ValueError):
+            PlanIndex(cyclic, calendar)
+
+    def test_scenarios_copy_on_write(self):
+        """Test that scenarios store only overrides and compare against the base plan"""
+        from plan_graph import PlanIndex, Scenario, WorkCalendar, compare_scenarios
+
+        index = PlanIndex(self.tasks, WorkCalendar())
+        base_durations = index.durations.copy()
+        slip = Scenario('slip', index).slip([3], 2)
+        crash = Scenario.from_spec('crash', 'crash 1-3 50%; resource 12 1', index)
+        self.assertEqual(slip.overrides, {3: {'delay': 2}})
+        self.assertEqual(crash.get(1, 'duration'), 2)
+        self.assertEqual(crash.arrays()[0].tolist(), [2, 1, 2, 1])
+
+        table = compare_scenarios(index, [slip, crash], executor='thread').set_index('Scenario')
+        np.testing.assert_array_equal(index.durations, base_durations)
+        self.assertEqual(table.loc['Base', 'Finish Delta (working days)'], 0)
+        self.assertEqual(table.loc['slip', 'Finish Delta (working days)'], 1)
+        self.assertEqual(table.loc['slip', 'Critical Added'], '3')
+        self.assertEqual(table.loc['slip', 'Critical Removed'], '1, 2')
+        self.assertEqual(table.loc['crash', 'Finish Delta (working days)'], -2)
+        self.assertEqual(table.loc['crash', 'Project Finish'], pd.Timestamp('2025-01-14'))
+        with self.assertRaises(KeyError):
+            Scenario('bad', index).slip([99], 1)
+
+    def test_calculator_matches_base_scenario(self):
+        """Test that the dates and critical path GanttCalculator writes are the what-if Base plan"""
+        import openpyxl
+        from gantt_calculator import GanttCalculator
+
+        test_dir = tempfile.mkdtemp()
+        path = os.path.join(test_dir, 'plan.xlsx')
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = 'Gantt Chart'
+        ws.append(['Task ID', 'Task Name', 'Duration (Days)', 'Start Date', 'Finish Date', 'Dependencies', 'Critical Path'])
+        for task_id, duration, dependencies in ((1, 5, None), (2, 2, None), (3, 3, '1SS+1, 2')):
+            ws.append([task_id, f'Task {task_id}', duration, datetime(2025, 1, 6), None, dependencies, None])
+        wb.save(path)
+
+        calculator = GanttCalculator(path)
+        self.assertTrue(calculator.load_tasks())
+        calculated = calculator.calculate_dates()
+        critical = calculator.calculate_critical_path()
+        # 3 waits for 2 to finish (FS), the SS+1 link to 1 is already met
+        self.assertEqual(calculated[3]['Start Date'], datetime(2025, 1, 9))
+        self.assertEqual(calculated[3]['Finish Date'], datetime(2025, 1, 14))
+        self.assertEqual(critical, [2, 3])
+
+        base = calculator.compare_scenarios([], executor='thread').set_index('Scenario').loc['Base']
+        self.assertEqual(base['Project Finish'], max(dates['Finish Date'] for dates in calculated.values()))
+        self.assertEqual(base['Critical Tasks'], len(critical))
+        shutil.rmtree(test_dir)
+
+class TestMspdiValues(unittest.TestCase):
+    """Test ISO-8601 duration and date-time parsing for MS Project XML"""
+
+    def setUp(self):
+        sys.path.insert(0, '../ms_project_integration/scripts')
+
+    def test_durations_keep_precision_and_units(self):
+        """Test minutes, date components and elapsed DurationFormat codes"""
+        from mspdi_values import duration_days
+
+        self.assertEqual(duration_days('PT40H0M0S', 7), 5.0)
+        self.assertEqual(duration_days('PT4H30M0S', 7), 0.5625)
+        self.assertEqual(duration_days('P5D'), 5.0)
+        self.assertEqual(duration_days('P1W', 9), 5.0)
+        self.assertEqual(duration_days('PT48H0M0S', 8), 2.0)  # elapsed days are 24 hours
+        self.assertEqual(duration_days('PT30H', 7, minutes_per_day=600), 3.0)
+        self.assertEqual(duration_days('junk', 7), 0)
+        self.assertEqual(duration_days('P', 7), 0)
+
+    def test_datetimes_keep_time_of_day(self):
+        """Test that the time of day and fractional seconds survive"""
+        from mspdi_values import parse_datetime
+
+        self.assertEqual(parse_datetime('2024-10-21T08:30:15.25'), datetime(2024, 10, 21, 8, 30, 15, 250000))
+        self.assertEqual(parse_datetime('2024-10-21'), datetime(2024, 10, 21))
+        self.assertEqual(parse_datetime('2024-10-21T17:00:00+02:00'), datetime(2024, 10, 21, 17))
+        self.assertIsNone(parse_datetime('2024-13-01T00:00:00'))
+        self.assertIsNone(parse_datetime(''))
+
+
+class TestPlanConsolidation(unittest.TestCase):
+    """Test streaming MSPDI reads and multi-project consolidation"""
+
+    def setUp(self):
+        sys.path.insert(0, '../ms_project_integration/scripts')
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_project(self, name, tasks, minutes_per_day=480, sections=''):
+        """Write a minimal MSPDI file; tasks are (uid, id, name, links, extra elements)"""
+        body = []
+        for uid, task_id, task_name, links, extra in tasks:
+            link_xml = ''.join(
+                f'<PredecessorLink><PredecessorUID>{pred}</PredecessorUID><Type>{link_type}</Type>'
+                f'<LinkLag>{lag}</LinkLag>{cross}</PredecessorLink>'
+                for pred, link_type, lag, cross in links)
+            body.append(f'<Task><UID>{uid}</UID><ID>{task_id}</ID><Name>{task_name}</Name>'
+                        f'<Duration>PT16H0M0S</Duration><DurationFormat>7</DurationFormat>{extra}{link_xml}</Task>')
+        path = os.path.join(self.test_dir, f'{name}.xml')
+        with open(path, 'w') as f:
+            f.write('<?xml version="1.0"?><Project xmlns="http://schemas.microsoft.com/project">'
+                    f'<Name>{name}</Name><MinutesPerDay>{minutes_per_day}</MinutesPerDay>'
+                    f'<Tasks>{"".join(body)}</Tasks>{sections}</Project>')
+        return path
+
+    def test_read_project_links_and_units(self):
+        """Test that links, lags and project units come through the streaming reader"""
+        from mspdi_reader import format_dependencies, local_links, read_project
+
+        path = self.write_project('Plan', [
+            (10, 1, 'Design', [], ''),
+            (20, 2, 'Build', [(10, 3, 9600, '')], '<!-- comment -->'),
+        ], minutes_per_day=960)
+        project = read_project(path)
+
+        self.assertEqual(project['name'], 'Plan')
+        self.assertEqual(project['units']['minutes_per_day'], 960)
+        self.assertEqual([task['Duration'] for task in project['tasks']], [1.0, 1.0])
+        # LinkLag is tenths of a minute: 9600 / 10 / 960 = 1 day
+        self.assertEqual(format_dependencies(local_links(project)[20]), '1SS+1')
+
+    def test_consolidate_remaps_ids_and_resolves_links(self):
+        """Test ID collisions, cross-project links and in-place subproject insertion"""
+        from mspdi_reader import consolidate, read_projects
+
+        paths = [
+            self.write_project('Master', [
+                (1, 1, 'Kickoff', [], ''),
+                (2, 2, 'Vendor work', [(1, 1, 0, '')],
+                 '<OutlineLevel>2</OutlineLevel>'
+                 '<IsSubproject>1</IsSubproject><SubprojectName>C:\\Plans\\Vendor.mpp</SubprojectName>'),
+                (3, 3, 'Go live', [(2, 1, 0, '')], ''),
+            ]),
+            self.write_project('Ops', [
+                (5, 2, 'Train', [(9, 3, 0, '<CrossProject>1</CrossProject>'
+                                           '<CrossProjectName>C:\\Plans\\Vendor.mpp\\2</CrossProjectName>')], ''),
+            ]),
+            self.write_project('Vendor', [
+                (1, 1, 'Design', [], '<OutlineLevel>1</OutlineLevel>'),
+                (2, 2, 'Build', [(1, 1, 0, '')], '<OutlineLevel>1</OutlineLevel>'),
+            ]),
+        ]
+        projects = read_projects(paths, max_workers=1)
+        tasks, mapping, stats = consolidate(projects)
+
+        rows = [(task['Task ID'], task['Name'], task['Dependencies']) for task in tasks]
+        self.assertEqual(rows, [
+            (1, 'Kickoff', ''),
+            (4, 'Design', '1FS'),      # inherits the subproject row's predecessor
+            (5, 'Build', '4FS'),
+            (3, 'Go live', '5FS'),     # waits for the subproject's last task
+            (2, 'Train', '5SS'),       # cross-project link to Vendor task 2
+        ])
+        self.assertEqual(stats['remapped'], 2)
+        self.assertEqual(stats['cross_project_links'], 1)
+        self.assertEqual(stats['unresolved_links'], 0)
+        self.assertEqual(len(mapping), 5)
+        # Inserted tasks nest at the subproject row's outline level
+        self.assertEqual([task['OutlineLevel'] for task in tasks], [None, 2, 2, None, None])
+
+
+    def test_resources_assignments_and_calendars(self):
+        """Test the assignment joins, per-resource work and inherited calendars"""
+        from mspdi_reader import read_project, resolve_calendars, resource_work
+        from plan_graph import calendars_from_rows
+
+        def weekday(day_type, working):
+            return f'<WeekDay><DayType>{day_type}</DayType><DayWorking>{working}</DayWorking></WeekDay>'
+
+        sections = (
+            '<Calendars>'
+            '<Calendar><UID>1</UID><Name>Standard</Name><BaseCalendarUID>-1</BaseCalendarUID><WeekDays>'
+            + ''.join(weekday(day, 0 if day in (1, 7) else 1) for day in range(1, 8))
+            + '<WeekDay><DayType>0</DayType><DayWorking>0</DayWorking><TimePeriod>'
+              '<FromDate>2025-01-01T00:00:00</FromDate><ToDate>2025-01-02T23:59:00</ToDate></TimePeriod></WeekDay>'
+            '</WeekDays></Calendar>'
+            '<Calendar><UID>2</UID><Name>Ann</Name><BaseCalendarUID>1</BaseCalendarUID><WeekDays>'
+            + weekday(7, 1) + '</WeekDays></Calendar>'
+            '</Calendars>'
+            '<Resources><Resource><UID>1</UID><Name>Ann</Name><CalendarUID>2</CalendarUID></Resource>'
+            '<Resource><UID>2</UID><Name>Bob</Name></Resource></Resources>'
+            '<Assignments>'
+            '<Assignment><UID>1</UID><TaskUID>10</TaskUID><ResourceUID>1</ResourceUID><Work>PT16H0M0S</Work></Assignment>'
+            '<Assignment><UID>2</UID><TaskUID>10</TaskUID><ResourceUID>2</ResourceUID><Work>PT8H30M0S</Work></Assignment>'
+            '<Assignment><UID>3</UID><TaskUID>20</TaskUID><ResourceUID>1</ResourceUID><Work>PT4H0M0S</Work></Assignment>'
+            '<Assignment><UID>4</UID><TaskUID>20</TaskUID><ResourceUID>-65535</ResourceUID></Assignment>'
+            '</Assignments>'
+        )
+        path = self.write_project('Plan', [
+            (10, 1, 'Design', [], ''),
+            (20, 2, 'Build', [], '<ResourceNames>Carol</ResourceNames>'),
+        ], sections=sections)
+        project = read_project(path)
+
+        # ResourceNames only comes from the assignments when the task has none
+        self.assertEqual([task['ResourceNames'] for task in project['tasks']], ['Ann, Bob', 'Carol'])
+        work = resource_work(project)
+        self.assertEqual((work[1]['Assignments'], work[1]['Work']), (2, 20.0))
+        self.assertEqual(work[2]['Work'], 8.5)
+
+        calendars = resolve_calendars(project)
+        self.assertEqual(calendars[1]['WorkingWeekdays'], [0, 1, 2, 3, 4])
+        self.assertEqual(calendars[2]['WorkingWeekdays'], [0, 1, 2, 3, 4, 5])  # Saturday added to the base
+        self.assertEqual([d.isoformat() for d in calendars[2]['NonWorkingDates']], ['2025-01-01', '2025-01-02'])
+
+        work_calendars = calendars_from_rows([{'Calendar UID': 1.0, 'Working Days': 'Mon, Tue, Wed, Thu, Fri',
+                                               'Non-working Dates': '2025-01-01, 2025-01-02'}])
+        self.assertEqual(work_calendars[1].add_working_days([np.datetime64('2024-12-31')], [1]).tolist(),
+                         [datetime(2025, 1, 3).date()])
+
+class TestWbsHierarchy(unittest.TestCase):
+    """Test the WBS outline tree and summary-task rollups"""
+
+    def setUp(self):
+        sys.path.insert(0, '../ms_project_integration/scripts')
+
+    def test_outline_tree_and_numbers(self):
+        """Test parents, summaries and regenerated WBS numbers from outline levels"""
+        from wbs_hierarchy import WbsHierarchy
+
+        hierarchy = WbsHierarchy([0, 1, 2, 3, 2, 1, None, 2])
+        self.assertEqual(hierarchy.parent, [-1, 0, 1, 2, 1, 0, 0, 6])
+        self.assertEqual(hierarchy.summaries, [0, 1, 2, 6])
+        self.assertEqual(list(hierarchy.ancestors(3)), [2, 1, 0])
+        numbers = hierarchy.outline_numbers()
+        self.assertEqual(numbers, ['0', '1', '1.1', '1.1.1', '1.2', '2', '3', '3.1'])
+        self.assertEqual(WbsHierarchy.from_outline_numbers(numbers).parent, hierarchy.parent)
+
+    def test_rollup_and_incremental_update(self):
+        """Test summary dates, weighted progress and work, and that updates match a full rebuild"""
+        from wbs_hierarchy import SummaryRollup, WbsHierarchy
+
+        hierarchy = WbsHierarchy([1, 2, 2, 3, 3, 1])
+        starts = [None, datetime(2024, 1, 1), datetime(2024, 1, 3), datetime(2024, 1, 2), datetime(2024, 1, 8), None]
+        finishes = [None, datetime(2024, 1, 2), datetime(2024, 1, 5), datetime(2024, 1, 4), datetime(2024, 1, 9), None]
+        durations = [0, 2, 0, 3, 1, 0]
+        percents = [0, 100, 0, 50, 0, 0]
+        rollup = SummaryRollup(hierarchy, starts, finishes, durations, percents, work=[0, 16, 0, 24, 8, 0])
+
+        self.assertEqual(rollup.values(0), {'Start Date': datetime(2024, 1, 1), 'Finish Date': datetime(2024, 1, 9),
+                                            'Progress (%)': 58.3, 'Work': 48.0})
+        self.assertEqual(rollup.values(2)['Start Date'], datetime(2024, 1, 2))
+        self.assertEqual(rollup.values(5)['Finish Date'], None)
+
+        # Moving the leaf that held the summary's extremes forces a rescan of its siblings
+        changed = rollup.update(4, start=datetime(2024, 1, 4), finish=datetime(2024, 1, 6), percent=100)
+        self.assertEqual(changed, [4, 2, 0])
+        starts[4], finishes[4], percents[4] = datetime(2024, 1, 4), datetime(2024, 1, 6), 100
+        rebuilt = SummaryRollup(hierarchy, starts, finishes, durations, percents, work=[0, 16, 0, 24, 8, 0])
+        for position in range(len(hierarchy)):
+            self.assertEqual(rollup.values(position), rebuilt.values(position))
+        with self.assertRaises(ValueError):
+            rollup.update(2, percent=10)
+
+class TestTimelineFacts(unittest.TestCase):
+    """Test the Power BI timeline fact, bridge and status tables"""
+
+    def setUp(self):
+        sys.path.insert(0, '../ms_project_integration/scripts')
+        self.test_dir = tempfile.mkdtemp()
+        self.gantt = pd.DataFrame({
+            'Task ID': [1, 2, 3, None],
+            'Task Name': ['Design', 'Review', 'Build', None],
+            'Duration (Days)': [3, 0, 5, None],
+            'Start Date': [datetime(2025, 1, 30, 8), datetime(2025, 2, 3), datetime(2025, 2, 3), None],
+            'Finish Date': [datetime(2025, 2, 2, 17), datetime(2025, 2, 3), datetime(2025, 2, 7), None],
+            'Status': ['Completed', 'Not Started', 'In Progress', None],
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_facts_status_and_bridge(self):
+        """Test the Power Query column definitions and the per-day bridge rows"""
+        from timeline_facts import bridge_rows, compute_facts, status_rows
+
+        facts = compute_facts(self.gantt)
+        self.assertEqual(len(facts), 3)
+        self.assertEqual(facts['Start Date'].iloc[0], pd.Timestamp('2025-01-30'))
+        self.assertEqual(facts['Task Duration Days'].tolist(), [3, 0, 4])
+        self.assertEqual(facts['Is Milestone'].tolist(), ['No', 'Yes', 'No'])
+        self.assertNotIn('Is Overdue', facts.columns)
+
+        status = status_rows(facts, '2025-02-05')
+        self.assertEqual(status['Is Overdue'].tolist(), ['No', 'Yes', 'No'])  # completed tasks are never overdue
+        self.assertEqual(status['Days Remaining'].tolist(), [-3, -2, 2])
+        self.assertEqual(status['Is Active'].tolist(), ['No', 'No', 'Yes'])
+
+        bridge = bridge_rows(facts, working_days=[0, 1, 2, 3, 4])
+        design = bridge[bridge['Task ID'] == 1]
+        self.assertEqual([str(day)[:10] for day in design['Date']],
+                         ['2025-01-30', '2025-01-31', '2025-02-01', '2025-02-02'])
+        self.assertEqual(design['Task Day'].tolist(), [1, 2, 3, 4])
+        self.assertEqual(design['Is Weekend'].tolist(), ['No', 'No', 'Yes', 'Yes'])
+        self.assertEqual(len(bridge), 4 + 1 + 5)
+
+    def test_partitions_rewritten_only_when_changed(self):
+        """Test digest skipping, removed partitions, the manifest and a new as-of date"""
+        from timeline_facts import PartitionedTableWriter, TimelineFactBuilder, partition_keys
+
+        root = os.path.join(self.test_dir, 'timeline')
+        frame = pd.DataFrame({'Task ID': [1, 2, 3],
+                              'Start Date': pd.to_datetime(['2025-01-05', '2025-02-01', '2025-02-09'])})
+        keys = partition_keys(frame['Start Date'])
+        writer = PartitionedTableWriter(root, 'csv')
+        self.assertEqual(writer.write('facts', frame, keys, 'start_month'), (2, 0, 0))
+        writer.save_manifest()
+
+        writer = PartitionedTableWriter(root, 'csv')
+        self.assertEqual(writer.write('facts', frame, keys, 'start_month'), (0, 2, 0))
+
+        changed = frame.iloc[1:].assign(**{'Task ID': [2, 4]})
+        writer = PartitionedTableWriter(root, 'csv')
+        self.assertEqual(writer.write('facts', changed, partition_keys(changed['Start Date']), 'start_month'),
+                         (1, 0, 1))
+        writer.save_manifest()
+        self.assertFalse(os.path.exists(os.path.join(root, 'facts', 'start_month=2025-01')))
+        with open(os.path.join(root, 'manifest.json')) as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest['tables']['facts']['start_month=2025-02']['rows'], 2)
+
+        # A later as-of date only replaces the status table
+        workbook = os.path.join(self.test_dir, 'plan.xlsx')
+        self.gantt.to_excel(workbook, sheet_name='Gantt Chart', index=False)
+        settings = {'format': 'csv', 'partition': 'month'}
+        output = os.path.join(self.test_dir, 'plan_timeline')
+        results = []
+        for as_of in ('2025-02-05', '2025-02-06'):
+            builder = TimelineFactBuilder(workbook, settings=settings, as_of=as_of)
+            self.assertTrue(builder.load_tasks() and builder.write(output))
+            results.append(builder.result)
+        self.assertEqual(results[1]['timeline_facts'], (0, 2, 0))
+        self.assertEqual(results[1]['timeline_task_days'], (0, 2, 0))
+        self.assertEqual(results[1]['timeline_status'], (1, 0, 1))
+        self.assertEqual(os.listdir(os.path.join(output, 'timeline_status')), ['as_of=2025-02-06'])
+
+class TestGanttRenderer(unittest.TestCase):
+    """Test the Gantt bar grid renderer"""
+
+    STATUS_COLORS = {'Not Started': '#D9D9D9', 'In Progress': '#FFC000', 'Completed': '#00B050'}
+
+    def setUp(self):
+        sys.path.insert(0, '../ms_project_integration/scripts')
+        self.test_dir = tempfile.mkdtemp()
+        self.workbook = os.path.join(self.test_dir, 'gantt.xlsx')
+        import openpyxl
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = 'Gantt Chart'
+        ws.append(['Task ID', 'Task Name', 'Start Date', 'Finish Date', 'Status', 'Critical Path'])
+        ws.append([1, 'Design', datetime(2025, 3, 3), datetime(2025, 3, 4), 'Completed', 'No'])
+        ws.append([2, 'Build', datetime(2025, 3, 5), datetime(2025, 3, 10), 'In Progress', 'Yes'])
+        ws.append([3, 'Unscheduled', None, None, 'Not Started', 'No'])
+        wb.save(self.workbook)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def renderer(self, **settings):
+        from gantt_renderer import GanttRenderer
+
+        settings = dict({'start_column': 'H', 'timeline_mode': 'days', 'timeline_weeks': 1,
+                         'timeline_start': '2025-03-03'}, **settings)
+        renderer = GanttRenderer(self.workbook, settings=settings, status_colors=self.STATUS_COLORS,
+                                 today='2025-03-05')
+        self.assertTrue(renderer.load_tasks())
+        return renderer
+
+    def test_occupancy_matrix(self):
+        """Test inclusive start/finish days, partial week overlap and undated tasks"""
+        from gantt_renderer import occupancy_matrix, period_starts
+
+        starts = np.array(['2025-03-03', '2025-03-09', 'NaT'], dtype='datetime64[D]')
+        finishes = np.array(['2025-03-03', '2025-03-10', 'NaT'], dtype='datetime64[D]')
+        days = period_starts('2025-03-02', 3, 'days')
+        self.assertEqual(occupancy_matrix(starts, finishes, days, 1).tolist(),
+                         [[False, True, False], [False, False, False], [False, False, False]])
+
+        weeks = period_starts('2025-03-05', 2, 'weeks')
+        self.assertEqual(str(weeks[0]), '2025-03-03')  # weeks start on Monday
+        # Task 2 runs Sunday to Monday, so it touches both weeks
+        self.assertEqual(occupancy_matrix(starts, finishes, weeks, 7).tolist(),
+                         [[True, False], [True, True], [False, False]])
+
+    def test_cell_codes(self):
+        """Test status, critical, weekend and today codes"""
+        from gantt_renderer import EMPTY, FIRST_BAR, TODAY, WEEKEND
+
+        periods, period_days, codes = self.renderer().grid_codes()
+        self.assertEqual((len(periods), period_days), (7, 1))
+        completed, critical_in_progress = FIRST_BAR + 2, FIRST_BAR + 1 + 3
+        self.assertEqual(codes[0].tolist(), [completed, completed, TODAY, EMPTY, EMPTY, WEEKEND, WEEKEND])
+        self.assertEqual(codes[1].tolist(), [EMPTY, EMPTY] + [critical_in_progress] * 5)
+        self.assertEqual(codes[2].tolist(), [EMPTY, EMPTY, TODAY, EMPTY, EMPTY, WEEKEND, WEEKEND])
+
+        _, _, plain = self.renderer(critical_path_highlight=False, weekend_shading=False).grid_codes()
+        self.assertEqual(plain[1, 2], FIRST_BAR + 1)
+        self.assertEqual(plain[2, 5], EMPTY)
+
+    def test_rerender_reuses_styles_and_replaces_columns(self):
+        """Test that a second render keeps one set of named styles and drops the old timeline columns"""
+        import openpyxl
+
+        self.assertTrue(self.renderer(timeline_weeks=2).render())
+        first = openpyxl.load_workbook(self.workbook)
+        styles = list(first.named_styles)
+        self.assertEqual(first['Gantt Chart'].max_column, 7 + 14)
+
+        self.assertTrue(self.renderer(timeline_weeks=1).render())
+        second = openpyxl.load_workbook(self.workbook)
+        ws = second['Gantt Chart']
+        self.assertEqual(list(second.named_styles), styles)
+        self.assertEqual(ws.max_column, 7 + 7)
+        self.assertEqual(ws.cell(row=3, column=10).style, 'Gantt In Progress Critical')
+        self.assertEqual(ws.cell(row=1, column=10).style, 'Gantt Today Header')
+
+    def test_unknown_status_and_weeks_mode_notes(self):
+        """Test the neutral style for unknown statuses and the weekend_shading note only when it was asked for"""
+        import openpyxl
+        from gantt_renderer import FIRST_BAR
+
+        wb = openpyxl.load_workbook(self.workbook)
+        wb['Gantt Chart'].append([4, 'Review', datetime(2025, 3, 3), datetime(2025, 3, 3), 'Deferred', 'Yes'])
+        wb.save(self.workbook)
+
+        with self.assertLogs(level='WARNING') as logs:
+            renderer = self.renderer()
+            _, _, codes = renderer.grid_codes()
+            renderer.grid_codes()
+        self.assertEqual(len([line for line in logs.output if 'Deferred' in line]), 1)
+        self.assertEqual(codes[3, 0], FIRST_BAR + 2 * 3 + 1)
+        self.assertTrue(renderer.render())
+        self.assertEqual(openpyxl.load_workbook(self.workbook)['Gantt Chart']['H5'].style, 'Gantt Other Critical')
+
+        undated = np.array([], dtype='datetime64[D]')
+        weeks, shaded = self.renderer(timeline_mode='weeks'), self.renderer(timeline_mode='weeks', weekend_shading=True)
+        with self.assertNoLogs(level='INFO'):
+            weeks.timeline(undated)
+        with self.assertLogs(level='INFO') as logs:
+            shaded.timeline(undated)
+        self.assertIn('weekend_shading', logs.output[0])
+
 class TestCSVProcessing(unittest.TestCase):
     """Test CSV processing functions"""
     
@@ -261,6 +1161,51 @@ class TestCSVProcessing(unittest.TestCase):
         result = read_all_weekly_csvs(self.csv_dir)
         self.assertEqual(len(result), 1)
 
+    def test_chunked_ingest_keeps_last_row_per_week(self):
+        """Test that chunk boundaries don't change keep-last semantics or validation"""
+        weeks = pd.date_range('2024-01-01', periods=5, freq='W-MON').strftime('%Y-%m-%d')
+        export = pd.DataFrame({
+            'Week Start': np.repeat(weeks, 7),
+            'Tickets Opened': np.arange(35),
+            'Tickets Resolved': np.arange(35),
+            'NPS': 50,
+            'CSAT': 8.0,
+            'Notes': 'export'
+        })
+        export.loc[3, 'CSAT'] = 42
+        self.create_test_csv('a_export.csv', export)
+        self.create_test_csv('b_correction.csv', export.iloc[[0]].assign(**{'Tickets Opened': 999, 'CSAT': 9.0}))
+
+        report_path = os.path.join(self.test_dir, 'issues.csv')
+        ingest = dict(CONFIG.get('INGEST', {}), CHUNK_SIZE=4)
+        validation = dict(CONFIG['DATA_VALIDATION'], ISSUE_REPORT_FILE=report_path)
+        with patch.dict(CONFIG, {'INGEST': ingest, 'DATA_VALIDATION': validation}):
+            result = read_all_weekly_csvs(self.csv_dir)
+
+        self.assertEqual(list(result['Week Start'].dt.strftime('%Y-%m-%d')), list(weeks))
+        self.assertEqual(list(result['Tickets Opened']), [999, 13, 20, 27, 34])
+
+        issues = pd.read_csv(report_path)
+        self.assertEqual(list(issues['File']), ['a_export.csv'])
+        self.assertEqual(list(issues['Row']), [3])
+        self.assertEqual(issues.iloc[0]['Issues'], 'Invalid CSAT values')
+
+    def test_duplicate_policy_file_order_and_mtime(self):
+        """Test last-writer-wins by file name order and by modification time"""
+        row = {'Week Start': ['2024-01-01'], 'Tickets Resolved': [9], 'NPS': [50], 'CSAT': [8.5], 'Notes': ['x']}
+        newer = self.create_test_csv('a_resend.csv', pd.DataFrame(dict(row, **{'Tickets Opened': [20]})))
+        older = self.create_test_csv('b_original.csv', pd.DataFrame(dict(row, **{'Tickets Opened': [10]})))
+        os.utime(older, (1_700_000_000, 1_700_000_000))
+        os.utime(newer, (1_700_000_100, 1_700_000_100))
+
+        result = read_all_weekly_csvs(self.csv_dir)
+        self.assertEqual(list(result['Tickets Opened']), [10])
+
+        ingest = dict(CONFIG.get('INGEST', {}), DUPLICATE_POLICY='mtime')
+        with patch.dict(CONFIG, {'INGEST': ingest}):
+            result = read_all_weekly_csvs(self.csv_dir)
+        self.assertEqual(list(result['Tickets Opened']), [20])
+
 class TestExcelIntegration(unittest.TestCase):
     """Test Excel file integration"""
     
@@ -332,6 +1277,304 @@ class TestExcelIntegration(unittest.TestCase):
         with self.assertRaises(FileNotFoundError):
             write_to_excel(nonexistent_path, 'Weekly_Updates', new_data, 4)
 
+class TestXlsxPatch(unittest.TestCase):
+    """Test in-place patching of worksheet parts"""
+
+    def setUp(self):
+        """Workbook with a formula, a chart and a second sheet"""
+        import openpyxl
+        from openpyxl.chart import BarChart, Reference
+
+        self.test_dir = tempfile.mkdtemp()
+        self.excel_path = os.path.join(self.test_dir, 'dashboard.xlsx')
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = 'Weekly_Updates'
+        ws.append(['Week Start', 'Tickets Opened', 'Tickets Resolved', 'NPS', 'CSAT', 'Notes'])
+        for week in range(3):
+            ws.append([datetime(2024, 1, 1) + timedelta(weeks=week), 10, 9, 50, 8.0, 'old'])
+        ws['H1'] = '=SUM(B2:B40)'
+        chart = BarChart()
+        chart.add_data(Reference(ws, min_col=2, min_row=1, max_row=4), titles_from_data=True)
+        ws.add_chart(chart, 'J2')
+        wb.create_sheet('KPI_Dashboard')['A1'] = 'Metric'
+        wb.save(self.excel_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _parts(self):
+        import zipfile
+        with zipfile.ZipFile(self.excel_path) as z:
+            return {name: z.read(name) for name in z.namelist()}
+
+    def test_only_target_sheet_part_changes(self):
+        """Test that other parts are copied through and the chart survives"""
+        from xlsx_patch import patch_sheet_cells
+        import openpyxl
+
+        before = self._parts()
+        result = patch_sheet_cells(self.excel_path, 'Weekly_Updates',
+                                   {(2, 2): 99, (5, 6): 'new row'}, clear=(2, None, 1, 6))
+
+        after = self._parts()
+        self.assertEqual(result['parts_rewritten'], ['xl/worksheets/sheet1.xml'])
+        self.assertEqual(set(before), set(after))
+        self.assertEqual([n for n in before if before[n] != after[n]], ['xl/worksheets/sheet1.xml'])
+
+        ws = openpyxl.load_workbook(self.excel_path)['Weekly_Updates']
+        self.assertEqual(ws['B2'].value, 99)
+        self.assertIsNone(ws['A3'].value)
+        self.assertEqual(ws['F5'].value, 'new row')
+        self.assertEqual(ws['H1'].value, '=SUM(B2:B40)')
+        self.assertEqual(ws.dimensions, 'A1:H5')
+
+    def test_write_to_excel_patches_in_place(self):
+        """Test write_to_excel dates, number formats and untouched parts"""
+        import openpyxl
+
+        before = self._parts()
+        df = pd.DataFrame({
+            'Week Start': pd.to_datetime(['2024-02-05', '2024-02-12']),
+            'Tickets Opened': [15, 18],
+            'Tickets Resolved': [14, 17],
+            'NPS': [60, 65],
+            'CSAT': [9.0, 9.2],
+            'Notes': ['Week 6', None]
+        })
+        with patch.dict(CONFIG, {'BACKUP_ON_SAVE': False, 'EXCEL_WRITER': 'patch'}):
+            self.assertEqual(write_to_excel(self.excel_path, 'Weekly_Updates', df, 2), 2)
+
+        after = self._parts()
+        self.assertEqual(before['xl/drawings/drawing1.xml'], after['xl/drawings/drawing1.xml'])
+        self.assertEqual(before['xl/worksheets/sheet2.xml'], after['xl/worksheets/sheet2.xml'])
+
+        ws = openpyxl.load_workbook(self.excel_path)['Weekly_Updates']
+        self.assertEqual(ws['A2'].value, datetime(2024, 2, 5))
+        self.assertTrue(ws['A2'].is_date)
+        self.assertEqual([c.value for c in ws[3]][:6], [datetime(2024, 2, 12), 18, 17, 65, 9.2, None])
+        self.assertIsNone(ws['A4'].value)
+
+    def test_shared_formula_falls_back_to_openpyxl(self):
+        """Test that unsupported parts fall back to a full openpyxl save"""
+        from xlsx_patch import XlsxPatchUnsupported, patch_sheet_cells
+        import zipfile
+
+        # Turn B2 into a shared-formula master
+        parts = self._parts()
+        sheet = parts['xl/worksheets/sheet1.xml'].decode()
+        sheet = sheet.replace('<c r="B2" t="n"><v>10</v></c>', '<c r="B2"><f t="shared" ref="B2:B3" si="0">1+1</f><v>2</v></c>')
+        parts['xl/worksheets/sheet1.xml'] = sheet.encode()
+        with zipfile.ZipFile(self.excel_path, 'w') as z:
+            for name, data in parts.items():
+                z.writestr(name, data)
+
+        with self.assertRaises(XlsxPatchUnsupported):
+            patch_sheet_cells(self.excel_path, 'Weekly_Updates', {(2, 2): 1})
+
+        df = pd.DataFrame({'Week Start': pd.to_datetime(['2024-02-05']), 'Tickets Opened': [1],
+                           'Tickets Resolved': [1], 'NPS': [1], 'CSAT': [1.0], 'Notes': ['x']})
+        with patch.dict(CONFIG, {'BACKUP_ON_SAVE': False, 'EXCEL_WRITER': 'patch'}):
+            self.assertEqual(write_to_excel(self.excel_path, 'Weekly_Updates', df, 2), 1)
+
+    def test_several_sheets_in_one_pass(self):
+        """Test patching two sheets with one read and one write"""
+        from xlsx_patch import patch_workbook_cells
+        import openpyxl
+
+        result = patch_workbook_cells(self.excel_path, {
+            'Weekly_Updates': ({(2, 6): 'patched'}, None),
+            'KPI_Dashboard': ({(2, 1): 'CSAT', (2, 2): 8.7}, (2, None, 1, 3)),
+        })
+        self.assertEqual(sorted(result['parts_rewritten']),
+                         ['xl/worksheets/sheet1.xml', 'xl/worksheets/sheet2.xml'])
+
+        wb = openpyxl.load_workbook(self.excel_path)
+        self.assertEqual(wb['Weekly_Updates']['F2'].value, 'patched')
+        self.assertEqual([c.value for c in wb['KPI_Dashboard'][2]][:2], ['CSAT', 8.7])
+
+    def test_dashboard_written_in_the_weekly_save(self):
+        """Test that publish_weekly_data writes the weekly rows and KPI_Dashboard in one save"""
+        import openpyxl
+        import update_weekly
+
+        df = pd.DataFrame({'Week Start': pd.to_datetime(['2024-02-05', '2024-02-12']),
+                           'Tickets Opened': [15, 18], 'Tickets Resolved': [14, 17],
+                           'NPS': [60, 65], 'CSAT': [9.0, 9.2], 'Notes': ['a', 'b']})
+        settings = {
+            'EXCEL_PATH': self.excel_path, 'WEEKLY_SHEET': 'Weekly_Updates', 'START_ROW': 2,
+            'BACKUP_ON_SAVE': False, 'EXCEL_WRITER': 'patch',
+            'TRENDS': {'ENABLED': False},
+            'KPI_ROLLUP': {'STATE_FILE': os.path.join(self.test_dir, 'kpi.json'), 'SHEET': 'KPI_Dashboard'},
+        }
+        with patch.dict(CONFIG, settings), \
+                patch.object(update_weekly, 'patch_workbook_cells', wraps=update_weekly.patch_workbook_cells) as save:
+            result = update_weekly.publish_weekly_data(df)
+
+        self.assertEqual(result['written_rows'], 2)
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(sorted(save.call_args[0][1]), ['KPI_Dashboard', 'Weekly_Updates'])
+        wb = openpyxl.load_workbook(self.excel_path)
+        self.assertEqual(wb['Weekly_Updates']['B3'].value, 18)
+        self.assertIsNotNone(wb['KPI_Dashboard']['A2'].value)
+
+class TestSheetFeeds(unittest.TestCase):
+    """Test the multi-sheet feed pipeline"""
+
+    def setUp(self):
+        import openpyxl
+
+        self.test_dir = tempfile.mkdtemp()
+        self.excel_path = os.path.join(self.test_dir, 'plan.xlsx')
+        wb = openpyxl.Workbook()
+        wb.active.title = 'Weekly_Updates'
+        wb['Weekly_Updates'].append(['Week Start', 'Tickets Opened', 'Tickets Resolved', 'NPS', 'CSAT', 'Notes'])
+        risks = wb.create_sheet('Risk_Issue_Log')
+        risks.append(['ID', 'Risk', 'Owner'])
+        risks.append(['R-old', 'stale row', 'nobody'])
+        wb.create_sheet('WBS_TaskPlan').append(['Task ID', 'Task Name', 'Duration'])
+        wb.save(self.excel_path)
+
+        pd.DataFrame({'ID': ['R1', 'R2'], 'Risk': ['Vendor delay', 'Scope creep'],
+                      'Owner': ['PM', 'PO']}).to_csv(os.path.join(self.test_dir, 'risks.csv'), index=False)
+        with open(os.path.join(self.test_dir, 'tasks.json'), 'w') as f:
+            json.dump([{'Task ID': 1, 'Task Name': 'Design', 'Duration': 5.0},
+                       {'Task ID': 2, 'Task Name': 'Build', 'Duration': float('nan')}], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_all_sheets_written_in_one_save(self):
+        """Test concurrent loads, one save and per-sheet stage metrics"""
+        from sheet_feeds import SheetFeed, SheetFeedPipeline, build_feed
+        from update_weekly import WEEKLY_COLUMNS, _weekly_row_values
+        from instrumentation import PipelineMetrics
+        import openpyxl
+
+        weekly = pd.DataFrame({'Week Start': pd.to_datetime(['2024-01-08', '2024-01-01']),
+                               'Tickets Opened': [12, 10], 'Tickets Resolved': [11, 9],
+                               'NPS': [55.0, 50.0], 'CSAT': [8.5, 8.0], 'Notes': ['b', 'a']})
+        feeds = [
+            SheetFeed('Weekly_Updates', lambda: weekly, columns=WEEKLY_COLUMNS,
+                      row_values=_weekly_row_values, sort_by='Week Start'),
+            build_feed({'SHEET': 'Risk_Issue_Log', 'TYPE': 'csv',
+                        'SOURCE': os.path.join(self.test_dir, 'risks.csv')}),
+            build_feed({'SHEET': 'WBS_TaskPlan', 'TYPE': 'json',
+                        'SOURCE': os.path.join(self.test_dir, 'tasks.json')}),
+        ]
+        metrics = PipelineMetrics('test_pipeline')
+        pipeline = SheetFeedPipeline(feeds, metrics, max_workers=3)
+        saves = []
+        written = pipeline.apply(self.excel_path, pipeline.load_all(), before_save=saves.append)
+
+        self.assertEqual(written, {'Weekly_Updates': 2, 'Risk_Issue_Log': 2, 'WBS_TaskPlan': 2})
+        self.assertEqual(saves, [self.excel_path])
+        stages = [(r['stage'], r['attributes'].get('sheet')) for r in metrics.records]
+        self.assertEqual([s for s in stages if s[0] == 'save'], [('save', None)])
+        for sheet in written:
+            self.assertIn(('feed_load', sheet), stages)
+            self.assertIn(('write_cells', sheet), stages)
+
+        wb = openpyxl.load_workbook(self.excel_path)
+        self.assertEqual(wb['Weekly_Updates']['A2'].value, datetime(2024, 1, 1))
+        self.assertEqual([[c.value for c in row] for row in wb['Risk_Issue_Log'].iter_rows(min_row=2)],
+                         [['R1', 'Vendor delay', 'PM'], ['R2', 'Scope creep', 'PO']])
+        self.assertEqual([c.value for c in wb['WBS_TaskPlan'][3]], [2, 'Build', None])
+
+    def test_unknown_feed_type(self):
+        """Test that an unknown feed type is rejected"""
+        from sheet_feeds import build_feed
+
+        with self.assertRaises(ValueError):
+            build_feed({'SHEET': 'Sprint_Planner', 'TYPE': 'ftp', 'SOURCE': 'x'})
+
+    def test_failing_feeds(self):
+        """Test that only a required feed's failure aborts the load, and one sheet takes one feed"""
+        from sheet_feeds import SheetFeed, SheetFeedPipeline, build_feed
+        from update_weekly import SchemaError
+        from instrumentation import PipelineMetrics
+
+        def broken():
+            raise SchemaError("Missing required columns: ['CSAT']")
+
+        risks = build_feed({'SHEET': 'Risk_Issue_Log', 'TYPE': 'csv', 'SOURCE': os.path.join(self.test_dir, 'risks.csv')})
+        missing = build_feed({'SHEET': 'WBS_TaskPlan', 'TYPE': 'json', 'SOURCE': os.path.join(self.test_dir, 'none.json')})
+        metrics = PipelineMetrics('test_pipeline')
+        frames = SheetFeedPipeline([risks, missing], metrics).load_all()
+        self.assertEqual(list(frames), ['Risk_Issue_Log'])
+
+        weekly = SheetFeed('Weekly_Updates', broken, required=True)
+        with self.assertRaises(SchemaError):
+            SheetFeedPipeline([weekly, risks], metrics).load_all()
+        with self.assertRaises(ValueError):
+            SheetFeedPipeline([risks, build_feed({'SHEET': 'Risk_Issue_Log', 'TYPE': 'json', 'SOURCE': 'x'})], metrics)
+
+class TestBackupStore(unittest.TestCase):
+    """Test the deduplicating backup store"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.workbook = os.path.join(self.test_dir, 'plan.xlsx')
+        self.store_dir = os.path.join(self.test_dir, 'backups')
+        self._write(b'version 1')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, content):
+        with open(self.workbook, 'wb') as f:
+            f.write(content)
+
+    def test_unchanged_runs_are_deduplicated(self):
+        """Test that identical content is stored once and referenced by hash"""
+        from backup_store import BackupStore
+
+        store = BackupStore(self.store_dir)
+        start = datetime(2024, 3, 1, 9, 0)
+        first = store.backup(self.workbook, created=start)
+        second = store.backup(self.workbook, created=start + timedelta(minutes=7))
+        self._write(b'version 2')
+        third = store.backup(self.workbook, created=start + timedelta(minutes=14))
+
+        self.assertFalse(first['deduplicated'])
+        self.assertTrue(second['deduplicated'])
+        self.assertFalse(third['deduplicated'])
+        usage = BackupStore(self.store_dir).usage()
+        self.assertEqual((usage['snapshots'], usage['objects']), (3, 2))
+
+        restored = os.path.join(self.test_dir, 'restored.xlsx')
+        store.restore(first['id'], restored)
+        with open(restored, 'rb') as f:
+            self.assertEqual(f.read(), b'version 1')
+
+    def test_retention_and_compression(self):
+        """Test keep-last/daily/weekly thinning, gzip of old objects and restore"""
+        from backup_store import BackupStore
+
+        store = BackupStore(self.store_dir, keep_last=3, keep_daily=2, keep_weekly=3, compress_after_days=7)
+        start = datetime(2024, 1, 1, 9, 0)
+        snapshots = []
+        for day in range(40):
+            self._write(f'version {day}'.encode())
+            snapshots.append(store.backup(self.workbook, created=start + timedelta(days=day)))
+
+        kept = {s['created'][:10] for s in store.snapshots()}
+        # Last 3 runs, plus the newest of each of the last 3 ISO weeks
+        self.assertEqual(kept, {'2024-02-09', '2024-02-08', '2024-02-07', '2024-02-04', '2024-01-28'})
+        self.assertEqual(len(store.manifest['objects']), 5)
+
+        old = next(s for s in store.snapshots() if s['created'].startswith('2024-01-28'))
+        self.assertTrue(store.manifest['objects'][old['sha256']]['compressed'])
+        self.assertFalse(store.manifest['objects'][snapshots[-1]['sha256']]['compressed'])
+
+        restored = os.path.join(self.test_dir, 'restored.xlsx')
+        store.restore(old['id'], restored)
+        with open(restored, 'rb') as f:
+            self.assertEqual(f.read(), b'version 27')
+
+        stored_files = [f for _, _, files in os.walk(os.path.join(self.store_dir, 'objects')) for f in files]
+        self.assertEqual(len(stored_files), 5)
+
 class TestConfiguration(unittest.TestCase):
     """Test configuration management"""
     
@@ -392,6 +1635,457 @@ class TestPerformance(unittest.TestCase):
         self.assertIsInstance(issues, list)
         self.assertIsInstance(trends, dict)
 
+    def test_benchmark_regression_detection(self):
+        """Test that the benchmark suite flags slowdowns against a baseline"""
+        from benchmark import compare_results, scaling_exponent
+
+        baseline = {'cases': [
+            {'entry': 'scheduler', 'size': 1000, 'wall_seconds': 1.0, 'peak_rss_kb': 100000},
+            {'entry': 'importer', 'size': 1000, 'wall_seconds': 0.01, 'peak_rss_kb': 100000}
+        ]}
+        current = {'cases': [
+            {'entry': 'scheduler', 'size': 1000, 'wall_seconds': 2.0, 'peak_rss_kb': 100000},
+            {'entry': 'importer', 'size': 1000, 'wall_seconds': 0.02, 'peak_rss_kb': 100000}
+        ]}
+
+        regressions = compare_results(current, baseline, tolerance=0.25)
+
+        # Only the scheduler slowdown is above the noise floor
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('scheduler@1000', regressions[0])
+
+        # Linear timings give a scaling exponent of ~1
+        points = [{'size': 100, 'wall_seconds': 0.1}, {'size': 1000, 'wall_seconds': 1.0}]
+        self.assertAlmostEqual(scaling_exponent(points), 1.0, places=2)
+
+    def test_benchmark_case_runs(self):
+        """Test a single benchmark case end to end in a child process"""
+        from benchmark import spawn_case
+
+        result = spawn_case('weekly_ingest', 20, timeout=120)
+
+        self.assertNotIn('error', result)
+        self.assertEqual(result['size'], 20)
+        self.assertGreater(result['wall_seconds'], 0)
+
+class TestLargePlanGenerator(unittest.TestCase):
+    """Test the synthetic load-test plan generator"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_plan_is_reproducible_dag(self):
+        """Test that a seeded plan is reproducible and only links backwards"""
+        from test_data_generator import LargePlanGenerator
+
+        first = list(LargePlanGenerator(task_count=300, seed=11).iter_tasks())
+        second = list(LargePlanGenerator(task_count=300, seed=11).iter_tasks())
+        self.assertEqual(first, second)
+
+        leaves = [t for t in first if not t['summary']]
+        self.assertEqual(len(leaves), 300)
+        for task in leaves:
+            for link in task['predecessors']:
+                self.assertLess(link['uid'], task['uid'])
+                self.assertIn(link['type'], ('FS', 'SS', 'FF', 'SF'))
+
+        # Summary tasks carry the WBS outline above the leaves
+        self.assertEqual({t['outline_level'] for t in first if t['summary']}, {1, 2})
+
+    def test_streaming_outputs(self):
+        """Test that the XML and weekly CSV writers produce consistent files"""
+        from test_data_generator import LargePlanGenerator
+        from lxml import etree
+
+        plan = LargePlanGenerator(task_count=50, seed=3, resource_count=5)
+        xml_path = plan.write_mspdi_xml(os.path.join(self.test_dir, 'plan.xml'))
+
+        ns = {'ms': 'http://schemas.microsoft.com/project'}
+        root = etree.parse(xml_path).getroot()
+        task_uids = {int(uid) for uid in root.xpath('//ms:Task/ms:UID/text()', namespaces=ns)}
+        assigned = {int(uid) for uid in root.xpath('//ms:Assignment/ms:TaskUID/text()', namespaces=ns)}
+        self.assertEqual(len(root.xpath('//ms:Resource', namespaces=ns)), 5)
+        self.assertEqual(len(root.xpath('//ms:Calendar', namespaces=ns)), 3)
+        self.assertTrue(assigned <= task_uids)
+
+        folder = plan.write_weekly_csv_folder(os.path.join(self.test_dir, 'csvs'), years=2, rows_per_week=2)
+        files = sorted(os.listdir(folder))
+        self.assertEqual(len(files), 104)
+        week = pd.read_csv(os.path.join(folder, files[0]))
+        self.assertEqual(len(week), 2)
+        self.assertEqual(list(week.columns),
+                         ['Week Start', 'Tickets Opened', 'Tickets Resolved', 'NPS', 'CSAT', 'Notes'])
+
+class TestWatchMode(unittest.TestCase):
+    """Test the event-driven --watch mode"""
+
+    def setUp(self):
+        import openpyxl
+
+        self.test_dir = tempfile.mkdtemp()
+        self.csv_dir = os.path.join(self.test_dir, 'csvs')
+        os.makedirs(self.csv_dir)
+        self.excel_path = os.path.join(self.test_dir, 'plan.xlsx')
+        wb = openpyxl.Workbook()
+        wb.active.title = 'Weekly_Updates'
+        wb.save(self.excel_path)
+        self._drop('week_01.csv', '2024-01-01', 10)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _drop(self, name, week, opened):
+        # Write next to the folder and move in, as a finished download would arrive
+        tmp_path = os.path.join(self.test_dir, name)
+        pd.DataFrame({'Week Start': [week], 'Tickets Opened': [opened], 'Tickets Resolved': [opened - 1],
+                      'NPS': [50], 'CSAT': [8.0], 'Notes': [name]}).to_csv(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.csv_dir, name))
+
+    def test_burst_is_debounced_into_one_batch(self):
+        """Test that each backend yields a burst of drops as one batch"""
+        from folder_watch import InotifyWatcher, PollingWatcher, debounced_batches
+
+        backends = [lambda: PollingWatcher(self.csv_dir, interval=0.05)]
+        if sys.platform.startswith('linux'):
+            backends.append(lambda: InotifyWatcher(self.csv_dir))
+        for make_watcher in backends:
+            with make_watcher() as watcher:
+                names = [f'burst_{watcher.backend}_{i}.csv' for i in range(3)]
+                for i, name in enumerate(names):
+                    self._drop(name, f'2024-02-0{i + 1}', 5)
+                with open(os.path.join(self.csv_dir, '.partial.csv'), 'w') as f:
+                    f.write('ignored')
+                batch = next(debounced_batches(watcher, debounce=0.3, max_wait=5))
+            self.assertEqual(sorted(os.path.basename(p) for p in batch), names)
+
+    def test_watch_processes_only_new_files(self):
+        """Test start-up ingest plus one batched write for newly arrived files"""
+        import openpyxl
+        import update_weekly
+
+        settings = {'EXCEL_PATH': self.excel_path, 'CSV_FOLDER': self.csv_dir, 'START_ROW': 2,
+                    'BACKUP_ON_SAVE': False, 'TRENDS': {'ENABLED': False}, 'KPI_ROLLUP': {'ENABLED': False},
+                    'WATCH': {'BACKEND': 'polling', 'POLL_INTERVAL': 0.05, 'DEBOUNCE_SECONDS': 0.3}}
+        stop = threading.Event()
+        with patch.dict(CONFIG, settings), \
+                patch('update_weekly.create_default_config'), \
+                patch('update_weekly.ingest_weekly_csvs', wraps=update_weekly.ingest_weekly_csvs) as ingest:
+            watcher = threading.Thread(target=update_weekly.watch, kwargs={'stop': stop, 'max_batches': 1})
+            watcher.start()
+            while ingest.call_count < 1:
+                threading.Event().wait(0.05)
+            threading.Event().wait(0.2)
+            self._drop('week_02.csv', '2024-01-08', 20)
+            self._drop('week_01.csv', '2024-01-01', 30)
+            watcher.join(timeout=10)
+            stop.set()
+
+        self.assertFalse(watcher.is_alive())
+        self.assertEqual(ingest.call_count, 2)
+        self.assertEqual(sorted(os.path.basename(f) for f in ingest.call_args_list[1].args[0]),
+                         ['week_01.csv', 'week_02.csv'])
+        ws = openpyxl.load_workbook(self.excel_path)['Weekly_Updates']
+        self.assertEqual([(row[0].value, row[1].value) for row in ws.iter_rows(min_row=2)],
+                         [(datetime(2024, 1, 1), 30), (datetime(2024, 1, 8), 20)])
+
+    def test_watch_batches_are_profiled(self):
+        """Test that --watch --profile writes a profile per published batch"""
+        import update_weekly
+
+        settings = {'EXCEL_PATH': self.excel_path, 'CSV_FOLDER': self.csv_dir, 'START_ROW': 2,
+                    'BACKUP_ON_SAVE': False, 'TRENDS': {'ENABLED': False}, 'KPI_ROLLUP': {'ENABLED': False},
+                    'LOG_FILE': os.path.join(self.test_dir, 'logs', 'weekly_update.log')}
+        with patch.dict(CONFIG, settings):
+            update_weekly._publish_arrivals([os.path.join(self.csv_dir, 'week_01.csv')],
+                                            update_weekly.WeekIndex(update_weekly.WEEKLY_COLUMNS), profile=True)
+
+        reports = os.listdir(os.path.join(self.test_dir, 'logs'))
+        self.assertTrue(any(name.startswith('update_weekly_watch_profile_') and name.endswith('.txt')
+                            for name in reports))
+
+class TestInstrumentation(unittest.TestCase):
+    """Test per-stage timing and memory instrumentation"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_stage_records_and_exports(self):
+        """Test stage records, JSON lines and the Prometheus/OTLP exports"""
+        from instrumentation import PipelineMetrics
+
+        metrics_file = os.path.join(self.test_dir, 'metrics.jsonl')
+        prom_file = os.path.join(self.test_dir, 'textfile', 'pipeline.prom')
+        otel_file = os.path.join(self.test_dir, 'otel.jsonl')
+        metrics = PipelineMetrics('test_pipeline', metrics_file=metrics_file,
+                                  prometheus_textfile=prom_file, otel_file=otel_file)
+
+        with metrics.stage('load_workbook'):
+            with metrics.stage('parse_csv', files=3):
+                sum(range(10000))
+        with metrics.stage('save'):
+            pass
+
+        self.assertEqual([r['stage'] for r in metrics.records], ['parse_csv', 'load_workbook', 'save'])
+        self.assertEqual(metrics.records[0]['parent'], 'load_workbook')
+        self.assertGreaterEqual(metrics.records[1]['wall_seconds'], metrics.records[0]['wall_seconds'])
+
+        with open(metrics_file) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]['attributes'], {'files': 3})
+
+        totals = metrics.flush()
+        self.assertEqual(totals['save']['count'], 1)
+        self.assertEqual(metrics.records, [])
+
+        with open(prom_file) as f:
+            prom = f.read()
+        self.assertIn('hybrid_pmp_stage_wall_seconds{pipeline="test_pipeline",stage="parse_csv"}', prom)
+
+        with open(otel_file) as f:
+            payload = json.loads(f.readline())
+        spans = payload['resourceSpans'][0]['scopeSpans'][0]['spans']
+        by_name = {span['name']: span for span in spans}
+        self.assertEqual(by_name['parse_csv']['parentSpanId'], by_name['load_workbook']['spanId'])
+
+    def test_failed_stage_is_recorded(self):
+        """Test that a stage raising an exception is recorded with error status"""
+        from instrumentation import PipelineMetrics
+
+        metrics = PipelineMetrics('test_pipeline')
+        with self.assertRaises(ValueError):
+            with metrics.stage('validate'):
+                raise ValueError("bad data")
+
+        self.assertEqual(metrics.records[0]['status'], 'error')
+
+    def test_stages_nest_per_thread(self):
+        """Test that stages in worker threads do not nest under each other"""
+        from instrumentation import PipelineMetrics
+
+        metrics = PipelineMetrics('test_pipeline')
+        barrier = threading.Barrier(2)
+
+        def load(sheet):
+            with metrics.stage('feed_load', sheet=sheet):
+                barrier.wait(timeout=5)
+
+        with metrics.stage('load_feeds'):
+            workers = [threading.Thread(target=load, args=(sheet,)) for sheet in ('a', 'b')]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        loads = [r for r in metrics.records if r['stage'] == 'feed_load']
+        self.assertEqual(len(loads), 2)
+        self.assertTrue(all(r['parent'] is None for r in loads))
+        self.assertIsNone(metrics.records[-1]['parent'])
+
+class TestQueuedLogging(unittest.TestCase):
+    """Test the shared queue-based logging setup"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        import update_weekly
+
+        update_weekly.setup_logging()
+        shutil.rmtree(self.test_dir)
+
+    def test_json_lines_and_summarised_items(self):
+        """Test JSON output, background writing and per-item summaries"""
+        import logging
+        import log_setup
+
+        log_file = os.path.join(self.test_dir, 'logs', 'run.log')
+        logs = log_setup.setup_logging('INFO', log_file, console=False, fmt='json', summary_after=3)
+        logger = logging.getLogger('test.ingest')
+        caller = threading.get_ident()
+        writers = []
+        logs.listener.handlers[0].addFilter(lambda record: writers.append(threading.get_ident()) or True)
+
+        for i in range(50):
+            logger.info("Processed file %d", i, extra={'summary': 'csv_processed'})
+        logger.warning("Run finished", extra={'fields': {'files': 50}})
+        logs.stop()
+
+        with open(log_file) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line['message'] for line in lines[:3]],
+                         ['Processed file 0', 'Processed file 1', 'Processed file 2'])
+        self.assertEqual(lines[3]['files'], 50)
+        self.assertEqual(lines[4]['summary_key'], 'csv_processed')
+        self.assertEqual(lines[4]['count'], 50)
+        self.assertEqual(len(lines), 5)
+        self.assertNotIn(caller, writers)
+
+class TestProfiling(unittest.TestCase):
+    """Test the built-in --profile mode"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_profile_reports_written(self):
+        """Test that a profiled run writes pstats, folded stacks and a summary"""
+        from profiling import profile_run
+
+        def busy_function():
+            deadline = datetime.now() + timedelta(milliseconds=100)
+            total = 0
+            while datetime.now() < deadline:
+                total += sum(range(1000))
+            return total
+
+        with profile_run('unit_test', self.test_dir, enabled=True,
+                         settings={'TOP_N': 5, 'SAMPLE_INTERVAL_MS': 1}) as profiler:
+            busy_function()
+
+        for key in ('pstats', 'folded', 'summary'):
+            self.assertTrue(os.path.exists(profiler.paths[key]), key)
+
+        with open(profiler.paths['summary']) as f:
+            self.assertIn('busy_function', f.read())
+        with open(profiler.paths['folded']) as f:
+            stack, count = f.readline().rsplit(' ', 1)
+        self.assertIn('busy_function', stack)
+        self.assertGreater(int(count), 0)
+
+    def test_profile_disabled_is_noop(self):
+        """Test that profile_run does nothing unless enabled"""
+        from profiling import profile_run
+
+        with profile_run('unit_test', self.test_dir, enabled=False):
+            pass
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+class LocalSMTPServer:
+    """Minimal stand-in SMTP server recording connections and messages"""
+
+    def __init__(self):
+        import socketserver
+
+        self.connections = 0
+        self.messages = []
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server.connections += 1
+                self.wfile.write(b"220 localhost test SMTP\r\n")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    command = line.decode().strip().upper()
+                    if command.startswith(('EHLO', 'HELO')):
+                        self.wfile.write(b"250 localhost\r\n")
+                    elif command == 'DATA':
+                        self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                        data = []
+                        while True:
+                            chunk = self.rfile.readline()
+                            if chunk in (b".\r\n", b""):
+                                break
+                            data.append(chunk.decode())
+                        server.messages.append(''.join(data))
+                        self.wfile.write(b"250 OK\r\n")
+                    elif command == 'QUIT':
+                        self.wfile.write(b"221 Bye\r\n")
+                        return
+                    else:
+                        self.wfile.write(b"250 OK\r\n")
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class TestNotifications(unittest.TestCase):
+    """Test queued, batched e-mail notification delivery"""
+
+    def setUp(self):
+        self.smtp = LocalSMTPServer()
+        self.settings = {
+            'ENABLED': True,
+            'SMTP_SERVER': '127.0.0.1',
+            'SMTP_PORT': self.smtp.port,
+            'EMAIL': 'bot@example.com',
+            'PASSWORD': '',
+            'TO_EMAILS': ['team@example.com'],
+            'USE_TLS': False,
+            'MAX_EVENTS_PER_GROUP': 5
+        }
+
+    def tearDown(self):
+        self.smtp.stop()
+
+    def test_events_coalesced_into_one_digest(self):
+        """Test that many events produce one e-mail over one connection"""
+        from update_weekly import NotificationDispatcher
+
+        notifier = NotificationDispatcher(lambda: self.settings)
+        for i in range(50):
+            notifier.notify('CSV Processing Error', f'Failed to process file_{i}.csv', is_error=True)
+        notifier.notify('Data Quality Issues', 'Missing values in CSAT: 2 rows')
+
+        self.assertTrue(notifier.flush(timeout=10))
+        self.assertEqual(len(self.smtp.messages), 1)
+        self.assertEqual(self.smtp.connections, 1)
+
+        message = self.smtp.messages[0]
+        self.assertIn('[ERROR] Weekly Update digest: 51 events, 50 errors', message)
+        self.assertIn('CSV Processing Error (50)', message)
+        self.assertIn('... and 45 more', message)
+
+        # A second digest reuses the pooled connection
+        notifier.notify('Weekly Update Success', 'Processed 10 data rows')
+        notifier.close(timeout=10)
+        self.assertEqual(len(self.smtp.messages), 2)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertIn('[INFO] Weekly Update Success', self.smtp.messages[1])
+
+    def test_notify_does_not_block(self):
+        """Test that queueing events returns immediately even if SMTP is unreachable"""
+        from update_weekly import NotificationDispatcher
+
+        self.settings['SMTP_PORT'] = 1
+        notifier = NotificationDispatcher(lambda: self.settings)
+
+        start = datetime.now()
+        for i in range(500):
+            notifier.notify('CSV Processing Error', f'file_{i}.csv', is_error=True)
+        self.assertLess((datetime.now() - start).total_seconds(), 1.0)
+
+        notifier.close(timeout=10)
+        self.assertEqual(notifier.sent_digests, 0)
+
+    def test_disabled_notifications_are_dropped(self):
+        """Test that nothing is queued when notifications are disabled"""
+        from update_weekly import NotificationDispatcher
+
+        self.settings['ENABLED'] = False
+        notifier = NotificationDispatcher(lambda: self.settings)
+        notifier.notify('Weekly Update Success', 'ok')
+
+        self.assertTrue(notifier.flush(timeout=1))
+        self.assertEqual(self.smtp.connections, 0)
+
 class MockDataGenerator:
     """Generate mock data for testing"""
     
@@ -445,10 +2139,29 @@ def run_tests(verbose=False, coverage=False):
     test_classes = [
         TestDataValidation,
         TestTrendAnalysis,
+        TestKpiRollup,
+        TestEarnedValue,
+        TestSprintAnalytics,
+        TestRiskRegister,
+        TestPlanScenarios,
+        TestMspdiValues,
+        TestPlanConsolidation,
+        TestWbsHierarchy,
+        TestTimelineFacts,
+        TestGanttRenderer,
         TestCSVProcessing,
         TestExcelIntegration,
+        TestXlsxPatch,
+        TestSheetFeeds,
+        TestBackupStore,
+        TestWatchMode,
         TestConfiguration,
-        TestPerformance
+        TestPerformance,
+        TestLargePlanGenerator,
+        TestInstrumentation,
+        TestQueuedLogging,
+        TestProfiling,
+        TestNotifications
     ]
     
     for test_class in test_classes:
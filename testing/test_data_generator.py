@@ -9,6 +9,7 @@ for testing and demonstration purposes.
 Usage:
     python test_data_generator.py
     python test_data_generator.py --weeks 24 --output test_data/
+    python test_data_generator.py --tasks 100000 --seed 7 --years 5 --output load_data/
 """
 
 import pandas as pd
@@ -354,13 +355,455 @@ class ProjectDataGenerator:
         print(f"Created sample configuration: {config_path}")
         return config_path
 
+class LargePlanGenerator:
+    """Generate large, seeded synthetic project plans for load testing
+
+    Tasks are produced by a generator (``iter_tasks``) in blocks, so writers
+    can stream plans of millions of tasks to disk without holding them in
+    memory. The same seed always yields the same plan, and every writer
+    re-runs the generator, so the workbook, MSPDI XML and CSV outputs of one
+    seed describe the same project.
+
+    Plan shape:
+    - WBS hierarchy of phases (outline level 1), work packages (level 2)
+      and leaf tasks (level 3); summary tasks carry no links
+    - Fan-in per leaf is Poisson distributed; predecessors are drawn from a
+      geometric distance over recent leaves, plus occasional "hub" tasks
+      that give a heavy-tailed fan-out
+    - FS/SS/FF/SF link types, lags/leads, resource assignments and a mix
+      of working calendars
+    """
+
+    # MSPDI PredecessorLink/Type codes
+    MSPDI_LINK_TYPES = {'FF': 0, 'FS': 1, 'SF': 2, 'SS': 3}
+
+    CALENDARS = [
+        {'uid': 1, 'name': 'Standard', 'working_weekdays': [0, 1, 2, 3, 4]},
+        {'uid': 2, 'name': 'Six Day', 'working_weekdays': [0, 1, 2, 3, 4, 5]},
+        {'uid': 3, 'name': 'Seven Day', 'working_weekdays': [0, 1, 2, 3, 4, 5, 6]}
+    ]
+
+    HOLIDAYS = [(1, 1), (7, 4), (12, 25)]
+
+    def __init__(self, task_count=1000, seed=0, project_start=None, status_date=None,
+                 fan_in_mean=1.5, max_fan_in=5, locality=8, window=200,
+                 hub_fraction=0.01, hub_link_probability=0.05,
+                 link_type_weights=None, lag_probability=0.1, max_lag_days=5,
+                 resource_count=50, max_assignments=2, calendar_weights=None,
+                 tasks_per_package=10, packages_per_phase=10, calendar_years=3, block_size=8192):
+        self.task_count = task_count
+        self.seed = seed
+        self.project_start = project_start or datetime(2025, 1, 6, 8, 0)
+        self.status_date = status_date or self.project_start + timedelta(days=90)
+        self.fan_in_mean = fan_in_mean
+        self.max_fan_in = max_fan_in
+        self.locality = locality
+        self.window = window
+        self.hub_fraction = hub_fraction
+        self.hub_link_probability = hub_link_probability
+        self.link_type_weights = link_type_weights or {'FS': 0.85, 'SS': 0.08, 'FF': 0.05, 'SF': 0.02}
+        self.lag_probability = lag_probability
+        self.max_lag_days = max_lag_days
+        self.resource_count = resource_count
+        self.max_assignments = max_assignments
+        self.calendar_weights = calendar_weights or {1: 0.8, 2: 0.15, 3: 0.05}
+        self.tasks_per_package = tasks_per_package
+        self.packages_per_phase = packages_per_phase
+        self.calendar_years = calendar_years
+        self.block_size = block_size
+
+    def resources(self):
+        """Resource pool shared by all tasks"""
+        return [
+            {'uid': i, 'name': f'Resource {i:04d}', 'calendar_uid': 1}
+            for i in range(1, self.resource_count + 1)
+        ]
+
+    def calendars(self, years=None):
+        """Working calendars, with fixed-date holidays for each plan year"""
+        if years is None:
+            years = range(self.project_start.year, self.project_start.year + self.calendar_years)
+        holidays = [datetime(year, month, day) for year in years for month, day in self.HOLIDAYS]
+        return [dict(calendar, holidays=holidays) for calendar in self.CALENDARS]
+
+    def iter_tasks(self):
+        """Yield task dicts (summaries and leaves) in outline order
+
+        Leaf tasks count towards ``task_count``; summary tasks are extra.
+        IDs and UIDs are sequential and shared by both kinds of task.
+        """
+        rng = np.random.default_rng(self.seed)
+        link_names = list(self.link_type_weights)
+        link_p = np.array([self.link_type_weights[k] for k in link_names], dtype=float)
+        link_p /= link_p.sum()
+        calendar_uids = list(self.calendar_weights)
+        calendar_p = np.array([self.calendar_weights[k] for k in calendar_uids], dtype=float)
+        calendar_p /= calendar_p.sum()
+
+        # Rolling state: recent leaves (for locality) and a bounded set of hubs
+        recent = []
+        hubs = []
+        next_id = 1
+        leaves_done = 0
+        phase = package = 0
+
+        while leaves_done < self.task_count:
+            n = min(self.block_size, self.task_count - leaves_done)
+            fan_in = np.minimum(rng.poisson(self.fan_in_mean, n), self.max_fan_in)
+            durations = np.maximum(1, np.round(rng.lognormal(1.5, 0.6, n))).astype(int)
+            link_idx = rng.choice(len(link_names), size=(n, self.max_fan_in), p=link_p)
+            lags = np.where(
+                rng.random((n, self.max_fan_in)) < self.lag_probability,
+                rng.integers(-self.max_lag_days // 2, self.max_lag_days + 1, (n, self.max_fan_in)),
+                0
+            )
+            distances = rng.geometric(1.0 / self.locality, (n, self.max_fan_in))
+            use_hub = rng.random(n) < self.hub_link_probability
+            becomes_hub = rng.random(n) < self.hub_fraction
+            calendars = rng.choice(calendar_uids, size=n, p=calendar_p)
+            assignment_counts = rng.integers(1, self.max_assignments + 1, n)
+            resource_picks = rng.integers(1, self.resource_count + 1, (n, self.max_assignments))
+            priorities = rng.choice([200, 500, 800], size=n, p=[0.25, 0.5, 0.25])
+            milestones = rng.random(n) < 0.02
+
+            for i in range(n):
+                # Open a new phase / work package when the previous one is full
+                if leaves_done % (self.tasks_per_package * self.packages_per_phase) == 0:
+                    phase += 1
+                    package = 0
+                    yield self._summary(next_id, 1, f'{phase}', f'Phase {phase}')
+                    next_id += 1
+                if leaves_done % self.tasks_per_package == 0:
+                    package += 1
+                    yield self._summary(next_id, 2, f'{phase}.{package}', f'Work Package {phase}.{package}')
+                    next_id += 1
+
+                duration = 0 if milestones[i] else int(durations[i])
+                predecessors = []
+                chosen = set()
+                for k in range(min(int(fan_in[i]), len(recent))):
+                    distance = int(min(distances[i, k], len(recent), self.window))
+                    pred = recent[-distance]
+                    if pred['uid'] in chosen:
+                        continue
+                    chosen.add(pred['uid'])
+                    predecessors.append((pred, link_names[link_idx[i, k]], int(lags[i, k])))
+                if use_hub[i] and hubs:
+                    pred = hubs[int(rng.integers(0, len(hubs)))]
+                    if pred['uid'] not in chosen:
+                        predecessors.append((pred, 'FS', 0))
+
+                start = self.project_start
+                calendar_days = int(np.ceil(duration * 7 / 5))
+                for pred, link_type, lag in predecessors:
+                    if link_type == 'FS':
+                        candidate = pred['finish'] + timedelta(days=lag)
+                    elif link_type == 'SS':
+                        candidate = pred['start'] + timedelta(days=lag)
+                    elif link_type == 'FF':
+                        candidate = pred['finish'] + timedelta(days=lag - calendar_days)
+                    else:
+                        candidate = pred['start'] + timedelta(days=lag - calendar_days)
+                    start = max(start, candidate)
+                finish = start + timedelta(days=calendar_days)
+
+                if finish <= self.status_date:
+                    percent = 100
+                elif start >= self.status_date:
+                    percent = 0
+                else:
+                    percent = int(100 * (self.status_date - start) / (finish - start))
+
+                task_uid = next_id
+                resources = sorted(set(int(r) for r in resource_picks[i, :assignment_counts[i]]))
+                task = {
+                    'uid': task_uid,
+                    'id': task_uid,
+                    'name': f'Milestone {task_uid}' if milestones[i] else f'Task {task_uid}',
+                    'outline_level': 3,
+                    'outline_number': f'{phase}.{package}.{leaves_done % self.tasks_per_package + 1}',
+                    'summary': False,
+                    'milestone': bool(milestones[i]),
+                    'start': start,
+                    'finish': finish,
+                    'duration_days': duration,
+                    'percent_complete': percent,
+                    'priority': int(priorities[i]),
+                    'calendar_uid': int(calendars[i]),
+                    'resource_uids': resources,
+                    'predecessors': [
+                        {'uid': pred['uid'], 'type': link_type, 'lag_days': lag}
+                        for pred, link_type, lag in predecessors
+                    ]
+                }
+                yield task
+
+                node = {'uid': task_uid, 'start': start, 'finish': finish}
+                recent.append(node)
+                if len(recent) > self.window:
+                    del recent[0]
+                if becomes_hub[i]:
+                    hubs.append(node)
+                    if len(hubs) > 64:
+                        del hubs[0]
+
+                next_id += 1
+                leaves_done += 1
+
+    def _summary(self, uid, level, outline_number, name):
+        return {
+            'uid': uid, 'id': uid, 'name': name, 'outline_level': level,
+            'outline_number': outline_number, 'summary': True, 'milestone': False,
+            'start': None, 'finish': None, 'duration_days': 0, 'percent_complete': 0,
+            'priority': 500, 'calendar_uid': 1, 'resource_uids': [], 'predecessors': []
+        }
+
+    @staticmethod
+    def format_dependencies(predecessors):
+        """Format links in the Gantt sheet notation, e.g. "12FS, 15SS+2" """
+        parts = []
+        for link in predecessors:
+            lag = link['lag_days']
+            suffix = f"{lag:+d}" if lag else ''
+            parts.append(f"{link['uid']}{link['type']}{suffix}")
+        return ', '.join(parts)
+
+    def write_gantt_workbook(self, filepath, include_summaries=False):
+        """Stream the plan into a 'Gantt Chart' workbook (write-only mode)"""
+        resource_names = {r['uid']: r['name'] for r in self.resources()}
+        priority_names = {200: 'Low', 500: 'Medium', 800: 'High'}
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet('Gantt Chart')
+        ws.append([
+            'Task ID', 'Task Name', 'Duration (Days)', 'Start Date', 'Finish Date',
+            'Progress (%)', 'Status', 'Dependencies', 'Assigned To', 'Priority', 'Notes',
+            'Critical Path'
+        ])
+
+        written = 0
+        for task in self.iter_tasks():
+            if task['summary'] and not include_summaries:
+                continue
+            percent = task['percent_complete']
+            ws.append([
+                task['id'],
+                task['name'],
+                task['duration_days'],
+                task['start'],
+                task['finish'],
+                percent,
+                'Completed' if percent == 100 else 'In Progress' if percent else 'Not Started',
+                self.format_dependencies(task['predecessors']),
+                ', '.join(resource_names[uid] for uid in task['resource_uids']),
+                priority_names[task['priority']],
+                '',
+                ''
+            ])
+            written += 1
+
+        wb.save(filepath)
+        print(f"Created Gantt workbook with {written} tasks: {filepath}")
+        return filepath
+
+    def wbs_frame(self):
+        """Leaf tasks as a WBS_TaskPlan-shaped DataFrame (WBS ID = outline number)
+
+        Started tasks get an actual start one day either side of the plan;
+        finished ones an actual end, so cost and schedule variances are mixed.
+        """
+        rng = np.random.default_rng(self.seed + 1)
+        leaves = [task for task in self.iter_tasks() if not task['summary']]
+        n = len(leaves)
+        planned_start = pd.to_datetime([task['start'] for task in leaves]).normalize()
+        planned_end = pd.to_datetime([task['finish'] for task in leaves]).normalize()
+        percent = np.array([task['percent_complete'] for task in leaves])
+        slip = pd.to_timedelta(rng.integers(-1, 2, n), unit='D')
+        actual_start = (planned_start + slip).where(percent > 0)
+        actual_end = (planned_end + pd.to_timedelta(rng.integers(-2, 4, n), unit='D')).where(percent == 100)
+        return pd.DataFrame({
+            'WBS ID': [task['outline_number'] for task in leaves],
+            'Task Name': [task['name'] for task in leaves],
+            'Owner': [f"Resource {task['resource_uids'][0]:04d}" for task in leaves],
+            'Planned Start': planned_start,
+            'Planned End': planned_end,
+            'Planned Days': [task['duration_days'] for task in leaves],
+            'Actual Start': actual_start,
+            'Actual End': actual_end,
+            'Actual Days': (actual_end - actual_start).days,
+            '% Complete': percent,
+        })
+
+    def write_mspdi_xml(self, filepath, project_name='Synthetic Load Test Plan'):
+        """Stream the plan as MS Project XML (MSPDI) without building a tree"""
+        from lxml import etree
+
+        ns = 'http://schemas.microsoft.com/project'
+
+        def sub(parent, tag, text):
+            element = etree.SubElement(parent, tag)
+            element.text = str(text)
+            return element
+
+        def duration_text(days):
+            return f'PT{int(days * 8)}H0M0S'
+
+        with etree.xmlfile(filepath, encoding='utf-8') as xf:
+            xf.write_declaration(standalone=True)
+            with xf.element('Project', nsmap={None: ns}):
+                for tag, text in [('Name', project_name),
+                                  ('StartDate', self.project_start.isoformat()),
+                                  ('StatusDate', self.status_date.isoformat()),
+                                  ('CalendarUID', 1),
+                                  ('MinutesPerDay', 480),
+                                  ('MinutesPerWeek', 2400)]:
+                    element = etree.Element(tag)
+                    element.text = str(text)
+                    xf.write(element)
+
+                with xf.element('Calendars'):
+                    for calendar in self.calendars():
+                        element = etree.Element('Calendar')
+                        sub(element, 'UID', calendar['uid'])
+                        sub(element, 'Name', calendar['name'])
+                        sub(element, 'IsBaseCalendar', 1)
+                        weekdays = etree.SubElement(element, 'WeekDays')
+                        for python_day in range(7):
+                            weekday = etree.SubElement(weekdays, 'WeekDay')
+                            # MSPDI DayType: 1 = Sunday ... 7 = Saturday
+                            sub(weekday, 'DayType', (python_day + 1) % 7 + 1)
+                            working = python_day in calendar['working_weekdays']
+                            sub(weekday, 'DayWorking', int(working))
+                            if working:
+                                times = etree.SubElement(weekday, 'WorkingTimes')
+                                for start, end in [('08:00:00', '12:00:00'), ('13:00:00', '17:00:00')]:
+                                    working_time = etree.SubElement(times, 'WorkingTime')
+                                    sub(working_time, 'FromTime', start)
+                                    sub(working_time, 'ToTime', end)
+                        for holiday in calendar['holidays']:
+                            weekday = etree.SubElement(weekdays, 'WeekDay')
+                            sub(weekday, 'DayType', 0)
+                            sub(weekday, 'DayWorking', 0)
+                            period = etree.SubElement(weekday, 'TimePeriod')
+                            sub(period, 'FromDate', holiday.strftime('%Y-%m-%dT00:00:00'))
+                            sub(period, 'ToDate', holiday.strftime('%Y-%m-%dT23:59:00'))
+                        xf.write(element)
+
+                with xf.element('Tasks'):
+                    for task in self.iter_tasks():
+                        element = etree.Element('Task')
+                        sub(element, 'UID', task['uid'])
+                        sub(element, 'ID', task['id'])
+                        sub(element, 'Name', task['name'])
+                        sub(element, 'OutlineNumber', task['outline_number'])
+                        sub(element, 'OutlineLevel', task['outline_level'])
+                        sub(element, 'Priority', task['priority'])
+                        if task['start'] is not None:
+                            sub(element, 'Start', task['start'].isoformat())
+                            sub(element, 'Finish', task['finish'].isoformat())
+                            sub(element, 'Duration', duration_text(task['duration_days']))
+                            sub(element, 'DurationFormat', 7)
+                        sub(element, 'Milestone', int(task['milestone']))
+                        sub(element, 'Summary', int(task['summary']))
+                        sub(element, 'PercentComplete', task['percent_complete'])
+                        sub(element, 'CalendarUID', task['calendar_uid'])
+                        for link in task['predecessors']:
+                            predecessor = etree.SubElement(element, 'PredecessorLink')
+                            sub(predecessor, 'PredecessorUID', link['uid'])
+                            sub(predecessor, 'Type', self.MSPDI_LINK_TYPES[link['type']])
+                            # LinkLag is expressed in tenths of a minute
+                            sub(predecessor, 'LinkLag', link['lag_days'] * 480 * 10)
+                            sub(predecessor, 'LagFormat', 7)
+                        xf.write(element)
+
+                with xf.element('Resources'):
+                    for resource in self.resources():
+                        element = etree.Element('Resource')
+                        sub(element, 'UID', resource['uid'])
+                        sub(element, 'ID', resource['uid'])
+                        sub(element, 'Name', resource['name'])
+                        sub(element, 'Type', 1)
+                        sub(element, 'MaxUnits', '1.00')
+                        sub(element, 'CalendarUID', resource['calendar_uid'])
+                        xf.write(element)
+
+                with xf.element('Assignments'):
+                    assignment_uid = 1
+                    for task in self.iter_tasks():
+                        for resource_uid in task['resource_uids']:
+                            element = etree.Element('Assignment')
+                            sub(element, 'UID', assignment_uid)
+                            sub(element, 'TaskUID', task['uid'])
+                            sub(element, 'ResourceUID', resource_uid)
+                            sub(element, 'Units', 1)
+                            sub(element, 'Work', duration_text(task['duration_days']))
+                            sub(element, 'Start', task['start'].isoformat())
+                            sub(element, 'Finish', task['finish'].isoformat())
+                            xf.write(element)
+                            assignment_uid += 1
+
+        print(f"Created MS Project XML with {self.task_count} tasks: {filepath}")
+        return filepath
+
+    def write_weekly_csv_folder(self, folder, years=3, start_date=None, rows_per_week=1, weeks_per_file=1):
+        """Stream multi-year weekly update CSVs into a folder
+
+        ``rows_per_week`` > 1 repeats each week (later rows supersede earlier
+        ones, like resubmitted exports); ``weeks_per_file`` > 1 produces
+        fewer, larger files like bulk ticketing-system exports.
+        """
+        import csv
+
+        rng = np.random.default_rng(self.seed)
+        os.makedirs(folder, exist_ok=True)
+        start_date = start_date or self.project_start - timedelta(weeks=52 * years)
+        total_weeks = 52 * years
+        headers = ['Week Start', 'Tickets Opened', 'Tickets Resolved', 'NPS', 'CSAT', 'Notes']
+
+        files = 0
+        csat, nps = 8.0, 50.0
+        for first_week in range(0, total_weeks, weeks_per_file):
+            week_start = start_date + timedelta(weeks=first_week)
+            filename = f"week_{first_week + 1:04d}_{week_start.strftime('%Y%m%d')}.csv"
+            with open(os.path.join(folder, filename), 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(headers)
+                for week in range(first_week, min(first_week + weeks_per_file, total_weeks)):
+                    day = (start_date + timedelta(weeks=week)).strftime('%Y-%m-%d')
+                    opened = rng.poisson(15, rows_per_week)
+                    resolved = np.maximum(0, opened - rng.integers(-2, 4, rows_per_week))
+                    for k in range(rows_per_week):
+                        csat = min(10.0, max(6.0, csat + rng.normal(0, 0.3)))
+                        nps = min(100.0, max(-50.0, nps + rng.normal(0, 5)))
+                        writer.writerow([day, int(opened[k]), int(resolved[k]), int(nps),
+                                         round(csat, 1), 'Normal operations'])
+            files += 1
+
+        print(f"Created {files} CSV files ({total_weeks * rows_per_week} rows) in {folder}")
+        return folder
+
+
 def main():
     """Main function to generate test data"""
     parser = argparse.ArgumentParser(description='Generate test data for Hybrid Project Management')
     parser.add_argument('--weeks', type=int, default=12, help='Number of weeks of data to generate')
     parser.add_argument('--output', default='test_data', help='Output directory')
+    parser.add_argument('--tasks', type=int, default=0, help='Also generate a large synthetic plan with this many tasks')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the large synthetic plan')
+    parser.add_argument('--years', type=int, default=0, help='Also generate a multi-year weekly CSV folder')
     
     args = parser.parse_args()
+
+    if args.tasks or args.years:
+        plan = LargePlanGenerator(task_count=args.tasks, seed=args.seed)
+        os.makedirs(args.output, exist_ok=True)
+        if args.tasks:
+            print(f"Generating {args.tasks} task synthetic plan (seed {args.seed})...")
+            plan.write_gantt_workbook(os.path.join(args.output, f'plan_{args.tasks}.xlsx'))
+            plan.write_mspdi_xml(os.path.join(args.output, f'plan_{args.tasks}.xml'))
+        if args.years:
+            plan.write_weekly_csv_folder(os.path.join(args.output, f'weekly_{args.years}y'), years=args.years)
+        return
     
     print("Generating test data for Hybrid Project Management System...")
     